@@ -0,0 +1,137 @@
+# ================================
+# GODOFREDA ASGI MIDDLEWARE
+# ================================
+# Métricas, admissão (rate limit) e span raiz do tracing como middleware
+# ASGI puro: sem task extra por requisição, sem reembalar o corpo das
+# respostas e com a duração medida até o último byte dos streams
+# ================================
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from instrumentation import route_template
+from tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+# (prefixo do caminho, método ou None para todos, tipo de limite)
+RateLimitRule = Tuple[str, Optional[str], str]
+AdmissionCheck = Callable[[Request, str], Awaitable[None]]
+
+# Header que força o rastreamento de uma requisição, independente da amostragem
+FORCE_TRACE_HEADER = b"x-trace"
+
+
+class MetricsMiddleware:
+    """
+    Conta requisições, mede a duração e aplica o rate limit na entrada
+
+    A duração vai do primeiro evento até o envio do último bloco do corpo,
+    então respostas em streaming (áudio) são medidas até o fim. Conexões
+    ativas só diminuem quando o stream termina ou o cliente desconecta.
+
+    Args:
+        app: aplicação ASGI interna
+        request_count: Counter com rótulos method, endpoint, status
+        request_duration: Histogram com rótulos method, endpoint
+        active_connections: Gauge de requisições em andamento
+        error_count: Counter com rótulo type
+        admission: verificação de rate limit; levanta HTTPException para recusar
+        rate_limits: regras que decidem qual limite se aplica a cada requisição
+        tracer: abre o span raiz das requisições amostradas e devolve o
+            X-Trace-Id na resposta
+    """
+
+    def __init__(self, app: ASGIApp, request_count: Any, request_duration: Any, active_connections: Any,
+                 error_count: Any, admission: Optional[AdmissionCheck] = None,
+                 rate_limits: Sequence[RateLimitRule] = (), tracer: Optional[Tracer] = None):
+        self.app = app
+        self.request_count = request_count
+        self.request_duration = request_duration
+        self.active_connections = active_connections
+        self.error_count = error_count
+        self.admission = admission
+        self.rate_limits = tuple(rate_limits)
+        self.tracer = tracer
+        # Filhos dos rótulos já resolvidos (conjunto limitado pelas rotas)
+        self._counters: Dict[Tuple[str, str, int], Any] = {}
+        self._histograms: Dict[Tuple[str, str], Any] = {}
+
+    def limit_for(self, path: str, method: str) -> Optional[str]:
+        """Tipo de rate limit da requisição (primeira regra que casa)"""
+        for prefix, rule_method, kind in self.rate_limits:
+            if path.startswith(prefix) and (rule_method is None or rule_method == method):
+                return kind
+        return None
+
+    def _record(self, method: str, endpoint: str, status_code: int, duration: float) -> None:
+        counter = self._counters.get((method, endpoint, status_code))
+        if counter is None:
+            counter = self.request_count.labels(method=method, endpoint=endpoint, status=str(status_code))
+            self._counters[(method, endpoint, status_code)] = counter
+        histogram = self._histograms.get((method, endpoint))
+        if histogram is None:
+            histogram = self.request_duration.labels(method=method, endpoint=endpoint)
+            self._histograms[(method, endpoint)] = histogram
+        counter.inc()
+        histogram.observe(duration)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        method = scope["method"]
+        status_code = 500
+        finished_at: Optional[float] = None
+        root = None
+        if self.tracer is not None:
+            force = any(name == FORCE_TRACE_HEADER and value == b"1" for name, value in scope["headers"])
+            root = self.tracer.start_trace(f"{method} {scope['path']}", force=force, method=method)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, finished_at
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if root is not None:
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"x-trace-id", root.trace_id.encode()))
+                    message = dict(message, headers=headers)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished_at = time.perf_counter()
+
+        self.active_connections.inc()
+        try:
+            kind = self.limit_for(scope["path"], method) if self.admission is not None else None
+            if kind is not None:
+                try:
+                    await self.admission(Request(scope, receive), kind)
+                except HTTPException as e:
+                    response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+                    await response(scope, receive, send_wrapper)
+                    return
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            self.error_count.labels(type=type(e).__name__).inc()
+            if root is not None:
+                root.error = f"{type(e).__name__}: {e}"
+            logger.error(f"Request error: {e}")
+            raise
+        finally:
+            # Template da rota já está no scope depois do roteamento
+            end = finished_at if finished_at is not None else time.perf_counter()
+            endpoint = route_template(scope)
+            self._record(method, endpoint, status_code, end - start)
+            self.active_connections.dec()
+            if root is not None:
+                root.name = f"{method} {endpoint}"
+                root.set_attributes(route=endpoint, path=scope["path"], status=status_code)
+                self.tracer.finish_trace(root)
@@ -0,0 +1,244 @@
+# ================================
+# GODOFREDA AUDIO ENCODING
+# ================================
+# Negociação do formato de saída (Accept ou parâmetro) e codificação
+# incremental em Opus/Ogg, MP3 ou FLAC via ffmpeg, fora do event loop
+# ================================
+
+import asyncio
+import logging
+import shutil
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_preprocess import resample
+from audio_utils import to_float32, wav_bytes
+from config import config
+from instrumentation import observe_stage, stage
+
+logger = logging.getLogger(__name__)
+
+# Tamanho da leitura da saída do ffmpeg
+READ_CHUNK_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    """Formato de saída suportado"""
+    name: str
+    media_type: str
+    extension: str
+    lossless: bool
+    codec_args: Tuple[str, ...]
+
+
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    "wav": AudioFormat("wav", "audio/wav", "wav", True, ("-f", "wav")),
+    "flac": AudioFormat("flac", "audio/flac", "flac", True, ("-c:a", "flac", "-f", "flac")),
+    "opus": AudioFormat("opus", "audio/ogg; codecs=opus", "ogg", False, ("-c:a", "libopus", "-f", "ogg")),
+    "mp3": AudioFormat("mp3", "audio/mpeg", "mp3", False, ("-c:a", "libmp3lame", "-f", "mp3")),
+}
+
+# Tipos MIME aceitos no Accept -> formato
+MEDIA_TYPE_FORMATS: Dict[str, str] = {
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+    "audio/ogg": "opus",
+    "audio/opus": "opus",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+}
+
+BIT_DEPTHS = (16, 24)
+
+
+class FormatNotAcceptable(ValueError):
+    """Nenhum formato suportado atende ao pedido do cliente"""
+
+
+@dataclass(frozen=True)
+class OutputSpec:
+    """Formato, taxa de amostragem e profundidade de bits da resposta"""
+    format: AudioFormat
+    sample_rate: int = 0  # 0 = taxa nativa do modelo
+    bit_depth: int = 16
+    from_accept: bool = False  # formato escolhido pelo header Accept, não pelo parâmetro
+
+    def needs_encoder(self) -> bool:
+        """WAV 16 bits é gerado em processo (reamostrado se preciso); o resto passa pelo ffmpeg"""
+        return self.format.name != "wav" or self.bit_depth != 16
+
+    def headers(self) -> Dict[str, str]:
+        """Headers da resposta: negociada pelo Accept, varia com ele (caches e proxies)"""
+        return {"Vary": "Accept"} if self.from_accept else {}
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    """Tipos do header Accept ordenados por qualidade (q)"""
+    entries = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [p.strip() for p in item.split(";")]
+        media_type = parts[0].lower()
+        if not media_type:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        entries.append((media_type, quality, position))
+    entries.sort(key=lambda entry: (-entry[1], entry[2]))
+    return [(media_type, quality) for media_type, quality, _ in entries]
+
+
+def negotiate_format(accept: Optional[str] = None, requested: Optional[str] = None) -> AudioFormat:
+    """
+    Escolhe o formato de saída
+
+    O parâmetro explícito tem precedência; sem ele, vale o header Accept.
+    ``*/*``, ``audio/*`` ou Accept ausente resultam no formato padrão.
+
+    Raises:
+        FormatNotAcceptable: formato pedido não suportado
+    """
+    if requested:
+        name = requested.lower()
+        if name not in AUDIO_FORMATS:
+            raise FormatNotAcceptable(f"Formato não suportado: {requested} (use {', '.join(AUDIO_FORMATS)})")
+        return AUDIO_FORMATS[name]
+
+    default = AUDIO_FORMATS[config.tts.output_format]
+    if not accept:
+        return default
+
+    for media_type, quality in _parse_accept(accept):
+        if quality <= 0:
+            continue
+        if media_type in ("*/*", "audio/*"):
+            return default
+        if media_type in MEDIA_TYPE_FORMATS:
+            return AUDIO_FORMATS[MEDIA_TYPE_FORMATS[media_type]]
+    raise FormatNotAcceptable(f"Nenhum formato aceitável em '{accept}' (use {', '.join(AUDIO_FORMATS)})")
+
+
+def build_output_spec(accept: Optional[str] = None, requested: Optional[str] = None,
+                      sample_rate: Optional[int] = None, bit_depth: Optional[int] = None) -> OutputSpec:
+    """Negocia o formato e valida taxa e profundidade pedidas"""
+    audio_format = negotiate_format(accept, requested)
+    sample_rate = config.tts.output_sample_rate if sample_rate is None else sample_rate
+    bit_depth = bit_depth or config.tts.output_bit_depth
+
+    if sample_rate and not 8000 <= sample_rate <= 48000:
+        raise FormatNotAcceptable("Taxa de amostragem deve estar entre 8000 e 48000 Hz")
+    if bit_depth not in BIT_DEPTHS:
+        raise FormatNotAcceptable(f"Profundidade de bits deve ser {' ou '.join(map(str, BIT_DEPTHS))}")
+    if bit_depth != 16 and not audio_format.lossless:
+        bit_depth = 16  # codecs com perda não usam profundidade fixa
+    return OutputSpec(audio_format, sample_rate, bit_depth, from_accept=not requested)
+
+
+def encoder_available() -> bool:
+    """ffmpeg está no PATH?"""
+    return shutil.which(config.tts.ffmpeg_path) is not None
+
+
+def ffmpeg_command(spec: OutputSpec, input_rate: int) -> List[str]:
+    """Linha de comando do ffmpeg: PCM float32 na entrada, formato pedido na saída"""
+    command = [
+        config.tts.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-f", "f32le", "-ar", str(input_rate), "-ac", "1", "-i", "pipe:0",
+    ]
+    if spec.sample_rate and spec.sample_rate != input_rate:
+        command += ["-ar", str(spec.sample_rate)]
+
+    name = spec.format.name
+    if name == "wav":
+        command += ["-c:a", "pcm_s24le" if spec.bit_depth == 24 else "pcm_s16le"]
+    elif name == "flac":
+        command += ["-sample_fmt", "s32" if spec.bit_depth == 24 else "s16"]
+        if spec.bit_depth == 24:
+            command += ["-bits_per_raw_sample", "24"]
+    elif name == "opus":
+        command += ["-b:a", config.tts.opus_bitrate, "-application", "voip"]
+    elif name == "mp3":
+        command += ["-b:a", config.tts.mp3_bitrate]
+
+    return command + list(spec.format.codec_args) + ["pipe:1"]
+
+
+async def encode_stream(chunks: AsyncIterator[np.ndarray], input_rate: int,
+                        spec: OutputSpec) -> AsyncIterator[bytes]:
+    """
+    Codifica trechos de áudio conforme chegam
+
+    O ffmpeg roda em um subprocesso; a escrita dos trechos e a leitura da
+    saída são assíncronas, então o event loop nunca espera a codificação.
+    Bytes codificados são entregues assim que o ffmpeg os produz.
+    """
+    if not spec.needs_encoder():
+        # WAV 16 bits: cabeçalho e amostras sem subprocesso
+        parts = [to_float32(chunk) async for chunk in chunks]
+        audio = parts[0] if len(parts) == 1 else np.concatenate(parts or [np.zeros(0, np.float32)])
+        if spec.sample_rate and spec.sample_rate != input_rate:
+            with stage("postprocess"):
+                audio, input_rate = resample(audio, input_rate, spec.sample_rate), spec.sample_rate
+        with stage("encoding"):
+            data = wav_bytes(audio, input_rate)
+        yield data
+        return
+
+    process = await asyncio.create_subprocess_exec(
+        *ffmpeg_command(spec, input_rate),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+
+    input_done = 0.0
+
+    async def feed() -> None:
+        nonlocal input_done
+        try:
+            async for chunk in chunks:
+                process.stdin.write(to_float32(chunk).tobytes())
+                await process.stdin.drain()
+        finally:
+            process.stdin.close()
+            input_done = time.perf_counter()
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            data = await process.stdout.read(READ_CHUNK_BYTES)
+            if not data:
+                break
+            yield data
+
+        await feeder
+        # Estágio de codificação: latência que o ffmpeg adiciona após o último trecho
+        observe_stage("encoding", time.perf_counter() - input_done)
+        stderr = await process.stderr.read()
+        if await process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+    finally:
+        if not feeder.done():
+            feeder.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def encode_audio(audio: np.ndarray, input_rate: int, spec: OutputSpec) -> bytes:
+    """Codifica um áudio completo no formato pedido"""
+    async def single() -> AsyncIterator[np.ndarray]:
+        yield audio
+
+    return b"".join([data async for data in encode_stream(single(), input_rate, spec)])
@@ -0,0 +1,222 @@
+# ================================
+# GODOFREDA AUDIO POSTPROCESS
+# ================================
+# Pós-processamento da saída do TTS em memória: corte de silêncio nas
+# bordas, reamostragem e normalização de pico ou de loudness (LUFS,
+# ITU-R BS.1770), tudo vetorizado em NumPy
+# ================================
+
+import logging
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from audio_preprocess import FRAME_SECONDS, resample, speech_mask
+from audio_utils import to_float32
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Blocos de 400 ms com 75% de sobreposição e portas de -70 LUFS e -10 LU (BS.1770-4)
+LOUDNESS_BLOCK_SECONDS = 0.4
+LOUDNESS_HOP_SECONDS = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+NORMALIZE_MODES = ("lufs", "peak", "none")
+
+
+def _biquad_power(b: Tuple[float, float, float], a: Tuple[float, float, float], w: np.ndarray) -> np.ndarray:
+    """|H(e^jw)|² de um biquad nas frequências angulares ``w``"""
+    z = np.exp(-1j * w)
+    response = (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    return np.square(np.abs(response))
+
+
+def k_weighting_power(freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Ganho de potência do filtro K em cada frequência (Hz)
+
+    Shelf de +4 dB acima de ~1,5 kHz (efeito da cabeça) seguido de um
+    passa-altas em 38 Hz, com coeficientes calculados para ``sample_rate``.
+    """
+    w = 2 * np.pi * freqs / sample_rate
+
+    gain = 10 ** (4.0 / 40)
+    w0 = 2 * np.pi * 1500.0 / sample_rate
+    cos, alpha = np.cos(w0), np.sin(w0) / (2 * (1 / np.sqrt(2)))
+    root = 2 * np.sqrt(gain) * alpha
+    shelf = _biquad_power(
+        (gain * ((gain + 1) + (gain - 1) * cos + root), -2 * gain * ((gain - 1) + (gain + 1) * cos),
+         gain * ((gain + 1) + (gain - 1) * cos - root)),
+        ((gain + 1) - (gain - 1) * cos + root, 2 * ((gain - 1) - (gain + 1) * cos),
+         (gain + 1) - (gain - 1) * cos - root),
+        w
+    )
+
+    w0 = 2 * np.pi * 38.0 / sample_rate
+    cos, alpha = np.cos(w0), np.sin(w0) / (2 * 0.5)
+    highpass = _biquad_power(((1 + cos) / 2, -(1 + cos), (1 + cos) / 2), (1 + alpha, -2 * cos, 1 - alpha), w)
+    return shelf * highpass
+
+
+@lru_cache(maxsize=8)
+def _frame_weights(frame_size: int, sample_rate: int) -> np.ndarray:
+    """
+    Pesos por bin da rfft de um quadro: filtro K vezes a escala de Parseval,
+    de modo que ``|X|² @ pesos`` seja a soma dos quadrados do sinal filtrado
+    """
+    scale = np.full(frame_size // 2 + 1, 2.0)
+    scale[0] = 1.0
+    if frame_size % 2 == 0:
+        scale[-1] = 1.0
+    power = k_weighting_power(np.fft.rfftfreq(frame_size, 1.0 / sample_rate), sample_rate)
+    return (power * scale / frame_size).astype(np.float32)
+
+
+def integrated_loudness(audio: np.ndarray, sample_rate: int) -> float:
+    """
+    Loudness integrada em LUFS (-inf para silêncio)
+
+    O sinal é cortado em quadros de 100 ms (o passo dos blocos) e o filtro
+    K é aplicado na energia do espectro de cada quadro, com todas as rfft
+    numa só chamada; cada bloco de 400 ms soma quatro quadros vizinhos.
+    A resposta do filtro não atravessa a borda dos quadros, o que desvia
+    a medida em centésimos de LU e custa uma fração de uma FFT do sinal
+    inteiro.
+    """
+    audio = to_float32(audio)
+    if audio.size == 0:
+        return float("-inf")
+
+    frame_size = int(sample_rate * LOUDNESS_HOP_SECONDS)
+    per_block = int(round(LOUDNESS_BLOCK_SECONDS / LOUDNESS_HOP_SECONDS))
+    frames = -(-audio.size // frame_size)
+    padded = np.zeros(frames * frame_size, dtype=np.float32)
+    padded[:audio.size] = audio
+    spectrum = np.fft.rfft(padded.reshape(frames, frame_size), axis=1)
+    frame_energy = (np.square(spectrum.real) + np.square(spectrum.imag)) @ _frame_weights(frame_size, sample_rate)
+
+    if frames <= per_block:
+        energies = np.array([frame_energy.sum() / audio.size])
+    else:
+        cumulative = np.concatenate(([0.0], np.cumsum(frame_energy, dtype=np.float64)))
+        energies = (cumulative[per_block:] - cumulative[:-per_block]) / (per_block * frame_size)
+
+    loudness = -0.691 + 10 * np.log10(np.maximum(energies, 1e-20))
+    energies, loudness = energies[loudness > ABSOLUTE_GATE_LUFS], loudness[loudness > ABSOLUTE_GATE_LUFS]
+    if energies.size == 0:
+        return float("-inf")
+    relative_gate = -0.691 + 10 * np.log10(energies.mean()) + RELATIVE_GATE_LU
+    return float(-0.691 + 10 * np.log10(energies[loudness > relative_gate].mean()))
+
+
+def trim_edges(audio: np.ndarray, sample_rate: int, threshold_db: float, floor_db: float,
+               padding_seconds: float, leading: bool = True, trailing: bool = True) -> np.ndarray:
+    """
+    Corta o silêncio das bordas (view, sem cópia), mantendo ``padding_seconds``
+
+    ``floor_db`` é o piso absoluto de energia (TTS_TRIM_FLOOR_DB), separado
+    do piso de ruído do VAD do STT. Sem nenhuma janela com voz o áudio
+    volta inteiro: uma saída silenciosa do modelo não vira um WAV vazio.
+    """
+    mask = speech_mask(audio, sample_rate, threshold_db, floor_db)
+    if not mask.any():
+        return audio
+    frame_size = max(1, int(sample_rate * FRAME_SECONDS))
+    voiced = np.flatnonzero(mask)
+    padding = int(sample_rate * padding_seconds)
+    start = max(0, voiced[0] * frame_size - padding) if leading else 0
+    end = min(audio.size, (voiced[-1] + 1) * frame_size + padding) if trailing else audio.size
+    return audio[start:end]
+
+
+def normalization_gain(audio: np.ndarray, sample_rate: int, mode: str, target_lufs: float,
+                       peak_dbfs: float) -> float:
+    """Ganho linear que leva ao alvo (pico ou LUFS) sem passar do teto de pico"""
+    if mode == "none" or audio.size == 0:
+        return 1.0
+    peak = float(np.max(np.abs(audio)))
+    if peak < 1e-6:
+        return 1.0
+    ceiling = 10 ** (peak_dbfs / 20.0) / peak
+    if mode == "peak":
+        return ceiling
+    loudness = integrated_loudness(audio, sample_rate)
+    if not np.isfinite(loudness):
+        return 1.0
+    return min(10 ** ((target_lufs - loudness) / 20.0), ceiling)
+
+
+def postprocess(audio: np.ndarray, sample_rate: int, target_rate: int = 0,
+                timings: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, int]:
+    """
+    Corta o silêncio das bordas, reamostra para ``target_rate`` (0 = taxa
+    nativa) e normaliza, conforme config.tts
+
+    O ganho é aplicado no próprio array (a saída do modelo é descartável),
+    então o único array novo é o da reamostragem. ``timings`` recebe a
+    duração de cada etapa.
+    """
+    settings = config.tts
+    audio = to_float32(audio)
+
+    def timed(step: str, start: float) -> None:
+        if timings is not None:
+            timings[step] = time.perf_counter() - start
+
+    if settings.postprocess:
+        start = time.perf_counter()
+        audio = trim_edges(audio, sample_rate, settings.trim_threshold_db, settings.trim_floor_db,
+                           settings.trim_padding_seconds)
+        timed("trim", start)
+
+    if target_rate and target_rate != sample_rate:
+        start = time.perf_counter()
+        audio, sample_rate = resample(audio, sample_rate, target_rate), target_rate
+        timed("resample", start)
+
+    if settings.postprocess and settings.loudness != "none":
+        start = time.perf_counter()
+        gain = normalization_gain(audio, sample_rate, settings.loudness,
+                                  settings.loudness_target_lufs, settings.peak_dbfs)
+        if gain != 1.0:
+            if not audio.flags.writeable:
+                audio = audio.copy()
+            np.multiply(audio, np.float32(gain), out=audio)
+        timed("normalize", start)
+
+    return audio, sample_rate
+
+
+class StreamPostprocessor:
+    """
+    Pós-processamento de trechos em streaming
+
+    O primeiro trecho perde o silêncio inicial (latência percebida) e
+    define o ganho do stream inteiro; os seguintes recebem o mesmo ganho,
+    limitados ao teto de pico. O silêncio final não é cortado: o último
+    trecho só é conhecido depois de entregue.
+    """
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.gain: Optional[float] = None
+        self.limit = 10 ** (config.tts.peak_dbfs / 20.0)
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        settings = config.tts
+        chunk = to_float32(chunk)
+        if not settings.postprocess:
+            return chunk
+        if self.gain is None:
+            chunk = trim_edges(chunk, self.sample_rate, settings.trim_threshold_db, settings.trim_floor_db,
+                               settings.trim_padding_seconds, trailing=False)
+            self.gain = normalization_gain(chunk, self.sample_rate, settings.loudness,
+                                           settings.loudness_target_lufs, settings.peak_dbfs)
+        if self.gain != 1.0:
+            chunk = chunk * np.float32(self.gain)
+            np.clip(chunk, -self.limit, self.limit, out=chunk)
+        return chunk
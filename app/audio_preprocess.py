@@ -0,0 +1,227 @@
+# ================================
+# GODOFREDA AUDIO PREPROCESS
+# ================================
+# Preparação da voz do usuário para STT: decodificação, mono 16 kHz,
+# corte de silêncio por energia e normalização de loudness, tudo
+# vetorizado em NumPy
+# ================================
+
+import asyncio
+import io
+import logging
+import wave
+from dataclasses import dataclass
+from typing import Iterator, Tuple, Union
+
+import numpy as np
+
+from audio_utils import to_float32
+from config import config
+
+logger = logging.getLogger(__name__)
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Janela de análise do VAD
+FRAME_SECONDS = 0.02
+
+# Taps do filtro anti-aliasing por lado (em períodos do sinal de saída)
+RESAMPLE_HALF_TAPS = 16
+
+
+@dataclass
+class PreprocessResult:
+    """Áudio pronto para o STT e estatísticas do corte"""
+    audio: np.ndarray
+    sample_rate: int
+    original_seconds: float
+    speech_seconds: float
+
+    @property
+    def trimmed_ratio(self) -> float:
+        """Fração do áudio removida como silêncio"""
+        if not self.original_seconds:
+            return 0.0
+        return 1.0 - self.speech_seconds / self.original_seconds
+
+
+def decode_wav(data: BytesLike) -> Tuple[np.ndarray, int]:
+    """
+    Decodifica WAV PCM (8/16/24/32 bits) para float32 mono
+
+    Raises:
+        ValueError: WAV truncado, malformado ou em formato não suportado
+    """
+    try:
+        with wave.open(io.BytesIO(data)) as wav_file:
+            channels = wav_file.getnchannels()
+            width = wav_file.getsampwidth()
+            sample_rate = wav_file.getframerate()
+            frames = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError) as e:
+        # Passou pelo sniff de RIFF/WAVE mas o conteúdo não é um WAV legível
+        raise ValueError(f"WAV truncado ou malformado ({e})") from e
+
+    if width == 1:
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        # Monta inteiros de 24 bits com sinal a partir dos três bytes
+        values = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        audio = values.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"WAV com {width * 8} bits não suportado")
+
+    return to_mono(audio.reshape(-1, channels)), sample_rate
+
+
+async def decode_with_ffmpeg(data: BytesLike, sample_rate: int) -> np.ndarray:
+    """Decodifica qualquer formato suportado pelo ffmpeg já em mono na taxa pedida"""
+    process = await asyncio.create_subprocess_exec(
+        config.tts.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-i", "pipe:0", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await process.communicate(bytes(data))
+    if process.returncode != 0:
+        raise ValueError(f"Falha ao decodificar áudio: {stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(stdout, dtype="<f4").copy()
+
+
+def to_mono(audio: np.ndarray) -> np.ndarray:
+    """Média dos canais (amostras x canais) em um sinal mono float32"""
+    if audio.ndim == 1:
+        return to_float32(audio)
+    return to_float32(audio.mean(axis=1))
+
+
+def _lowpass_kernel(cutoff: float, half_taps: int) -> np.ndarray:
+    """FIR passa-baixas (sinc com janela de Hann); ``cutoff`` em ciclos/amostra"""
+    n = np.arange(-half_taps, half_taps + 1, dtype=np.float64)
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hanning(2 * half_taps + 1)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(audio: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Reamostra com filtro anti-aliasing e interpolação vetorizada
+
+    Na redução de taxa, um FIR passa-baixas remove o conteúdo acima da nova
+    frequência de Nyquist antes da interpolação.
+    """
+    audio = to_float32(audio)
+    if source_rate == target_rate or audio.size == 0:
+        return audio
+
+    if target_rate < source_rate:
+        ratio = source_rate / target_rate
+        half_taps = int(np.ceil(RESAMPLE_HALF_TAPS * ratio))
+        audio = np.convolve(audio, _lowpass_kernel(0.5 / ratio * 0.95, half_taps), mode="same")
+
+    duration = audio.size / source_rate
+    target_size = int(round(duration * target_rate))
+    positions = np.arange(target_size, dtype=np.float64) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(audio.size), audio).astype(np.float32)
+
+
+def frame_energy_db(audio: np.ndarray, frame_size: int) -> np.ndarray:
+    """Energia RMS (dBFS) por janela não sobreposta"""
+    frames = audio.size // frame_size
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    blocks = audio[:frames * frame_size].reshape(frames, frame_size)
+    rms = np.sqrt(np.mean(np.square(blocks, dtype=np.float64), axis=1))
+    return (20.0 * np.log10(rms + 1e-10)).astype(np.float32)
+
+
+def speech_mask(audio: np.ndarray, sample_rate: int, threshold_db: float, floor_db: float) -> np.ndarray:
+    """
+    Janelas com voz: energia acima de ``threshold_db`` relativo à janela mais
+    forte e acima do piso absoluto de ruído ``floor_db``
+    """
+    energy = frame_energy_db(audio, max(1, int(sample_rate * FRAME_SECONDS)))
+    if energy.size == 0:
+        return np.zeros(0, dtype=bool)
+    return (energy > energy.max() + threshold_db) & (energy > floor_db)
+
+
+def trim_silence(audio: np.ndarray, sample_rate: int, threshold_db: float,
+                 padding_seconds: float = 0.15) -> np.ndarray:
+    """Remove o silêncio do início e do fim, mantendo uma margem em volta da fala"""
+    mask = speech_mask(audio, sample_rate, threshold_db, config.stt.vad_floor_db)
+    if not mask.any():
+        return audio[:0]
+    frame_size = max(1, int(sample_rate * FRAME_SECONDS))
+    voiced = np.flatnonzero(mask)
+    padding = int(sample_rate * padding_seconds)
+    start = max(0, voiced[0] * frame_size - padding)
+    end = min(audio.size, (voiced[-1] + 1) * frame_size + padding)
+    return audio[start:end]
+
+
+def normalize_loudness(audio: np.ndarray, target_dbfs: float, peak_dbfs: float = -1.0) -> np.ndarray:
+    """Ajusta o RMS para ``target_dbfs`` sem deixar o pico passar de ``peak_dbfs``"""
+    if audio.size == 0:
+        return audio
+    rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+    peak = float(np.max(np.abs(audio)))
+    if rms < 1e-8:
+        return audio
+    gain = 10 ** (target_dbfs / 20.0) / rms
+    gain = min(gain, 10 ** (peak_dbfs / 20.0) / peak)
+    return (audio * np.float32(gain)).astype(np.float32)
+
+
+def iter_speech_chunks(audio: np.ndarray, sample_rate: int, max_seconds: float) -> Iterator[np.ndarray]:
+    """
+    Divide o áudio em trechos de até ``max_seconds`` para STT em streaming
+
+    Cada corte é feito na janela de menor energia da segunda metade do
+    trecho, para não partir palavras ao meio.
+    """
+    frame_size = max(1, int(sample_rate * FRAME_SECONDS))
+    max_samples = max(frame_size, int(sample_rate * max_seconds))
+    start = 0
+    while audio.size - start > max_samples:
+        window = audio[start:start + max_samples]
+        energy = frame_energy_db(window, frame_size)
+        half = energy.size // 2
+        cut = (half + int(np.argmin(energy[half:]))) * frame_size
+        yield audio[start:start + cut]
+        start += cut
+    if audio.size > start:
+        yield audio[start:]
+
+
+async def preprocess_voice(data: BytesLike, content_type: str = "audio/wav") -> PreprocessResult:
+    """
+    Pipeline completo: decodifica, mono 16 kHz, corta silêncio e normaliza
+
+    WAV é decodificado em processo; outros formatos passam pelo ffmpeg.
+    O processamento numérico roda em thread para não bloquear o event loop.
+    """
+    target_rate = config.stt.sample_rate
+    if content_type in ("audio/wav", "audio/x-wav", "audio/wave"):
+        audio, source_rate = decode_wav(data)
+    else:
+        audio, source_rate = await decode_with_ffmpeg(data, target_rate), target_rate
+
+    def process() -> PreprocessResult:
+        mono = resample(audio, source_rate, target_rate)
+        speech = trim_silence(mono, target_rate, config.stt.vad_threshold_db)
+        speech = normalize_loudness(speech, config.stt.target_dbfs)
+        return PreprocessResult(speech, target_rate, mono.size / target_rate, speech.size / target_rate)
+
+    result = await asyncio.to_thread(process)
+    logger.info(
+        f"Voice preprocessed: {result.original_seconds:.2f}s -> {result.speech_seconds:.2f}s "
+        f"({result.trimmed_ratio:.0%} silence trimmed)"
+    )
+    return result
@@ -0,0 +1,85 @@
+# ================================
+# GODOFREDA AUDIO UTILS
+# ================================
+# Funções auxiliares para manipular áudio sintetizado em memória
+# ================================
+
+import struct
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+AudioLike = Union[np.ndarray, Sequence[float]]
+
+# Amostras convertidas por vez para PCM: o temporário float32 cabe no cache
+PCM16_BLOCK = 65536
+
+WAV_HEADER_SIZE = 44
+
+
+def to_float32(samples: AudioLike) -> np.ndarray:
+    """Converte a saída do modelo para um array float32 contíguo"""
+    return np.ascontiguousarray(samples, dtype=np.float32).reshape(-1)
+
+
+def float_to_pcm16(samples: AudioLike, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Converte amostras float [-1, 1] para PCM 16 bits
+
+    Converte em blocos reaproveitando um único buffer float32 pequeno, sem
+    temporários do tamanho do áudio; ``out`` (int16) permite escrever
+    direto no destino, como o corpo de um WAV.
+    """
+    audio = to_float32(samples)
+    if out is None:
+        out = np.empty(audio.size, dtype=np.int16)
+    scratch = np.empty(min(audio.size, PCM16_BLOCK), dtype=np.float32)
+    for start in range(0, audio.size, PCM16_BLOCK):
+        block = audio[start:start + PCM16_BLOCK]
+        buffer = scratch[:block.size]
+        np.clip(block, -1.0, 1.0, out=buffer)
+        np.multiply(buffer, 32767.0, out=buffer)
+        # Truncamento em direção a zero, como astype(np.int16)
+        np.copyto(out[start:start + block.size], buffer, casting="unsafe")
+    return out
+
+
+def concat_audio(parts: List[np.ndarray], sample_rate: int, gap_seconds: float = 0.0) -> np.ndarray:
+    """Concatena trechos de áudio em ordem, com silêncio opcional entre eles"""
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+
+    gap = np.zeros(int(sample_rate * gap_seconds), dtype=np.float32)
+    pieces: List[np.ndarray] = []
+    for index, part in enumerate(parts):
+        if index > 0 and gap.size:
+            pieces.append(gap)
+        pieces.append(to_float32(part))
+    return np.concatenate(pieces)
+
+
+def wav_header(num_samples: int, sample_rate: int) -> bytes:
+    """Cabeçalho RIFF de um WAV PCM 16 bits mono (o mesmo gerado pelo módulo wave)"""
+    data_size = 2 * num_samples
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE", b"fmt ", 16, 1, 1,
+        sample_rate, 2 * sample_rate, 2, 16, b"data", data_size
+    )
+
+
+def wav_bytes(samples: AudioLike, sample_rate: int) -> bytes:
+    """Serializa amostras float como WAV PCM 16 bits mono (PCM escrito direto no buffer final)"""
+    audio = to_float32(samples)
+    buffer = bytearray(WAV_HEADER_SIZE + 2 * audio.size)
+    buffer[:WAV_HEADER_SIZE] = wav_header(audio.size, sample_rate)
+    float_to_pcm16(audio, out=np.frombuffer(buffer, dtype="<i2", offset=WAV_HEADER_SIZE))
+    return bytes(buffer)
+
+
+def write_wav(path: str, samples: AudioLike, sample_rate: int) -> None:
+    """Grava amostras float em um arquivo WAV PCM 16 bits mono"""
+    audio = to_float32(samples)
+    with open(path, "wb") as f:
+        f.write(wav_header(audio.size, sample_rate))
+        f.write(float_to_pcm16(audio).astype("<i2", copy=False))
@@ -0,0 +1,102 @@
+# ================================
+# GODOFREDA BATCH SERVICE
+# ================================
+# Execução de lotes com concorrência limitada e serialização
+# incremental dos resultados (NDJSON ou ZIP em streaming)
+# ================================
+
+import asyncio
+import json
+import logging
+import time
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (índice do item, resultado, erro)
+BatchOutcome = Tuple[int, Any, Optional[Exception]]
+
+
+async def run_bounded(items: List[Any], handler: Callable[[Any], Awaitable[Any]],
+                      concurrency: int, stop: Optional[asyncio.Event] = None) -> AsyncIterator[BatchOutcome]:
+    """
+    Processa itens com no máximo ``concurrency`` simultâneos
+
+    Os resultados são entregues na ordem em que ficam prontos. A falha de
+    um item não interrompe os demais: a exceção é devolvida no resultado.
+    Se o consumidor parar de iterar (cliente desconectou), os itens
+    pendentes são cancelados. O fechamento deste gerador pode chegar só
+    depois do ``finally`` do consumidor: ``stop``, definido por ele ao
+    encerrar, impede que itens ainda na fila do semáforo comecem.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    stop = stop or asyncio.Event()
+
+    async def run(index: int, item: Any) -> BatchOutcome:
+        async with semaphore:
+            if stop.is_set():
+                raise asyncio.CancelledError()
+            try:
+                return index, await handler(item), None
+            except Exception as e:
+                return index, None, e
+
+    tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        stop.set()
+        for task in tasks:
+            task.cancel()
+
+
+def ndjson_line(data: Any) -> bytes:
+    """Serializa um objeto como uma linha NDJSON"""
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode()
+
+
+class _ChunkSink:
+    """Destino não posicionável do zipfile; acumula bytes até serem drenados"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """
+    Escreve um ZIP incrementalmente
+
+    Cada ``add`` devolve os bytes prontos para envio, permitindo transmitir
+    o arquivo enquanto os itens ainda estão sendo gerados. O zipfile usa
+    descritores de dados quando o destino não permite seek.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_STORED):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=compression)
+
+    def add(self, name: str, data: bytes) -> bytes:
+        """Adiciona um arquivo e retorna os bytes gerados"""
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = self._zip.compression
+        self._zip.writestr(info, data)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """Finaliza o diretório central e retorna os bytes restantes"""
+        self._zip.close()
+        return self._sink.drain()
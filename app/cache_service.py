@@ -6,11 +6,14 @@
 
 import json
 import hashlib
+import functools
 import logging
 import os
 from typing import Any, Optional, Dict
 import redis.asyncio as redis
 from config import config
+from instrumentation import stage
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +46,10 @@ class CacheService:
             return None
         
         try:
-            value = await self.redis_client.get(key)
+            with stage("cache_lookup", prefix=key.rsplit(":", 1)[0]) as span:
+                value = await self.redis_client.get(key)
+                if span is not None:
+                    span.set_attribute("hit", bool(value))
             if value:
                 return json.loads(value)
             return None
@@ -58,7 +64,8 @@ class CacheService:
         
         try:
             value_str = json.dumps(value)
-            await self.redis_client.setex(key, ttl, value_str)
+            with tracer.span("cache.set", prefix=key.rsplit(":", 1)[0], bytes=len(value_str), ttl=ttl):
+                await self.redis_client.setex(key, ttl, value_str)
             return True
         except Exception as e:
             logger.error(f"Error setting cache: {e}")
@@ -110,6 +117,7 @@ cache_service = CacheService()
 def cached_response(ttl: int = 3600):
     """Decorator para cachear respostas de endpoints"""
     def decorator(func):
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             # Gerar chave única baseada na função e argumentos
             cache_key = cache_service._generate_key(
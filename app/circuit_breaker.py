@@ -0,0 +1,101 @@
+# ================================
+# GODOFREDA CIRCUIT BREAKER
+# ================================
+# Disjuntor para dependências externas (Ollama): depois de falhas
+# seguidas as chamadas são recusadas sem tentar, até um teste periódico
+# ================================
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Disjuntor com três estados
+
+    closed: chamadas passam; ``failure_threshold`` falhas seguidas abrem.
+    open: chamadas recusadas até passar ``reset_timeout`` segundos.
+    half_open: uma única chamada de teste passa; sucesso fecha, falha reabre.
+
+    Usado pelo event loop e por threads, por isso o estado passa por um lock.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+        self._probe_started = 0.0
+        # Chamado com o novo estado a cada transição (métricas)
+        self.observer: Optional[Callable[[str], None]] = None
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        logger.warning(f"Circuit breaker {self.name} is now {state}")
+        if self.observer is not None:
+            self.observer(state)
+
+    def allow(self) -> bool:
+        """Se a próxima chamada pode ser feita (no half_open, só a de teste)"""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self._transition("half_open")
+            # Teste abandonado (cancelado sem resultado) não trava o disjuntor
+            if self._probing and self.clock() - self._probe_started < self.reset_timeout:
+                return False
+            self._probing = True
+            self._probe_started = self.clock()
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            self._transition("closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                if self.state != "open":
+                    self.times_opened += 1
+                self._transition("open")
+
+    @property
+    def is_open(self) -> bool:
+        """Recusando chamadas: aberto dentro do tempo de espera ou com teste em andamento"""
+        with self._lock:
+            if self.state == "open":
+                return self.clock() - self.opened_at < self.reset_timeout
+            return self.state == "half_open" and self._probing
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            report: Dict[str, Any] = {
+                "state": self.state,
+                "failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "times_opened": self.times_opened,
+            }
+            if self.state == "open":
+                report["retry_in_seconds"] = round(max(0.0, self.reset_timeout - (self.clock() - self.opened_at)), 1)
+        return report
@@ -17,25 +17,246 @@ class APIConfig:
     debug: bool = False
     cors_origins: Optional[List[str]] = None
     max_text_length: int = 1000
+    workers: int = 1
+    preload: bool = False  # carregar o modelo no mestre e fazer fork (serve.py)
+    batch_max_items: int = 100
+    batch_concurrency: int = 2  # itens de um lote processados simultaneamente
+    ws_max_sessions: int = 100  # sessões WebSocket simultâneas por worker
+    ws_history_turns: int = 6  # trocas anteriores usadas como contexto da sessão
     
     def __post_init__(self):
         if self.cors_origins is None:
             self.cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:8501").split(",")
         self.max_text_length = int(os.getenv("MAX_TEXT_LENGTH", self.max_text_length))
+        self.host = os.getenv("HOST", self.host)
+        self.port = int(os.getenv("PORT", self.port))
+        self.workers = int(os.getenv("WORKERS", self.workers))
+        self.preload = bool(int(os.getenv("SERVE_PRELOAD", "0")))
+        self.batch_max_items = int(os.getenv("BATCH_MAX_ITEMS", self.batch_max_items))
+        self.batch_concurrency = int(os.getenv("BATCH_CONCURRENCY", self.batch_concurrency))
+        self.ws_max_sessions = int(os.getenv("WS_MAX_SESSIONS", self.ws_max_sessions))
+        self.ws_history_turns = int(os.getenv("WS_HISTORY_TURNS", self.ws_history_turns))
 
 @dataclass
 class TTSConfig:
     """Configurações do TTS"""
+    backend: str = "coqui"  # coqui ou onnx
     model: str = "tts_models/multilingual/multi-dataset/xtts_v2"
+    onnx_model_dir: str = "app/tts_models/onnx"
+    warmup: bool = True
+    load_mode: str = "background"  # background, blocking (antes de aceitar conexões) ou none (sem modelo)
+    models: str = ""  # nome=backend:modelo;tier=...;mb=..., separados por vírgula (vazio = só TTS_BACKEND)
+    default_model: str = ""  # vazio = primeiro de TTS_MODELS
+    chat_tier: str = ""  # faixa usada nas respostas de chat (vazio = modelo padrão)
+    model_memory_budget_mb: float = 0.0  # 0 = sem limite
+    model_min_residency_seconds: float = 60.0  # tempo mínimo residente antes de poder ser despejado
+    model_load_timeout: float = 120.0  # espera máxima por espaço no orçamento
+    model_switch_cost_seconds: float = 30.0  # custo estimado de uma troca antes da primeira carga
     default_speaker: str = "p230"
     temp_dir: str = "app/tts_temp"
+    voice_store_dir: str = "app/voices"
     coqui_tos_agreed: bool = True
+    runtime: str = "fp32"  # fp32 ou int8 (quantização dinâmica para CPU)
+    runtime_self_check: bool = True
+    runtime_max_distance_db: float = 6.0
+    long_text_enabled: bool = False  # cada worker do pool carrega o modelo
+    long_text_threshold: int = 400  # caracteres a partir dos quais usa o pool
+    long_text_max_parallel: int = 2  # trechos simultâneos por requisição
+    long_text_chunk_chars: int = 200
+    scheduler_concurrency: int = 1  # sínteses simultâneas no modelo em processo
+    scheduler_aging_rate: float = 1.0  # segundos de prioridade ganhos por segundo de espera
+    scheduler_seconds_per_char: float = 0.05  # estimativa inicial de custo (ajustada em execução)
+    output_format: str = "wav"  # formato padrão: wav, flac, opus ou mp3
+    output_sample_rate: int = 0  # 0 = taxa nativa do modelo
+    output_bit_depth: int = 16
+    opus_bitrate: str = "32k"
+    mp3_bitrate: str = "64k"
+    ffmpeg_path: str = "ffmpeg"
+    postprocess: bool = True  # corte de silêncio e normalização da saída
+    trim_threshold_db: float = -40.0  # relativo à janela mais forte
+    trim_floor_db: float = -60.0  # piso absoluto: mais baixo que isso é silêncio
+    trim_padding_seconds: float = 0.05
+    loudness: str = "lufs"  # lufs, peak ou none
+    loudness_target_lufs: float = -16.0
+    peak_dbfs: float = -1.0
     
     def __post_init__(self):
+        self.backend = os.getenv("TTS_BACKEND", self.backend).lower()
         self.model = os.getenv("TTS_MODEL", self.model)
+        self.onnx_model_dir = os.getenv("TTS_ONNX_MODEL_DIR", self.onnx_model_dir)
+        self.warmup = bool(int(os.getenv("TTS_WARMUP", "1")))
+        self.load_mode = os.getenv("TTS_LOAD_MODE", self.load_mode).lower()
+        self.models = os.getenv("TTS_MODELS", self.models)
+        self.default_model = os.getenv("TTS_DEFAULT_MODEL", self.default_model)
+        self.chat_tier = os.getenv("TTS_CHAT_TIER", self.chat_tier)
+        self.model_memory_budget_mb = float(os.getenv("TTS_MODEL_MEMORY_BUDGET_MB", self.model_memory_budget_mb))
+        self.model_min_residency_seconds = float(os.getenv("TTS_MODEL_MIN_RESIDENCY_SECONDS", self.model_min_residency_seconds))
+        self.model_load_timeout = float(os.getenv("TTS_MODEL_LOAD_TIMEOUT", self.model_load_timeout))
+        self.model_switch_cost_seconds = float(os.getenv("TTS_MODEL_SWITCH_COST_SECONDS", self.model_switch_cost_seconds))
         self.default_speaker = os.getenv("TTS_SPEAKER", self.default_speaker)
         self.temp_dir = os.getenv("TTS_TEMP_DIR", self.temp_dir)
+        self.voice_store_dir = os.getenv("TTS_VOICE_STORE_DIR", self.voice_store_dir)
         self.coqui_tos_agreed = bool(int(os.getenv("COQUI_TOS_AGREED", "1")))
+        self.runtime = os.getenv("TTS_RUNTIME", self.runtime).lower()
+        self.runtime_self_check = bool(int(os.getenv("TTS_RUNTIME_SELF_CHECK", "1")))
+        self.runtime_max_distance_db = float(os.getenv("TTS_RUNTIME_MAX_DISTANCE_DB", self.runtime_max_distance_db))
+        self.long_text_enabled = bool(int(os.getenv("TTS_LONG_TEXT_ENABLED", "0")))
+        self.long_text_threshold = int(os.getenv("TTS_LONG_TEXT_THRESHOLD", self.long_text_threshold))
+        self.long_text_max_parallel = int(os.getenv("TTS_LONG_TEXT_MAX_PARALLEL", self.long_text_max_parallel))
+        self.long_text_chunk_chars = int(os.getenv("TTS_LONG_TEXT_CHUNK_CHARS", self.long_text_chunk_chars))
+        self.scheduler_concurrency = int(os.getenv("TTS_SCHEDULER_CONCURRENCY", self.scheduler_concurrency))
+        self.scheduler_aging_rate = float(os.getenv("TTS_SCHEDULER_AGING_RATE", self.scheduler_aging_rate))
+        self.scheduler_seconds_per_char = float(os.getenv("TTS_SCHEDULER_SECONDS_PER_CHAR", self.scheduler_seconds_per_char))
+        self.output_format = os.getenv("TTS_OUTPUT_FORMAT", self.output_format).lower()
+        self.output_sample_rate = int(os.getenv("TTS_OUTPUT_SAMPLE_RATE", self.output_sample_rate))
+        self.output_bit_depth = int(os.getenv("TTS_OUTPUT_BIT_DEPTH", self.output_bit_depth))
+        self.opus_bitrate = os.getenv("TTS_OPUS_BITRATE", self.opus_bitrate)
+        self.mp3_bitrate = os.getenv("TTS_MP3_BITRATE", self.mp3_bitrate)
+        self.ffmpeg_path = os.getenv("FFMPEG_PATH", self.ffmpeg_path)
+        self.postprocess = bool(int(os.getenv("TTS_POSTPROCESS", "1")))
+        self.trim_threshold_db = float(os.getenv("TTS_TRIM_THRESHOLD_DB", self.trim_threshold_db))
+        self.trim_floor_db = float(os.getenv("TTS_TRIM_FLOOR_DB", self.trim_floor_db))
+        self.trim_padding_seconds = float(os.getenv("TTS_TRIM_PADDING_SECONDS", self.trim_padding_seconds))
+        self.loudness = os.getenv("TTS_LOUDNESS", self.loudness).lower()
+        self.loudness_target_lufs = float(os.getenv("TTS_LOUDNESS_TARGET_LUFS", self.loudness_target_lufs))
+        self.peak_dbfs = float(os.getenv("TTS_PEAK_DBFS", self.peak_dbfs))
+
+@dataclass
+class InferenceConfig:
+    """Configurações do pool de inferência (CPU)"""
+    workers: int = 0  # 0 = automático pela topologia de CPU
+    threads_per_worker: int = 0  # 0 = automático
+    interop_threads: int = 1
+    pin_cores: bool = False
+    server_address: str = "unix:/tmp/godofreda-tts.sock"  # ou host:porta
+    server_backend: str = "coqui"  # backend carregado pelo inference_server.py
+    server_concurrency: int = 1
+    client_pool_size: int = 4
+    client_timeout: float = 120.0
+    buffer_dir: str = "/dev/shm"  # tmpfs para handoff do áudio sem cópia
+    buffer_ttl_seconds: float = 60.0
+    
+    def __post_init__(self):
+        self.workers = int(os.getenv("INFERENCE_WORKERS", self.workers))
+        self.threads_per_worker = int(os.getenv("INFERENCE_THREADS_PER_WORKER", self.threads_per_worker))
+        self.interop_threads = int(os.getenv("INFERENCE_INTEROP_THREADS", self.interop_threads))
+        self.pin_cores = bool(int(os.getenv("INFERENCE_PIN_CORES", "0")))
+        self.server_address = os.getenv("INFERENCE_SERVER_ADDRESS", self.server_address)
+        self.server_backend = os.getenv("INFERENCE_SERVER_BACKEND", self.server_backend).lower()
+        self.server_concurrency = int(os.getenv("INFERENCE_SERVER_CONCURRENCY", self.server_concurrency))
+        self.client_pool_size = int(os.getenv("INFERENCE_CLIENT_POOL_SIZE", self.client_pool_size))
+        self.client_timeout = float(os.getenv("INFERENCE_CLIENT_TIMEOUT", self.client_timeout))
+        self.buffer_dir = os.getenv("INFERENCE_BUFFER_DIR", self.buffer_dir)
+        if not os.path.isdir(self.buffer_dir):
+            self.buffer_dir = "/tmp"
+        self.buffer_ttl_seconds = float(os.getenv("INFERENCE_BUFFER_TTL", self.buffer_ttl_seconds))
+
+@dataclass
+class JobsConfig:
+    """Configurações da fila de jobs assíncronos"""
+    backend: str = "redis"  # redis ou memory (processo único/testes)
+    visibility_timeout: int = 300  # segundos até um job sem conclusão voltar à fila
+    max_retries: int = 3
+    result_ttl: int = 3600
+    poll_interval: float = 0.5
+    claim_block_seconds: float = 5.0
+    inline_workers: int = 0  # workers dentro da API (necessário com backend memory)
+    
+    def __post_init__(self):
+        self.backend = os.getenv("JOBS_BACKEND", self.backend).lower()
+        self.visibility_timeout = int(os.getenv("JOBS_VISIBILITY_TIMEOUT", self.visibility_timeout))
+        self.max_retries = int(os.getenv("JOBS_MAX_RETRIES", self.max_retries))
+        self.result_ttl = int(os.getenv("JOBS_RESULT_TTL", self.result_ttl))
+        self.poll_interval = float(os.getenv("JOBS_POLL_INTERVAL", self.poll_interval))
+        self.claim_block_seconds = float(os.getenv("JOBS_CLAIM_BLOCK_SECONDS", self.claim_block_seconds))
+        self.inline_workers = int(os.getenv("JOBS_INLINE_WORKERS", self.inline_workers))
+
+@dataclass
+class STTConfig:
+    """Configurações do reconhecimento de fala (entrada de voz)"""
+    backend: str = "stub"  # stub ou whisper
+    model: str = "small"
+    language: str = "pt"
+    sample_rate: int = 16000
+    vad_threshold_db: float = -35.0  # janelas abaixo disso (relativo ao pico) são silêncio
+    vad_floor_db: float = -60.0  # piso absoluto de ruído
+    target_dbfs: float = -20.0  # loudness (RMS) após a normalização
+    chunk_seconds: float = 30.0  # trecho máximo entregue ao modelo
+    
+    def __post_init__(self):
+        self.backend = os.getenv("STT_BACKEND", self.backend).lower()
+        self.model = os.getenv("STT_MODEL", self.model)
+        self.language = os.getenv("STT_LANGUAGE", self.language)
+        self.vad_threshold_db = float(os.getenv("STT_VAD_THRESHOLD_DB", self.vad_threshold_db))
+        self.vad_floor_db = float(os.getenv("STT_VAD_FLOOR_DB", self.vad_floor_db))
+        self.target_dbfs = float(os.getenv("STT_TARGET_DBFS", self.target_dbfs))
+        self.chunk_seconds = float(os.getenv("STT_CHUNK_SECONDS", self.chunk_seconds))
+
+@dataclass
+class VisionConfig:
+    """Configurações da análise de imagens"""
+    backend: str = "stub"  # stub ou ollama (modelo multimodal)
+    model: str = "llava:7b"
+    prompt: str = "Descreva esta imagem em poucas frases, em português."
+    timeout: int = 60
+    max_side: int = 672  # lado máximo enviado ao modelo (pixels)
+    jpeg_quality: int = 85
+    max_pixels: int = 40_000_000  # imagens maiores são recusadas antes de decodificar
+    cache_size: int = 512  # análises mantidas no cache LRU
+    hash_distance: int = 0  # bits de diferença no dHash ainda tratados como a mesma imagem (0 = só iguais)
+    
+    def __post_init__(self):
+        self.backend = os.getenv("VISION_BACKEND", self.backend).lower()
+        self.model = os.getenv("VISION_MODEL", self.model)
+        self.prompt = os.getenv("VISION_PROMPT", self.prompt)
+        self.timeout = int(os.getenv("VISION_TIMEOUT", self.timeout))
+        self.max_side = int(os.getenv("VISION_MAX_SIDE", self.max_side))
+        self.jpeg_quality = int(os.getenv("VISION_JPEG_QUALITY", self.jpeg_quality))
+        self.max_pixels = int(os.getenv("VISION_MAX_PIXELS", self.max_pixels))
+        self.cache_size = int(os.getenv("VISION_CACHE_SIZE", self.cache_size))
+        self.hash_distance = int(os.getenv("VISION_HASH_DISTANCE", self.hash_distance))
+
+@dataclass
+class AdminConfig:
+    """Configurações dos endpoints de diagnóstico (/admin)"""
+    token: str = ""  # vazio = endpoints desativados
+    profile_max_seconds: float = 60.0
+    profile_hz: float = 100.0  # amostras por segundo do perfil
+    tracemalloc_frames: int = 10
+    max_snapshots: int = 5
+    loop_monitor_enabled: bool = True
+    loop_lag_interval: float = 0.1  # período do batimento do event loop
+    blocking_threshold: float = 0.25  # parada do loop registrada como chamada bloqueante
+    blocking_events: int = 50
+    
+    def __post_init__(self):
+        self.token = os.getenv("ADMIN_TOKEN", self.token)
+        self.profile_max_seconds = float(os.getenv("ADMIN_PROFILE_MAX_SECONDS", self.profile_max_seconds))
+        self.profile_hz = float(os.getenv("ADMIN_PROFILE_HZ", self.profile_hz))
+        self.tracemalloc_frames = int(os.getenv("ADMIN_TRACEMALLOC_FRAMES", self.tracemalloc_frames))
+        self.max_snapshots = int(os.getenv("ADMIN_MAX_SNAPSHOTS", self.max_snapshots))
+        self.loop_monitor_enabled = bool(int(os.getenv("LOOP_MONITOR_ENABLED", "1")))
+        self.loop_lag_interval = float(os.getenv("LOOP_LAG_INTERVAL", self.loop_lag_interval))
+        self.blocking_threshold = float(os.getenv("LOOP_BLOCKING_THRESHOLD", self.blocking_threshold))
+        self.blocking_events = int(os.getenv("LOOP_BLOCKING_EVENTS", self.blocking_events))
+
+@dataclass
+class TracingConfig:
+    """Configurações do tracing por requisição"""
+    sample_rate: float = 0.01  # fração das requisições rastreadas (0 desativa)
+    ring_size: int = 200  # traces recentes mantidos em memória (/admin/traces)
+    jsonl_path: str = ""  # arquivo JSONL com um trace por linha (vazio = desativado)
+    otlp_endpoint: str = ""  # coletor OTLP/HTTP, ex.: http://otel-collector:4318/v1/traces
+    service_name: str = "godofreda-api"
+    max_spans: int = 256  # spans guardados por trace
+    
+    def __post_init__(self):
+        self.sample_rate = float(os.getenv("TRACING_SAMPLE_RATE", self.sample_rate))
+        self.ring_size = int(os.getenv("TRACING_RING_SIZE", self.ring_size))
+        self.jsonl_path = os.getenv("TRACING_JSONL_PATH", self.jsonl_path)
+        self.otlp_endpoint = os.getenv("TRACING_OTLP_ENDPOINT", self.otlp_endpoint)
+        self.service_name = os.getenv("TRACING_SERVICE_NAME", self.service_name)
+        self.max_spans = int(os.getenv("TRACING_MAX_SPANS", self.max_spans))
 
 @dataclass
 class LLMConfig:
@@ -45,6 +266,8 @@ class LLMConfig:
     timeout: int = 30
     max_retries: int = 3
     retry_delay: int = 2
+    breaker_failures: int = 3  # falhas seguidas que abrem o disjuntor
+    breaker_reset_seconds: float = 30.0  # tempo aberto antes da chamada de teste
     
     def __post_init__(self):
         self.host = os.getenv("OLLAMA_HOST", self.host)
@@ -52,6 +275,22 @@ class LLMConfig:
         self.timeout = int(os.getenv("OLLAMA_TIMEOUT", self.timeout))
         self.max_retries = int(os.getenv("OLLAMA_MAX_RETRIES", self.max_retries))
         self.retry_delay = int(os.getenv("OLLAMA_RETRY_DELAY", self.retry_delay))
+        self.breaker_failures = int(os.getenv("LLM_BREAKER_FAILURES", self.breaker_failures))
+        self.breaker_reset_seconds = float(os.getenv("LLM_BREAKER_RESET_SECONDS", self.breaker_reset_seconds))
+
+@dataclass
+class DegradedConfig:
+    """Modo degradado: áudio pré-renderizado de fallbacks e mensagens do sistema"""
+    enabled: bool = True
+    bundle_path: str = "app/tts_models/degraded_audio.bin"
+    build_on_startup: bool = True  # sintetiza na fila bulk se o pacote faltar ou estiver desatualizado
+    tts_queue_threshold: int = 8  # jobs na fila do TTS a partir dos quais o chat responde com áudio pronto (0 = nunca)
+    
+    def __post_init__(self):
+        self.enabled = bool(int(os.getenv("DEGRADED_AUDIO_ENABLED", "1")))
+        self.bundle_path = os.getenv("DEGRADED_AUDIO_BUNDLE", self.bundle_path)
+        self.build_on_startup = bool(int(os.getenv("DEGRADED_AUDIO_BUILD_ON_STARTUP", "1")))
+        self.tts_queue_threshold = int(os.getenv("DEGRADED_TTS_QUEUE_THRESHOLD", self.tts_queue_threshold))
 
 @dataclass
 class FileConfig:
@@ -61,14 +300,18 @@ class FileConfig:
     allowed_audio_types: Optional[List[str]] = None
     cleanup_interval_hours: int = 1
     file_max_age_hours: int = 1
+    upload_spool_bytes: int = 1024 * 1024  # acima disso o upload vai para arquivo temporário (mmap)
+    upload_tmp_dir: Optional[str] = None  # None = diretório temporário do sistema
     
     def __post_init__(self):
         self.max_file_size = int(os.getenv("MAX_FILE_SIZE_MB", "100")) * 1024 * 1024
+        self.upload_spool_bytes = int(os.getenv("UPLOAD_SPOOL_KB", self.upload_spool_bytes // 1024)) * 1024
+        self.upload_tmp_dir = os.getenv("UPLOAD_TMP_DIR", self.upload_tmp_dir)
         self.allowed_image_types = [
             "image/jpeg", "image/jpg", "image/png", "image/gif", "image/webp"
         ]
         self.allowed_audio_types = [
-            "audio/wav", "audio/mp3", "audio/mpeg", "audio/ogg", "audio/flac"
+            "audio/wav", "audio/mp3", "audio/mpeg", "audio/ogg", "audio/flac", "audio/webm"
         ]
         self.cleanup_interval_hours = int(os.getenv("CLEANUP_INTERVAL_HOURS", self.cleanup_interval_hours))
         self.file_max_age_hours = int(os.getenv("FILE_MAX_AGE_HOURS", self.file_max_age_hours))
@@ -102,7 +345,14 @@ class Config:
     def __init__(self):
         self.api = APIConfig()
         self.tts = TTSConfig()
+        self.inference = InferenceConfig()
+        self.jobs = JobsConfig()
+        self.stt = STTConfig()
+        self.vision = VisionConfig()
+        self.admin = AdminConfig()
+        self.tracing = TracingConfig()
         self.llm = LLMConfig()
+        self.degraded = DegradedConfig()
         self.file = FileConfig()
         self.logging = LoggingConfig()
         self.monitoring = MonitoringConfig()
@@ -142,6 +392,15 @@ class Config:
         if not self.llm.host:
             raise ValueError("OLLAMA_HOST não pode estar vazio")
         
+        if self.tts.load_mode not in ("background", "blocking", "none"):
+            raise ValueError("TTS_LOAD_MODE deve ser background, blocking ou none")
+        
+        if self.tts.output_format not in ("wav", "flac", "opus", "mp3"):
+            raise ValueError("TTS_OUTPUT_FORMAT deve ser wav, flac, opus ou mp3")
+        
+        if self.tts.loudness not in ("lufs", "peak", "none"):
+            raise ValueError("TTS_LOUDNESS deve ser lufs, peak ou none")
+        
         if self.file.max_file_size <= 0:
             raise ValueError("MAX_FILE_SIZE deve ser maior que 0")
 
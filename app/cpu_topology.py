@@ -0,0 +1,202 @@
+# ================================
+# GODOFREDA CPU TOPOLOGY
+# ================================
+# Descobre CPUs disponíveis e cota do cgroup para dimensionar
+# workers de inferência e threads do torch sem oversubscription
+# ================================
+
+import logging
+import math
+import os
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Threads intra-op por worker quando nada é configurado; acima disso
+# o ganho do XTTS em CPU é pequeno e vale mais ter outro worker
+DEFAULT_THREADS_PER_WORKER = 4
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def available_cpus() -> List[int]:
+    """Lista de CPUs em que o processo pode rodar (respeita affinity/cpuset)"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def _read_file(path: str) -> Optional[str]:
+    """Lê um arquivo de controle do cgroup, se existir"""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """
+    Cota de CPU do cgroup em número de CPUs
+
+    Returns:
+        Cota em CPUs (ex.: 2.5) ou None se não houver limite
+    """
+    cpu_max = _read_file(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+
+    quota = _read_file(CGROUP_V1_QUOTA)
+    period = _read_file(CGROUP_V1_PERIOD)
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def effective_cpu_count(cpus: List[int], quota: Optional[float]) -> int:
+    """Número de CPUs utilizáveis considerando affinity e cota"""
+    count = len(cpus)
+    if quota is not None:
+        count = min(count, max(1, math.floor(quota)))
+    return max(1, count)
+
+
+@dataclass
+class PoolLayout:
+    """Layout do pool de inferência"""
+    workers: int
+    intra_op_threads: int
+    interop_threads: int
+    pinned: bool
+    core_sets: List[List[int]] = field(default_factory=list)
+    available_cpus: int = 0
+    cgroup_quota: Optional[float] = None
+    effective_cpus: int = 0
+
+    def core_set(self, index: int) -> Optional[List[int]]:
+        """Conjunto de cores do worker ``index`` (None se não fixado)"""
+        if not self.pinned or index >= len(self.core_sets):
+            return None
+        return self.core_sets[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação serializável para /status"""
+        return asdict(self)
+
+
+def plan_layout(workers: int = 0, threads_per_worker: int = 0, interop_threads: int = 1,
+                pin_cores: bool = False, cpus: Optional[List[int]] = None,
+                quota: Optional[float] = None) -> PoolLayout:
+    """
+    Calcula o layout de workers e threads para as CPUs disponíveis
+
+    Args:
+        workers: Número de workers (0 = automático)
+        threads_per_worker: Threads intra-op por worker (0 = automático)
+        interop_threads: Threads inter-op por worker
+        pin_cores: Fixar cada worker em um conjunto disjunto de cores
+        cpus: CPUs disponíveis (padrão: affinity do processo)
+        quota: Cota do cgroup em CPUs (padrão: lida do sistema)
+
+    Returns:
+        PoolLayout com workers * threads <= CPUs efetivas
+    """
+    if cpus is None:
+        cpus = available_cpus()
+        quota = cgroup_cpu_quota()
+    effective = effective_cpu_count(cpus, quota)
+
+    if workers <= 0 and threads_per_worker <= 0:
+        threads_per_worker = min(DEFAULT_THREADS_PER_WORKER, effective)
+    if workers <= 0:
+        workers = max(1, effective // threads_per_worker)
+    if threads_per_worker <= 0:
+        threads_per_worker = max(1, effective // workers)
+
+    if workers * threads_per_worker > effective:
+        logger.warning(
+            f"Inference layout oversubscribes CPUs: {workers} workers x "
+            f"{threads_per_worker} threads > {effective} CPUs"
+        )
+
+    core_sets: List[List[int]] = []
+    if pin_cores:
+        usable = cpus[:effective]
+        for index in range(workers):
+            start = (index * threads_per_worker) % len(usable)
+            core_sets.append([usable[(start + i) % len(usable)] for i in range(threads_per_worker)])
+
+    return PoolLayout(
+        workers=workers,
+        intra_op_threads=threads_per_worker,
+        interop_threads=max(1, interop_threads),
+        pinned=pin_cores,
+        core_sets=core_sets,
+        available_cpus=len(cpus),
+        cgroup_quota=quota,
+        effective_cpus=effective
+    )
+
+
+# Processo mestre do modo preload (serve.py): threads só são aplicadas após o fork
+_preload_master = False
+
+
+def enter_preload_master() -> None:
+    """Mantém o torch single-thread no mestre para que o fork seja seguro"""
+    global _preload_master
+    _preload_master = True
+    try:
+        import torch
+    except ImportError:
+        return  # backend sem PyTorch (ONNX, remoto): nada a ajustar
+    torch.set_num_threads(1)
+
+
+def leave_preload_master() -> None:
+    """Libera a aplicação do layout (chamado no worker após o fork)"""
+    global _preload_master
+    _preload_master = False
+
+
+def apply_worker_layout(intra_op_threads: int, interop_threads: int,
+                        cores: Optional[List[int]] = None) -> None:
+    """Aplica affinity e threads do torch no processo atual (threads só se o torch estiver instalado)"""
+    if _preload_master:
+        return
+
+    if cores:
+        try:
+            os.sched_setaffinity(0, cores)
+        except (AttributeError, OSError) as e:
+            logger.warning(f"Could not pin process to cores {cores}: {e}")
+
+    try:
+        import torch
+    except ImportError:
+        # ONNX Runtime e backend remoto recebem as threads pela própria sessão
+        return
+    torch.set_num_threads(intra_op_threads)
+    try:
+        torch.set_num_interop_threads(interop_threads)
+    except RuntimeError:
+        # Só pode ser chamado antes de qualquer trabalho paralelo no processo
+        logger.debug("torch interop threads already initialized")
+
+
+# Layout global calculado a partir da configuração
+inference_layout = plan_layout(
+    workers=config.inference.workers,
+    threads_per_worker=config.inference.threads_per_worker,
+    interop_threads=config.inference.interop_threads,
+    pin_cores=config.inference.pin_cores
+)
@@ -0,0 +1,228 @@
+# ================================
+# GODOFREDA DEGRADED AUDIO
+# ================================
+# Pacote de áudio pré-renderizado para o modo degradado: respostas de
+# fallback do LLM e mensagens do sistema, sintetizadas no build ou no
+# startup e servidas direto de um arquivo mapeado em memória
+# ================================
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import struct
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from audio_utils import float_to_pcm16, wav_header
+from config import config
+from llm_service import STATIC_FALLBACKS
+from model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Formato: magic, versão, tamanho do índice JSON, índice e PCM 16 bits
+# mono little-endian de todas as frases em sequência (alinhado em 16 bytes)
+BUNDLE_MAGIC = b"GDAB"
+BUNDLE_VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+DATA_ALIGNMENT = 16
+
+# Mensagens do sistema; campos entre chaves são expandidos com os valores
+# de TEMPLATE_SLOTS, uma frase renderizada por combinação
+SYSTEM_MESSAGES: Dict[str, str] = {
+    "tts_busy": "Minha fila de voz está lotada, então a resposta completa vai por escrito. "
+                "Volto a falar em uns {seconds} segundos.",
+}
+TEMPLATE_SLOTS: Dict[str, Tuple[str, ...]] = {
+    "seconds": ("10", "30", "60"),
+}
+
+
+def message_key(name: str, **values: Any) -> str:
+    """Chave de uma frase do pacote: ``tts_busy/seconds=30``"""
+    return "/".join([name] + [f"{slot}={values[slot]}" for slot in sorted(values)])
+
+
+def nearest_slot(slot: str, value: float) -> str:
+    """Menor valor do campo que cobre ``value`` (o maior, se nenhum cobrir)"""
+    options = TEMPLATE_SLOTS[slot]
+    for option in options:
+        if float(option) >= value:
+            return option
+    return options[-1]
+
+
+def degraded_catalog() -> Dict[str, str]:
+    """Todas as frases do pacote (chave -> texto): fallbacks fixos e mensagens expandidas"""
+    catalog = {f"fallback/{index}": line for index, line in enumerate(STATIC_FALLBACKS)}
+    for name, template in SYSTEM_MESSAGES.items():
+        slots = [slot for slot in TEMPLATE_SLOTS if "{" + slot + "}" in template]
+        for values in itertools.product(*(TEMPLATE_SLOTS[slot] for slot in slots)):
+            filled = dict(zip(slots, values))
+            catalog[message_key(name, **filled)] = template.format(**filled)
+    return catalog
+
+
+def bundle_fingerprint(catalog: Dict[str, str]) -> str:
+    """
+    Identifica textos, voz e pós-processamento: mudou, o pacote é renderizado de novo
+
+    A voz é a do modelo padrão do registro (TTS_MODELS / TTS_DEFAULT_MODEL),
+    o mesmo que sintetiza o pacote.
+    """
+    settings = config.tts
+    spec = model_registry.specs[model_registry.default]
+    # Sem modelo explícito no registro, o backend usa o da própria configuração
+    model = spec.model or {"coqui": settings.model, "onnx": settings.onnx_model_dir}.get(spec.backend, "")
+    source = {
+        "catalog": catalog,
+        "voice": [spec.backend, model, settings.default_speaker],
+        "postprocess": [settings.postprocess, settings.loudness, settings.loudness_target_lufs, settings.peak_dbfs],
+    }
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def write_bundle(path: str, clips: Dict[str, Tuple[str, np.ndarray]], sample_rate: int, fingerprint: str) -> int:
+    """
+    Grava o pacote (``clips``: chave -> (texto, áudio float32)) e retorna o
+    tamanho em bytes
+
+    Escrita em arquivo temporário e troca atômica: processos com a versão
+    anterior mapeada continuam lendo o arquivo antigo.
+    """
+    entries, offset = {}, 0
+    for key, (text, audio) in clips.items():
+        entries[key] = {"text": text, "offset": offset, "samples": int(len(audio))}
+        offset += len(audio)
+    index = json.dumps({
+        "sample_rate": sample_rate, "fingerprint": fingerprint, "samples": offset, "entries": entries
+    }, ensure_ascii=False).encode()
+    data_offset = -(-(HEADER.size + len(index)) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, 0, len(index)))
+        f.write(index)
+        f.write(b"\0" * (data_offset - HEADER.size - len(index)))
+        for _, audio in clips.values():
+            f.write(float_to_pcm16(audio).tobytes())
+    os.replace(temp_path, path)
+    return data_offset + offset * 2
+
+
+def build_bundle(path: str, synthesize: Callable[[str], Tuple[np.ndarray, int]],
+                 catalog: Optional[Dict[str, str]] = None) -> int:
+    """Sintetiza o catálogo com ``synthesize`` (texto -> (áudio, taxa)) e grava o pacote"""
+    catalog = catalog or degraded_catalog()
+    clips, sample_rate = {}, 0
+    for key, text in catalog.items():
+        audio, sample_rate = synthesize(text)
+        clips[key] = (text, audio)
+    return write_bundle(path, clips, sample_rate, bundle_fingerprint(catalog))
+
+
+class DegradedAudioBundle:
+    """
+    Pacote carregado: índice em memória e PCM mapeado do arquivo
+
+    As frases saem como views do mapeamento (nenhuma cópia até a
+    resposta); o sistema operacional mantém em cache só as páginas usadas.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.sample_rate = 0
+        self.fingerprint = ""
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._by_text: Dict[str, str] = {}
+        self._pcm: Optional[np.ndarray] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._pcm is not None
+
+    def load(self, path: str) -> bool:
+        """Mapeia o pacote; arquivo ausente ou inválido deixa o pacote atual como está"""
+        try:
+            with open(path, "rb") as f:
+                magic, version, _, index_size = HEADER.unpack(f.read(HEADER.size))
+                if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+                    raise ValueError(f"formato desconhecido ({magic!r} v{version})")
+                index = json.loads(f.read(index_size))
+            data_offset = -(-(HEADER.size + index_size) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+            pcm = np.memmap(path, dtype="<i2", mode="r", offset=data_offset, shape=(max(1, index["samples"]),))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            logger.warning(f"Degraded audio bundle {path} ignored: {e}")
+            return False
+
+        self.path = path
+        self.sample_rate = index["sample_rate"]
+        self.fingerprint = index["fingerprint"]
+        self.entries = index["entries"]
+        self._by_text = {entry["text"].strip(): key for key, entry in self.entries.items()}
+        self._pcm = pcm
+        logger.info(f"Degraded audio bundle loaded: {len(self.entries)} clips, {len(pcm) / self.sample_rate:.1f}s")
+        return True
+
+    def find(self, text: str) -> Optional[str]:
+        """Chave da frase com exatamente este texto (respostas de fallback do LLM)"""
+        return self._by_text.get(text.strip()) if self.loaded else None
+
+    def pcm(self, key: str) -> Optional[np.ndarray]:
+        """PCM 16 bits da frase (view do mapeamento) ou None"""
+        entry = self.entries.get(key)
+        if entry is None or self._pcm is None:
+            return None
+        return self._pcm[entry["offset"]:entry["offset"] + entry["samples"]]
+
+    def wav(self, key: str) -> Optional[bytes]:
+        """WAV pronto: cabeçalho mais as amostras do arquivo, sem conversão"""
+        pcm = self.pcm(key)
+        if pcm is None:
+            return None
+        return wav_header(len(pcm), self.sample_rate) + pcm.tobytes()
+
+    def audio(self, key: str) -> Optional[np.ndarray]:
+        """Frase em float32, para os formatos que passam pelo codificador"""
+        pcm = self.pcm(key)
+        return None if pcm is None else pcm.astype(np.float32) / 32767.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "path": self.path,
+            "clips": len(self.entries),
+            "seconds": round(len(self._pcm) / self.sample_rate, 2) if self.loaded and self.sample_rate else 0.0,
+            "fingerprint": self.fingerprint,
+        }
+
+
+# Instância global: carregada no startup da API
+degraded_audio = DegradedAudioBundle()
+
+
+if __name__ == "__main__":
+    # Build da imagem: python app/degraded_audio.py [--output caminho]
+    import argparse
+
+    from audio_postprocess import postprocess
+
+    parser = argparse.ArgumentParser(description="Pré-renderiza o pacote de áudio do modo degradado")
+    parser.add_argument("--output", default=config.degraded.bundle_path)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    backend = model_registry.specs[model_registry.default].create()
+    backend.load()
+
+    def synthesize(text: str) -> Tuple[np.ndarray, int]:
+        return postprocess(backend.synthesize(text, "pt", config.tts.default_speaker), backend.sample_rate)
+
+    size = build_bundle(args.output, synthesize)
+    logger.info(f"Degraded audio bundle written to {args.output} ({size / 1024:.0f} KiB)")
@@ -0,0 +1,406 @@
+# ================================
+# GODOFREDA DIAGNOSTICS
+# ================================
+# Diagnóstico do processo em produção, sem reiniciar: perfil por
+# amostragem das pilhas de todas as threads, snapshots do tracemalloc
+# e monitor de atraso do event loop com detecção de chamadas bloqueantes
+# ================================
+
+import asyncio
+import html
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from prometheus_client import Histogram
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = Histogram(
+    'godofreda_event_loop_lag_seconds', 'Atraso do event loop em relação ao agendado',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+
+
+def format_stack(frame: Any, limit: int = 64) -> List[str]:
+    """Pilha da raiz até o frame atual como ``função (arquivo:linha)``"""
+    entries = []
+    while frame is not None and len(entries) < limit:
+        code = frame.f_code
+        entries.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    entries.reverse()
+    return entries
+
+
+# ================================
+# PERFIL POR AMOSTRAGEM
+# ================================
+class StackSampler:
+    """
+    Amostra periodicamente as pilhas de todas as threads Python
+
+    Usa ``sys._current_frames()``, então pega o event loop, o pool do
+    ``asyncio.to_thread`` e threads de inferência sem instrumentar nada.
+    As amostras viram pilhas colapsadas (formato do flamegraph.pl) com o
+    nome da thread como raiz.
+
+    Args:
+        loop_thread_id: ident da thread do event loop (rotulada "event-loop")
+    """
+
+    def __init__(self, loop_thread_id: Optional[int] = None):
+        self.loop_thread_id = loop_thread_id
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+    def _thread_names(self) -> Dict[int, str]:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        if self.loop_thread_id is not None:
+            names[self.loop_thread_id] = "event-loop"
+        return names
+
+    def sample(self, skip: int) -> None:
+        names = self._thread_names()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip:
+                continue
+            # ";" separa os frames no formato colapsado
+            stack = [entry.replace(";", ",") for entry in format_stack(frame)]
+            self.stacks[";".join([names.get(thread_id, f"thread-{thread_id}")] + stack)] += 1
+        self.samples += 1
+
+    def run(self, seconds: float, hz: float) -> "StackSampler":
+        """Amostra por ``seconds`` (bloqueante; rodar em uma thread própria)"""
+        interval = 1.0 / hz
+        me = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + seconds
+        next_tick = start
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now >= next_tick:
+                self.sample(me)
+                next_tick += interval
+            time.sleep(max(0.0, min(next_tick, deadline) - time.perf_counter()))
+        self.duration = time.perf_counter() - start
+        return self
+
+    def collapsed(self) -> str:
+        """Uma linha ``pilha;separada;por;ponto-e-vírgula contagem`` por pilha"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def flamegraph_svg(self, title: str = "Godofreda profile", width: int = 1200) -> str:
+        """Flamegraph SVG autocontido (mesma leitura do flamegraph.pl)"""
+        return render_flamegraph(self.stacks, title, width)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"samples": self.samples, "duration_seconds": round(self.duration, 3), "stacks": len(self.stacks)}
+
+
+_profile_lock = asyncio.Lock()
+
+
+async def profile_process(seconds: float, hz: float, loop_thread_id: Optional[int] = None) -> StackSampler:
+    """
+    Perfil de ``seconds`` segundos do processo, amostrado em uma thread
+
+    Só um perfil por vez: amostrar em paralelo dobraria o custo sem ganho.
+
+    Raises:
+        RuntimeError: se outro perfil estiver em andamento
+    """
+    if _profile_lock.locked():
+        raise RuntimeError("a profile is already running")
+    async with _profile_lock:
+        sampler = StackSampler(loop_thread_id or threading.get_ident())
+        logger.info(f"Sampling profile started ({seconds}s at {hz}Hz)")
+        return await asyncio.to_thread(sampler.run, seconds, hz)
+
+
+def render_flamegraph(stacks: Counter, title: str, width: int = 1200, row: int = 16) -> str:
+    """Desenha pilhas colapsadas como flamegraph (raiz embaixo, largura = amostras)"""
+    root: Dict[str, Any] = {"count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = root
+        node["count"] += count
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"count": 0, "children": {}})
+            node["count"] += count
+
+    def depth(node: Dict[str, Any]) -> int:
+        return 1 + max((depth(child) for child in node["children"].values()), default=0)
+
+    levels = depth(root) - 1
+    margin = 10
+    height = (levels + 1) * row + 3 * margin
+    total = root["count"] or 1
+    scale = (width - 2 * margin) / total
+    rects: List[str] = []
+
+    def draw(node: Dict[str, Any], x: float, level: int) -> None:
+        for name, child in sorted(node["children"].items()):
+            w = child["count"] * scale
+            if w >= 0.5:
+                y = height - margin - (level + 1) * row
+                hue = 20 + (sum(map(ord, name)) % 35)
+                label = html.escape(name)
+                pct = child["count"] / total * 100
+                # ~7px por caractere; nomes que não cabem são truncados ou omitidos
+                if w > 7 * len(name):
+                    text = label
+                else:
+                    text = html.escape(name[:int(w / 7) - 2]) + ".." if w > 28 else ""
+                rects.append(
+                    f'<g><title>{label} ({child["count"]} amostras, {pct:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" '
+                    f'fill="hsl({hue},90%,60%)"/>'
+                    f'<text x="{x + 3:.1f}" y="{y + row - 4}">{text}</text></g>'
+                )
+                draw(child, x, level + 1)
+            x += w
+
+    draw(root, margin, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<rect width="100%" height="100%" fill="#fafafa"/>'
+        f'<text x="{margin}" y="{margin + 6}">{html.escape(title)} - {root["count"]} amostras</text>'
+        + "".join(rects) + "</svg>\n"
+    )
+
+
+# ================================
+# SNAPSHOTS DE MEMÓRIA
+# ================================
+class MemorySnapshots:
+    """
+    Snapshots numerados do tracemalloc e diferença entre dois deles
+
+    O tracemalloc só fica ligado entre ``start`` e ``stop``: ele deixa as
+    alocações mais lentas, então não roda o tempo todo.
+
+    Args:
+        max_snapshots: snapshots mantidos (os mais antigos são descartados)
+    """
+
+    def __init__(self, max_snapshots: int = 5):
+        self.max_snapshots = max_snapshots
+        self.snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info(f"tracemalloc started ({frames} frames)")
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        self.snapshots.clear()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if self.tracing else (0, 0)
+        return {
+            "tracing": self.tracing,
+            "traced_mb": round(current / 1024 ** 2, 2),
+            "peak_mb": round(peak / 1024 ** 2, 2),
+            "snapshots": list(self.snapshots),
+        }
+
+    @staticmethod
+    def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def take(self, limit: int = 20) -> Dict[str, Any]:
+        """Tira um snapshot e devolve seu id e as linhas que mais alocam"""
+        if not self.tracing:
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = self._filtered(tracemalloc.take_snapshot())
+        snapshot_id = next(self._ids)
+        self.snapshots[snapshot_id] = snapshot
+        while len(self.snapshots) > self.max_snapshots:
+            self.snapshots.popitem(last=False)
+        stats = snapshot.statistics("lineno")
+        return {
+            "id": snapshot_id,
+            "total_mb": round(sum(stat.size for stat in stats) / 1024 ** 2, 2),
+            "top": [self._stat(stat) for stat in stats[:limit]],
+        }
+
+    def diff(self, base: int, target: int, limit: int = 20, key: str = "lineno") -> Dict[str, Any]:
+        """Linhas que mais cresceram de ``base`` para ``target``"""
+        try:
+            before, after = self.snapshots[base], self.snapshots[target]
+        except KeyError as e:
+            raise KeyError(f"snapshot {e.args[0]} not found") from None
+        stats = after.compare_to(before, key)
+        return {
+            "base": base,
+            "target": target,
+            "size_diff_mb": round(sum(stat.size_diff for stat in stats) / 1024 ** 2, 3),
+            "top": [self._stat(stat) for stat in stats[:limit]],
+        }
+
+    @staticmethod
+    def _stat(stat: Any) -> Dict[str, Any]:
+        frame = stat.traceback[0]
+        entry = {"location": f"{frame.filename}:{frame.lineno}", "size_kb": round(stat.size / 1024, 1),
+                 "count": stat.count}
+        if hasattr(stat, "size_diff"):
+            entry.update(size_diff_kb=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+        return entry
+
+
+# ================================
+# ATRASO DO EVENT LOOP
+# ================================
+@dataclass
+class BlockingEvent:
+    """Período em que o event loop ficou sem rodar callbacks"""
+    started_at: float
+    blocked_seconds: float
+    stack: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": round(self.started_at, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "stack": self.stack,
+        }
+
+
+class LoopMonitor:
+    """
+    Mede o atraso do event loop e captura quem o está bloqueando
+
+    Uma task dorme ``interval`` e mede o quanto acordou atrasada (vai para
+    o histograma ``godofreda_event_loop_lag_seconds``). Uma thread de
+    vigia confere o último batimento da task: se o loop ficar parado por
+    mais de ``threshold``, guarda a pilha da thread do loop naquele
+    instante (ex.: um ``tts_to_file`` síncrono dentro de um handler).
+
+    Args:
+        interval: período da task de batimento
+        threshold: parada do loop considerada bloqueio
+        max_events: bloqueios mantidos para consulta
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, max_events: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=600)
+        self.events: Deque[BlockingEvent] = deque(maxlen=max_events)
+        self.max_lag = 0.0
+        self.blocking_total = 0
+        self.loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Inicia a task e a vigia (chamar de dentro do event loop)"""
+        if self.running:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        # Evento novo a cada start: a vigia de um ciclo anterior continua parada
+        self._stop = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started (interval {self.interval}s, threshold {self.threshold}s)")
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self.lags.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self, stop: threading.Event) -> None:
+        """Vigia em thread: registra um evento por período bloqueado"""
+        current: Optional[BlockingEvent] = None
+        period = min(self.threshold / 4, self.interval)
+        while not stop.wait(period):
+            beat = self._heartbeat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold:
+                current = None
+                continue
+            if current is not None and current.started_at == beat:
+                current.blocked_seconds = stalled
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            current = BlockingEvent(started_at=beat, blocked_seconds=stalled,
+                                    stack=format_stack(frame) if frame is not None else [])
+            self.events.append(current)
+            self.blocking_total += 1
+            logger.warning(f"Event loop blocked for {stalled:.2f}s in {current.stack[-1] if current.stack else '?'}")
+
+    def stats(self) -> Dict[str, Any]:
+        lags = sorted(self.lags)
+
+        def pct(q: float) -> float:
+            return round(lags[min(len(lags) - 1, int(q * len(lags)))] * 1000, 2) if lags else 0.0
+
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "lag_ms": {"p50": pct(0.5), "p99": pct(0.99), "max_recent": round(lags[-1] * 1000, 2) if lags else 0.0,
+                       "max": round(self.max_lag * 1000, 2)},
+            "blocking_total": self.blocking_total,
+            "blocking_events": [event.to_dict() for event in reversed(self.events)],
+        }
+
+
+# Instâncias globais (o monitor é iniciado no startup da API)
+loop_monitor = LoopMonitor(
+    interval=config.admin.loop_lag_interval,
+    threshold=config.admin.blocking_threshold,
+    max_events=config.admin.blocking_events
+)
+memory_snapshots = MemorySnapshots(max_snapshots=config.admin.max_snapshots)
@@ -0,0 +1,211 @@
+# ================================
+# GODOFREDA IMAGE PIPELINE
+# ================================
+# Preparação das imagens enviadas no chat: decodificação, redução para o
+# tamanho de entrada do modelo de visão, recodificação compacta e cache
+# LRU das análises por hash perceptual (dHash)
+# ================================
+
+import asyncio
+import hashlib
+import io
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+# Lado do dHash: 8x8 = 64 bits
+HASH_SIZE = 8
+
+
+@dataclass
+class PreparedImage:
+    """Imagem reduzida e recodificada, pronta para o modelo de visão"""
+    data: bytes
+    media_type: str
+    width: int
+    height: int
+    original_width: int
+    original_height: int
+    dhash: int
+    sha256: str
+
+    @property
+    def hash_hex(self) -> str:
+        return f"{self.dhash:016x}"
+
+
+def dhash(image: Any, hash_size: int = HASH_SIZE) -> int:
+    """
+    Hash perceptual por diferença de brilho entre vizinhos horizontais
+
+    Recompressões, redimensionamentos e pequenas edições mudam poucos bits;
+    a distância de Hamming mede o quanto duas imagens diferem.
+    """
+    from PIL import Image
+
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).reshape(-1)
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    """Número de bits diferentes entre dois hashes"""
+    return bin(a ^ b).count("1")
+
+
+def prepare_image(data: BytesLike, max_side: Optional[int] = None, quality: Optional[int] = None) -> PreparedImage:
+    """
+    Decodifica, corrige a orientação, reduz e recodifica em JPEG
+
+    Para JPEG, ``draft`` decodifica direto em escala reduzida (DCT), o que
+    evita montar a imagem inteira em memória.
+
+    Raises:
+        ValueError: imagem corrompida, grande demais ou formato desconhecido
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    max_side = max_side or config.vision.max_side
+    quality = quality or config.vision.jpeg_quality
+    Image.MAX_IMAGE_PIXELS = config.vision.max_pixels
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        original_width, original_height = image.size
+        if image.format == "JPEG":
+            image.draft("RGB", (max_side, max_side))
+        image.seek(0)  # GIF/WebP animados: primeiro quadro
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            # Transparência sobre fundo branco
+            rgba = image.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ValueError(f"Imagem inválida: {e}")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    encoded = buffer.getvalue()
+    return PreparedImage(
+        data=encoded,
+        media_type="image/jpeg",
+        width=image.width,
+        height=image.height,
+        original_width=original_width,
+        original_height=original_height,
+        dhash=dhash(image),
+        sha256=hashlib.sha256(encoded).hexdigest()
+    )
+
+
+class AnalysisCache:
+    """
+    Cache LRU de análises indexado pelo prompt e pelo dHash
+
+    A busca exata é O(1); com ``max_distance`` > 0 também aceita imagens
+    quase iguais (repostagens recomprimidas), varrendo as entradas. O
+    padrão é 0: imagens diferentes com hash próximo (prints da mesma tela,
+    memes do mesmo template) não recebem a análise uma da outra.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_distance: Optional[int] = None):
+        self.max_entries = config.vision.cache_size if max_entries is None else max_entries
+        self.max_distance = config.vision.hash_distance if max_distance is None else max_distance
+        self._entries: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_hash: int, prompt: str) -> Optional[str]:
+        key = (prompt, image_hash)
+        match = key if key in self._entries else None
+        if match is None and self.max_distance > 0:
+            for candidate in self._entries:
+                if candidate[0] == prompt and hamming(candidate[1], image_hash) <= self.max_distance:
+                    match = candidate
+                    break
+        if match is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(match)
+        return self._entries[match]
+
+    def put(self, image_hash: int, prompt: str, analysis: str) -> None:
+        key = (prompt, image_hash)
+        self._entries[key] = analysis
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
+class ImageAnalyzer:
+    """
+    Prepara a imagem, consulta o cache e só então chama o backend de visão
+
+    Pedidos simultâneos da mesma imagem compartilham uma única inferência.
+    """
+
+    def __init__(self, backend: Any, cache: Optional[AnalysisCache] = None):
+        self.backend = backend
+        self.cache = cache or AnalysisCache()
+        self._inflight: Dict[Tuple[str, int], "asyncio.Future[str]"] = {}
+
+    async def analyze(self, data: BytesLike, prompt: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Returns:
+            (análise, veio do cache)
+        """
+        prompt = prompt or config.vision.prompt
+        image = await asyncio.to_thread(prepare_image, data)
+        cached = self.cache.get(image.dhash, prompt)
+        if cached is not None:
+            logger.info(f"Image analysis cache hit ({image.hash_hex})")
+            return cached, True
+
+        key = (prompt, image.dhash)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending), True
+
+        future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            analysis = await self.backend.describe(image, prompt)
+            self.cache.put(image.dhash, prompt, analysis)
+            future.set_result(analysis)
+            logger.info(
+                f"Image analyzed by {self.backend.name}: {image.original_width}x{image.original_height} -> "
+                f"{image.width}x{image.height}, {len(image.data)} bytes ({image.hash_hex})"
+            )
+            return analysis, False
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # evita aviso quando ninguém mais aguarda
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.backend.info(), "cache": self.cache.stats(), "inflight": len(self._inflight)}
@@ -0,0 +1,161 @@
+# ================================
+# GODOFREDA INFERENCE CLIENT
+# ================================
+# Cliente do servidor de inferência TTS com pool de conexões e
+# leitura do áudio direto de buffers memory-mapped
+# ================================
+
+import json
+import logging
+import mmap
+import os
+import queue
+import socket
+import struct
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 1024 * 1024
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """
+    Interpreta o endereço do servidor
+
+    Returns:
+        ("unix", caminho) ou ("tcp", (host, porta))
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    """Serializa uma mensagem com prefixo de tamanho"""
+    payload = json.dumps(message).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def map_audio_buffer(descriptor: Dict[str, Any]) -> np.ndarray:
+    """
+    Mapeia o buffer de áudio do servidor como array somente leitura
+
+    O arquivo é removido logo após o mapeamento; as páginas continuam
+    válidas enquanto o array existir, sem cópia pelo socket.
+    """
+    path = descriptor["buffer"]
+    samples = descriptor["samples"]
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        mapped = mmap.mmap(fd, max(samples * np.dtype(descriptor["dtype"]).itemsize, 1), prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+        os.unlink(path)
+    return np.frombuffer(mapped, dtype=descriptor["dtype"], count=samples)
+
+
+class _Connection:
+    """Conexão persistente com o servidor de inferência"""
+
+    def __init__(self, address: str, timeout: float):
+        kind, target = parse_address(address)
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(target)
+        self.file = self.sock.makefile("rb")
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self.sock.sendall(encode_frame(message))
+
+    def receive(self) -> Dict[str, Any]:
+        header = self.file.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            raise ConnectionError("Inference server closed the connection")
+        (size,) = FRAME_HEADER.unpack(header)
+        if size > MAX_FRAME_BYTES:
+            raise ConnectionError(f"Frame too large: {size} bytes")
+        return json.loads(self.file.read(size))
+
+    def close(self) -> None:
+        try:
+            self.file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class InferenceClient:
+    """Cliente com pool de conexões para o servidor de inferência"""
+
+    def __init__(self, address: Optional[str] = None, pool_size: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.address = address or config.inference.server_address
+        self.timeout = timeout or config.inference.client_timeout
+        self._pool: "queue.LifoQueue[_Connection]" = queue.LifoQueue(maxsize=pool_size or config.inference.client_pool_size)
+
+    def _acquire(self) -> _Connection:
+        """Reutiliza uma conexão ociosa ou abre uma nova"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return _Connection(self.address, self.timeout)
+
+    def _release(self, connection: _Connection) -> None:
+        """Devolve a conexão ao pool (fecha se o pool estiver cheio)"""
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _exchange(self, message: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Envia uma requisição e entrega as respostas até o frame final"""
+        connection = self._acquire()
+        try:
+            connection.send(message)
+            while True:
+                response = connection.receive()
+                if not response.get("ok"):
+                    raise RuntimeError(f"Inference server error: {response.get('error')}")
+                if response.get("done", True):
+                    break
+                yield response
+        except BaseException:
+            # Conexão em estado desconhecido (erro ou consumo interrompido)
+            connection.close()
+            raise
+        # Devolve ao pool antes do frame final para que next() já libere a conexão
+        self._release(connection)
+        yield response
+
+    def info(self) -> Dict[str, Any]:
+        """Informações do backend no servidor"""
+        return next(self._exchange({"op": "info"}))
+
+    def synthesize(self, text: str, language: str = "pt", speaker: Optional[str] = None) -> np.ndarray:
+        """Sintetiza no servidor e mapeia o resultado sem copiar bytes"""
+        response = next(self._exchange({"op": "synthesize", "text": text, "language": language, "speaker": speaker}))
+        return map_audio_buffer(response)
+
+    def synthesize_stream(self, text: str, language: str = "pt",
+                          speaker: Optional[str] = None) -> Iterator[np.ndarray]:
+        """Recebe trechos de áudio conforme o servidor os produz"""
+        message = {"op": "synthesize_stream", "text": text, "language": language, "speaker": speaker}
+        for response in self._exchange(message):
+            if "buffer" in response:
+                yield map_audio_buffer(response)
+
+    def close(self) -> None:
+        """Fecha todas as conexões ociosas"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,207 @@
+"""
+Godofreda Inference Server
+Processo dedicado ao modelo TTS, separado da API. Escuta em socket Unix ou
+localhost e devolve o áudio em buffers memory-mapped (tmpfs) em vez de
+copiar os bytes pelo socket
+
+Protocolo: frames com 4 bytes (big-endian) de tamanho seguidos de JSON.
+    {"op": "info"}
+    {"op": "synthesize", "text": ..., "language": ..., "speaker": ...}
+    {"op": "synthesize_stream", ...}  -> vários frames, o último com "done"
+
+Uso:
+    python inference_server.py
+"""
+
+import asyncio
+import json
+import logging
+import mmap
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from config import config
+from inference_client import FRAME_HEADER, MAX_FRAME_BYTES, encode_frame, parse_address
+from tts_backends import TTSBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+AUDIO_DTYPE = "float32"
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """Lê um frame; None quando a conexão foi fechada"""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame too large: {size} bytes")
+    return json.loads(await reader.readexactly(size))
+
+
+class AudioBufferWriter:
+    """Escreve áudio em arquivos memory-mapped no tmpfs para handoff sem cópia"""
+
+    def __init__(self, buffer_dir: str, ttl_seconds: float):
+        self.buffer_dir = buffer_dir
+        self.ttl_seconds = ttl_seconds
+        # caminho -> momento de criação, para remover buffers não consumidos
+        self._pending: Dict[str, float] = {}
+
+    def write(self, audio: np.ndarray) -> Dict[str, Any]:
+        """
+        Copia o áudio para um novo buffer mapeado
+
+        Returns:
+            Descritor do buffer (caminho, amostras e dtype)
+        """
+        audio = np.ascontiguousarray(audio, dtype=AUDIO_DTYPE)
+        path = os.path.join(self.buffer_dir, f"godofreda-{uuid.uuid4().hex}.pcm")
+        size = max(audio.nbytes, 1)
+
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+        try:
+            os.ftruncate(fd, size)
+            with mmap.mmap(fd, size) as mapped:
+                target = np.ndarray(audio.shape, dtype=AUDIO_DTYPE, buffer=mapped)
+                target[:] = audio
+                del target
+        finally:
+            os.close(fd)
+
+        self._pending[path] = time.monotonic()
+        return {"buffer": path, "samples": int(audio.size), "dtype": AUDIO_DTYPE}
+
+    def sweep(self) -> int:
+        """Remove buffers que o cliente não consumiu dentro do TTL"""
+        now = time.monotonic()
+        removed = 0
+        for path, created in list(self._pending.items()):
+            if now - created < self.ttl_seconds:
+                continue
+            del self._pending[path]
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass  # já consumido (o cliente remove após mapear)
+        return removed
+
+
+class InferenceServer:
+    """Servidor de inferência TTS local"""
+
+    def __init__(self, backend: TTSBackend, address: Optional[str] = None,
+                 concurrency: Optional[int] = None, buffer_dir: Optional[str] = None):
+        self.backend = backend
+        self.address = address or config.inference.server_address
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency or config.inference.server_concurrency,
+            thread_name_prefix="inference"
+        )
+        self.buffers = AudioBufferWriter(
+            buffer_dir or config.inference.buffer_dir,
+            config.inference.buffer_ttl_seconds
+        )
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Começa a aceitar conexões"""
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle, path=target)
+            os.chmod(target, 0o660)
+        else:
+            self._server = await asyncio.start_server(self._handle, *target)
+
+        self._sweeper = asyncio.create_task(self._sweep_loop())
+        logger.info(f"Inference server listening on {self.address} (backend {self.backend.name})")
+
+    async def stop(self) -> None:
+        """Para o servidor e libera recursos"""
+        if self._sweeper:
+            self._sweeper.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def serve_forever(self) -> None:
+        """Inicia e atende até ser cancelado"""
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _sweep_loop(self) -> None:
+        """Remove periodicamente buffers órfãos"""
+        while True:
+            await asyncio.sleep(self.buffers.ttl_seconds)
+            removed = self.buffers.sweep()
+            if removed:
+                logger.warning(f"Removed {removed} unconsumed audio buffers")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Atende uma conexão persistente do cliente"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request = await read_frame(reader)
+                if request is None:
+                    break
+                try:
+                    await self._dispatch(loop, request, writer)
+                except Exception as e:
+                    logger.error(f"Inference request failed: {e}")
+                    writer.write(encode_frame({"ok": False, "error": str(e), "done": True}))
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, loop: asyncio.AbstractEventLoop, request: Dict[str, Any],
+                        writer: asyncio.StreamWriter) -> None:
+        """Executa uma operação do protocolo"""
+        op = request.get("op")
+        args = (request.get("text", ""), request.get("language", "pt"), request.get("speaker"))
+
+        if op == "info":
+            writer.write(encode_frame({"ok": True, **self.backend.info()}))
+        elif op == "synthesize":
+            audio = await loop.run_in_executor(self.executor, self.backend.synthesize, *args)
+            writer.write(encode_frame({"ok": True, "done": True, **self.buffers.write(audio)}))
+        elif op == "synthesize_stream":
+            chunks = self.backend.synthesize_stream(*args)
+            while True:
+                audio = await loop.run_in_executor(self.executor, next, chunks, None)
+                if audio is None:
+                    break
+                writer.write(encode_frame({"ok": True, "done": False, **self.buffers.write(audio)}))
+                await writer.drain()
+            writer.write(encode_frame({"ok": True, "done": True}))
+        else:
+            raise ValueError(f"Unknown op: {op}")
+
+
+async def _main() -> None:
+    backend = create_backend(config.inference.server_backend)
+    backend.load()
+    if config.tts.warmup:
+        backend.warmup()
+    await InferenceServer(backend).serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=config.logging.format, stream=sys.stdout)
+    asyncio.run(_main())
@@ -0,0 +1,109 @@
+# ================================
+# GODOFREDA INSTRUMENTATION
+# ================================
+# Métricas por estágio do pipeline (fila, cache, LLM, TTS, codificação,
+# upload), fator de tempo real do TTS, tokens/s do LLM e rótulos de rota
+# com cardinalidade limitada; cada estágio também vira um span quando a
+# requisição está sendo rastreada
+# ================================
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, MutableMapping, Optional
+
+from prometheus_client import Gauge, Histogram
+
+from tracing import Span, tracer
+
+# Buckets para operações de milissegundos até inferências de minutos
+INFERENCE_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0, 300.0
+)
+
+STAGES = (
+    "queue_wait",       # espera por um slot do modelo TTS
+    "cache_lookup",     # consulta ao Redis
+    "llm_prompt_eval",  # processamento do prompt pelo Ollama
+    "llm_generation",   # geração dos tokens
+    "tts_synthesis",
+    "postprocess",      # corte de silêncio, reamostragem e loudness da saída
+    "encoding",         # WAV em processo ou cauda do ffmpeg após a síntese
+    "upload_parse",
+    "stt",
+    "vision",
+)
+
+# Rótulo de requisições que não casaram com nenhuma rota (scans, 404)
+UNMATCHED_ROUTE = "<unmatched>"
+
+STAGE_DURATION = Histogram(
+    'godofreda_stage_duration_seconds', 'Duração por estágio do pipeline', ['stage'],
+    buckets=INFERENCE_BUCKETS
+)
+TTS_REAL_TIME_FACTOR = Gauge(
+    'godofreda_tts_real_time_factor', 'Tempo de síntese dividido pela duração do áudio (última síntese)'
+)
+LLM_TOKENS_PER_SECOND = Gauge(
+    'godofreda_llm_tokens_per_second', 'Tokens gerados por segundo (última resposta do LLM)'
+)
+
+# Séries criadas de antemão: o dashboard mostra zero em vez de "sem dados"
+for _stage in STAGES:
+    STAGE_DURATION.labels(stage=_stage)
+
+
+def observe_stage(name: str, seconds: float, /, end_ns: Optional[int] = None, **attributes: Any) -> None:
+    """Registra a duração de um estágio medido por fora (termina agora ou em ``end_ns``)"""
+    STAGE_DURATION.labels(stage=name).observe(seconds)
+    tracer.add_span(name, seconds, end_ns, **attributes)
+
+
+@contextmanager
+def stage(name: str, /, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Mede o bloco como um estágio (inclusive quando ele falha); devolve o span, se rastreado"""
+    start = time.perf_counter()
+    with tracer.span(name, **attributes) as span:
+        try:
+            yield span
+        finally:
+            STAGE_DURATION.labels(stage=name).observe(time.perf_counter() - start)
+
+
+def record_tts(elapsed: float, samples: int, sample_rate: int) -> None:
+    """Duração da síntese e fator de tempo real (< 1 = mais rápido que a fala)"""
+    audio_seconds = samples / sample_rate if samples and sample_rate else 0.0
+    rtf = elapsed / audio_seconds if audio_seconds else None
+    observe_stage("tts_synthesis", elapsed, audio_seconds=round(audio_seconds, 3))
+    if rtf is not None:
+        TTS_REAL_TIME_FACTOR.set(rtf)
+
+
+def record_llm_timings(result: Dict[str, Any]) -> None:
+    """
+    Estágios do LLM a partir dos tempos reportados pelo Ollama
+
+    ``prompt_eval_duration`` e ``eval_duration`` vêm em nanossegundos na
+    resposta final (``done``) de /api/generate.
+    """
+    prompt_ns = result.get("prompt_eval_duration")
+    eval_ns = result.get("eval_duration")
+    # A geração acabou agora; a avaliação do prompt terminou antes dela
+    now = time.time_ns()
+    if prompt_ns:
+        observe_stage("llm_prompt_eval", prompt_ns / 1e9, end_ns=now - (eval_ns or 0),
+                      prompt_tokens=result.get("prompt_eval_count", 0))
+    if eval_ns:
+        observe_stage("llm_generation", eval_ns / 1e9, end_ns=now, tokens=result.get("eval_count", 0))
+        if result.get("eval_count"):
+            LLM_TOKENS_PER_SECOND.set(result["eval_count"] / (eval_ns / 1e9))
+
+
+def route_template(scope: MutableMapping[str, Any]) -> str:
+    """
+    Template da rota atendida (ex.: /jobs/{job_id}) em vez do caminho bruto
+
+    Disponível no scope depois do roteamento; caminhos sem rota caem em um
+    único rótulo, o que mantém a cardinalidade limitada sob varreduras.
+    """
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
@@ -0,0 +1,559 @@
+# ================================
+# GODOFREDA JOB QUEUE
+# ================================
+# Fila de jobs assíncronos (TTS longo, geração em lote) com
+# visibility timeout, retentativas e métricas de atraso.
+# Implementações: Redis (produção) e memória (testes/processo único)
+# ================================
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+from config import config
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_PROCESSING = "processing"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINAL_STATES = (JOB_DONE, JOB_FAILED)
+
+
+@dataclass
+class Job:
+    """Job da fila"""
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    status: str = JOB_QUEUED
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    worker: Optional[str] = None
+    error: Optional[str] = None
+    result_type: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representação pública do job (sem o resultado)"""
+        return asdict(self)
+
+
+class JobQueue(ABC):
+    """Interface da fila de jobs"""
+
+    def __init__(self):
+        self.visibility_timeout = config.jobs.visibility_timeout
+        self.max_retries = config.jobs.max_retries
+        self.result_ttl = config.jobs.result_ttl
+        self.poll_interval = config.jobs.poll_interval
+
+    @abstractmethod
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Job:
+        """Enfileira um novo job"""
+
+    @abstractmethod
+    async def claim(self, worker_id: str, block_seconds: float = 5.0) -> Optional[Job]:
+        """Retira o próximo job e abre um lease de ``visibility_timeout``"""
+
+    @abstractmethod
+    async def complete(self, job_id: str, worker_id: str, result: bytes, result_type: str) -> bool:
+        """
+        Marca o job como concluído e guarda o resultado
+
+        Só vale enquanto o lease é de ``worker_id``: se expirou e o job
+        voltou à fila (ou foi para outro worker), o resultado é descartado
+        e o retorno é False.
+        """
+
+    @abstractmethod
+    async def fail(self, job_id: str, error: str, worker_id: Optional[str] = None) -> Job:
+        """
+        Registra falha; reenfileira enquanto houver retentativas
+
+        Só vale para job em processamento; com ``worker_id``, ignorada
+        também se o lease já não é desse worker.
+        """
+
+    @abstractmethod
+    async def extend(self, job_id: str, worker_id: str) -> bool:
+        """
+        Renova o lease por mais ``visibility_timeout`` (heartbeat do worker)
+
+        False se o lease já não é de ``worker_id``.
+        """
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Obtém o estado do job"""
+
+    @abstractmethod
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        """Obtém o resultado de um job concluído"""
+
+    @abstractmethod
+    async def requeue_expired(self) -> int:
+        """Devolve à fila jobs cujo lease expirou (worker morreu/travou)"""
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Profundidade, jobs em processamento, atraso e retentativas"""
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Long-poll: espera o job chegar a um estado final ou o timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job.status in FINAL_STATES or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    @staticmethod
+    def _owns(job: Job, worker_id: str) -> bool:
+        """Se o lease atual do job é de ``worker_id``"""
+        return job.status == JOB_PROCESSING and job.worker == worker_id
+
+    def _retry_or_fail(self, job: Job, error: str) -> Job:
+        """Decide se o job volta para a fila ou falha definitivamente"""
+        job.error = error
+        job.worker = None
+        if job.attempts < self.max_retries:
+            job.status = JOB_QUEUED
+        else:
+            job.status = JOB_FAILED
+            job.finished_at = time.time()
+        return job
+
+
+class MemoryJobQueue(JobQueue):
+    """Fila em memória com a mesma semântica da fila Redis"""
+
+    def __init__(self):
+        super().__init__()
+        self._jobs: Dict[str, Job] = {}
+        self._results: Dict[str, bytes] = {}
+        self._queue: Deque[str] = deque()
+        self._leases: Dict[str, float] = {}
+        # (prazo, id) dos jobs finalizados, em ordem de prazo (TTL fixo)
+        self._expiry: Deque[Tuple[float, str]] = deque()
+        self._retries = 0
+        self._available = asyncio.Condition()
+
+    def _finish(self, job_id: str) -> None:
+        """Agenda a remoção do job finalizado após ``result_ttl``"""
+        self._expiry.append((time.monotonic() + self.result_ttl, job_id))
+
+    def _purge_finished(self) -> None:
+        """Remove jobs finalizados com TTL vencido, como as chaves com EXPIRE no Redis"""
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, job_id = self._expiry.popleft()
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Job:
+        self._purge_finished()
+        job = Job(id=uuid.uuid4().hex, kind=kind, payload=payload)
+        self._jobs[job.id] = job
+        async with self._available:
+            self._queue.append(job.id)
+            self._available.notify()
+        return job
+
+    async def claim(self, worker_id: str, block_seconds: float = 5.0) -> Optional[Job]:
+        async with self._available:
+            if not self._queue:
+                try:
+                    await asyncio.wait_for(self._available.wait_for(lambda: bool(self._queue)), block_seconds)
+                except asyncio.TimeoutError:
+                    return None
+            job = self._jobs[self._queue.popleft()]
+
+        job.status = JOB_PROCESSING
+        job.attempts += 1
+        job.worker = worker_id
+        job.started_at = time.time()
+        self._leases[job.id] = time.monotonic() + self.visibility_timeout
+        return job
+
+    async def complete(self, job_id: str, worker_id: str, result: bytes, result_type: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or not self._owns(job, worker_id):
+            return False
+        self._leases.pop(job_id, None)
+        self._results[job_id] = result
+        job.status = JOB_DONE
+        job.result_type = result_type
+        job.finished_at = time.time()
+        self._finish(job_id)
+        return True
+
+    async def fail(self, job_id: str, error: str, worker_id: Optional[str] = None) -> Job:
+        job = self._jobs[job_id]
+        if job.status != JOB_PROCESSING or (worker_id is not None and job.worker != worker_id):
+            return job
+        self._leases.pop(job_id, None)
+        self._retry_or_fail(job, error)
+        if job.status == JOB_QUEUED:
+            self._retries += 1
+            async with self._available:
+                self._queue.append(job_id)
+                self._available.notify()
+        else:
+            self._finish(job_id)
+        return job
+
+    async def extend(self, job_id: str, worker_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or not self._owns(job, worker_id):
+            return False
+        self._leases[job_id] = time.monotonic() + self.visibility_timeout
+        return True
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        self._purge_finished()
+        return self._jobs.get(job_id)
+
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        self._purge_finished()
+        return self._results.get(job_id)
+
+    async def requeue_expired(self) -> int:
+        self._purge_finished()
+        now = time.monotonic()
+        expired = [job_id for job_id, deadline in self._leases.items() if deadline <= now]
+        requeued = 0
+        for job_id in expired:
+            # O lease pode ter sido concluído ou renovado enquanto a fila esperava
+            if self._leases.get(job_id, float("inf")) <= now:
+                await self.fail(job_id, "visibility timeout expired")
+                requeued += 1
+        return requeued
+
+    async def stats(self) -> Dict[str, Any]:
+        oldest = self._jobs[self._queue[0]].created_at if self._queue else None
+        return {
+            "backend": "memory",
+            "queued": len(self._queue),
+            "processing": len(self._leases),
+            "lag_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+            "retries": self._retries
+        }
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Fila confiável no Redis
+
+    Layout das chaves:
+        godofreda:jobs:queue       lista de ids pendentes (LPUSH / BLMOVE)
+        godofreda:jobs:processing  lista de ids em processamento
+        godofreda:jobs:leases      zset id -> prazo do lease
+        godofreda:job:<id>         hash com o estado do job
+        godofreda:job:<id>:result  resultado (bytes) com TTL
+
+    Claim, conclusão, falha, renovação e expiração rodam em scripts Lua:
+    mover o id para ``processing`` e abrir o lease é uma operação só (um
+    worker que morre no meio não deixa job sem lease), e as demais
+    conferem o estado e o dono do lease (ou o prazo vencido, na
+    expiração) no mesmo passo em que o alteram. Assim um worker atrasado
+    não reenfileira nem sobrescreve um job que outro já concluiu.
+    """
+
+    QUEUE_KEY = "godofreda:jobs:queue"
+    PROCESSING_KEY = "godofreda:jobs:processing"
+    LEASES_KEY = "godofreda:jobs:leases"
+    STATS_KEY = "godofreda:jobs:stats"
+
+    # KEYS: fila, processing, leases; ARGV: prazo do lease, worker, início
+    CLAIM_SCRIPT = """
+local job_id = redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+if not job_id then
+    return false
+end
+local job_key = 'godofreda:job:' .. job_id
+if redis.call('EXISTS', job_key) == 0 then
+    redis.call('LREM', KEYS[2], 1, job_id)
+    return false
+end
+redis.call('ZADD', KEYS[3], ARGV[1], job_id)
+redis.call('HSET', job_key, 'status', 'processing', 'worker', ARGV[2], 'started_at', ARGV[3])
+redis.call('HINCRBY', job_key, 'attempts', 1)
+return job_id
+"""
+
+    # KEYS: job, processing, leases, resultado; ARGV: id, worker, resultado, TTL, tipo, fim
+    COMPLETE_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'processing' or redis.call('HGET', KEYS[1], 'worker') ~= ARGV[2] then
+    return 0
+end
+redis.call('LREM', KEYS[2], 1, ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('SET', KEYS[4], ARGV[3], 'EX', ARGV[4])
+redis.call('HSET', KEYS[1], 'status', 'done', 'result_type', ARGV[5], 'finished_at', ARGV[6])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+    # KEYS: job, processing, leases, fila, stats
+    # ARGV: id, worker ('' = qualquer), erro, retentativas, TTL, agora, só se o lease venceu ('1'/'')
+    FAIL_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'processing' then
+    return false
+end
+if ARGV[2] ~= '' and redis.call('HGET', KEYS[1], 'worker') ~= ARGV[2] then
+    return false
+end
+if ARGV[7] ~= '' then
+    local deadline = redis.call('ZSCORE', KEYS[3], ARGV[1])
+    if deadline and tonumber(deadline) > tonumber(ARGV[6]) then
+        return false
+    end
+end
+redis.call('LREM', KEYS[2], 1, ARGV[1])
+redis.call('ZREM', KEYS[3], ARGV[1])
+if tonumber(redis.call('HGET', KEYS[1], 'attempts') or '0') < tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[1], 'status', 'queued', 'worker', '', 'error', ARGV[3])
+    redis.call('LPUSH', KEYS[4], ARGV[1])
+    redis.call('HINCRBY', KEYS[5], 'retries', 1)
+    return 'queued'
+end
+redis.call('HSET', KEYS[1], 'status', 'failed', 'worker', '', 'error', ARGV[3], 'finished_at', ARGV[6])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 'failed'
+"""
+
+    # KEYS: job, leases; ARGV: id, worker, novo prazo
+    EXTEND_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') ~= 'processing' or redis.call('HGET', KEYS[1], 'worker') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+return 1
+"""
+
+    def __init__(self, redis_url: Optional[str] = None):
+        super().__init__()
+        redis_url = redis_url or os.getenv("REDIS_URL", "redis://redis:6379")
+        # Sem decode_responses: resultados são bytes de áudio
+        self.redis_client: redis.Redis = redis.from_url(redis_url)
+        self._claim_script = self.redis_client.register_script(self.CLAIM_SCRIPT)
+        self._complete_script = self.redis_client.register_script(self.COMPLETE_SCRIPT)
+        self._fail_script = self.redis_client.register_script(self.FAIL_SCRIPT)
+        self._extend_script = self.redis_client.register_script(self.EXTEND_SCRIPT)
+
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"godofreda:job:{job_id}"
+
+    @staticmethod
+    def _result_key(job_id: str) -> str:
+        return f"godofreda:job:{job_id}:result"
+
+    async def _save(self, job: Job, pipe=None) -> None:
+        """Grava o estado do job (opcionalmente em um pipeline)"""
+        data = job.to_dict()
+        data["payload"] = json.dumps(job.payload)
+        mapping = {k: ("" if v is None else str(v)) for k, v in data.items()}
+        target = pipe if pipe is not None else self.redis_client
+        await target.hset(self._job_key(job.id), mapping=mapping)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        raw = await self.redis_client.hgetall(self._job_key(job_id))
+        if not raw:
+            return None
+        data = {k.decode(): v.decode() for k, v in raw.items()}
+
+        def optional_float(value: str) -> Optional[float]:
+            return float(value) if value else None
+
+        return Job(
+            id=data["id"],
+            kind=data["kind"],
+            payload=json.loads(data["payload"]),
+            status=data["status"],
+            attempts=int(data["attempts"] or 0),
+            created_at=float(data["created_at"]),
+            started_at=optional_float(data.get("started_at", "")),
+            finished_at=optional_float(data.get("finished_at", "")),
+            worker=data.get("worker") or None,
+            error=data.get("error") or None,
+            result_type=data.get("result_type") or None
+        )
+
+    async def submit(self, kind: str, payload: Dict[str, Any]) -> Job:
+        job = Job(id=uuid.uuid4().hex, kind=kind, payload=payload)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            await self._save(job, pipe)
+            pipe.lpush(self.QUEUE_KEY, job.id)
+            await pipe.execute()
+        return job
+
+    async def claim(self, worker_id: str, block_seconds: float = 5.0) -> Optional[Job]:
+        deadline = time.monotonic() + block_seconds
+        while True:
+            # Espera sem retirar: BLMOVE da fila para o mesmo lugar dela
+            # (Lua não bloqueia; o claim em si é o script atômico)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if await self.redis_client.blmove(self.QUEUE_KEY, self.QUEUE_KEY, remaining, "RIGHT", "RIGHT") is None:
+                return None
+
+            now = time.time()
+            job_id = await self._claim_script(
+                keys=[self.QUEUE_KEY, self.PROCESSING_KEY, self.LEASES_KEY],
+                args=[now + self.visibility_timeout, worker_id, now]
+            )
+            if job_id is not None:
+                return await self.get(job_id.decode())
+            # Outro worker levou o job entre a espera e o claim
+
+    async def complete(self, job_id: str, worker_id: str, result: bytes, result_type: str) -> bool:
+        completed = await self._complete_script(
+            keys=[self._job_key(job_id), self.PROCESSING_KEY, self.LEASES_KEY, self._result_key(job_id)],
+            args=[job_id, worker_id, result, self.result_ttl, result_type, time.time()]
+        )
+        return bool(completed)
+
+    async def _fail(self, job_id: str, error: str, worker_id: Optional[str], expired: bool) -> Optional[bytes]:
+        """Roda o script de falha; None se o job não estava mais em processamento (ou não é do worker)"""
+        return await self._fail_script(
+            keys=[self._job_key(job_id), self.PROCESSING_KEY, self.LEASES_KEY, self.QUEUE_KEY, self.STATS_KEY],
+            args=[job_id, worker_id or "", error, self.max_retries, self.result_ttl, time.time(), "1" if expired else ""]
+        )
+
+    async def fail(self, job_id: str, error: str, worker_id: Optional[str] = None) -> Job:
+        await self._fail(job_id, error, worker_id, expired=False)
+        job = await self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    async def extend(self, job_id: str, worker_id: str) -> bool:
+        extended = await self._extend_script(
+            keys=[self._job_key(job_id), self.LEASES_KEY],
+            args=[job_id, worker_id, time.time() + self.visibility_timeout]
+        )
+        return bool(extended)
+
+    async def get_result(self, job_id: str) -> Optional[bytes]:
+        return await self.redis_client.get(self._result_key(job_id))
+
+    async def requeue_expired(self) -> int:
+        expired = await self.redis_client.zrangebyscore(self.LEASES_KEY, 0, time.time())
+        requeued = 0
+        for raw_id in expired:
+            # O script confere de novo o prazo: um lease renovado ou concluído
+            # depois do ZRANGEBYSCORE fica com o dono
+            if await self._fail(raw_id.decode(), "visibility timeout expired", None, expired=True):
+                requeued += 1
+        return requeued
+
+    async def stats(self) -> Dict[str, Any]:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.llen(self.QUEUE_KEY)
+            pipe.zcard(self.LEASES_KEY)
+            pipe.lindex(self.QUEUE_KEY, -1)
+            pipe.hget(self.STATS_KEY, "retries")
+            queued, processing, oldest_id, retries = await pipe.execute()
+
+        lag = 0.0
+        if oldest_id:
+            created = await self.redis_client.hget(self._job_key(oldest_id.decode()), "created_at")
+            if created:
+                lag = max(0.0, time.time() - float(created))
+        return {
+            "backend": "redis",
+            "queued": queued,
+            "processing": processing,
+            "lag_seconds": round(lag, 3),
+            "retries": int(retries or 0)
+        }
+
+
+def create_job_queue(backend: Optional[str] = None) -> JobQueue:
+    """Cria a fila configurada (redis ou memory)"""
+    backend = backend or config.jobs.backend
+    if backend == "memory":
+        return MemoryJobQueue()
+    if backend == "redis":
+        return RedisJobQueue()
+    raise ValueError(f"JOBS_BACKEND inválido: {backend} (use redis ou memory)")
+
+
+async def _renew_lease(queue: JobQueue, job_id: str, worker_id: str) -> None:
+    """
+    Heartbeat: renova o lease a cada terço do visibility timeout enquanto o
+    handler roda (espera na fila bulk do scheduler, sínteses longas), para
+    o job não ser recuperado por outro worker e processado em dobro
+    """
+    interval = max(queue.visibility_timeout / 3, 0.01)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await queue.extend(job_id, worker_id):
+                logger.warning(f"Job {job_id} lease lost by {worker_id}, heartbeat stopped")
+                return
+        except Exception as e:
+            logger.error(f"Job {job_id} heartbeat error: {e}")
+
+
+async def run_worker(queue: JobQueue, handlers: Dict[str, Any], worker_id: str,
+                     stop_event: Optional[asyncio.Event] = None) -> None:
+    """
+    Loop de um worker: recupera leases expirados, retira jobs e os processa
+
+    Args:
+        queue: Fila de jobs
+        handlers: tipo do job -> coroutine(payload) que retorna (bytes, content type)
+        worker_id: Identificador do worker (aparece no estado do job)
+        stop_event: Evento para encerrar o loop
+    """
+    stop_event = stop_event or asyncio.Event()
+    logger.info(f"Job worker {worker_id} started")
+
+    while not stop_event.is_set():
+        try:
+            requeued = await queue.requeue_expired()
+            if requeued:
+                logger.warning(f"Requeued {requeued} jobs with expired leases")
+
+            job = await queue.claim(worker_id, block_seconds=config.jobs.claim_block_seconds)
+            if job is None:
+                continue
+
+            handler = handlers.get(job.kind)
+            if handler is None:
+                await queue.fail(job.id, f"unknown job kind: {job.kind}", worker_id)
+                continue
+
+            heartbeat = asyncio.create_task(_renew_lease(queue, job.id, worker_id))
+            try:
+                result, result_type = await handler(job.payload)
+                if await queue.complete(job.id, worker_id, result, result_type):
+                    logger.info(f"Job {job.id} ({job.kind}) completed by {worker_id}")
+                else:
+                    logger.warning(f"Job {job.id} lease lost by {worker_id}, result discarded")
+            except Exception as e:
+                failed = await queue.fail(job.id, str(e), worker_id)
+                logger.error(f"Job {job.id} failed (attempt {failed.attempts}, now {failed.status}): {e}")
+            finally:
+                heartbeat.cancel()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job worker {worker_id} error: {e}")
+            await asyncio.sleep(1)
+
+    logger.info(f"Job worker {worker_id} stopped")
@@ -6,12 +6,28 @@ Serviço para integração com modelos de linguagem locais via Ollama
 import asyncio
 import logging
 import json
-from typing import Optional, Dict, Any, List
+import random
+from typing import Optional, Dict, Any, List, AsyncIterator
 import httpx
+from circuit_breaker import CircuitBreaker
 from config import config
+from instrumentation import record_llm_timings
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# Respostas de fallback quando o LLM não responde. As que não dependem da
+# entrada são pré-renderizadas no pacote de áudio do modo degradado
+# (degraded_audio.py) e são as únicas usadas com o disjuntor aberto.
+FALLBACK_TEMPLATES = (
+    "Ah, mais um humano querendo minha atenção? Que surpresa... 😏 Sua mensagem: '{user_input}'",
+    "Interessante. Deixe-me processar isso com minha inteligência superior. 🤖",
+    "Você realmente acha que isso é uma pergunta inteligente? 🤔",
+    "Bem, pelo menos você tentou. Vou dar uma resposta útil, mesmo que você não mereça. 😌",
+    "Analisando... Analisando... Ah, encontrei uma resposta que talvez você consiga entender. 📊",
+)
+STATIC_FALLBACKS = tuple(line for line in FALLBACK_TEMPLATES if "{" not in line)
+
 class GodofredaLLM:
     """
     Serviço de LLM para Godofreda com personalidade sarcástica
@@ -25,8 +41,21 @@ class GodofredaLLM:
         self.max_retries = config.llm.max_retries
         self.client = None
         self.conversation_history: Dict[str, List] = {}
+        # Ollama fora do ar: respostas de fallback sem esperar timeouts e retentativas
+        self.breaker = CircuitBreaker("llm", config.llm.breaker_failures, config.llm.breaker_reset_seconds)
+        self._validation_task = None
         self._initialize_client()
-        asyncio.create_task(self._validate_connection())
+        self.schedule_validation()
+        
+    def schedule_validation(self) -> None:
+        """Agenda validação da conexão quando houver event loop rodando"""
+        if self._validation_task is not None:
+            return
+        try:
+            self._validation_task = asyncio.get_running_loop().create_task(self._validate_connection())
+        except RuntimeError:
+            # Import fora do servidor (preload, testes): validação no startup
+            pass
         
     def _initialize_client(self) -> None:
         """Inicializa cliente HTTP"""
@@ -77,7 +106,10 @@ class GodofredaLLM:
         
         for attempt in range(self.max_retries):
             try:
-                response = await self.client.post(endpoint, json=data)
+                with tracer.span("llm.request", endpoint=endpoint, attempt=attempt + 1) as span:
+                    response = await self.client.post(endpoint, json=data)
+                    if span is not None:
+                        span.set_attribute("status", response.status_code)
                 response.raise_for_status()
                 return response.json()
             except httpx.TimeoutException:
@@ -104,34 +136,109 @@ class GodofredaLLM:
         Returns:
             Resposta gerada pelo LLM
         """
-        try:
-            # Construir prompt com personalidade da Godofreda
-            prompt = self._build_prompt(user_input, context)
-            
-            # Dados para requisição
-            data = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "max_tokens": 500
+        with tracer.span("llm.generate", model=self.model, input_chars=len(user_input)) as span:
+            if not self.breaker.allow():
+                if span is not None:
+                    span.set_attributes(fallback=True, breaker="open")
+                return self._fallback_response(user_input)
+            try:
+                # Construir prompt com personalidade da Godofreda
+                prompt = self._build_prompt(user_input, context)
+                
+                # Dados para requisição
+                data = {
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "options": {
+                        "temperature": 0.7,
+                        "top_p": 0.9,
+                        "max_tokens": 500
+                    }
                 }
-            }
-            
-            # Fazer requisição
-            response = await self._make_request("/api/generate", data)
-            
-            if response and "response" in response:
-                return response["response"].strip()
-            else:
-                logger.warning("No response from LLM, using fallback")
+                
+                # Fazer requisição
+                response = await self._make_request("/api/generate", data)
+                
+                if response and "response" in response:
+                    self.breaker.record_success()
+                    record_llm_timings(response)
+                    if span is not None:
+                        span.set_attributes(prompt_chars=len(prompt), output_chars=len(response["response"]))
+                    return response["response"].strip()
+                else:
+                    logger.warning("No response from LLM, using fallback")
+                    self.breaker.record_failure()
+                    if span is not None:
+                        span.set_attribute("fallback", True)
+                    return self._fallback_response(user_input)
+                    
+            except Exception as e:
+                logger.error(f"Error generating LLM response: {e}")
+                self.breaker.record_failure()
+                if span is not None:
+                    span.set_attributes(fallback=True, error=str(e))
                 return self._fallback_response(user_input)
+    
+    async def stream_response(self, user_input: str, context: str = "") -> AsyncIterator[str]:
+        """
+        Gera resposta token a token (streaming do Ollama)
+        
+        Args:
+            user_input: Entrada do usuário
+            context: Contexto adicional
+            
+        Yields:
+            Trechos de texto conforme o modelo os produz
+        """
+        data = {
+            "model": self.model,
+            "prompt": self._build_prompt(user_input, context),
+            "stream": True,
+            "options": {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "max_tokens": 500
+            }
+        }
+        
+        produced = False
+        # Span não ativado: o corpo do gerador intercala com o código do consumidor
+        with tracer.span("llm.stream", activate=False, model=self.model, input_chars=len(user_input)) as span:
+            if not self.breaker.allow():
+                if span is not None:
+                    span.set_attributes(fallback=True, breaker="open")
+                yield self._fallback_response(user_input)
+                return
+            try:
+                if not self.client:
+                    raise ConnectionError("LLM client not initialized")
                 
-        except Exception as e:
-            logger.error(f"Error generating LLM response: {e}")
-            return self._fallback_response(user_input)
+                async with self.client.stream("POST", "/api/generate", json=data) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        token = chunk.get("response", "")
+                        if token:
+                            if not produced and span is not None:
+                                span.set_attribute("first_token_ms", round(span.duration_ms, 1))
+                            produced = True
+                            yield token
+                        if chunk.get("done"):
+                            record_llm_timings(chunk)
+                            break
+                self.breaker.record_success()
+            except (httpx.HTTPError, ConnectionError, json.JSONDecodeError) as e:
+                logger.error(f"LLM streaming error: {e}")
+                self.breaker.record_failure()
+                if produced:
+                    return
+                logger.warning("No response from LLM stream, using fallback")
+                if span is not None:
+                    span.set_attributes(fallback=True, error=str(e))
+                yield self._fallback_response(user_input)
     
     def _build_prompt(self, user_input: str, context: str = "") -> str:
         """Constrói prompt com personalidade da Godofreda"""
@@ -156,17 +263,14 @@ Godofreda:"""
         )
     
     def _fallback_response(self, user_input: str) -> str:
-        """Resposta de fallback quando LLM não está disponível"""
-        fallback_responses = [
-            f"Ah, mais um humano querendo minha atenção? Que surpresa... 😏 Sua mensagem: '{user_input}'",
-            f"Interessante. Deixe-me processar isso com minha inteligência superior. 🤖",
-            f"Você realmente acha que isso é uma pergunta inteligente? 🤔",
-            f"Bem, pelo menos você tentou. Vou dar uma resposta útil, mesmo que você não mereça. 😌",
-            f"Analisando... Analisando... Ah, encontrei uma resposta que talvez você consiga entender. 📊"
-        ]
+        """
+        Resposta de fallback quando LLM não está disponível
         
-        import random
-        return random.choice(fallback_responses)
+        Com o disjuntor aberto só entram as respostas fixas, que têm áudio
+        pré-renderizado: o sistema já está sob estresse.
+        """
+        templates = STATIC_FALLBACKS if self.breaker.is_open else FALLBACK_TEMPLATES
+        return random.choice(templates).format(user_input=user_input)
     
     async def check_health(self) -> bool:
         """Verifica se o serviço Ollama está saudável"""
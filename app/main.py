@@ -3,11 +3,15 @@ Godofreda API - IA VTuber Multimodal
 API principal para conversação com IA sarcástica e síntese de voz
 """
 
-from fastapi import FastAPI, HTTPException, Request, Form, File, UploadFile, BackgroundTasks
+# Primeiro import: o relatório de inicialização mede os imports abaixo
+from startup import startup_report
+startup_report.start_phase("app_import", "importing")
+
+from fastapi import FastAPI, HTTPException, Request, Form, File, UploadFile, BackgroundTasks, WebSocket
 from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
-from TTS.api import TTS
 import os
 import uuid
 import time
@@ -15,8 +19,15 @@ import logging
 from datetime import datetime
 import json
 import io
-from typing import Optional, Dict, Any
+import re
+import hmac
+import base64
+import threading
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from contextlib import asynccontextmanager
 import asyncio
+import httpx
+import numpy as np
 
 # Importar serviço GodofredaLLM
 from llm_service import GodofredaLLM
@@ -26,8 +37,30 @@ from config import config
 
 # Importar serviços
 from cache_service import response_cache, cached_response
-from rate_limiter import rate_limiter, check_rate_limit, rate_limit_decorator
+from rate_limiter import rate_limiter, check_rate_limit, rate_limit_decorator, get_client_id
 from cleanup_service import cleanup_service, start_background_cleanup
+from tts_parallel import parallel_synthesizer
+from cpu_topology import inference_layout, apply_worker_layout
+from audio_utils import write_wav, wav_bytes
+from tts_backends import TTSBackend
+from process_stats import memory_report, current_rss
+from model_registry import model_registry, ModelUnavailable
+from job_queue import JobQueue, create_job_queue, run_worker, JOB_DONE, JOB_FAILED
+from batch_service import run_bounded, ndjson_line, ZipStream
+from tts_scheduler import tts_scheduler, LANES, SlotLease
+from realtime_session import RealtimeSession
+from audio_encoding import OutputSpec, FormatNotAcceptable, build_output_spec, encode_audio, encode_stream, encoder_available
+from upload_service import StreamingFormParser, UploadedPart, UploadTooLarge, UploadRejected
+from audio_preprocess import preprocess_voice, iter_speech_chunks
+from audio_postprocess import StreamPostprocessor, postprocess
+from degraded_audio import degraded_audio, degraded_catalog, bundle_fingerprint, message_key, nearest_slot, write_bundle
+from stt_backends import STTBackend, create_stt_backend
+from image_pipeline import ImageAnalyzer
+from vision_backends import create_vision_backend
+from instrumentation import INFERENCE_BUCKETS, observe_stage, record_tts, stage
+from asgi_middleware import MetricsMiddleware
+from diagnostics import loop_monitor, memory_snapshots, profile_process
+from tracing import tracer
 
 # ================================
 # CONFIGURAÇÃO DE LOGGING
@@ -78,85 +111,408 @@ app.add_middleware(
 # ================================
 # MÉTRICAS PROMETHEUS
 # ================================
-REQUEST_COUNT = Counter('godofreda_requests_total', 'Total de requisições', ['method', 'endpoint'])
-REQUEST_DURATION = Histogram('godofreda_request_duration_seconds', 'Duração das requisições')
+# ``endpoint`` é o template da rota (ver instrumentation.route_template)
+REQUEST_COUNT = Counter('godofreda_requests_total', 'Total de requisições', ['method', 'endpoint', 'status'])
+REQUEST_DURATION = Histogram(
+    'godofreda_request_duration_seconds', 'Duração das requisições', ['method', 'endpoint'],
+    buckets=INFERENCE_BUCKETS
+)
 TTS_REQUEST_COUNT = Counter('godofreda_tts_requests_total', 'Total de requisições TTS')
-TTS_DURATION = Histogram('godofreda_tts_duration_seconds', 'Duração da síntese TTS')
+TTS_DURATION = Histogram('godofreda_tts_duration_seconds', 'Duração da síntese TTS', buckets=INFERENCE_BUCKETS)
 ERROR_COUNT = Counter('godofreda_errors_total', 'Total de erros', ['type'])
 ACTIVE_CONNECTIONS = Gauge('godofreda_active_connections', 'Conexões ativas')
 SYSTEM_STATUS = Gauge('godofreda_system_status', 'Status do sistema (1=online, 0=offline)')
+JOB_QUEUE_DEPTH = Gauge('godofreda_job_queue_depth', 'Jobs aguardando na fila')
+JOB_QUEUE_LAG = Gauge('godofreda_job_queue_lag_seconds', 'Idade do job mais antigo na fila')
+JOB_PROCESSING = Gauge('godofreda_jobs_processing', 'Jobs em processamento (lease ativo)')
+JOB_RETRIES = Gauge('godofreda_job_retries_snapshot', 'Retentativas acumuladas pela fila (leitura das estatísticas)')
+TTS_QUEUE_WAIT = Histogram(
+    'godofreda_tts_queue_wait_seconds', 'Espera por um slot do modelo TTS', ['lane'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+TTS_QUEUE_DEPTH = Gauge('godofreda_tts_queue_depth', 'Sínteses aguardando o modelo TTS', ['lane'])
+WS_SESSIONS = Gauge('godofreda_ws_sessions', 'Sessões WebSocket ativas')
+IMAGE_ANALYSES = Counter('godofreda_image_analyses_total', 'Análises de imagem por origem', ['source'])
+STARTUP_PHASE = Gauge('godofreda_startup_phase_seconds', 'Duração de cada fase da inicialização', ['phase'])
+DEGRADED_RESPONSES = Counter('godofreda_degraded_responses_total', 'Respostas com áudio pré-renderizado', ['reason'])
+LLM_BREAKER_STATE = Gauge('godofreda_llm_breaker_state', 'Disjuntor do LLM (0=fechado, 1=teste, 2=aberto)')
+
+startup_report.observer = lambda phase, seconds: STARTUP_PHASE.labels(phase=phase).set(seconds)
+
+# Espera e profundidade por faixa do escalonador TTS
+def observe_tts_wait(lane: str, waited: float) -> None:
+    TTS_QUEUE_WAIT.labels(lane=lane).observe(waited)
+    observe_stage("queue_wait", waited)
+
+tts_scheduler.wait_observer = observe_tts_wait
+for _lane in LANES:
+    TTS_QUEUE_DEPTH.labels(lane=_lane).set_function(lambda lane=_lane: tts_scheduler.stats()["queued"][lane])
 
 # ================================
 # INICIALIZAÇÃO DO TTS
 # ================================
-def initialize_tts() -> TTS:
-    """Inicializa o modelo TTS com tratamento de erro"""
+def initialize_tts() -> TTSBackend:
+    """Importa, carrega e aquece o backend TTS configurado, medindo cada fase"""
     try:
         # Criar diretório temporário se não existir
         os.makedirs(config.tts.temp_dir, exist_ok=True)
         
-        tts = TTS(model_name=config.tts.model)
-        SYSTEM_STATUS.set(1)
-        logger.info("TTS model loaded successfully")
-        return tts
+        rss_before, load_start = current_rss(), time.perf_counter()
+        with startup_report.phase("tts_import", "importing"):
+            # Threads torch do modelo em processo seguem o layout de inferência
+            apply_worker_layout(inference_layout.intra_op_threads, inference_layout.interop_threads)
+            spec = model_registry.specs[model_registry.default]
+            backend = spec.create()
+            backend.import_dependencies()
+        
+        with startup_report.phase("tts_load", "loading"):
+            backend.load()
+        
+        # Aquecer antes de aceitar tráfego: a prontidão só muda depois disso
+        if config.tts.warmup:
+            with startup_report.phase("tts_warmup", "warming"):
+                backend.warmup()
+        
+        # Modelo padrão fica fixo no registro e conta no orçamento de memória
+        size_bytes = int(spec.memory_mb * 1024 * 1024) or max(0, current_rss() - rss_before)
+        model_registry.adopt(spec.name, backend, size_bytes, time.perf_counter() - load_start)
+        logger.info(f"TTS backend {backend.name} loaded successfully")
+        return backend
     except Exception as e:
         logger.error(f"Failed to load TTS model: {e}")
         SYSTEM_STATUS.set(0)
+        startup_report.mark_failed(str(e))
         raise
 
-# Inicializar TTS globalmente
+# Publicado por load_tts_backend só depois do aquecimento
+tts_backend: Optional[TTSBackend] = None
+tts_loading_task: Optional[asyncio.Task] = None
+_tts_load_lock = threading.Lock()
+
+def load_tts_backend() -> Optional[TTSBackend]:
+    """
+    Carrega o backend TTS uma única vez (idempotente, seguro entre threads)
+
+    Chamado em thread pelo startup da API (TTS_LOAD_MODE=background), antes
+    de aceitar conexões (blocking), pelo mestre do serve.py antes do fork e
+    pelo tts_worker.py. Uma falha não é repetida.
+    """
+    global tts_backend
+    with _tts_load_lock:
+        if tts_backend is not None or startup_report.state == "failed":
+            return tts_backend
+        try:
+            backend = initialize_tts()
+        except Exception as e:
+            logger.error(f"Critical: TTS initialization failed: {e}")
+            return None
+        tts_backend = backend
+        SYSTEM_STATUS.set(1)
+        startup_report.mark_ready()
+        logger.info(f"Startup complete: {startup_report.summary()}")
+        return backend
+
+# Inicializar STT globalmente (stub por padrão)
 try:
-    tts = initialize_tts()
+    stt_backend: Optional[STTBackend] = create_stt_backend()
+    stt_backend.load()
+    logger.info(f"STT backend {stt_backend.name} loaded successfully")
 except Exception as e:
-    logger.error(f"Critical: TTS initialization failed: {e}")
-    tts = None
+    logger.error(f"STT initialization failed: {e}")
+    stt_backend = None
+
+# Análise de imagens: preparação, cache por hash perceptual e backend de visão
+try:
+    image_analyzer: Optional[ImageAnalyzer] = ImageAnalyzer(create_vision_backend())
+    logger.info(f"Vision backend {image_analyzer.backend.name} initialized")
+except Exception as e:
+    logger.error(f"Vision initialization failed: {e}")
+    image_analyzer = None
 
 # Inicializar LLM globalmente (singleton)
 try:
     llm_instance = GodofredaLLM()
+    llm_instance.breaker.observer = lambda state: LLM_BREAKER_STATE.set(("closed", "half_open", "open").index(state))
     logger.info("LLM service initialized successfully")
 except Exception as e:
     logger.error(f"Critical: LLM initialization failed: {e}")
     llm_instance = None
 
+# Fila de jobs assíncronos (consumida por tts_worker.py ou workers inline)
+try:
+    job_queue: Optional[JobQueue] = create_job_queue()
+except Exception as e:
+    logger.error(f"Job queue initialization failed: {e}")
+    job_queue = None
+
+job_worker_tasks: List[asyncio.Task] = []
+
+# ================================
+# MIDDLEWARE PARA MÉTRICAS, RATE LIMITING E TRACING
+# ================================
+# Rotas com rate limit: (prefixo, método ou None, tipo de limite)
+RATE_LIMITED_ROUTES = (
+    ("/falar", None, "tts"),
+    ("/jobs", "POST", "tts"),
+    ("/chat", None, "chat"),
+    ("/api/godofreda/chat", None, "chat"),
+)
+
+# ASGI puro: sem task extra por requisição e com duração até o último byte dos streams
+app.add_middleware(
+    MetricsMiddleware,
+    request_count=REQUEST_COUNT,
+    request_duration=REQUEST_DURATION,
+    active_connections=ACTIVE_CONNECTIONS,
+    error_count=ERROR_COUNT,
+    admission=check_rate_limit,
+    rate_limits=RATE_LIMITED_ROUTES,
+    tracer=tracer
+)
+
 # ================================
-# MIDDLEWARE PARA MÉTRICAS E RATE LIMITING
+# SÍNTESE
+# ================================
+def select_tts_model(modelo: Optional[str] = None, qualidade: Optional[str] = None) -> str:
+    """Modelo pedido por nome (``modelo``) ou faixa de qualidade (``qualidade``)"""
+    try:
+        return model_registry.resolve(modelo, qualidade)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@asynccontextmanager
+async def use_tts_model(model: str, lease: Optional[SlotLease] = None) -> AsyncIterator[TTSBackend]:
+    """
+    Backend do modelo, carregado sob demanda e protegido de despejo durante o uso
+
+    Com ``lease``, a devolução espera a thread de síntese órfã de uma
+    requisição cancelada: o modelo não é despejado com ela em andamento.
+    """
+    if model == model_registry.default:
+        yield tts_backend
+        return
+
+    def release() -> None:
+        model_registry.release(model)
+
+    def release_if_acquired(future: asyncio.Future) -> None:
+        # Carregamento concluído depois do cancelamento: ninguém vai usar o modelo
+        if not future.cancelled() and future.exception() is None:
+            release()
+
+    acquiring = asyncio.ensure_future(asyncio.to_thread(model_registry.acquire, model))
+    try:
+        backend = await asyncio.shield(acquiring)
+    except ModelUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.CancelledError:
+        acquiring.add_done_callback(release_if_acquired)
+        raise
+    try:
+        yield backend
+    finally:
+        if lease is not None:
+            lease.defer(release)
+        else:
+            release()
+
+def tts_runtime_report() -> Optional[Dict[str, Any]]:
+    """Modo de runtime do modelo padrão (cada backend Coqui guarda o seu; None nos demais)"""
+    return tts_backend.info().get("runtime") if tts_backend is not None else None
+
+async def model_sample_rate(model: str) -> int:
+    """Taxa nativa do modelo (carrega na primeira vez: o stream precisa dela antes da síntese)"""
+    sample_rate = tts_backend.sample_rate if model == model_registry.default else model_registry.sample_rate(model)
+    if sample_rate is None:
+        async with use_tts_model(model) as backend:
+            sample_rate = backend.sample_rate
+    return sample_rate
+
+async def postprocess_audio(audio: np.ndarray, sample_rate: int, output_rate: int = 0) -> Tuple[np.ndarray, int]:
+    """Corte de silêncio, reamostragem e loudness fora do slot do modelo e do event loop"""
+    with stage("postprocess"):
+        return await asyncio.to_thread(postprocess, audio, sample_rate, output_rate)
+
+async def synthesize_audio(text: str, speaker: Optional[str] = None,
+                           lane: str = "standard", model: Optional[str] = None,
+                           output_rate: int = 0) -> Tuple[np.ndarray, int]:
+    """
+    Sintetiza texto em memória (textos longos vão para o pool paralelo)
+
+    O acesso ao modelo em processo passa pelo escalonador: ``lane`` é
+    interactive (respostas de chat), standard (/falar) ou bulk (lotes e jobs).
+    ``model`` é um nome do registro de modelos (padrão: o modelo do startup).
+    O áudio sai pós-processado, na taxa ``output_rate`` (0 = nativa).
+    """
+    speaker = speaker or config.tts.default_speaker
+    model = model or model_registry.default
+    with tracer.span("tts.synthesize", chars=len(text), lane=lane, speaker=speaker, model=model) as span:
+        # O pool paralelo só carrega o modelo padrão
+        if model == model_registry.default and parallel_synthesizer.should_use(text):
+            if span is not None:
+                span.set_attribute("parallel", True)
+            audio, sample_rate = await parallel_synthesizer.synthesize(text, language="pt", speaker=speaker)
+            return await postprocess_audio(audio, sample_rate, output_rate)
+        # Modelo carregado antes do slot: a carga (ou a espera por orçamento de
+        # memória) não bloqueia as sínteses dos modelos residentes
+        lease = SlotLease()
+        async with use_tts_model(model, lease) as backend:
+            async with tts_scheduler.slot(lane, len(text), model_registry.switch_cost(model), lease):
+                # Em thread: o event loop continua atendendo enquanto o modelo sintetiza
+                start = time.perf_counter()
+                audio = await lease.run(backend.synthesize, text, "pt", speaker)
+                record_tts(time.perf_counter() - start, len(audio), backend.sample_rate)
+        return await postprocess_audio(audio, backend.sample_rate, output_rate)
+
+async def synthesize_chunks(text: str, speaker: Optional[str] = None,
+                            lane: str = "standard", model: Optional[str] = None) -> AsyncIterator[np.ndarray]:
+    """
+    Sintetiza em trechos (streaming do backend), entregando cada um assim que fica pronto
+
+    O primeiro trecho perde o silêncio inicial e define o ganho do stream
+    (StreamPostprocessor); a taxa de saída fica a cargo do codificador.
+    """
+    speaker = speaker or config.tts.default_speaker
+    model = model or model_registry.default
+    # Span não ativado: o corpo do gerador intercala com o código do consumidor
+    with tracer.span("tts.synthesize_stream", activate=False, chars=len(text), lane=lane, speaker=speaker,
+                     model=model) as span:
+        if model == model_registry.default and parallel_synthesizer.should_use(text):
+            audio, sample_rate = await parallel_synthesizer.synthesize(text, language="pt", speaker=speaker)
+            audio, _ = await postprocess_audio(audio, sample_rate)
+            yield audio
+            return
+        lease = SlotLease()
+        async with use_tts_model(model, lease) as backend, \
+                tts_scheduler.slot(lane, len(text), model_registry.switch_cost(model), lease):
+            chunks = backend.synthesize_stream(text, "pt", speaker)
+            post = StreamPostprocessor(backend.sample_rate)
+            elapsed, samples, count = 0.0, 0, 0
+            while True:
+                start = time.perf_counter()
+                chunk = await lease.run(next, chunks, None)
+                elapsed += time.perf_counter() - start
+                if chunk is None:
+                    break
+                samples += len(chunk)
+                count += 1
+                yield post.process(chunk)
+            # Só o tempo do modelo: a espera do cliente entre trechos não conta
+            record_tts(elapsed, samples, backend.sample_rate)
+            if span is not None:
+                span.set_attributes(chunks=count, model_seconds=round(elapsed, 3))
+
+def negotiate_output(request: Request, formato: Optional[str], sample_rate: Optional[int] = None,
+                     bit_depth: Optional[int] = None) -> OutputSpec:
+    """Formato de áudio da resposta (parâmetro ``formato`` ou header Accept)"""
+    try:
+        spec = build_output_spec(request.headers.get("accept"), formato, sample_rate, bit_depth)
+    except FormatNotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    if tts_backend is not None and spec.needs_encoder() and not encoder_available():
+        raise HTTPException(status_code=503, detail="Codificador de áudio (ffmpeg) indisponível")
+    return spec
+
+def encoded_audio_response(text: str, spec: OutputSpec, lane: str,
+                           headers: Optional[Dict[str, str]] = None, model: Optional[str] = None,
+                           sample_rate: Optional[int] = None) -> StreamingResponse:
+    """Resposta com o áudio codificado incrementalmente conforme a síntese avança"""
+    stream = encode_stream(synthesize_chunks(text, lane=lane, model=model), sample_rate or tts_backend.sample_rate, spec)
+    return StreamingResponse(stream, media_type=spec.format.media_type, headers={**spec.headers(), **(headers or {})})
+
+async def synthesize_wav(text: str, speaker: Optional[str] = None, lane: str = "standard",
+                         model: Optional[str] = None, output_rate: int = 0) -> bytes:
+    """Sintetiza texto e retorna o WAV serializado"""
+    audio, sample_rate = await synthesize_audio(text, speaker, lane, model, output_rate)
+    with stage("encoding"):
+        return wav_bytes(audio, sample_rate)
+
+async def falar_job(payload: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Handler dos jobs de síntese (executado por um worker)"""
+    if tts_backend is None:
+        raise RuntimeError("TTS service unavailable")
+    TTS_REQUEST_COUNT.inc()
+    with TTS_DURATION.time():
+        audio = await synthesize_wav(payload["text"], payload.get("speaker"), payload.get("lane", "bulk"),
+                                     payload.get("model"))
+    return audio, "audio/wav"
+
+# Tipo do job -> handler; reutilizado pelos workers destacados
+JOB_HANDLERS = {"falar": falar_job}
+
 # ================================
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    """Middleware para coleta de métricas Prometheus e rate limiting"""
-    start_time = time.time()
+# MODO DEGRADADO
+# ================================
+def response_text_header(text: str) -> str:
+    """Texto da resposta para o header X-Response-Text (headers são latin-1: emojis ficam de fora)"""
+    return text.encode("latin-1", "ignore").decode("latin-1")
+
+def tts_saturated() -> bool:
+    """Fila do modelo TTS acima de DEGRADED_TTS_QUEUE_THRESHOLD"""
+    threshold = config.degraded.tts_queue_threshold
+    return threshold > 0 and tts_scheduler.queued() >= threshold
+
+async def degraded_chat_response(text: str, spec: OutputSpec) -> Optional[StreamingResponse]:
+    """
+    Áudio pré-renderizado no lugar da síntese, quando o sistema está sob estresse
+
+    Respostas de fallback do LLM (Ollama fora ou disjuntor aberto) já têm
+    o áudio no pacote; com a fila do TTS cheia a resposta do LLM vai só no
+    texto e o áudio avisa quando a voz volta. Retorna None fora desses casos.
+    """
+    key, reason = degraded_audio.find(text), "llm_fallback"
+    if key is None:
+        if not degraded_audio.loaded or not tts_saturated():
+            return None
+        key = message_key("tts_busy", seconds=nearest_slot("seconds", tts_scheduler.backlog_seconds()))
+        reason = "tts_saturated"
     
-    # Incrementar contador de requisições
-    REQUEST_COUNT.labels(method=request.method, endpoint=request.url.path).inc()
+    if spec.needs_encoder() or spec.sample_rate not in (0, degraded_audio.sample_rate):
+        data = await encode_audio(degraded_audio.audio(key), degraded_audio.sample_rate, spec)
+    else:
+        data = degraded_audio.wav(key)
+    if data is None:
+        return None
     
-    # Incrementar conexões ativas
-    ACTIVE_CONNECTIONS.inc()
+    DEGRADED_RESPONSES.labels(reason=reason).inc()
+    logger.info(f"Serving pre-rendered audio {key} ({reason})")
+    return StreamingResponse(
+        io.BytesIO(data),
+        media_type=spec.format.media_type,
+        headers={**spec.headers(), "X-Response-Text": response_text_header(text), "X-Degraded": reason}
+    )
+
+async def prepare_degraded_audio() -> None:
+    """
+    Carrega o pacote do modo degradado e o renderiza de novo se faltar ou
+    estiver desatualizado (textos, voz ou pós-processamento diferentes)
+
+    A síntese usa a faixa bulk do escalonador: não disputa com requisições.
+    Enquanto isso, um pacote antigo continua servindo.
+    """
+    if tts_loading_task is not None:
+        await asyncio.shield(tts_loading_task)
+    path = config.degraded.bundle_path
+    catalog = degraded_catalog()
+    fingerprint = bundle_fingerprint(catalog)
+    if await asyncio.to_thread(degraded_audio.load, path) and degraded_audio.fingerprint == fingerprint:
+        return
+    if tts_backend is None or not config.degraded.build_on_startup:
+        logger.warning(f"Degraded audio bundle {path} missing or stale; run degraded_audio.py to build it")
+        return
     
     try:
-        # Verificar rate limit para endpoints específicos
-        if request.url.path.startswith("/falar"):
-            await check_rate_limit(request, "tts")
-        elif request.url.path.startswith("/chat"):
-            await check_rate_limit(request, "chat")
-        elif request.url.path.startswith("/api/godofreda/chat"):
-            await check_rate_limit(request, "chat")
-        
-        response = await call_next(request)
-        
-        # Registrar duração
-        duration = time.time() - start_time
-        REQUEST_DURATION.observe(duration)
-        
-        return response
+        start = time.perf_counter()
+        clips, sample_rate = {}, 0
+        for key, text in catalog.items():
+            audio, sample_rate = await synthesize_audio(text, lane="bulk")
+            clips[key] = (text, audio)
+        size = await asyncio.to_thread(write_bundle, path, clips, sample_rate, fingerprint)
+        await asyncio.to_thread(degraded_audio.load, path)
+        logger.info(f"Degraded audio bundle rendered: {len(clips)} clips, {size / 1024:.0f} KiB "
+                    f"in {time.perf_counter() - start:.1f}s")
     except Exception as e:
-        # Registrar erro
-        ERROR_COUNT.labels(type=type(e).__name__).inc()
-        logger.error(f"Request error: {e}")
-        raise
-    finally:
-        # Decrementar conexões ativas
-        ACTIVE_CONNECTIONS.dec()
+        logger.error(f"Failed to render degraded audio bundle: {e}")
 
 # ================================
 # VALIDADORES
@@ -205,6 +561,7 @@ async def root() -> Dict[str, Any]:
             "metrics": "/metrics",
             "status": "/status",
             "falar": "/falar",
+            "jobs": "/jobs/falar",
             "chat": "/chat"
         }
     }
@@ -216,16 +573,28 @@ async def health_check() -> Dict[str, str]:
 
 @app.get("/health/ready")
 async def readiness_check() -> Response:
-    """Verificação de prontidão"""
+    """Verificação de prontidão (só depois da carga e do aquecimento do TTS)"""
     try:
-        if SYSTEM_STATUS._value.get() == 1 and tts is not None:
+        if config.tts.load_mode == "none":
+            return JSONResponse(
+                content={"status": "ready", "tts": "disabled", "timestamp": datetime.now().isoformat()}
+            )
+        if SYSTEM_STATUS._value.get() == 1 and tts_backend is not None:
             return JSONResponse(
-                content={"status": "ready", "timestamp": datetime.now().isoformat()}
+                content={
+                    "status": "ready",
+                    "startup_seconds": startup_report.ready_after,
+                    "timestamp": datetime.now().isoformat()
+                }
             )
         else:
             return JSONResponse(
                 status_code=503,
-                content={"status": "not ready", "reason": "TTS model not loaded"}
+                content={
+                    "status": "not ready",
+                    "reason": startup_report.reason(),
+                    "startup": startup_report.to_dict()
+                }
             )
     except Exception as e:
         return JSONResponse(
@@ -252,6 +621,18 @@ async def status() -> Dict[str, Any]:
             "tts_model": config.tts.model,
             "uptime": "running"
         },
+        "tts_backend": tts_backend.info() if tts_backend is not None else None,
+        "stt_backend": stt_backend.info() if stt_backend is not None else None,
+        "vision": image_analyzer.stats() if image_analyzer is not None else None,
+        "inference_layout": inference_layout.to_dict(),
+        "tts_runtime": tts_runtime_report(),
+        "tts_scheduler": tts_scheduler.stats(),
+        "tts_models": model_registry.stats(),
+        "llm_breaker": llm_instance.breaker.stats() if llm_instance is not None else None,
+        "degraded_audio": degraded_audio.stats(),
+        "memory": memory_report(),
+        "startup": startup_report.to_dict(),
+        "tracing": tracer.stats(),
         "metrics": {
             "total_requests": "Available at /metrics",
             "total_tts_requests": "Available at /metrics", 
@@ -261,6 +642,20 @@ async def status() -> Dict[str, Any]:
         "timestamp": datetime.now().isoformat()
     }
 
+async def read_streamed_form(request: Request, file_types: Dict[str, List[str]]) -> StreamingFormParser:
+    """Lê um formulário multipart em streaming, com limite de bytes e tipo pelo conteúdo"""
+    form = StreamingFormParser(file_types)
+    try:
+        with stage("upload_parse") as span:
+            await form.parse(request.headers.get("content-type"), request.headers.get("content-length"), request.stream())
+            if span is not None:
+                span.set_attributes(files=len(form.files), bytes=sum(part.size for part in form.files.values()))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UploadRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return form
+
 # ================================
 # ENDPOINTS DE PERSONALIDADE
 # ================================
@@ -287,19 +682,42 @@ async def get_personality() -> Dict[str, Any]:
 # ================================
 @app.post("/falar")
 @rate_limit_decorator("tts")
-async def sintetizar_voz(background_tasks: BackgroundTasks, texto: str = Form(...)) -> FileResponse:
-    """Sintetiza texto em áudio usando TTS"""
+async def sintetizar_voz(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    texto: str = Form(...),
+    formato: Optional[str] = Form(None),
+    sample_rate: Optional[int] = Form(None),
+    bit_depth: Optional[int] = Form(None),
+    qualidade: Optional[str] = Form(None),
+    modelo: Optional[str] = Form(None)
+) -> Response:
+    """
+    Sintetiza texto em áudio usando TTS (formato negociado por ``formato`` ou Accept)
+
+    ``qualidade`` escolhe a faixa do modelo (ex.: fast, quality) e
+    ``modelo`` um modelo pelo nome; sem eles usa o modelo padrão.
+    """
     try:
+        # Validar entrada
+        validate_text_input(texto)
+        
         # Verificar se o TTS está disponível
-        if SYSTEM_STATUS._value.get() != 1 or tts is None:
+        if SYSTEM_STATUS._value.get() != 1 or tts_backend is None:
             raise HTTPException(status_code=503, detail="TTS service unavailable")
         
-        # Validar entrada
-        validate_text_input(texto)
+        spec = negotiate_output(request, formato, sample_rate, bit_depth)
+        model = select_tts_model(modelo, qualidade)
+        native_rate = await model_sample_rate(model)
         
         # Incrementar contador de requisições TTS
         TTS_REQUEST_COUNT.inc()
         
+        # Formatos comprimidos: codificação incremental enquanto sintetiza
+        if spec.needs_encoder():
+            logger.info(f"TTS request streaming as {spec.format.name}. Text: '{texto[:50]}...'")
+            return encoded_audio_response(texto, spec, lane="standard", model=model, sample_rate=native_rate)
+        
         # Gerar nome único para o arquivo
         output_path = f"{config.tts.temp_dir}/{uuid.uuid4()}.wav"
         
@@ -307,12 +725,9 @@ async def sintetizar_voz(background_tasks: BackgroundTasks, texto: str = Form(..
         start_time = time.time()
         
         # Gerar áudio com speaker padrão
-        tts.tts_to_file(
-            text=texto,
-            language="pt",
-            file_path=output_path,
-            speaker=config.tts.default_speaker
-        )
+        audio, sample_rate = await synthesize_audio(texto, model=model, output_rate=spec.sample_rate)
+        with stage("encoding"):
+            write_wav(output_path, audio, sample_rate)
         
         # Registrar duração
         duration = time.time() - start_time
@@ -324,7 +739,7 @@ async def sintetizar_voz(background_tasks: BackgroundTasks, texto: str = Form(..
         # Adicionar tarefa de limpeza
         background_tasks.add_task(lambda: os.remove(output_path) if os.path.exists(output_path) else None)
         
-        return FileResponse(output_path, media_type="audio/wav")
+        return FileResponse(output_path, media_type="audio/wav", headers=spec.headers())
 
     except HTTPException:
         raise
@@ -334,6 +749,284 @@ async def sintetizar_voz(background_tasks: BackgroundTasks, texto: str = Form(..
         logger.error(f"TTS error: {e}")
         raise HTTPException(status_code=500, detail=f"Erro na síntese de voz: {str(e)}")
 
+# ================================
+# ENDPOINTS EM LOTE
+# ================================
+class FalarBatchItem(BaseModel):
+    """Item de um lote de síntese"""
+    texto: str
+    id: Optional[str] = None
+    speaker: Optional[str] = None
+
+class FalarBatchRequest(BaseModel):
+    """Lote de síntese; ``format`` é ndjson ou zip"""
+    items: List[FalarBatchItem]
+    format: str = "ndjson"
+
+class ChatBatchItem(BaseModel):
+    """Item de um lote de chat"""
+    user_input: str
+    context: str = ""
+    id: Optional[str] = None
+
+class ChatBatchRequest(BaseModel):
+    """Lote de chat (resultado em NDJSON)"""
+    items: List[ChatBatchItem]
+
+BATCH_FORMATS = ("ndjson", "zip")
+
+def validate_batch_size(items: list) -> None:
+    """Valida a quantidade de itens de um lote"""
+    if not items:
+        raise HTTPException(status_code=400, detail="Lote vazio")
+    if len(items) > config.api.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lote muito grande (máximo {config.api.batch_max_items} itens)"
+        )
+
+def batch_error(error: Exception) -> str:
+    """Mensagem de erro de um item do lote"""
+    return error.detail if isinstance(error, HTTPException) else str(error)
+
+def batch_summary(total: int, errors: int) -> Dict[str, Any]:
+    """Resumo final de um lote"""
+    return {"total": total, "ok": total - errors, "errors": errors}
+
+@app.post("/falar/batch")
+async def falar_batch(batch: FalarBatchRequest) -> StreamingResponse:
+    """Sintetiza um lote de textos, transmitindo cada resultado assim que fica pronto"""
+    validate_batch_size(batch.items)
+    if batch.format not in BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido (use {', '.join(BATCH_FORMATS)})")
+    if SYSTEM_STATUS._value.get() != 1 or tts_backend is None:
+        raise HTTPException(status_code=503, detail="TTS service unavailable")
+    
+    # Textos repetidos no lote compartilham a mesma síntese
+    syntheses: Dict[Tuple[str, Optional[str]], asyncio.Task] = {}
+    stopped = asyncio.Event()
+    
+    async def synthesize_item(item: FalarBatchItem) -> bytes:
+        validate_text_input(item.texto)
+        key = (item.texto, item.speaker)
+        if key not in syntheses:
+            syntheses[key] = asyncio.ensure_future(falar_job({"text": item.texto, "speaker": item.speaker}))
+        audio, _ = await syntheses[key]
+        return audio
+    
+    def cancel_pending() -> None:
+        # Cliente desconectou: itens na fila não começam e sínteses compartilhadas
+        # não ficam rodando sem ninguém esperando
+        stopped.set()
+        for synthesis in syntheses.values():
+            synthesis.cancel()
+    
+    def item_id(index: int) -> str:
+        return batch.items[index].id or str(index)
+    
+    async def ndjson_results():
+        errors = 0
+        try:
+            async for index, audio, error in run_bounded(batch.items, synthesize_item, config.api.batch_concurrency, stopped):
+                line = {"index": index, "id": item_id(index)}
+                if error is None:
+                    line.update({"status": "ok", "content_type": "audio/wav",
+                                 "audio_base64": base64.b64encode(audio).decode()})
+                else:
+                    errors += 1
+                    line.update({"status": "error", "error": batch_error(error)})
+                yield ndjson_line(line)
+        finally:
+            cancel_pending()
+        yield ndjson_line({"summary": batch_summary(len(batch.items), errors)})
+    
+    async def zip_results():
+        archive = ZipStream()
+        manifest = []
+        try:
+            async for index, audio, error in run_bounded(batch.items, synthesize_item, config.api.batch_concurrency, stopped):
+                entry = {"index": index, "id": item_id(index)}
+                if error is None:
+                    name = f"{index:04d}-{re.sub(r'[^A-Za-z0-9_.-]', '_', item_id(index))}.wav"
+                    entry.update({"status": "ok", "file": name})
+                    yield archive.add(name, audio)
+                else:
+                    entry.update({"status": "error", "error": batch_error(error)})
+                manifest.append(entry)
+        finally:
+            cancel_pending()
+        
+        errors = sum(1 for entry in manifest if entry["status"] == "error")
+        manifest.sort(key=lambda entry: entry["index"])
+        summary = {"summary": batch_summary(len(batch.items), errors), "items": manifest}
+        yield archive.add("manifest.json", json.dumps(summary, ensure_ascii=False, indent=2).encode())
+        yield archive.close()
+    
+    logger.info(f"TTS batch started: {len(batch.items)} items, format {batch.format}")
+    if batch.format == "zip":
+        return StreamingResponse(
+            zip_results(),
+            media_type="application/zip",
+            headers={"Content-Disposition": "attachment; filename=godofreda-batch.zip"}
+        )
+    return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+
+@app.post("/chat/batch")
+async def chat_batch(batch: ChatBatchRequest) -> StreamingResponse:
+    """Gera respostas para um lote de mensagens (NDJSON, em ordem de conclusão)"""
+    validate_batch_size(batch.items)
+    if llm_instance is None:
+        raise HTTPException(status_code=503, detail="LLM service unavailable")
+    
+    async def answer_item(item: ChatBatchItem) -> Dict[str, str]:
+        # Mesmo caminho (e cache) do /chat
+        return await chat_endpoint(user_input=item.user_input, context=item.context)
+    
+    async def ndjson_results():
+        errors = 0
+        async for index, result, error in run_bounded(batch.items, answer_item, config.api.batch_concurrency):
+            line = {"index": index, "id": batch.items[index].id or str(index)}
+            if error is None:
+                line.update({"status": "ok", "response": result["response"]})
+            else:
+                errors += 1
+                line.update({"status": "error", "error": batch_error(error)})
+            yield ndjson_line(line)
+        yield ndjson_line({"summary": batch_summary(len(batch.items), errors)})
+    
+    logger.info(f"Chat batch started: {len(batch.items)} items")
+    return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+
+# ================================
+# ENDPOINTS DE JOBS ASSÍNCRONOS
+# ================================
+def require_job_queue() -> JobQueue:
+    """Retorna a fila de jobs ou 503 se indisponível"""
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    return job_queue
+
+async def update_job_metrics() -> Dict[str, Any]:
+    """Atualiza as métricas Prometheus da fila e retorna as estatísticas"""
+    stats = await require_job_queue().stats()
+    JOB_QUEUE_DEPTH.set(stats["queued"])
+    JOB_PROCESSING.set(stats["processing"])
+    JOB_QUEUE_LAG.set(stats["lag_seconds"])
+    JOB_RETRIES.set(stats["retries"])
+    return stats
+
+@app.post("/jobs/falar", status_code=202)
+async def submit_falar_job(texto: str = Form(...), speaker: Optional[str] = Form(None),
+                           qualidade: Optional[str] = Form(None), modelo: Optional[str] = Form(None)) -> Dict[str, Any]:
+    """Enfileira uma síntese de voz e retorna o id do job"""
+    validate_text_input(texto)
+    queue = require_job_queue()
+    model = select_tts_model(modelo, qualidade)
+    
+    try:
+        job = await queue.submit("falar", {"text": texto, "speaker": speaker, "model": model})
+    except Exception as e:
+        ERROR_COUNT.labels(type="job_queue_error").inc()
+        logger.error(f"Job submit error: {e}")
+        raise HTTPException(status_code=503, detail="Job queue unavailable")
+    
+    logger.info(f"Job {job.id} queued. Text: '{texto[:50]}...'")
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+@app.get("/jobs/stats")
+async def job_stats() -> Dict[str, Any]:
+    """Profundidade, atraso e retentativas da fila"""
+    return await update_job_metrics()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0.0) -> Dict[str, Any]:
+    """Estado do job; ``wait`` (segundos, máx. 30) faz long-poll até o estado final"""
+    queue = require_job_queue()
+    wait = min(max(wait, 0.0), 30.0)
+    job = await queue.wait(job_id, wait) if wait else await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    
+    data = job.to_dict()
+    data.pop("payload", None)
+    if job.status == JOB_DONE:
+        data["result_url"] = f"/jobs/{job.id}/result"
+    return data
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str) -> Response:
+    """Resultado de um job concluído"""
+    queue = require_job_queue()
+    job = await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=409, detail=f"Job falhou: {job.error}")
+    if job.status != JOB_DONE:
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído ({job.status})")
+    
+    result = await queue.get_result(job_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Resultado expirado")
+    return Response(result, media_type=job.result_type or "application/octet-stream")
+
+async def job_metrics_loop() -> None:
+    """Atualiza periodicamente as métricas da fila"""
+    while True:
+        try:
+            await update_job_metrics()
+        except Exception as e:
+            logger.warning(f"Job metrics update failed: {e}")
+        await asyncio.sleep(config.monitoring.health_check_interval)
+
+# ================================
+# ENDPOINTS DE VOZES
+# ================================
+@app.get("/voices")
+async def list_voices() -> Dict[str, Any]:
+    """Lista vozes com latentes em cache para o modelo padrão"""
+    voices = getattr(tts_backend, "voices", None)
+    return {"default": config.tts.default_speaker, "voices": voices.names() if voices is not None else []}
+
+@app.post("/voices")
+@rate_limit_decorator("upload")
+async def register_voice(name: str = Form(...), references: List[UploadFile] = File(...)) -> Dict[str, Any]:
+    """Registra uma voz a partir de áudios de referência (custo único)"""
+    if SYSTEM_STATUS._value.get() != 1 or tts_backend is None:
+        raise HTTPException(status_code=503, detail="TTS service unavailable")
+    
+    if not hasattr(tts_backend, "register_voice"):
+        raise HTTPException(status_code=400, detail=f"Backend {tts_backend.name} não suporta vozes de referência")
+    
+    reference_paths = []
+    
+    def remove_references() -> None:
+        for path in reference_paths:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    lease: Optional[SlotLease] = None
+    try:
+        for reference in references:
+            validate_file_type(reference, config.file.allowed_audio_types)
+            path = f"{config.tts.temp_dir}/{uuid.uuid4()}-{os.path.basename(reference.filename or 'ref')}"
+            with open(path, 'wb') as f:
+                f.write(await reference.read())
+            reference_paths.append(path)
+        
+        # Os latentes saem do mesmo modelo da síntese: em thread e sob um slot do escalonador
+        async with tts_scheduler.slot("bulk", 0) as lease:
+            await lease.run(tts_backend.register_voice, name, reference_paths)
+        return {"status": "registered", "voice": name}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        # Requisição cancelada: a thread ainda lê as referências até terminar
+        if lease is not None:
+            lease.defer(remove_references)
+        else:
+            remove_references()
+
 # ================================
 # ENDPOINTS DE CHAT
 # ================================
@@ -343,13 +1036,13 @@ async def sintetizar_voz(background_tasks: BackgroundTasks, texto: str = Form(..
 async def chat_endpoint(user_input: str = Form(...), context: str = Form("")) -> Dict[str, str]:
     """Endpoint de chat conversacional com LLM sarcástica"""
     try:
+        # Validar entrada
+        validate_text_input(user_input)
+        
         # Verificar se o LLM está disponível
         if llm_instance is None:
             raise HTTPException(status_code=503, detail="LLM service unavailable")
         
-        # Validar entrada
-        validate_text_input(user_input)
-        
         # Gerar resposta usando LLM singleton
         resposta = await llm_instance.generate_response(user_input, context)
         
@@ -363,40 +1056,62 @@ async def chat_endpoint(user_input: str = Form(...), context: str = Form("")) ->
         logger.error(f"Erro no chat LLM: {e}")
         raise HTTPException(status_code=500, detail="Erro ao gerar resposta da Godofreda LLM")
 
-@app.post("/api/godofreda/chat")
+# Formulário do chat multimodal (lido em streaming, documentado manualmente)
+MULTIMODAL_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["text"],
+            "properties": {
+                "text": {"type": "string"},
+                "image": {"type": "string", "format": "binary"},
+                "voice": {"type": "string", "format": "binary"},
+                "formato": {"type": "string"},
+                "qualidade": {"type": "string"},
+                "modelo": {"type": "string"}
+            }
+        }}}
+    }
+}
+
+@app.post("/api/godofreda/chat", openapi_extra=MULTIMODAL_FORM_SCHEMA)
 @rate_limit_decorator("chat")
-async def multimodal_chat(
-    text: str = Form(...),
-    image: Optional[UploadFile] = File(None),
-    voice: Optional[UploadFile] = File(None)
-) -> StreamingResponse:
+async def multimodal_chat(request: Request) -> StreamingResponse:
     """Chat multimodal com suporte a texto, imagem e voz"""
+    form = None
     try:
-        # Verificar se o TTS está disponível
-        if SYSTEM_STATUS._value.get() != 1 or tts is None:
+        # Verificar se o TTS está disponível (antes de receber o upload)
+        if SYSTEM_STATUS._value.get() != 1 or tts_backend is None:
             raise HTTPException(status_code=503, detail="TTS service unavailable")
         
+        # Ler formulário em streaming: limite aplicado durante a recepção
+        form = await read_streamed_form(request, {
+            "image": config.file.allowed_image_types,
+            "voice": config.file.allowed_audio_types
+        })
+        text = form.fields.get("text", "")
+        image = form.files.get("image")
+        voice = form.files.get("voice")
+        
         # Validar entrada de texto
         validate_text_input(text)
         
-        # Validar tipos de arquivo
-        if image and config.file.allowed_image_types:
-            validate_file_type(image, config.file.allowed_image_types)
-        if voice and config.file.allowed_audio_types:
-            validate_file_type(voice, config.file.allowed_audio_types)
+        # Negociar o formato antes do trabalho do LLM
+        spec = negotiate_output(request, form.fields.get("formato"))
         
         # Processar entrada multimodal
         context = ""
         final_text = text
         
         if image:
-            # Simular análise de imagem (aqui você integraria com LLM Vision)
+            # Imagem reduzida e analisada (repostagens vêm do cache)
             image_analysis = await analyze_image_with_llm(image)
             context += f"Imagem: {image_analysis}\n"
             logger.info(f"Image analysis completed for: {image.filename}")
         
         if voice:
-            # Simular speech-to-text (aqui você integraria com STT)
+            # Voz preprocessada e transcrita pelo backend STT
             transcription = await speech_to_text(voice)
             final_text += f" {transcription}"
             logger.info(f"Voice transcription completed for: {voice.filename}")
@@ -407,15 +1122,30 @@ async def multimodal_chat(
             context=context
         )
         
+        # Modo degradado: fallback do LLM ou fila do TTS cheia saem do pacote pré-renderizado
+        degraded = await degraded_chat_response(godofreda_response, spec)
+        if degraded is not None:
+            return degraded
+        
+        # Respostas de chat usam TTS_CHAT_TIER, salvo pedido explícito
+        model = select_tts_model(form.fields.get("modelo"), form.fields.get("qualidade") or config.tts.chat_tier)
+        native_rate = await model_sample_rate(model)
+        if spec.needs_encoder():
+            logger.info(f"Multimodal chat streaming audio as {spec.format.name}")
+            return encoded_audio_response(
+                godofreda_response, spec, lane="interactive",
+                headers={"X-Response-Text": response_text_header(godofreda_response)}, model=model, sample_rate=native_rate
+            )
+        
         # Converter resposta para áudio
-        audio_response = await text_to_speech_response(godofreda_response)
+        audio_response = await text_to_speech_response(godofreda_response, model, spec.sample_rate)
         
         logger.info(f"Multimodal chat completed successfully. Input: '{text[:50]}...'")
         
         return StreamingResponse(
             io.BytesIO(audio_response),
             media_type="audio/wav",
-            headers={"X-Response-Text": godofreda_response}
+            headers={**spec.headers(), "X-Response-Text": response_text_header(godofreda_response)}
         )
         
     except HTTPException:
@@ -424,6 +1154,56 @@ async def multimodal_chat(
         ERROR_COUNT.labels(type="chat_error").inc()
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=f"Erro no chat: {str(e)}")
+    finally:
+        if form is not None:
+            form.close()
+
+# ================================
+# SESSÃO EM TEMPO REAL (WEBSOCKET)
+# ================================
+@app.websocket("/ws/session")
+async def realtime_session(websocket: WebSocket) -> None:
+    """Sessão duplex por espectador: tokens do LLM e áudio intercalados, com barge-in"""
+    if llm_instance is None:
+        await websocket.close(code=1013, reason="LLM service unavailable")
+        return
+    if WS_SESSIONS._value.get() >= config.api.ws_max_sessions:
+        await websocket.close(code=1013, reason="Too many sessions")
+        return
+    
+    # Sem passar pelo MetricsMiddleware nem pelos decorators: o limite de chat
+    # vale na abertura e em cada turno, por cliente
+    client_id = get_client_id(websocket)
+    allowed, retry_after = await rate_limiter.is_allowed(client_id, "chat")
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for {client_id} on realtime session")
+        await websocket.close(code=1008, reason=f"Rate limit exceeded, retry in {retry_after}s")
+        return
+    
+    async def admit_turn() -> Tuple[bool, int]:
+        return await rate_limiter.is_allowed(client_id, "chat")
+    
+    async def synthesize_sentence(text: str) -> Tuple[np.ndarray, int]:
+        TTS_REQUEST_COUNT.inc()
+        with TTS_DURATION.time():
+            return await synthesize_audio(text, lane="interactive", model=chat_model)
+    
+    chat_model = select_tts_model(qualidade=config.tts.chat_tier)
+    tts_ready = SYSTEM_STATUS._value.get() == 1 and tts_backend is not None
+    session = RealtimeSession(
+        websocket,
+        stream_fn=llm_instance.stream_response,
+        synthesize_fn=synthesize_sentence if tts_ready else None,
+        transcribe_fn=transcribe_audio,
+        admit_fn=admit_turn
+    )
+    
+    WS_SESSIONS.inc()
+    logger.info(f"Realtime session {session.session_id} opened (tts={'on' if tts_ready else 'off'})")
+    try:
+        await session.run()
+    finally:
+        WS_SESSIONS.dec()
 
 # ================================
 # ENDPOINTS DE WEBHOOK
@@ -434,20 +1214,160 @@ async def webhook_alerts(alert_data: dict) -> Dict[str, str]:
     logger.warning(f"Alert received: {json.dumps(alert_data, indent=2)}")
     return {"status": "alert_received"}
 
+# ================================
+# ENDPOINTS DE DIAGNÓSTICO (ADMIN)
+# ================================
+def require_admin(request: Request) -> None:
+    """Exige o X-Admin-Token; sem ADMIN_TOKEN configurado as rotas nem aparecem (404)"""
+    if not config.admin.token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), config.admin.token.encode()):
+        raise HTTPException(status_code=401, detail="Token de administração inválido")
+
+@app.post("/admin/profile")
+async def admin_profile(request: Request, seconds: float = 10.0, hz: Optional[float] = None,
+                        formato: str = "collapsed") -> Response:
+    """Perfil por amostragem de todas as threads por ``seconds`` segundos"""
+    require_admin(request)
+    if not 0 < seconds <= config.admin.profile_max_seconds:
+        raise HTTPException(
+            status_code=400, detail=f"seconds deve estar entre 0 e {config.admin.profile_max_seconds}"
+        )
+    if formato not in ("collapsed", "svg", "json"):
+        raise HTTPException(status_code=400, detail="formato deve ser collapsed, svg ou json")
+    if hz is not None and not hz > 0:
+        raise HTTPException(status_code=400, detail="hz deve ser maior que 0")
+    
+    try:
+        sampler = await profile_process(seconds, min(hz or config.admin.profile_hz, 1000.0))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if formato == "svg":
+        return Response(
+            sampler.flamegraph_svg(f"Godofreda pid {os.getpid()} - {seconds:g}s"),
+            media_type="image/svg+xml",
+            headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.svg"'}
+        )
+    if formato == "json":
+        top = [{"stack": stack, "samples": count} for stack, count in sampler.stacks.most_common(50)]
+        return JSONResponse(dict(sampler.summary(), top=top))
+    return Response(
+        sampler.collapsed(), media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.folded"'}
+    )
+
+@app.get("/admin/memory")
+async def admin_memory_status(request: Request) -> Dict[str, Any]:
+    """Estado do tracemalloc e snapshots disponíveis"""
+    require_admin(request)
+    return dict(memory_snapshots.status(), process=memory_report())
+
+@app.post("/admin/memory/start")
+async def admin_memory_start(request: Request, frames: Optional[int] = None) -> Dict[str, Any]:
+    """Liga o tracemalloc (deixa as alocações mais lentas até o stop)"""
+    require_admin(request)
+    return memory_snapshots.start(frames or config.admin.tracemalloc_frames)
+
+@app.post("/admin/memory/snapshot")
+async def admin_memory_snapshot(request: Request, limit: int = 20) -> Dict[str, Any]:
+    """Tira um snapshot e retorna as linhas que mais alocam"""
+    require_admin(request)
+    try:
+        return await asyncio.to_thread(memory_snapshots.take, limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/memory/diff")
+async def admin_memory_diff(request: Request, base: int, target: int, limit: int = 20) -> Dict[str, Any]:
+    """Crescimento de memória por linha entre dois snapshots"""
+    require_admin(request)
+    try:
+        return await asyncio.to_thread(memory_snapshots.diff, base, target, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@app.post("/admin/memory/stop")
+async def admin_memory_stop(request: Request) -> Dict[str, Any]:
+    """Desliga o tracemalloc e descarta os snapshots"""
+    require_admin(request)
+    return memory_snapshots.stop()
+
+@app.get("/admin/traces")
+async def admin_traces(request: Request, limit: int = 20, min_ms: float = 0.0,
+                       name: Optional[str] = None) -> Dict[str, Any]:
+    """Traces recentes do ring buffer (sem os spans), filtrados por duração e rota"""
+    require_admin(request)
+    if tracer.ring is None:
+        raise HTTPException(status_code=503, detail="Ring buffer de traces desativado")
+    return {"tracing": tracer.stats(), "traces": tracer.ring.recent(limit, min_ms, name)}
+
+@app.get("/admin/traces/{trace_id}")
+async def admin_trace(request: Request, trace_id: str) -> Dict[str, Any]:
+    """Trace completo com todos os spans"""
+    require_admin(request)
+    trace = tracer.ring.get(trace_id) if tracer.ring is not None else None
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace não encontrado")
+    return trace
+
+@app.get("/admin/loop")
+async def admin_loop(request: Request) -> Dict[str, Any]:
+    """Atraso do event loop e últimas chamadas bloqueantes (com a pilha)"""
+    require_admin(request)
+    return loop_monitor.stats()
+
 # ================================
 # FUNÇÕES AUXILIARES
 # ================================
-async def analyze_image_with_llm(image: UploadFile) -> str:
-    """Analisa imagem usando LLM multimodal (simulado)"""
-    # TODO: Integrar com GPT-4V, Claude, etc.
-    logger.info(f"Image analysis requested for: {image.filename}")
-    return "Imagem analisada: contém elementos visuais interessantes"
+async def analyze_image_with_llm(image: UploadedPart) -> str:
+    """Analisa a imagem com o backend de visão (reduzida e com cache por hash perceptual)"""
+    logger.info(f"Image analysis requested for: {image.filename} ({image.content_type}, sha256 {image.sha256[:12]})")
+    if image_analyzer is None:
+        raise HTTPException(status_code=503, detail="Vision service unavailable")
+    try:
+        with stage("vision", bytes=image.size) as span:
+            analysis, cached = await image_analyzer.analyze(image.data)
+            if span is not None:
+                span.set_attribute("cached", cached)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except httpx.HTTPError as e:
+        # Modelo de visão fora do ar, lento demais ou com erro (inclui timeouts)
+        logger.warning(f"Vision backend {image_analyzer.backend.name} failed: {e!r}")
+        raise HTTPException(status_code=503, detail="Vision service unavailable")
+    IMAGE_ANALYSES.labels(source="cache" if cached else "model").inc()
+    return analysis
 
-async def speech_to_text(audio: UploadFile) -> str:
-    """Converte áudio para texto (simulado)"""
-    # TODO: Integrar com Whisper, etc.
-    logger.info(f"Speech-to-text requested for: {audio.filename}")
-    return "Áudio transcrito com sucesso"
+async def speech_to_text(audio: UploadedPart) -> str:
+    """Converte a voz enviada no chat multimodal para texto"""
+    logger.info(f"Speech-to-text requested for: {audio.filename} ({audio.content_type}, sha256 {audio.sha256[:12]})")
+    try:
+        return await transcribe_audio(audio.data, audio.content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Áudio inválido: {e}")
+
+async def transcribe_audio(audio: bytes, content_type: str) -> str:
+    """Preprocessa (16 kHz mono, corte de silêncio, loudness) e transcreve com o backend STT"""
+    if stt_backend is None:
+        raise HTTPException(status_code=503, detail="STT service unavailable")
+    
+    with tracer.span("stt.preprocess", bytes=len(audio), content_type=content_type) as span:
+        prepared = await preprocess_voice(audio, content_type)
+        if span is not None:
+            span.set_attributes(original_seconds=round(prepared.original_seconds, 3),
+                                speech_seconds=round(prepared.speech_seconds, 3))
+    if prepared.audio.size == 0:
+        logger.info("No speech detected in voice input")
+        return ""
+    
+    chunks = iter_speech_chunks(prepared.audio, prepared.sample_rate, config.stt.chunk_seconds)
+    with stage("stt", backend=stt_backend.name):
+        return await asyncio.to_thread(
+            stt_backend.transcribe_chunks, chunks, prepared.sample_rate, config.stt.language
+        )
 
 async def generate_response_with_personality(user_input: str, context: str = "") -> str:
     """Gera resposta com personalidade sarcástica da Godofreda"""
@@ -456,31 +1376,14 @@ async def generate_response_with_personality(user_input: str, context: str = "")
     
     return await llm_instance.generate_response(user_input, context)
 
-async def text_to_speech_response(text: str) -> bytes:
+async def text_to_speech_response(text: str, model: Optional[str] = None, output_rate: int = 0) -> bytes:
     """Converte texto para áudio usando TTS"""
     try:
-        # Gerar nome único para o arquivo temporário
-        output_path = f"{config.tts.temp_dir}/{uuid.uuid4()}.wav"
-        
-        # Gerar áudio
-        if tts is not None:
-            tts.tts_to_file(
-                text=text,
-                language="pt",
-                file_path=output_path,
-                speaker=config.tts.default_speaker
-            )
-        else:
+        if tts_backend is None:
             raise HTTPException(status_code=503, detail="TTS service unavailable")
         
-        # Ler arquivo e retornar bytes
-        with open(output_path, 'rb') as f:
-            audio_bytes = f.read()
-        
-        # Limpar arquivo temporário
-        os.remove(output_path)
-        
-        return audio_bytes
+        # Gerar áudio direto em memória, sem arquivo temporário
+        return await synthesize_wav(text, lane="interactive", model=model, output_rate=output_rate)
         
     except Exception as e:
         logger.error(f"TTS error in chat: {e}")
@@ -489,17 +1392,67 @@ async def text_to_speech_response(text: str) -> bytes:
 # ================================
 # EVENTOS DE INICIALIZAÇÃO
 # ================================
+async def inline_job_worker(worker_id: str) -> None:
+    """Worker de jobs dentro da API; só consome a fila depois da carga do TTS"""
+    if tts_loading_task is not None:
+        await asyncio.shield(tts_loading_task)
+    await run_worker(job_queue, JOB_HANDLERS, worker_id)
+
+async def start_parallel_pool() -> None:
+    """Pool de textos longos, iniciado depois da carga para herdar o modo de runtime efetivo"""
+    if tts_loading_task is not None:
+        await asyncio.shield(tts_loading_task)
+    if tts_backend is None:
+        return
+    try:
+        parallel_synthesizer.start((tts_runtime_report() or {}).get("mode"))
+    except Exception as e:
+        logger.error(f"Failed to start parallel TTS pool: {e}")
+
 @app.on_event("startup")
 async def startup_event():
     """Evento de inicialização da aplicação"""
+    global tts_loading_task
     logger.info("Starting Godofreda API...")
     
+    # Modelo TTS: em background a API já responde /health/live durante a carga
+    if config.tts.load_mode == "none":
+        startup_report.mark_disabled()
+        logger.info(f"TTS_LOAD_MODE=none: serving without a TTS model ({startup_report.summary()})")
+    elif config.tts.load_mode == "blocking":
+        await asyncio.to_thread(load_tts_backend)
+    elif tts_backend is None:
+        tts_loading_task = asyncio.create_task(asyncio.to_thread(load_tts_backend))
+    
+    # Áudio pré-renderizado do modo degradado (renderizado depois da carga do modelo, se preciso)
+    if config.degraded.enabled and config.tts.load_mode != "none":
+        asyncio.create_task(prepare_degraded_audio())
+    
+    # Atraso do event loop e detecção de chamadas bloqueantes
+    if config.admin.loop_monitor_enabled:
+        loop_monitor.start()
+    
+    # Validar conexão com o Ollama se o LLM foi criado fora do event loop
+    if llm_instance is not None:
+        llm_instance.schedule_validation()
+    
     # Iniciar serviço de limpeza em background
     try:
         asyncio.create_task(start_background_cleanup())
         logger.info("Cleanup service started")
     except Exception as e:
         logger.error(f"Failed to start cleanup service: {e}")
+    
+    # Iniciar pool de síntese paralela para textos longos (cada processo carrega o modelo)
+    if config.tts.load_mode != "none":
+        asyncio.create_task(start_parallel_pool())
+    
+    # Métricas da fila e workers de jobs dentro da API (opcional)
+    if job_queue is not None:
+        job_worker_tasks.append(asyncio.create_task(job_metrics_loop()))
+        for index in range(config.jobs.inline_workers):
+            worker_id = f"api-{os.getpid()}-{index}"
+            job_worker_tasks.append(asyncio.create_task(inline_job_worker(worker_id)))
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -512,6 +1465,23 @@ async def shutdown_event():
         logger.info("Cleanup service stopped")
     except Exception as e:
         logger.error(f"Error stopping cleanup service: {e}")
+    
+    # Parar pool de síntese paralela
+    parallel_synthesizer.stop()
+    
+    # Parar workers inline e métricas da fila
+    for task in job_worker_tasks:
+        task.cancel()
+    
+    # Parar monitor do event loop e esvaziar os exportadores de traces
+    await loop_monitor.stop()
+    tracer.close()
+    
+    # Fechar conexões do backend de visão
+    if image_analyzer is not None:
+        await image_analyzer.backend.close()
+
+startup_report.end_phase()
 
 # ================================
 # INICIALIZAÇÃO DA APLICAÇÃO
@@ -0,0 +1,348 @@
+# ================================
+# GODOFREDA TTS MODEL REGISTRY
+# ================================
+# Vários modelos TTS no mesmo processo: carga sob demanda por nome ou
+# faixa de qualidade, residência limitada por um orçamento de memória
+# com despejo LRU e proteção contra trocas sucessivas (thrashing)
+# ================================
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from config import config
+from process_stats import current_rss
+from tts_backends import TTSBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Argumento do construtor de cada backend que recebe o modelo da spec
+MODEL_OPTIONS = {"coqui": "model_name", "onnx": "model_dir", "remote": "address"}
+
+MODEL_LOADS = Counter('godofreda_tts_model_loads_total', 'Cargas de modelos TTS', ['model'])
+MODEL_EVICTIONS = Counter('godofreda_tts_model_evictions_total', 'Modelos TTS despejados da memória', ['model'])
+MODEL_LOAD_SECONDS = Histogram(
+    'godofreda_tts_model_load_seconds', 'Duração da carga (e aquecimento) de modelos TTS', ['model'],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+)
+MODEL_RESIDENT_BYTES = Gauge('godofreda_tts_model_resident_bytes', 'Memória dos modelos TTS residentes', ['model'])
+
+
+class ModelUnavailable(Exception):
+    """O orçamento de memória não abriu espaço para o modelo dentro do prazo"""
+
+
+@dataclass
+class ModelSpec:
+    """Modelo TTS registrado: backend, modelo do backend e faixa de qualidade"""
+    name: str
+    backend: str
+    model: str = ""  # vazio = modelo padrão do backend
+    tier: str = ""
+    memory_mb: float = 0.0  # 0 = medido pelo RSS na carga
+
+    def create(self) -> TTSBackend:
+        option = MODEL_OPTIONS.get(self.backend)
+        kwargs = {option: self.model} if option and self.model else {}
+        return create_backend(self.backend, **kwargs)
+
+
+def parse_model_specs(text: str) -> List[ModelSpec]:
+    """
+    Lê ``TTS_MODELS``: entradas ``nome=backend:modelo;tier=...;mb=...``
+    separadas por vírgula, por exemplo
+    ``rapido=onnx:app/tts_models/vits;tier=fast;mb=300,xtts=coqui:tts_models/multilingual/multi-dataset/xtts_v2;tier=quality``
+    """
+    specs = []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        head, *options = item.split(";")
+        name, separator, target = head.partition("=")
+        backend, _, model = target.partition(":")
+        if not separator or not name.strip() or not backend.strip():
+            raise ValueError(f"Modelo TTS inválido: {item!r} (use nome=backend:modelo;tier=...;mb=...)")
+        spec = ModelSpec(name.strip(), backend.strip().lower(), model.strip())
+        for option in options:
+            key, _, value = option.partition("=")
+            key = key.strip()
+            if key == "tier":
+                spec.tier = value.strip()
+            elif key == "mb":
+                spec.memory_mb = float(value)
+            else:
+                raise ValueError(f"Opção desconhecida em TTS_MODELS: {key!r} (use tier ou mb)")
+        specs.append(spec)
+    return specs
+
+
+class _Resident:
+    """Modelo carregado e seu uso"""
+
+    __slots__ = ("backend", "size_bytes", "loaded_at", "last_used", "in_use", "uses")
+
+    def __init__(self, backend: TTSBackend, size_bytes: int, now: float):
+        self.backend = backend
+        self.size_bytes = size_bytes
+        self.loaded_at = now
+        self.last_used = now
+        self.in_use = 0
+        self.uses = 0
+
+
+class ModelRegistry:
+    """
+    Modelos TTS residentes dentro de ``budget_mb`` com despejo LRU
+
+    O modelo padrão (carregado no startup e usado pelo pool paralelo e
+    pelo servidor de inferência) fica fixo na memória. Os demais são
+    carregados no primeiro uso; para abrir espaço saem os menos usados
+    recentemente que não estejam sintetizando e que já estejam residentes
+    há ``min_residency`` segundos. Sem candidatos a carga espera (até
+    ``load_timeout``) em vez de passar do orçamento, e duas faixas
+    disputando a memória não trocam de modelo a cada requisição.
+    ``switch_cost`` dá ao escalonador o custo de uma troca, para que jobs
+    de modelos residentes passem na frente.
+    """
+
+    def __init__(self, specs: List[ModelSpec], default: Optional[str] = None, budget_mb: float = 0.0,
+                 min_residency: float = 60.0, load_timeout: float = 120.0, switch_cost: float = 30.0,
+                 warmup: bool = True, factory: Callable[[ModelSpec], TTSBackend] = ModelSpec.create,
+                 memory_probe: Callable[[], int] = current_rss, clock: Callable[[], float] = time.monotonic):
+        if not specs:
+            raise ValueError("Nenhum modelo TTS configurado")
+        self.specs: Dict[str, ModelSpec] = {spec.name: spec for spec in specs}
+        self.default = default or specs[0].name
+        if self.default not in self.specs:
+            raise ValueError(f"TTS_DEFAULT_MODEL desconhecido: {self.default} (use {', '.join(self.specs)})")
+        self.budget_bytes = int(budget_mb * MB)
+        self.min_residency = min_residency
+        self.load_timeout = load_timeout
+        self.default_switch_cost = switch_cost
+        self.warmup = warmup
+        self.factory = factory
+        self.memory_probe = memory_probe
+        self.clock = clock
+        # Ordem LRU: o primeiro é o usado há mais tempo
+        self._resident: "OrderedDict[str, _Resident]" = OrderedDict()
+        self._loading: Dict[str, int] = {}  # nome -> bytes reservados
+        self._sizes: Dict[str, int] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._sample_rates: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self.counters = {"hits": 0, "loads": 0, "evictions": 0, "budget_waits": 0}
+
+    def resolve(self, model: Optional[str] = None, tier: Optional[str] = None) -> str:
+        """
+        Nome do modelo para um pedido por nome ou faixa
+
+        Numa faixa com vários modelos vale um já residente; faixa sem
+        modelo declarado usa o padrão (implantações com um só modelo
+        aceitam qualquer faixa).
+        """
+        if model:
+            if model not in self.specs:
+                raise ValueError(f"Modelo TTS desconhecido: {model} (use {', '.join(self.specs)})")
+            return model
+        if tier:
+            candidates = [name for name, spec in self.specs.items() if spec.tier == tier]
+            with self._cond:
+                resident = [name for name in candidates if name in self._resident]
+            if resident or candidates:
+                return (resident or candidates)[0]
+        return self.default
+
+    def is_resident(self, name: str) -> bool:
+        return name in self._resident
+
+    def switch_cost(self, name: str) -> float:
+        """Segundos estimados para trazer o modelo à memória (0 se residente)"""
+        if name in self._resident:
+            return 0.0
+        return self._load_seconds.get(name, self.default_switch_cost)
+
+    def sample_rate(self, name: str) -> Optional[int]:
+        """Taxa nativa de um modelo já carregado alguma vez"""
+        return self._sample_rates.get(name)
+
+    def adopt(self, name: str, backend: TTSBackend, size_bytes: int, load_seconds: float) -> None:
+        """Registra um modelo carregado por fora (o padrão, no startup)"""
+        with self._cond:
+            self._register(name, backend, size_bytes, load_seconds)
+            self._cond.notify_all()
+
+    def acquire(self, name: str) -> TTSBackend:
+        """
+        Backend do modelo, carregando se preciso; protegido de despejo até
+        ``release``. Bloqueante: chamar em thread a partir do event loop.
+        """
+        deadline = self.clock() + self.load_timeout
+        waited = False
+        with self._cond:
+            while True:
+                entry = self._resident.get(name)
+                if entry is not None:
+                    entry.in_use += 1
+                    entry.uses += 1
+                    entry.last_used = self.clock()
+                    self._resident.move_to_end(name)
+                    self.counters["hits"] += 1
+                    return entry.backend
+                if name not in self._loading:
+                    needed = self._estimate_bytes(name)
+                    if self._make_room(needed):
+                        self._loading[name] = needed
+                        break
+                    if not waited:
+                        waited = True
+                        self.counters["budget_waits"] += 1
+                        logger.info(f"TTS model {name} waiting for memory budget ({self._used_bytes() / MB:.0f} MB used)")
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    raise ModelUnavailable(f"Sem memória no orçamento para o modelo TTS {name}")
+                # Recheca periodicamente: o fim da residência mínima não notifica
+                self._cond.wait(min(remaining, 1.0))
+
+        try:
+            backend, size_bytes, seconds = self._load(name)
+        except BaseException:
+            with self._cond:
+                del self._loading[name]
+                self._cond.notify_all()
+            raise
+
+        with self._cond:
+            del self._loading[name]
+            entry = self._register(name, backend, size_bytes, seconds)
+            entry.in_use = entry.uses = 1
+            # A medida real pode passar da estimativa usada na reserva
+            self._make_room(0)
+            self._cond.notify_all()
+        return backend
+
+    def release(self, name: str) -> None:
+        with self._cond:
+            entry = self._resident.get(name)
+            if entry is not None:
+                entry.in_use -= 1
+                entry.last_used = self.clock()
+            self._cond.notify_all()
+
+    def _register(self, name: str, backend: TTSBackend, size_bytes: int, seconds: float) -> _Resident:
+        entry = _Resident(backend, size_bytes, self.clock())
+        self._resident[name] = entry
+        self._sizes[name] = size_bytes
+        self._load_seconds[name] = seconds
+        self._sample_rates[name] = backend.sample_rate
+        self.counters["loads"] += 1
+        MODEL_LOADS.labels(model=name).inc()
+        MODEL_LOAD_SECONDS.labels(model=name).observe(seconds)
+        MODEL_RESIDENT_BYTES.labels(model=name).set(size_bytes)
+        return entry
+
+    def _load(self, name: str) -> Tuple[TTSBackend, int, float]:
+        """Cria, carrega e aquece fora do lock; mede o RSS acrescentado"""
+        spec = self.specs[name]
+        logger.info(f"Loading TTS model {name} ({spec.backend}{':' + spec.model if spec.model else ''})")
+        before = self.memory_probe()
+        start = time.perf_counter()
+        backend = self.factory(spec)
+        backend.import_dependencies()
+        backend.load()
+        if self.warmup:
+            backend.warmup()
+        seconds = time.perf_counter() - start
+        size_bytes = int(spec.memory_mb * MB) if spec.memory_mb else max(0, self.memory_probe() - before)
+        logger.info(f"TTS model {name} loaded in {seconds:.2f}s ({size_bytes / MB:.0f} MB)")
+        return backend, size_bytes, seconds
+
+    def _estimate_bytes(self, name: str) -> int:
+        spec = self.specs[name]
+        return self._sizes.get(name) or int(spec.memory_mb * MB)
+
+    def _used_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._resident.values()) + sum(self._loading.values())
+
+    def _evictable(self, name: str, entry: _Resident) -> bool:
+        return (name != self.default and entry.in_use == 0
+                and self.clock() - entry.loaded_at >= self.min_residency)
+
+    def _make_room(self, needed: int) -> bool:
+        """
+        Despeja modelos LRU até ``needed`` caber no orçamento (com o lock)
+
+        Retorna False quando falta espaço só por modelos em uso, protegidos
+        pela residência mínima ou carregando: quem chamou espera. Se nada
+        mais pode sair, um modelo maior que o orçamento carrega assim mesmo.
+        """
+        if not self.budget_bytes:
+            return True
+        while self._used_bytes() + needed > self.budget_bytes:
+            victim = next((name for name, entry in self._resident.items() if self._evictable(name, entry)), None)
+            if victim is None:
+                blocked = self._loading or any(name != self.default for name in self._resident)
+                if blocked:
+                    return False
+                logger.warning(f"TTS models exceed memory budget ({(self._used_bytes() + needed) / MB:.0f} MB "
+                               f"> {self.budget_bytes / MB:.0f} MB)")
+                return True
+            self._evict(victim)
+        return True
+
+    def _evict(self, name: str) -> None:
+        entry = self._resident.pop(name)
+        self.counters["evictions"] += 1
+        MODEL_EVICTIONS.labels(model=name).inc()
+        MODEL_RESIDENT_BYTES.labels(model=name).set(0)
+        logger.info(f"Evicted TTS model {name} ({entry.size_bytes / MB:.0f} MB, {entry.uses} uses)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Modelos, faixas e residência para /status"""
+        now = self.clock()
+        with self._cond:
+            models = {}
+            for name, spec in self.specs.items():
+                entry = self._resident.get(name)
+                models[name] = {
+                    "backend": spec.backend,
+                    "model": spec.model or None,
+                    "tier": spec.tier or None,
+                    "resident": entry is not None,
+                    "loading": name in self._loading,
+                    "in_use": entry.in_use if entry else 0,
+                    "runtime": entry.backend.info().get("runtime") if entry else None,
+                    "size_mb": round(self._sizes[name] / MB, 1) if name in self._sizes else None,
+                    "resident_seconds": round(now - entry.loaded_at, 1) if entry else None,
+                    "last_load_seconds": round(self._load_seconds[name], 2) if name in self._load_seconds else None,
+                }
+            return {
+                "default": self.default,
+                "budget_mb": round(self.budget_bytes / MB, 1) if self.budget_bytes else None,
+                "used_mb": round(self._used_bytes() / MB, 1),
+                "min_residency_seconds": self.min_residency,
+                "models": models,
+                **self.counters,
+            }
+
+
+def create_model_registry() -> ModelRegistry:
+    """Registro pelo config (sem TTS_MODELS: só o modelo de TTS_BACKEND/TTS_MODEL)"""
+    specs = parse_model_specs(config.tts.models) or [ModelSpec("default", config.tts.backend)]
+    return ModelRegistry(
+        specs,
+        default=config.tts.default_model or None,
+        budget_mb=config.tts.model_memory_budget_mb,
+        min_residency=config.tts.model_min_residency_seconds,
+        load_timeout=config.tts.model_load_timeout,
+        switch_cost=config.tts.model_switch_cost_seconds,
+        warmup=config.tts.warmup,
+    )
+
+
+# Instância global do registro de modelos
+model_registry = create_model_registry()
@@ -0,0 +1,82 @@
+# ================================
+# GODOFREDA PROCESS STATS
+# ================================
+# Uso de memória do processo separado em páginas exclusivas e
+# compartilhadas (copy-on-write entre workers)
+# ================================
+
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SMAPS_ROLLUP = "/proc/self/smaps_rollup"
+PROC_STAT = "/proc/self/stat"
+PROC_STATM = "/proc/self/statm"
+PROC_UPTIME = "/proc/uptime"
+
+
+def memory_report() -> Dict[str, Any]:
+    """
+    Retorna RSS, PSS, memória exclusiva (USS) e compartilhada do processo
+
+    USS são as páginas privadas do worker; páginas dos pesos do modelo
+    herdadas do mestre via fork aparecem como compartilhadas enquanto
+    não forem escritas.
+    """
+    report: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "worker_index": os.getenv("GODOFREDA_WORKER_INDEX")
+    }
+
+    try:
+        with open(SMAPS_ROLLUP) as f:
+            fields = {}
+            for line in f:
+                key, _, value = line.partition(":")
+                parts = value.split()
+                if parts and parts[0].isdigit():
+                    fields[key] = int(parts[0]) * 1024  # kB -> bytes
+    except OSError as e:
+        report["error"] = str(e)
+        return report
+
+    mb = 1024 * 1024
+    unique = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    report.update({
+        "rss_mb": round(fields.get("Rss", 0) / mb, 1),
+        "pss_mb": round(fields.get("Pss", 0) / mb, 1),
+        "unique_mb": round(unique / mb, 1),
+        "shared_mb": round(shared / mb, 1)
+    })
+    return report
+
+
+def current_rss() -> int:
+    """RSS atual em bytes (leitura barata, para medir a carga de modelos); 0 fora do Linux"""
+    try:
+        with open(PROC_STATM) as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_age() -> Optional[float]:
+    """
+    Segundos desde o início do processo (None fora do Linux)
+
+    Usado no relatório de inicialização para incluir o tempo gasto antes
+    do primeiro import da API (interpretador e uvicorn).
+    """
+    try:
+        with open(PROC_STAT) as f:
+            # O nome do processo pode ter espaços: os campos vêm depois do ")"
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(PROC_UPTIME) as f:
+            uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(max(0.0, uptime - started), 3)
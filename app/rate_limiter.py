@@ -6,11 +6,13 @@
 
 import time
 import asyncio
+import functools
 import os
 from typing import Dict, Tuple
 import logging
 import redis.asyncio as redis
 from config import config
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +50,14 @@ class RateLimiter:
         Returns:
             Tuple[bool, int]: (permitido, tempo_restante_em_segundos)
         """
+        with tracer.span("rate_limit.check", endpoint=endpoint) as span:
+            allowed, time_remaining = await self._check(client_id, endpoint)
+            if span is not None:
+                span.set_attributes(allowed=allowed, retry_after=time_remaining)
+            return allowed, time_remaining
+    
+    async def _check(self, client_id: str, endpoint: str) -> Tuple[bool, int]:
+        """Janela deslizante em um sorted set do Redis"""
         if not self.redis_client:
             # Fallback para memória se Redis não estiver disponível
             return True, 0
@@ -152,6 +162,7 @@ async def check_rate_limit(request, endpoint: str = "default") -> None:
 def rate_limit_decorator(endpoint: str = "default"):
     """Decorator para aplicar rate limiting em endpoints"""
     def decorator(func):
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
             try:
                 # Encontrar o objeto request nos argumentos
@@ -0,0 +1,246 @@
+# ================================
+# GODOFREDA REALTIME SESSION
+# ================================
+# Sessão WebSocket full-duplex por espectador: recebe texto ou áudio,
+# devolve tokens do LLM e trechos de áudio intercalados e permite
+# interromper (barge-in) a resposta em andamento
+# ================================
+
+import asyncio
+import json
+import logging
+import re
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import WebSocket, WebSocketDisconnect
+
+from audio_utils import float_to_pcm16
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Fim de sentença seguido de espaço: ponto de corte para a síntese
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+")
+
+# Trechos menores que isso esperam a próxima sentença (evita sínteses mínimas)
+MIN_SPEECH_CHARS = 24
+
+StreamFn = Callable[[str, str], AsyncIterator[str]]
+SynthesizeFn = Callable[[str], Awaitable[Tuple[np.ndarray, int]]]
+TranscribeFn = Callable[[bytes, str], Awaitable[str]]
+# Limite de requisições do cliente: (permitido, segundos até liberar)
+AdmitFn = Callable[[], Awaitable[Tuple[bool, int]]]
+
+
+def pop_sentences(buffer: str, min_chars: int = MIN_SPEECH_CHARS) -> Tuple[List[str], str]:
+    """
+    Separa as sentenças completas do texto recebido até agora
+
+    Returns:
+        (sentenças prontas para síntese, resto ainda incompleto)
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(buffer):
+        candidate = buffer[start:match.end()].strip()
+        if len(candidate) >= min_chars:
+            sentences.append(candidate)
+            start = match.end()
+    return sentences, buffer[start:]
+
+
+class RealtimeSession:
+    """
+    Sessão de conversa em tempo real sobre um WebSocket
+
+    Protocolo (cliente -> servidor, frames de texto JSON):
+        {"type": "text", "text": ..., "context": ...}   inicia um turno
+        frames binários + {"type": "audio_end", "content_type": ...}   turno por voz
+        {"type": "cancel"}   interrompe a resposta em andamento
+        {"type": "ping"}
+
+    Servidor -> cliente:
+        {"type": "session", "session_id": ...}
+        {"type": "turn_start" | "turn_end", "turn_id": ..., ...}
+        {"type": "transcript", "turn_id": ..., "text": ...}
+        {"type": "token", "turn_id": ..., "text": ...}
+        {"type": "audio", "turn_id": ..., "seq": n, "sample_rate": sr, "format": "pcm16"}
+            seguido de um frame binário com o PCM 16 bits mono
+        {"type": "error", "message": ..., "retry_after": s}   (retry_after só no limite de requisições)
+
+    Cada turno passa por ``admit_fn`` (limite de chat do cliente) antes
+    de chegar ao LLM e ao TTS.
+    """
+
+    def __init__(self, websocket: WebSocket, stream_fn: StreamFn, synthesize_fn: Optional[SynthesizeFn],
+                 transcribe_fn: Optional[TranscribeFn] = None, history_turns: Optional[int] = None,
+                 admit_fn: Optional[AdmitFn] = None):
+        self.websocket = websocket
+        self.stream_fn = stream_fn
+        self.synthesize_fn = synthesize_fn
+        self.transcribe_fn = transcribe_fn
+        self.admit_fn = admit_fn
+        self.history_turns = config.api.ws_history_turns if history_turns is None else history_turns
+        self.session_id = uuid.uuid4().hex
+        # Só as trocas usadas como contexto: a sessão dura a live inteira
+        self.history: Deque[Tuple[str, str]] = deque(maxlen=max(0, self.history_turns))
+        self._turn: Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+        self._audio = bytearray()
+
+    async def send_json(self, message: Dict[str, Any]) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def send_audio(self, header: Dict[str, Any], pcm: bytes) -> None:
+        """Envia cabeçalho e PCM juntos, sem intercalar outros frames"""
+        async with self._send_lock:
+            await self.websocket.send_json(header)
+            await self.websocket.send_bytes(pcm)
+
+    def _context(self, extra: str = "") -> str:
+        """Contexto do turno: últimas trocas da sessão mais o contexto enviado"""
+        lines = [f"Usuário: {user}\nGodofreda: {reply}" for user, reply in self.history]
+        if extra:
+            lines.append(extra)
+        return "\n".join(lines)
+
+    async def cancel_turn(self) -> bool:
+        """Interrompe a resposta em andamento (barge-in)"""
+        turn = self._turn
+        if turn is None or turn.done():
+            return False
+        turn.cancel()
+        try:
+            await turn
+        except asyncio.CancelledError:
+            pass
+        return True
+
+    async def run(self) -> None:
+        """Atende a sessão até o cliente desconectar"""
+        await self.websocket.accept()
+        await self.send_json({"type": "session", "session_id": self.session_id})
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    await self._receive_audio(message["bytes"])
+                elif message.get("text") is not None:
+                    await self._handle_command(message["text"])
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await self.cancel_turn()
+            logger.info(f"Realtime session {self.session_id} closed")
+
+    async def _receive_audio(self, data: bytes) -> None:
+        """Acumula o áudio do turno até o comando audio_end"""
+        if len(self._audio) + len(data) > config.file.max_file_size:
+            self._audio.clear()
+            await self.send_json({"type": "error", "message": "Áudio do turno excede o tamanho máximo"})
+            return
+        self._audio.extend(data)
+
+    async def _handle_command(self, raw: str) -> None:
+        try:
+            command = json.loads(raw)
+        except json.JSONDecodeError:
+            await self.send_json({"type": "error", "message": "Frame JSON inválido"})
+            return
+
+        kind = command.get("type")
+        if kind == "ping":
+            await self.send_json({"type": "pong"})
+        elif kind == "cancel":
+            cancelled = await self.cancel_turn()
+            await self.send_json({"type": "cancelled", "active": cancelled})
+        elif kind == "text":
+            text = (command.get("text") or "").strip()
+            if not text or len(text) > config.api.max_text_length:
+                await self.send_json({"type": "error", "message": "Texto vazio ou muito longo"})
+                return
+            await self._start_turn(text, None, command.get("context", ""))
+        elif kind == "audio_end":
+            audio, self._audio = bytes(self._audio), bytearray()
+            if not audio:
+                await self.send_json({"type": "error", "message": "Nenhum áudio recebido"})
+            elif self.transcribe_fn is None:
+                await self.send_json({"type": "error", "message": "Transcrição indisponível"})
+            else:
+                await self._start_turn(None, (audio, command.get("content_type", "audio/wav")),
+                                       command.get("context", ""))
+        else:
+            await self.send_json({"type": "error", "message": f"Tipo desconhecido: {kind}"})
+
+    async def _start_turn(self, text: Optional[str], audio: Optional[Tuple[bytes, str]], context: str) -> None:
+        if self.admit_fn is not None:
+            allowed, retry_after = await self.admit_fn()
+            if not allowed:
+                await self.send_json({"type": "error", "message": "Limite de requisições excedido",
+                                      "retry_after": retry_after})
+                return
+        # Nova fala do usuário interrompe a resposta anterior
+        await self.cancel_turn()
+        self._turn = asyncio.create_task(self._run_turn(uuid.uuid4().hex[:12], text, audio, context))
+
+    async def _run_turn(self, turn_id: str, text: Optional[str], audio: Optional[Tuple[bytes, str]],
+                        context: str) -> None:
+        """LLM em streaming alimentando a síntese sentença a sentença"""
+        sentences: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        speaker = asyncio.create_task(self._speak(turn_id, sentences))
+        reply = ""
+        cancelled = False
+        try:
+            await self.send_json({"type": "turn_start", "turn_id": turn_id})
+            if audio is not None:
+                text = await self.transcribe_fn(*audio)
+                await self.send_json({"type": "transcript", "turn_id": turn_id, "text": text})
+
+            buffer = ""
+            async for token in self.stream_fn(text, self._context(context)):
+                reply += token
+                buffer += token
+                await self.send_json({"type": "token", "turn_id": turn_id, "text": token})
+                ready, buffer = pop_sentences(buffer)
+                for sentence in ready:
+                    sentences.put_nowait(sentence)
+
+            if buffer.strip():
+                sentences.put_nowait(buffer.strip())
+            sentences.put_nowait(None)
+            await speaker
+            self.history.append((text, reply.strip()))
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            logger.error(f"Realtime turn {turn_id} failed: {e}")
+            await self.send_json({"type": "error", "turn_id": turn_id, "message": str(e)})
+        finally:
+            speaker.cancel()
+            try:
+                await self.send_json({"type": "turn_end", "turn_id": turn_id,
+                                      "text": reply.strip(), "cancelled": cancelled})
+            except Exception:
+                pass  # cliente já desconectou
+
+    async def _speak(self, turn_id: str, sentences: "asyncio.Queue[Optional[str]]") -> None:
+        """Sintetiza as sentenças em ordem e envia o áudio de cada uma"""
+        seq = 0
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                return
+            if self.synthesize_fn is None:
+                continue  # TTS indisponível: sessão só com texto
+            audio, sample_rate = await self.synthesize_fn(sentence)
+            header = {"type": "audio", "turn_id": turn_id, "seq": seq,
+                      "sample_rate": sample_rate, "format": "pcm16", "text": sentence}
+            await self.send_audio(header, float_to_pcm16(audio).tobytes())
+            seq += 1
@@ -0,0 +1,141 @@
+"""
+Godofreda Serve
+Servidor multi-worker com preload: o modelo é carregado uma única vez no
+processo mestre e os workers são criados via fork, compartilhando os pesos
+em copy-on-write
+
+Uso:
+    python serve.py  (WORKERS define o número de workers)
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+from config import config
+import cpu_topology
+
+logger = logging.getLogger("serve")
+
+# Intervalo mínimo entre reinícios de um mesmo worker
+RESTART_BACKOFF_SECONDS = 1.0
+
+
+def _bind_socket() -> socket.socket:
+    """Cria o socket de escuta compartilhado pelos workers"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((config.api.host, config.api.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(index: int, sock: socket.socket, app) -> None:
+    """Executa um worker uvicorn no processo filho"""
+    os.environ["GODOFREDA_WORKER_INDEX"] = str(index)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Objetos herdados continuam congelados; só os novos passam pelo coletor
+    gc.enable()
+
+    layout = cpu_topology.inference_layout
+    cpu_topology.leave_preload_master()
+    cpu_topology.apply_worker_layout(layout.intra_op_threads, layout.interop_threads, layout.core_set(index))
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level=config.logging.level.lower(), access_log=True))
+    server.run(sockets=[sock])
+
+
+def _fork_worker(index: int, sock: socket.socket, app) -> int:
+    """Cria um worker via fork e retorna seu PID"""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _run_worker(index, sock, app)
+        finally:
+            os._exit(0)
+    logger.info(f"Worker {index} started (pid {pid})")
+    return pid
+
+
+def run() -> None:
+    """Carrega o modelo no mestre, congela o heap e supervisiona os workers"""
+    # Inferência single-thread no mestre: o pool OpenMP não é fork-safe
+    cpu_topology.enter_preload_master()
+
+    # Evita que o coletor reescreva cabeçalhos de objetos durante a carga
+    gc.disable()
+
+    import main as app_module
+
+    # Os workers herdam o modelo já carregado e aquecido via fork
+    if config.tts.load_mode != "none":
+        app_module.load_tts_backend()
+    if app_module.tts_backend is not None:
+        app_module.tts_backend.freeze()
+
+    # Move tudo o que já existe para a geração permanente: o coletor não
+    # toca mais nessas páginas nos filhos, evitando cópias por escrita
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind_socket()
+    workers = max(1, config.api.workers)
+    children: Dict[int, int] = {}
+    started_at: Dict[int, float] = {}
+    shutting_down = False
+
+    def handle_shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, handle_shutdown)
+    signal.signal(signal.SIGINT, handle_shutdown)
+
+    for index in range(workers):
+        children[_fork_worker(index, sock, app_module.app)] = index
+        started_at[index] = time.monotonic()
+
+    logger.info(f"Serving on {config.api.host}:{config.api.port} with {workers} preloaded workers")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        index = children.pop(pid, None)
+        if index is None or shutting_down:
+            continue
+
+        # Worker morreu inesperadamente: recriar a partir do mestre (pesos ainda compartilhados)
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+        elapsed = time.monotonic() - started_at[index]
+        if elapsed < RESTART_BACKOFF_SECONDS:
+            time.sleep(RESTART_BACKOFF_SECONDS - elapsed)
+        children[_fork_worker(index, sock, app_module.app)] = index
+        started_at[index] = time.monotonic()
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=config.logging.format, stream=sys.stdout)
+    run()
@@ -0,0 +1,127 @@
+# ================================
+# GODOFREDA STARTUP REPORT
+# ================================
+# Tempo de inicialização por fase (imports da API, import das bibliotecas
+# do TTS, carga do modelo e aquecimento) e estado de prontidão
+# ================================
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from process_stats import process_age
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """
+    Fases da inicialização com duração, fase atual e estado
+
+    Estados: starting, importing, loading, warming, ready, failed e
+    disabled (sem modelo).
+
+    O relógio começa na criação do relatório (primeiro import de main.py);
+    ``before_import_seconds`` é o tempo do processo até ali (interpretador,
+    uvicorn). Atualizado pela thread de carga do modelo e lido pelos
+    endpoints de saúde, por isso as mudanças passam por um lock.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.before_import_seconds = process_age()
+        self.state = "starting"
+        self.phases: Dict[str, float] = {}
+        self.current: Optional[str] = None
+        self.error: Optional[str] = None
+        self.ready_after: Optional[float] = None
+        # Chamado com (fase, segundos) ao fim de cada fase (métricas)
+        self.observer: Optional[Callable[[str, float], None]] = None
+        self._current_started = 0.0
+        self._lock = threading.Lock()
+
+    def start_phase(self, name: str, state: Optional[str] = None) -> None:
+        with self._lock:
+            self.current = name
+            self._current_started = self.clock()
+            if state is not None:
+                self.state = state
+
+    def end_phase(self) -> float:
+        with self._lock:
+            name, elapsed = self.current, self.clock() - self._current_started
+            if name is None:
+                return 0.0
+            self.phases[name] = round(elapsed, 4)
+            self.current = None
+        logger.info(f"Startup phase {name} took {elapsed:.2f}s")
+        if self.observer is not None:
+            self.observer(name, elapsed)
+        return elapsed
+
+    @contextmanager
+    def phase(self, name: str, state: Optional[str] = None) -> Iterator[None]:
+        """Mede uma fase; em caso de erro a duração parcial também fica registrada"""
+        self.start_phase(name, state)
+        try:
+            yield
+        finally:
+            self.end_phase()
+
+    def _finish(self, state: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.state = state
+            self.error = error
+            if error is None:
+                self.ready_after = round(self.clock() - self.started, 4)
+
+    def mark_ready(self) -> None:
+        self._finish("ready")
+
+    def mark_failed(self, error: str) -> None:
+        self._finish("failed", error)
+
+    def mark_disabled(self) -> None:
+        """Modo sem modelo (TTS_LOAD_MODE=none): a API sobe só com os serviços leves"""
+        self._finish("disabled")
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def reason(self) -> str:
+        """Motivo de ainda não estar pronto, para o /health/ready"""
+        with self._lock:
+            if self.state == "failed":
+                return f"TTS model failed to load: {self.error}"
+            if self.current is not None:
+                return f"TTS model {self.state} ({self.current}, {self.clock() - self._current_started:.1f}s)"
+            return "TTS model not loaded"
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds:.2f}s" for name, seconds in self.phases.items()]
+        if self.ready_after is not None:
+            parts.append(f"total={self.ready_after:.2f}s")
+        return " ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            report: Dict[str, Any] = {
+                "state": self.state,
+                "phases": dict(self.phases),
+                "current_phase": self.current,
+                "elapsed_seconds": round(self.clock() - self.started, 4),
+                "ready_after_seconds": self.ready_after,
+                "before_import_seconds": self.before_import_seconds,
+                "error": self.error,
+            }
+            if self.current is not None:
+                report["current_phase_seconds"] = round(self.clock() - self._current_started, 4)
+        return report
+
+
+# Instância global: criada no primeiro import, antes dos imports pesados da API
+startup_report = StartupReport()
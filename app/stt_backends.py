@@ -0,0 +1,111 @@
+# ================================
+# GODOFREDA STT BACKENDS
+# ================================
+# Motores de reconhecimento de fala plugáveis: recebem áudio já
+# preprocessado (float32 mono 16 kHz) e devolvem o texto
+# ================================
+
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STUB_TEXT = "Áudio transcrito com sucesso"
+
+
+class STTBackend(ABC):
+    """Interface de um motor de reconhecimento de fala"""
+
+    name = "base"
+
+    def __init__(self):
+        self.loaded = False
+
+    def load(self) -> None:
+        """Carrega o modelo na memória"""
+        self.loaded = True
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, sample_rate: int, language: str = "pt") -> str:
+        """Transcreve um trecho de áudio float32 mono"""
+
+    def transcribe_chunks(self, chunks: Iterable[np.ndarray], sample_rate: int, language: str = "pt") -> str:
+        """Transcreve trechos em sequência (ver audio_preprocess.iter_speech_chunks)"""
+        texts = [self.transcribe(chunk, sample_rate, language) for chunk in chunks]
+        return " ".join(text.strip() for text in texts if text.strip())
+
+    def info(self) -> Dict[str, Any]:
+        """Informações do backend para /status"""
+        return {"backend": self.name, "loaded": self.loaded}
+
+
+class StubSTTBackend(STTBackend):
+    """
+    Backend em memória para testes e ambientes sem modelo
+
+    Devolve as respostas programadas em ordem (ou um texto fixo) e registra
+    a duração de cada trecho recebido.
+    """
+
+    name = "stub"
+
+    def __init__(self, responses: Optional[Iterable[str]] = None, default_text: str = DEFAULT_STUB_TEXT):
+        super().__init__()
+        self.responses = deque(responses or [])
+        self.default_text = default_text
+        self.calls: List[float] = []
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int, language: str = "pt") -> str:
+        self.calls.append(audio.size / sample_rate)
+        return self.responses.popleft() if self.responses else self.default_text
+
+
+class WhisperBackend(STTBackend):
+    """Backend faster-whisper (CTranslate2), executado em CPU com int8"""
+
+    name = "whisper"
+
+    def __init__(self, model: Optional[str] = None):
+        super().__init__()
+        self.model_name = model or config.stt.model
+        self.model = None
+
+    def load(self) -> None:
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(self.model_name, device="cpu", compute_type="int8")
+        self.loaded = True
+        logger.info(f"Whisper model {self.model_name} loaded")
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int, language: str = "pt") -> str:
+        if sample_rate != 16000:
+            raise ValueError("Whisper espera áudio a 16 kHz")
+        # VAD já aplicado no preprocessamento
+        segments, _ = self.model.transcribe(audio, language=language, vad_filter=False)
+        return " ".join(segment.text.strip() for segment in segments)
+
+    def info(self) -> Dict[str, Any]:
+        info = super().info()
+        info["model"] = self.model_name
+        return info
+
+
+# Registro de backends disponíveis
+STT_BACKENDS: Dict[str, Callable[..., STTBackend]] = {
+    "stub": StubSTTBackend,
+    "whisper": WhisperBackend,
+}
+
+
+def create_stt_backend(name: Optional[str] = None, **kwargs) -> STTBackend:
+    """Cria um backend pelo nome (padrão: config.stt.backend)"""
+    name = name or config.stt.backend
+    if name not in STT_BACKENDS:
+        raise ValueError(f"STT_BACKEND inválido: {name} (use {', '.join(STT_BACKENDS)})")
+    return STT_BACKENDS[name](**kwargs)
@@ -0,0 +1,421 @@
+# ================================
+# GODOFREDA TRACING
+# ================================
+# Tracing leve por requisição: spans com duração e atributos propagados
+# por contextvars (atravessam asyncio.to_thread e tasks filhas), amostragem
+# na entrada e exportadores em memória (ring buffer), JSONL e OTLP/HTTP
+# ================================
+
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Deque, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("godofreda_current_span", default=None)
+
+
+class Span:
+    """Trecho cronometrado de uma requisição (epoch em ns, compatível com OTLP)"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error", "token")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any],
+                 start_ns: Optional[int] = None):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.token: Optional[Token] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        if self.end_ns is None:
+            self.end_ns = end_ns if end_ns is not None else time.time_ns()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Spans de uma requisição amostrada (limitados para lotes grandes)"""
+
+    __slots__ = ("trace_id", "spans", "dropped", "max_spans")
+
+    def __init__(self, max_spans: int):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.max_spans = max_spans
+
+    def add(self, span: Span) -> bool:
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return False
+        self.spans.append(span)
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        root = self.spans[0]
+        return {
+            "trace_id": self.trace_id,
+            "name": root.name,
+            "start_ns": root.start_ns,
+            "duration_ms": round(root.duration_ms, 3),
+            "error": root.error,
+            "dropped_spans": self.dropped,
+            "spans": [span.to_dict() for span in self.spans if span.end_ns is not None],
+        }
+
+
+class _NoopSpanContext:
+    """Contexto devolvido fora de traces amostrados: custo de uma checagem"""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+_NOOP = _NoopSpanContext()
+
+
+class _SpanContext:
+    def __init__(self, span: Span, activate: bool):
+        self.span = span
+        self.activate = activate
+        self.token: Optional[Token] = None
+
+    def __enter__(self) -> Span:
+        if self.activate:
+            self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        if exc_type is not None and issubclass(exc_type, (GeneratorExit, asyncio.CancelledError)):
+            # Cliente desconectou ou a resposta foi interrompida (barge-in)
+            self.span.attributes["cancelled"] = True
+        elif exc is not None and self.span.error is None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.span.end()
+        if self.token is not None:
+            _current_span.reset(self.token)
+        return False
+
+
+# ================================
+# EXPORTADORES
+# ================================
+class TraceExporter(ABC):
+    """Recebe cada trace concluído (já serializado com ``Trace.to_dict``)"""
+
+    name = "base"
+
+    @abstractmethod
+    def export(self, trace: Dict[str, Any]) -> None:
+        """Chamado no event loop: não pode bloquear"""
+
+    def close(self) -> None:
+        pass
+
+
+class RingBufferExporter(TraceExporter):
+    """Últimos traces em memória, consultáveis por /admin/traces"""
+
+    name = "memory"
+
+    def __init__(self, size: int = 200):
+        self.traces: Deque[Dict[str, Any]] = deque(maxlen=size)
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        self.traces.append(trace)
+
+    def recent(self, limit: int = 20, min_duration_ms: float = 0.0, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Resumo dos traces mais recentes (sem os spans), filtrados por duração e nome"""
+        result = []
+        for trace in reversed(self.traces):
+            if trace["duration_ms"] < min_duration_ms or (name and name not in trace["name"]):
+                continue
+            result.append({key: value for key, value in trace.items() if key != "spans"})
+            if len(result) >= limit:
+                break
+        return result
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for trace in reversed(self.traces):
+            if trace["trace_id"] == trace_id:
+                return trace
+        return None
+
+
+class ThreadedExporter(TraceExporter):
+    """
+    Exportador com fila e thread própria: I/O fora do event loop
+
+    A fila é limitada; com o destino lento ou fora do ar, os traces
+    excedentes são descartados (contados em ``dropped``) em vez de
+    acumular memória.
+    """
+
+    def __init__(self, batch_size: int = 64, flush_interval: float = 2.0, max_queue: int = 2048):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name=f"trace-export-{self.name}", daemon=True)
+        self.thread.start()
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = {}
+            if item:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                try:
+                    self.write(batch)
+                except Exception as e:
+                    logger.warning(f"Trace exporter {self.name} failed ({len(batch)} traces dropped): {e}")
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+            if item is None:
+                return
+
+    @abstractmethod
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        """Grava um lote (executado na thread do exportador)"""
+
+
+class JSONLExporter(ThreadedExporter):
+    """Um trace por linha em um arquivo JSONL (para jq, pandas, etc.)"""
+
+    name = "jsonl"
+
+    def __init__(self, path: str, **kwargs: Any):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for trace in batch:
+                f.write(json.dumps(trace, ensure_ascii=False, default=str) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces: List[Dict[str, Any]], service_name: str) -> Dict[str, Any]:
+    """Traces no formato OTLP/HTTP JSON (``ExportTraceServiceRequest``)"""
+    spans = []
+    for trace in traces:
+        for span in trace["spans"]:
+            otlp_span = {
+                "traceId": trace["trace_id"],
+                "spanId": span["span_id"],
+                "name": span["name"],
+                "kind": 1 if span["parent_id"] else 2,  # INTERNAL ou SERVER (raiz)
+                "startTimeUnixNano": str(span["start_ns"]),
+                "endTimeUnixNano": str(span["start_ns"] + int(span["duration_ms"] * 1e6)),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span["attributes"].items()],
+                "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+            }
+            if span["parent_id"]:
+                otlp_span["parentSpanId"] = span["parent_id"]
+            spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{"scope": {"name": "godofreda"}, "spans": spans}],
+    }]}
+
+
+class OTLPExporter(ThreadedExporter):
+    """Envia lotes para um coletor OTLP/HTTP (ex.: http://otel-collector:4318/v1/traces)"""
+
+    name = "otlp"
+
+    def __init__(self, endpoint: str, service_name: str = "godofreda-api", timeout: float = 5.0, **kwargs: Any):
+        import httpx
+
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=timeout)
+        super().__init__(**kwargs)
+
+    def write(self, batch: List[Dict[str, Any]]) -> None:
+        response = self.client.post(self.endpoint, json=to_otlp(batch, self.service_name))
+        response.raise_for_status()
+
+    def close(self) -> None:
+        super().close()
+        self.client.close()
+
+
+# ================================
+# TRACER
+# ================================
+class Tracer:
+    """
+    Abre traces amostrados e spans filhos a partir do span corrente
+
+    Fora de um trace amostrado, ``span`` devolve um contexto vazio
+    compartilhado: o custo por estágio é o de ler uma contextvar.
+
+    Args:
+        sample_rate: fração das requisições rastreadas (0 desativa)
+        exporters: destinos dos traces concluídos
+        max_spans: spans guardados por trace
+    """
+
+    def __init__(self, sample_rate: float = 0.01, exporters: Optional[List[TraceExporter]] = None,
+                 max_spans: int = 256):
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters or [])
+        self.max_spans = max_spans
+        self.started = 0
+        self.ring = next((e for e in self.exporters if isinstance(e, RingBufferExporter)), None)
+
+    def should_sample(self, force: bool = False) -> bool:
+        if force:
+            return True
+        return self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def start_trace(self, name: str, /, force: bool = False, **attributes: Any) -> Optional[Span]:
+        """Span raiz de uma requisição, ou None se não amostrada; terminar com ``finish_trace``"""
+        if not self.should_sample(force):
+            return None
+        trace = Trace(self.max_spans)
+        root = Span(trace, name, None, attributes)
+        trace.add(root)
+        root.token = _current_span.set(root)
+        self.started += 1
+        return root
+
+    def finish_trace(self, root: Span) -> None:
+        if root.token is not None:
+            _current_span.reset(root.token)
+            root.token = None
+        root.end()
+        exported = root.trace.to_dict()
+        for exporter in self.exporters:
+            try:
+                exporter.export(exported)
+            except Exception as e:
+                logger.warning(f"Trace exporter {exporter.name} failed: {e}")
+
+    def span(self, name: str, /, activate: bool = True, **attributes: Any) -> Any:
+        """
+        Span filho do corrente (``with tracer.span("x") as span``; span é None sem trace)
+
+        ``activate=False`` registra o span sem torná-lo o corrente; use em
+        geradores assíncronos, cujo corpo intercala com o código do consumidor.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return _NOOP
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        if not parent.trace.add(span):
+            return _NOOP
+        return _SpanContext(span, activate)
+
+    def add_span(self, name: str, seconds: float, /, end_ns: Optional[int] = None, **attributes: Any) -> None:
+        """Span já concluído, medido por fora (ex.: tempos reportados pelo Ollama)"""
+        parent = _current_span.get()
+        if parent is None:
+            return
+        end = end_ns if end_ns is not None else time.time_ns()
+        span = Span(parent.trace, name, parent.span_id, attributes, start_ns=end - int(seconds * 1e9))
+        span.end(end)
+        parent.trace.add(span)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "traces_started": self.started,
+            "exporters": [exporter.name for exporter in self.exporters],
+            "dropped": {e.name: e.dropped for e in self.exporters if isinstance(e, ThreadedExporter)},
+        }
+
+    def close(self) -> None:
+        for exporter in self.exporters:
+            exporter.close()
+
+
+def current_span() -> Optional[Span]:
+    """Span corrente (None fora de um trace amostrado)"""
+    return _current_span.get()
+
+
+def create_tracer() -> Tracer:
+    """Tracer com os exportadores configurados em config.tracing"""
+    cfg = config.tracing
+    exporters: List[TraceExporter] = []
+    if cfg.ring_size > 0:
+        exporters.append(RingBufferExporter(cfg.ring_size))
+    if cfg.jsonl_path:
+        exporters.append(JSONLExporter(cfg.jsonl_path))
+    if cfg.otlp_endpoint:
+        exporters.append(OTLPExporter(cfg.otlp_endpoint, cfg.service_name))
+    return Tracer(cfg.sample_rate, exporters, cfg.max_spans)
+
+
+# Instância global (threads dos exportadores só existem se configurados)
+tracer = create_tracer()
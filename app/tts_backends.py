@@ -0,0 +1,298 @@
+# ================================
+# GODOFREDA TTS BACKENDS
+# ================================
+# Interface comum para engines de síntese de voz e implementações
+# Coqui TTS (PyTorch) e ONNX Runtime (CPU)
+# ================================
+
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from audio_utils import to_float32
+from config import config
+from cpu_topology import inference_layout
+from tts_parallel import split_sentences
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TEXT = "Olá, tudo bem?"
+
+# Tamanho dos trechos no streaming padrão por sentença
+STREAM_CHUNK_CHARS = 120
+
+
+class TTSBackend(ABC):
+    """Interface de uma engine de síntese de voz"""
+
+    name = "base"
+
+    def __init__(self):
+        self.sample_rate = 0
+        self.loaded = False
+
+    def import_dependencies(self) -> None:
+        """Importa as bibliotecas pesadas da engine (medido à parte no startup)"""
+
+    @abstractmethod
+    def load(self) -> None:
+        """Carrega o modelo na memória"""
+
+    @abstractmethod
+    def synthesize(self, text: str, language: str = "pt", speaker: Optional[str] = None) -> np.ndarray:
+        """
+        Sintetiza texto completo
+
+        Returns:
+            Amostras float32 mono em ``self.sample_rate``
+        """
+
+    def synthesize_stream(self, text: str, language: str = "pt",
+                          speaker: Optional[str] = None) -> Iterator[np.ndarray]:
+        """Sintetiza em trechos, entregando cada um assim que fica pronto"""
+        for chunk in split_sentences(text, STREAM_CHUNK_CHARS):
+            yield self.synthesize(chunk, language, speaker)
+
+    def warmup(self) -> float:
+        """
+        Executa uma síntese curta para aquecer caches e alocadores
+
+        Returns:
+            Duração do aquecimento em segundos
+        """
+        start = time.perf_counter()
+        self.synthesize(WARMUP_TEXT, "pt", config.tts.default_speaker)
+        elapsed = time.perf_counter() - start
+        logger.info(f"TTS backend {self.name} warmed up in {elapsed:.2f}s")
+        return elapsed
+
+    def freeze(self) -> None:
+        """Prepara o modelo carregado para ser compartilhado entre processos"""
+
+    def info(self) -> Dict[str, Any]:
+        """Informações do backend para /status"""
+        return {"backend": self.name, "loaded": self.loaded, "sample_rate": self.sample_rate}
+
+
+class CoquiBackend(TTSBackend):
+    """Backend Coqui TTS (TTS.api.TTS) com store de vozes e runtime int8"""
+
+    name = "coqui"
+
+    def __init__(self, model_name: Optional[str] = None, self_check: Optional[bool] = None,
+                 runtime: Optional[str] = None):
+        super().__init__()
+        self.model_name = model_name or config.tts.model
+        self.self_check = self_check
+        self.runtime = runtime
+        self.tts = None
+        # Store de vozes do modelo; None quando o modelo não é XTTS
+        self.voices = None
+        # Modo de runtime efetivo deste modelo (apply_runtime)
+        self.runtime_report: Optional[Dict[str, Any]] = None
+
+    def import_dependencies(self) -> None:
+        import TTS.api  # noqa: F401 (torch e o Coqui TTS)
+
+    def load(self) -> None:
+        """Carrega o modelo Coqui, vozes em cache e aplica o runtime"""
+        from TTS.api import TTS
+        from tts_runtime import apply_runtime
+        from voice_store import store_for, xtts_model
+
+        self.tts = TTS(model_name=self.model_name)
+        self.sample_rate = self.tts.synthesizer.output_sample_rate
+
+        # Só o XTTS usa latentes: carregar os deste modelo e garantir o speaker padrão
+        if xtts_model(self.tts) is not None:
+            self.voices = store_for(self.model_name)
+            self.voices.load_all()
+            self.voices.ensure_builtin(config.tts.default_speaker, self.tts)
+
+        # Aplicar modo de runtime (fp32 ou int8 com auto-verificação)
+        self.runtime_report = apply_runtime(self.tts, mode=self.runtime, self_check=self.self_check,
+                                            voices=self.voices)
+        self.loaded = True
+
+    def synthesize(self, text: str, language: str = "pt", speaker: Optional[str] = None) -> np.ndarray:
+        """Sintetiza usando latentes em cache quando o modelo é XTTS e a voz está no store"""
+        from tts_runtime import inference_context
+
+        speaker = speaker or config.tts.default_speaker
+        if self.voices is not None and self.voices.has(speaker):
+            audio, _ = self.voices.synthesize(self.tts, text, language, speaker)
+            return audio
+
+        with inference_context():
+            wav = self.tts.tts(text=text, language=language, speaker=speaker)
+        return to_float32(wav)
+
+    def synthesize_stream(self, text: str, language: str = "pt",
+                          speaker: Optional[str] = None) -> Iterator[np.ndarray]:
+        """Usa o streaming nativo do XTTS quando a voz está no store"""
+        speaker = speaker or config.tts.default_speaker
+        if self.voices is not None and self.voices.has(speaker):
+            yield from self.voices.synthesize_stream(self.tts, text, language, speaker)
+        else:
+            yield from super().synthesize_stream(text, language, speaker)
+
+    def freeze(self) -> None:
+        """Modo avaliação sem gradientes: nenhuma escrita nos pesos após o fork"""
+        model = self.tts.synthesizer.tts_model
+        model.eval()
+        for parameter in model.parameters():
+            parameter.requires_grad_(False)
+
+    def register_voice(self, name: str, reference_paths: List[str]) -> None:
+        """Registra uma voz de referência no store do modelo"""
+        if self.voices is None:
+            raise ValueError("Modelo TTS atual não suporta vozes de referência")
+        self.voices.register(name, reference_paths, self.tts)
+
+    def info(self) -> Dict[str, Any]:
+        info = super().info()
+        info.update({"model": self.model_name, "runtime": self.runtime_report})
+        return info
+
+
+class OnnxBackend(TTSBackend):
+    """
+    Backend ONNX Runtime (CPUExecutionProvider)
+
+    Executa grafos exportados com ``Vits.export_onnx`` do Coqui. O diretório
+    do modelo deve conter ``model.onnx`` e o ``config.json`` do treino, usado
+    para tokenização; ``speakers.json`` (nome -> id) é opcional.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: Optional[str] = None):
+        super().__init__()
+        self.model_dir = model_dir or config.tts.onnx_model_dir
+        self.session = None
+        self.tokenizer = None
+        self.input_names: List[str] = []
+        self.speakers: Dict[str, int] = {}
+        # noise_scale, length_scale, noise_scale_dp
+        self.scales = np.array([0.667, 1.0, 0.8], dtype=np.float32)
+
+    def import_dependencies(self) -> None:
+        try:
+            import onnxruntime  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("onnxruntime não está instalado (necessário para TTS_BACKEND=onnx)") from e
+        import TTS.tts.utils.text.tokenizer  # noqa: F401
+
+    def load(self) -> None:
+        """Cria a sessão ONNX Runtime com threads do layout de inferência"""
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("onnxruntime não está instalado (necessário para TTS_BACKEND=onnx)") from e
+        from TTS.config import load_config
+        from TTS.tts.utils.text.tokenizer import TTSTokenizer
+
+        model_config = load_config(os.path.join(self.model_dir, "config.json"))
+        self.tokenizer, _ = TTSTokenizer.init_from_config(model_config)
+        self.sample_rate = model_config.audio.sample_rate
+
+        speakers_path = os.path.join(self.model_dir, "speakers.json")
+        if os.path.exists(speakers_path):
+            with open(speakers_path) as f:
+                self.speakers = json.load(f)
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = inference_layout.intra_op_threads
+        options.inter_op_num_threads = inference_layout.interop_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(
+            os.path.join(self.model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.loaded = True
+        logger.info(f"ONNX TTS model loaded from {self.model_dir}")
+
+    def synthesize(self, text: str, language: str = "pt", speaker: Optional[str] = None) -> np.ndarray:
+        """Tokeniza e executa o grafo ONNX"""
+        ids = np.asarray(self.tokenizer.text_to_ids(text, language=language), dtype=np.int64)[None, :]
+        inputs = {
+            "input": ids,
+            "input_lengths": np.array([ids.shape[1]], dtype=np.int64),
+            "scales": self.scales
+        }
+        if "sid" in self.input_names:
+            inputs["sid"] = np.array([self.speakers.get(speaker or "", 0)], dtype=np.int64)
+
+        audio = self.session.run(None, inputs)[0]
+        return to_float32(audio)
+
+    def info(self) -> Dict[str, Any]:
+        info = super().info()
+        info["model_dir"] = self.model_dir
+        return info
+
+
+class RemoteBackend(TTSBackend):
+    """Backend que delega a síntese ao servidor de inferência local"""
+
+    name = "remote"
+
+    def __init__(self, address: Optional[str] = None):
+        super().__init__()
+        self.address = address or config.inference.server_address
+        self.client = None
+        self.remote_info: Dict[str, Any] = {}
+
+    def load(self) -> None:
+        """Conecta ao servidor e obtém o sample rate do modelo remoto"""
+        from inference_client import InferenceClient
+
+        self.client = InferenceClient(self.address)
+        self.remote_info = self.client.info()
+        self.sample_rate = self.remote_info["sample_rate"]
+        self.loaded = True
+        logger.info(f"Remote TTS backend connected to {self.address} ({self.remote_info.get('backend')})")
+
+    def synthesize(self, text: str, language: str = "pt", speaker: Optional[str] = None) -> np.ndarray:
+        return self.client.synthesize(text, language, speaker)
+
+    def synthesize_stream(self, text: str, language: str = "pt",
+                          speaker: Optional[str] = None) -> Iterator[np.ndarray]:
+        return self.client.synthesize_stream(text, language, speaker)
+
+    def warmup(self) -> float:
+        """O servidor já aquece o modelo; aqui só medimos a ida e volta (consulta de info, sem síntese)"""
+        start = time.perf_counter()
+        self.remote_info = self.client.info()
+        elapsed = time.perf_counter() - start
+        logger.info(f"Remote TTS backend round trip to {self.address}: {elapsed * 1000:.1f}ms")
+        return elapsed
+
+    def info(self) -> Dict[str, Any]:
+        info = super().info()
+        info.update({"address": self.address, "remote": self.remote_info})
+        return info
+
+
+# Registro de backends disponíveis
+BACKENDS: Dict[str, Callable[..., TTSBackend]] = {
+    "coqui": CoquiBackend,
+    "onnx": OnnxBackend,
+    "remote": RemoteBackend,
+}
+
+
+def create_backend(name: Optional[str] = None, **kwargs) -> TTSBackend:
+    """Cria um backend pelo nome (padrão: config.tts.backend)"""
+    name = name or config.tts.backend
+    if name not in BACKENDS:
+        raise ValueError(f"TTS_BACKEND inválido: {name} (use {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
@@ -0,0 +1,205 @@
+# ================================
+# GODOFREDA PARALLEL TTS
+# ================================
+# Síntese de textos longos dividida por sentenças e distribuída
+# entre processos dedicados, cada um com seu próprio modelo TTS
+# ================================
+
+import asyncio
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from audio_utils import concat_audio
+from config import config
+from cpu_topology import PoolLayout, apply_worker_layout, inference_layout
+
+logger = logging.getLogger(__name__)
+
+# Fim de sentença: pontuação final seguida de espaço
+_SENTENCE_END = re.compile(r'(?<=[.!?…;])\s+')
+
+# Pausa inserida entre trechos ao juntar o áudio
+CHUNK_GAP_SECONDS = 0.12
+
+
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """Quebra uma sentença maior que o limite em pedaços por palavras"""
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    pieces: List[str] = []
+    current = ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_sentences(text: str, max_chars: int) -> List[str]:
+    """
+    Divide texto em trechos alinhados a fins de sentença
+
+    Sentenças curtas consecutivas são agrupadas até ``max_chars`` para
+    evitar chamadas ao modelo com poucas palavras.
+
+    Args:
+        text: Texto completo
+        max_chars: Tamanho máximo de cada trecho
+
+    Returns:
+        Lista de trechos na ordem original
+    """
+    chunks: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for piece in _split_long_sentence(sentence, max_chars):
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ================================
+# PROCESSO WORKER
+# ================================
+_worker_backend = None
+
+
+def _init_worker(backend_name: str, runtime_mode: str, layout: PoolLayout, slots) -> None:
+    """
+    Aplica o layout de CPU do slot livre e carrega o backend TTS no worker
+
+    ``runtime_mode`` é o modo efetivo do processo principal: se a
+    auto-verificação int8 falhou lá, os workers também ficam em fp32.
+    """
+    global _worker_backend
+    from tts_backends import create_backend
+
+    try:
+        slot = slots.get_nowait()
+    except Exception:
+        slot = -1
+    apply_worker_layout(layout.intra_op_threads, layout.interop_threads, layout.core_set(slot))
+
+    # A auto-verificação do runtime int8 já roda no processo principal
+    kwargs = {"self_check": False, "runtime": runtime_mode} if backend_name == "coqui" else {}
+    _worker_backend = create_backend(backend_name, **kwargs)
+    _worker_backend.load()
+
+
+def _synthesize_chunk(text: str, language: str, speaker: Optional[str]) -> Tuple[np.ndarray, int]:
+    """Sintetiza um trecho no processo worker"""
+    audio = _worker_backend.synthesize(text, language, speaker)
+    return audio, _worker_backend.sample_rate
+
+
+class ParallelSynthesizer:
+    """Sintetizador de textos longos usando um pool de processos"""
+
+    def __init__(self, layout: PoolLayout = inference_layout):
+        self.backend_name = config.tts.backend
+        self.layout = layout
+        self.max_parallel_per_request = config.tts.long_text_max_parallel
+        self.threshold = config.tts.long_text_threshold
+        self.chunk_chars = config.tts.long_text_chunk_chars
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Indica se o modo de texto longo está habilitado"""
+        return config.tts.long_text_enabled
+
+    def should_use(self, text: str) -> bool:
+        """Decide se o texto deve ir para o pool de processos"""
+        return self._executor is not None and len(text) >= self.threshold
+
+    def start(self, runtime_mode: Optional[str] = None) -> None:
+        """
+        Inicia o pool de processos (cada worker carrega o modelo)
+
+        ``runtime_mode``: modo efetivo do modelo já carregado no processo
+        principal (padrão: config.tts.runtime)
+        """
+        if not self.enabled or self._executor is not None:
+            return
+
+        # spawn evita herdar estado do torch/threads do processo principal
+        context = multiprocessing.get_context("spawn")
+
+        # Cada worker retira um slot para saber seu conjunto de cores
+        slots = context.Queue()
+        for slot in range(self.layout.workers):
+            slots.put(slot)
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.layout.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.backend_name, runtime_mode or config.tts.runtime, self.layout, slots)
+        )
+        logger.info(
+            f"Parallel TTS pool started: {self.layout.workers} workers, "
+            f"{self.layout.intra_op_threads} torch threads each, pinned={self.layout.pinned}"
+        )
+
+    def stop(self) -> None:
+        """Encerra o pool de processos"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Parallel TTS pool stopped")
+
+    async def synthesize(self, text: str, language: str, speaker: Optional[str]) -> Tuple[np.ndarray, int]:
+        """
+        Sintetiza texto longo em paralelo
+
+        Args:
+            text: Texto completo
+            language: Idioma da síntese
+            speaker: Speaker do modelo
+
+        Returns:
+            Tuple[np.ndarray, int]: (amostras float32, sample rate)
+        """
+        if self._executor is None:
+            raise RuntimeError("Parallel TTS pool not started")
+
+        chunks = split_sentences(text, self.chunk_chars)
+        loop = asyncio.get_running_loop()
+
+        # Limite por requisição para que poucos textos longos não ocupem todo o pool
+        semaphore = asyncio.Semaphore(self.max_parallel_per_request)
+
+        async def run_chunk(chunk: str) -> Tuple[np.ndarray, int]:
+            async with semaphore:
+                return await loop.run_in_executor(
+                    self._executor, _synthesize_chunk, chunk, language, speaker
+                )
+
+        results = await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        sample_rate = results[0][1] if results else 0
+        audio = concat_audio([wav for wav, _ in results], sample_rate, CHUNK_GAP_SECONDS)
+
+        logger.debug(f"Parallel TTS synthesized {len(chunks)} chunks")
+        return audio, sample_rate
+
+
+# Instância global do sintetizador paralelo
+parallel_synthesizer = ParallelSynthesizer()
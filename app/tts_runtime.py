@@ -0,0 +1,198 @@
+# ================================
+# GODOFREDA TTS RUNTIME
+# ================================
+# Modo de execução otimizado para CPU: quantização dinâmica int8,
+# torch.inference_mode e auto-verificação de qualidade na inicialização
+# ================================
+
+import copy
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from audio_utils import to_float32
+from config import config
+
+logger = logging.getLogger(__name__)
+
+RUNTIME_MODES = ("fp32", "int8")
+
+# Frases fixas usadas para comparar fp32 e int8
+SELF_CHECK_PHRASES = [
+    "Olá, eu sou a Godofreda.",
+    "Você realmente acha que isso é uma pergunta inteligente?",
+    "Analisando os dados com minha inteligência superior, a resposta é simples.",
+]
+
+SELF_CHECK_SEED = 1234
+
+
+@contextmanager
+def inference_context() -> Iterator[None]:
+    """Contexto de inferência sem autograd nem version counters"""
+    import torch
+    with torch.inference_mode():
+        yield
+
+
+def _conv1d_to_linear(module: Any) -> int:
+    """
+    Troca camadas Conv1D do GPT-2 (transformers) por nn.Linear equivalentes
+
+    O GPT do XTTS usa Conv1D, que a quantização dinâmica não reconhece;
+    a conversão deixa atenção e MLP do transformer elegíveis para int8.
+
+    Returns:
+        Número de camadas convertidas
+    """
+    import torch
+
+    converted = 0
+    for name, child in module.named_children():
+        if type(child).__name__ == "Conv1D" and hasattr(child, "nf"):
+            linear = torch.nn.Linear(child.weight.shape[0], child.nf)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+            converted += 1
+        else:
+            converted += _conv1d_to_linear(child)
+    return converted
+
+
+def quantize_model(model: Any) -> Any:
+    """Aplica quantização dinâmica int8 nas camadas lineares do modelo"""
+    import torch
+
+    converted = _conv1d_to_linear(model)
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    logger.info(f"Dynamic int8 quantization applied ({converted} Conv1D layers converted to Linear)")
+    return quantized
+
+
+def long_term_spectral_distance(reference: np.ndarray, candidate: np.ndarray,
+                                n_fft: int = 1024, hop: int = 256) -> float:
+    """
+    Distância (dB) entre os espectros médios de dois áudios
+
+    Compara o timbre médio em vez de alinhar amostra a amostra, já que
+    a amostragem do XTTS não gera formas de onda idênticas entre execuções.
+    """
+    def mean_log_spectrum(audio: np.ndarray) -> np.ndarray:
+        audio = to_float32(audio)
+        if audio.size < n_fft:
+            audio = np.pad(audio, (0, n_fft - audio.size))
+        frames = np.lib.stride_tricks.sliding_window_view(audio, n_fft)[::hop]
+        magnitude = np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1))
+        return 20.0 * np.log10(magnitude.mean(axis=0) + 1e-8)
+
+    difference = mean_log_spectrum(reference) - mean_log_spectrum(candidate)
+    return float(np.sqrt(np.mean(difference ** 2)))
+
+
+def _synthesize(tts: Any, text: str, speaker: str, voices: Any = None) -> Tuple[np.ndarray, int]:
+    """Sintetiza uma frase com semente fixa para a auto-verificação"""
+    import torch
+
+    torch.manual_seed(SELF_CHECK_SEED)
+    if voices is not None and voices.has(speaker):
+        return voices.synthesize(tts, text, "pt", speaker)
+    with inference_context():
+        wav = tts.tts(text=text, language="pt", speaker=speaker)
+    return to_float32(wav), tts.synthesizer.output_sample_rate
+
+
+def _measure(tts: Any, phrases: List[str], speaker: str, voices: Any = None) -> List[Dict[str, Any]]:
+    """Sintetiza as frases e mede o fator de tempo real (RTF)"""
+    results = []
+    for phrase in phrases:
+        start = time.perf_counter()
+        audio, sample_rate = _synthesize(tts, phrase, speaker, voices)
+        elapsed = time.perf_counter() - start
+        audio_seconds = audio.size / sample_rate if sample_rate else 0.0
+        results.append({
+            "audio": audio,
+            "rtf": elapsed / audio_seconds if audio_seconds else None,
+            "audio_seconds": audio_seconds
+        })
+    return results
+
+
+def _mean_rtf(results: List[Dict[str, Any]]) -> Optional[float]:
+    """RTF médio de uma rodada de medições"""
+    values = [r["rtf"] for r in results if r["rtf"] is not None]
+    return round(sum(values) / len(values), 3) if values else None
+
+
+def apply_runtime(tts: Any, mode: Optional[str] = None, self_check: Optional[bool] = None,
+                  voices: Any = None) -> Dict[str, Any]:
+    """
+    Aplica o modo de runtime configurado ao modelo carregado
+
+    Args:
+        tts: Instância TTS.api.TTS já carregada
+        mode: "fp32" ou "int8" (padrão: config.tts.runtime)
+        self_check: Comparar int8 com fp32 antes de ativar (padrão: config)
+        voices: Store de vozes do modelo (XTTS), usado nas frases de verificação
+
+    Returns:
+        Relatório com modo efetivo, RTF e distância espectral por frase
+        (cada backend guarda o seu; vários modelos podem estar carregados)
+    """
+    mode = mode or config.tts.runtime
+    self_check = config.tts.runtime_self_check if self_check is None else self_check
+    if mode not in RUNTIME_MODES:
+        raise ValueError(f"TTS_RUNTIME inválido: {mode} (use {', '.join(RUNTIME_MODES)})")
+
+    synthesizer = tts.synthesizer
+    model = synthesizer.tts_model
+    model.eval()
+
+    if mode == "fp32":
+        return {"mode": "fp32", "self_check": None}
+
+    speaker = config.tts.default_speaker
+    baseline = None
+    fp32_model = None
+    if self_check:
+        baseline = _measure(tts, SELF_CHECK_PHRASES, speaker, voices)
+        fp32_model = copy.deepcopy(model)
+
+    quantize_model(model)
+
+    if not self_check:
+        return {"mode": "int8", "self_check": None}
+
+    quantized = _measure(tts, SELF_CHECK_PHRASES, speaker, voices)
+    phrases = []
+    for phrase, ref, cand in zip(SELF_CHECK_PHRASES, baseline, quantized):
+        phrases.append({
+            "phrase": phrase,
+            "rtf_fp32": round(ref["rtf"], 3) if ref["rtf"] else None,
+            "rtf_int8": round(cand["rtf"], 3) if cand["rtf"] else None,
+            "spectral_distance_db": round(long_term_spectral_distance(ref["audio"], cand["audio"]), 2),
+            "duration_ratio": round(cand["audio_seconds"] / ref["audio_seconds"], 3) if ref["audio_seconds"] else None
+        })
+
+    worst = max(p["spectral_distance_db"] for p in phrases)
+    passed = worst <= config.tts.runtime_max_distance_db
+    report = {
+        "passed": passed,
+        "max_spectral_distance_db": worst,
+        "threshold_db": config.tts.runtime_max_distance_db,
+        "rtf_fp32": _mean_rtf(baseline),
+        "rtf_int8": _mean_rtf(quantized),
+        "phrases": phrases
+    }
+
+    if passed:
+        logger.info(f"int8 runtime enabled: RTF {report['rtf_fp32']} -> {report['rtf_int8']}, distance {worst} dB")
+        return {"mode": "int8", "self_check": report}
+
+    # Qualidade abaixo do limite: volta para o modelo fp32 original
+    synthesizer.tts_model = fp32_model
+    logger.warning(f"int8 self-check failed ({worst} dB > {config.tts.runtime_max_distance_db} dB), keeping fp32")
+    return {"mode": "fp32", "self_check": report}
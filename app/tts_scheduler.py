@@ -0,0 +1,216 @@
+# ================================
+# GODOFREDA TTS SCHEDULER
+# ================================
+# Escalonador do modelo TTS com faixas de prioridade (interactive,
+# standard, bulk), menor-job-primeiro dentro da faixa e envelhecimento
+# para evitar inanição
+# ================================
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Penalidade fixa de cada faixa, em segundos de espera equivalentes.
+# Com envelhecimento de 1 s/s, um job bulk passa à frente de um
+# interactive recém-chegado depois de esperar ~60 s a mais.
+LANE_OFFSETS: Dict[str, float] = {
+    "interactive": 0.0,
+    "standard": 10.0,
+    "bulk": 60.0,
+}
+LANES = tuple(LANE_OFFSETS)
+
+# Peso da última medição na estimativa de segundos por caractere
+COST_EMA_ALPHA = 0.2
+
+
+class _Waiter:
+    """Requisição aguardando um slot do modelo"""
+
+    __slots__ = ("lane", "chars", "enqueued_at", "future")
+
+    def __init__(self, lane: str, chars: int, enqueued_at: float, future: asyncio.Future):
+        self.lane = lane
+        self.chars = chars
+        self.enqueued_at = enqueued_at
+        self.future = future
+
+
+class SlotLease:
+    """
+    Slot ocupado por uma requisição
+
+    Uma thread do modelo não para quando a requisição é cancelada
+    (desconexão do cliente, barge-in). ``run`` executa a chamada em uma
+    thread; se a espera for cancelada, ``defer`` adia as liberações (o
+    slot, o modelo em uso) até a thread terminar, e o limite de
+    concorrência continua valendo para as threads, não só para as
+    requisições. ``elapsed`` soma só o tempo das chamadas nas threads:
+    a espera do consumidor entre trechos e a carga de modelos não entram
+    na estimativa de custo do escalonador.
+    """
+
+    def __init__(self):
+        self._pending: Optional[asyncio.Future] = None
+        self.elapsed = 0.0
+
+    def _timed(self, func: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        future = asyncio.ensure_future(asyncio.to_thread(self._timed, func, *args))
+        self._pending = future
+        return await asyncio.shield(future)
+
+    def defer(self, callback: Callable[[], None]) -> None:
+        """Executa ``callback`` agora ou quando a thread em andamento terminar"""
+        pending = self._pending
+        if pending is None or pending.done():
+            callback()
+            return
+
+        def finished(future: asyncio.Future) -> None:
+            # Resultado de uma thread órfã: ninguém mais o lê
+            if not future.cancelled():
+                future.exception()
+            callback()
+
+        pending.add_done_callback(finished)
+
+
+class TTSScheduler:
+    """
+    Controla o acesso concorrente ao modelo TTS
+
+    A prioridade de um job é ``offset da faixa + custo estimado - aging * espera``.
+    Como o termo de espera cresce igualmente para todos os jobs, a ordem
+    relativa é fixa no enfileiramento: a chave do heap é
+    ``offset + custo + aging * instante de chegada``. Jobs de um modelo
+    fora da memória somam o custo da troca (``switch_cost``), então os de
+    modelos residentes passam na frente e a troca espera acumular fila.
+    """
+
+    def __init__(self, concurrency: Optional[int] = None, aging_rate: Optional[float] = None,
+                 seconds_per_char: Optional[float] = None,
+                 wait_observer: Optional[Callable[[str, float], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.concurrency = max(1, concurrency or config.tts.scheduler_concurrency)
+        self.aging_rate = config.tts.scheduler_aging_rate if aging_rate is None else aging_rate
+        self.seconds_per_char = seconds_per_char or config.tts.scheduler_seconds_per_char
+        self.wait_observer = wait_observer
+        self.clock = clock
+        self._heap: List[Any] = []
+        self._sequence = itertools.count()
+        self._running = 0
+        self._depth: Dict[str, int] = {lane: 0 for lane in LANES}
+
+    def estimate_cost(self, chars: int) -> float:
+        """Custo estimado (segundos) de sintetizar ``chars`` caracteres"""
+        return chars * self.seconds_per_char
+
+    def _observe_wait(self, lane: str, waited: float) -> None:
+        if self.wait_observer is not None:
+            self.wait_observer(lane, waited)
+
+    def _dispatch(self) -> None:
+        """Entrega slots livres aos jobs de menor chave"""
+        while self._running < self.concurrency and self._heap:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue  # cancelado enquanto esperava
+            self._depth[waiter.lane] -= 1
+            self._running += 1
+            waiter.future.set_result(None)
+            self._observe_wait(waiter.lane, self.clock() - waiter.enqueued_at)
+
+    async def acquire(self, lane: str, chars: int, switch_cost: float = 0.0) -> None:
+        """Espera um slot do modelo para um job da faixa ``lane``"""
+        if lane not in LANE_OFFSETS:
+            raise ValueError(f"Faixa inválida: {lane} (use {', '.join(LANES)})")
+
+        if self._running < self.concurrency and not self._heap:
+            self._running += 1
+            self._observe_wait(lane, 0.0)
+            return
+
+        now = self.clock()
+        key = LANE_OFFSETS[lane] + self.estimate_cost(chars) + switch_cost + self.aging_rate * now
+        waiter = _Waiter(lane, chars, now, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._heap, (key, next(self._sequence), waiter))
+        self._depth[lane] += 1
+        # Slots podem estar livres se só havia jobs cancelados no heap
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                self._depth[lane] -= 1
+            else:
+                # Slot já concedido quando o cancelamento chegou: devolver
+                self.release()
+            raise
+
+    def release(self, chars: int = 0, elapsed: Optional[float] = None) -> None:
+        """Libera o slot e atualiza a estimativa de custo com a duração medida"""
+        self._running -= 1
+        if chars > 0 and elapsed is not None:
+            observed = elapsed / chars
+            self.seconds_per_char += COST_EMA_ALPHA * (observed - self.seconds_per_char)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane: str, chars: int, switch_cost: float = 0.0,
+                   lease: Optional[SlotLease] = None) -> AsyncIterator[SlotLease]:
+        """
+        Contexto que ocupa um slot do modelo durante a síntese
+
+        Chamadas ao modelo passam por ``lease.run``: cancelada a requisição,
+        o slot só volta quando a thread termina. A estimativa de custo é
+        atualizada com o tempo dessas chamadas, não com o tempo de posse
+        do slot. ``lease`` permite criar o lease antes do slot, para que
+        outras liberações (o modelo em uso) também esperem a thread.
+        """
+        await self.acquire(lane, chars, switch_cost)
+        lease = lease or SlotLease()
+        try:
+            yield lease
+        except BaseException:
+            lease.defer(self.release)
+            raise
+        self.release(chars, lease.elapsed if lease.elapsed > 0 else None)
+
+    def queued(self) -> int:
+        """Jobs esperando um slot, em todas as faixas"""
+        return sum(self._depth.values())
+
+    def backlog_seconds(self) -> float:
+        """Estimativa do tempo para esvaziar a fila com os slots atuais"""
+        chars = sum(waiter.chars for _, _, waiter in self._heap if not waiter.future.done())
+        return self.estimate_cost(chars) / self.concurrency
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado atual para /status"""
+        return {
+            "concurrency": self.concurrency,
+            "running": self._running,
+            "queued": dict(self._depth),
+            "seconds_per_char": round(self.seconds_per_char, 5),
+            "aging_rate": self.aging_rate
+        }
+
+
+# Instância global do escalonador
+tts_scheduler = TTSScheduler()
@@ -0,0 +1,51 @@
+"""
+Godofreda TTS Worker
+Processo destacado que consome a fila de jobs e reutiliza o caminho de
+síntese da API (main.synthesize_wav). Vários workers podem rodar em
+paralelo, em outras máquinas inclusive, apontando para o mesmo Redis.
+
+Uso:
+    python tts_worker.py [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from config import config
+from job_queue import create_job_queue, run_worker
+
+logger = logging.getLogger(__name__)
+
+
+async def _main(concurrency: int) -> None:
+    # O worker sempre precisa do modelo, independente de TTS_LOAD_MODE
+    import main
+
+    await asyncio.to_thread(main.load_tts_backend)
+    if main.tts_backend is None:
+        raise SystemExit("TTS backend failed to load; worker not started")
+
+    queue = create_job_queue()
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    base_id = f"{socket.gethostname()}-{os.getpid()}"
+    await asyncio.gather(*(
+        run_worker(queue, main.JOB_HANDLERS, f"{base_id}-{index}", stop_event)
+        for index in range(concurrency)
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker da fila de jobs TTS")
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs processados simultaneamente")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=config.logging.format)
+    asyncio.run(_main(args.concurrency))
@@ -0,0 +1,303 @@
+# ================================
+# GODOFREDA UPLOAD SERVICE
+# ================================
+# Leitura de uploads multipart em streaming: limite de bytes aplicado
+# durante a recepção, tipo real detectado pelos magic bytes, hash
+# calculado no caminho e entrega sem cópia (memoryview / mmap)
+# ================================
+
+import hashlib
+import logging
+import mmap
+import tempfile
+from urllib.parse import parse_qsl
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Bytes necessários para identificar todos os formatos suportados
+SNIFF_BYTES = 16
+
+# Limite para campos de texto do formulário
+MAX_FIELD_BYTES = 64 * 1024
+MAX_PARTS = 16
+
+
+class UploadTooLarge(Exception):
+    """Upload excedeu o limite de bytes (HTTP 413)"""
+
+
+class UploadRejected(ValueError):
+    """Upload malformado ou de tipo não permitido (HTTP 400/415)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Identifica o tipo real do arquivo pelos primeiros bytes"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "audio/webm"  # EBML (Matroska/WebM): gravações do MediaRecorder
+    if head.startswith(b"ID3") or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    return None
+
+
+@dataclass
+class UploadedPart:
+    """
+    Arquivo recebido
+
+    ``data`` é um memoryview do buffer em memória ou de um mmap somente
+    leitura do arquivo temporário; nenhum estágio precisa copiar os bytes.
+    """
+    field_name: str
+    filename: Optional[str]
+    declared_type: Optional[str]
+    content_type: Optional[str]
+    size: int
+    sha256: str
+    data: memoryview
+    _mapped: Optional[mmap.mmap] = field(default=None, repr=False)
+    _file: Optional[object] = field(default=None, repr=False)
+
+    def close(self) -> None:
+        """Libera o buffer e remove o arquivo temporário"""
+        self.data.release()
+        if self._mapped is not None:
+            try:
+                self._mapped.close()
+            except BufferError:
+                # Ainda há fatias em uso; o mapeamento é liberado com elas
+                logger.warning(f"Upload buffer for {self.field_name} still referenced")
+        if self._file is not None:
+            self._file.close()
+
+
+class _PartWriter:
+    """Acumula uma parte em memória e passa para disco acima do limite de spool"""
+
+    def __init__(self, limit: int, spool_bytes: int):
+        self.limit = limit
+        self.spool_bytes = spool_bytes
+        self.size = 0
+        self.head = b""
+        self.hasher = hashlib.sha256()
+        self.buffer = bytearray()
+        self.file = None
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.limit:
+            raise UploadTooLarge(f"Arquivo excede o limite de {self.limit // (1024 * 1024)}MB")
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+        self.hasher.update(chunk)
+
+        if self.file is not None:
+            self.file.write(chunk)
+            return
+        self.buffer += chunk
+        if len(self.buffer) > self.spool_bytes:
+            self.file = tempfile.TemporaryFile(dir=config.file.upload_tmp_dir)
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+
+    def finish(self) -> Tuple[memoryview, Optional[mmap.mmap], Optional[object]]:
+        """Buffer final: memoryview em memória ou mmap do arquivo temporário"""
+        if self.file is None:
+            return memoryview(self.buffer), None, None
+        self.file.flush()
+        mapped = mmap.mmap(self.file.fileno(), self.size, prot=mmap.PROT_READ)
+        return memoryview(mapped), mapped, self.file
+
+    def discard(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+
+class StreamingFormParser:
+    """
+    Formulário multipart lido em streaming
+
+    Args:
+        file_types: campo de arquivo -> tipos MIME permitidos (pelo conteúdo)
+        max_file_size: limite por arquivo (padrão: config.file.max_file_size)
+    """
+
+    def __init__(self, file_types: Dict[str, List[str]], max_file_size: Optional[int] = None,
+                 spool_bytes: Optional[int] = None):
+        self.file_types = file_types
+        self.max_file_size = max_file_size or config.file.max_file_size
+        self.spool_bytes = spool_bytes or config.file.upload_spool_bytes
+        self.fields: Dict[str, str] = {}
+        self.files: Dict[str, UploadedPart] = {}
+        self._parts = 0
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name: Optional[str] = None
+        self._filename: Optional[str] = None
+        self._writer: Optional[_PartWriter] = None
+        self._field_data = bytearray()
+
+    # Callbacks do parser (síncronos; exceções interrompem a leitura)
+    def _on_part_begin(self) -> None:
+        self._parts += 1
+        if self._parts > MAX_PARTS:
+            raise UploadRejected("Formulário com partes demais")
+        self._headers = {}
+        self._name = None
+        self._filename = None
+        self._writer = None
+        self._field_data = bytearray()
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise UploadRejected("Parte sem nome no formulário")
+        self._name = options[b"name"].decode("utf-8", errors="replace")
+        if b"filename" in options:
+            if self._name not in self.file_types:
+                raise UploadRejected(f"Campo de arquivo inesperado: {self._name}")
+            self._filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._writer = _PartWriter(self.max_file_size, self.spool_bytes)
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._writer is not None:
+            self._writer.write(data[start:end])
+            return
+        self._field_data += data[start:end]
+        if len(self._field_data) > MAX_FIELD_BYTES:
+            raise UploadTooLarge(f"Campo {self._name} excede {MAX_FIELD_BYTES // 1024}KB")
+
+    def _on_part_end(self) -> None:
+        if self._writer is None:
+            self.fields[self._name] = self._field_data.decode("utf-8", errors="replace")
+            return
+
+        writer, self._writer = self._writer, None
+        if writer.size == 0:
+            writer.discard()
+            return  # campo de arquivo enviado vazio
+
+        sniffed = sniff_content_type(writer.head)
+        if sniffed not in self.file_types[self._name]:
+            writer.discard()
+            raise UploadRejected(
+                f"Tipo de arquivo não suportado em {self._name} (detectado: {sniffed or 'desconhecido'})",
+                status_code=415
+            )
+
+        data, mapped, temp_file = writer.finish()
+        previous = self.files.pop(self._name, None)
+        if previous is not None:
+            previous.close()  # campo repetido: vale o último arquivo
+        declared = self._headers.get(b"content-type")
+        self.files[self._name] = UploadedPart(
+            field_name=self._name,
+            filename=self._filename,
+            declared_type=declared.decode("latin-1") if declared else None,
+            content_type=sniffed,
+            size=writer.size,
+            sha256=writer.hasher.hexdigest(),
+            data=data,
+            _mapped=mapped,
+            _file=temp_file
+        )
+
+    def close(self) -> None:
+        """Libera todos os arquivos recebidos"""
+        if self._writer is not None:
+            self._writer.discard()
+        for part in self.files.values():
+            part.close()
+        self.files.clear()
+
+    async def _parse_urlencoded(self, body: AsyncIterator[bytes]) -> Dict[str, str]:
+        """Formulário só com campos de texto (sem arquivos)"""
+        data = bytearray()
+        async for chunk in body:
+            data += chunk
+            if len(data) > MAX_FIELD_BYTES:
+                raise UploadTooLarge(f"Formulário excede {MAX_FIELD_BYTES // 1024}KB")
+        self.fields = dict(parse_qsl(data.decode("utf-8", errors="replace"), keep_blank_values=True))
+        return self.fields
+
+    async def parse(self, content_type: Optional[str], content_length: Optional[str],
+                    body: AsyncIterator[bytes]) -> Tuple[Dict[str, str], Dict[str, UploadedPart]]:
+        """
+        Lê o corpo em streaming, abortando assim que um limite é excedido
+
+        Raises:
+            UploadTooLarge: arquivo, campo ou corpo acima do limite
+            UploadRejected: formulário malformado ou tipo não permitido
+        """
+        media_type, options = parse_options_header(content_type or "")
+        if media_type == b"application/x-www-form-urlencoded":
+            return await self._parse_urlencoded(body), self.files
+        if media_type != b"multipart/form-data" or b"boundary" not in options:
+            raise UploadRejected("Esperado multipart/form-data")
+
+        # Content-Length declarado acima do máximo possível: recusar sem ler
+        max_body = self.max_file_size * len(self.file_types) + MAX_FIELD_BYTES * MAX_PARTS
+        if content_length and content_length.isdigit() and int(content_length) > max_body:
+            raise UploadTooLarge("Requisição excede o tamanho máximo")
+
+        parser = MultipartParser(options[b"boundary"], callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+        received = 0
+        try:
+            async for chunk in body:
+                received += len(chunk)
+                if received > max_body:
+                    raise UploadTooLarge("Requisição excede o tamanho máximo")
+                if chunk:
+                    parser.write(chunk)
+            parser.finalize()
+        except (UploadTooLarge, UploadRejected):
+            self.close()
+            raise
+        except Exception as e:
+            self.close()
+            raise UploadRejected(f"Formulário multipart inválido: {e}")
+        return self.fields, self.files
@@ -0,0 +1,100 @@
+# ================================
+# GODOFREDA VISION BACKENDS
+# ================================
+# Modelos de visão plugáveis: recebem a imagem já preparada pelo
+# image_pipeline e devolvem uma descrição em texto
+# ================================
+
+import base64
+import logging
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from config import config
+from image_pipeline import PreparedImage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STUB_TEXT = "Imagem analisada: contém elementos visuais interessantes"
+
+
+class VisionBackend(ABC):
+    """Interface de um modelo de visão"""
+
+    name = "base"
+
+    @abstractmethod
+    async def describe(self, image: PreparedImage, prompt: str) -> str:
+        """Descreve a imagem seguindo o prompt"""
+
+    async def close(self) -> None:
+        """Libera conexões abertas"""
+
+    def info(self) -> Dict[str, Any]:
+        """Informações do backend para /status"""
+        return {"backend": self.name}
+
+
+class StubVisionBackend(VisionBackend):
+    """
+    Backend local para testes e ambientes sem modelo de visão
+
+    Devolve as respostas programadas em ordem (ou um texto fixo) e registra
+    o hash de cada imagem recebida.
+    """
+
+    name = "stub"
+
+    def __init__(self, responses: Optional[Iterable[str]] = None, default_text: str = DEFAULT_STUB_TEXT):
+        self.responses = deque(responses or [])
+        self.default_text = default_text
+        self.calls: List[str] = []
+
+    async def describe(self, image: PreparedImage, prompt: str) -> str:
+        self.calls.append(image.hash_hex)
+        return self.responses.popleft() if self.responses else self.default_text
+
+
+class OllamaVisionBackend(VisionBackend):
+    """Modelo multimodal servido pelo Ollama (ex.: llava)"""
+
+    name = "ollama"
+
+    def __init__(self, model: Optional[str] = None, host: Optional[str] = None):
+        self.model = model or config.vision.model
+        self.host = host or config.llm.host
+        self.client = httpx.AsyncClient(base_url=self.host, timeout=config.vision.timeout)
+
+    async def describe(self, image: PreparedImage, prompt: str) -> str:
+        response = await self.client.post("/api/generate", json={
+            "model": self.model,
+            "prompt": prompt,
+            "images": [base64.b64encode(image.data).decode("ascii")],
+            "stream": False
+        })
+        response.raise_for_status()
+        return response.json().get("response", "").strip()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.model}
+
+
+# Registro de backends disponíveis
+VISION_BACKENDS: Dict[str, Callable[..., VisionBackend]] = {
+    "stub": StubVisionBackend,
+    "ollama": OllamaVisionBackend,
+}
+
+
+def create_vision_backend(name: Optional[str] = None, **kwargs) -> VisionBackend:
+    """Cria um backend pelo nome (padrão: config.vision.backend)"""
+    name = name or config.vision.backend
+    if name not in VISION_BACKENDS:
+        raise ValueError(f"VISION_BACKEND inválido: {name} (use {', '.join(VISION_BACKENDS)})")
+    return VISION_BACKENDS[name](**kwargs)
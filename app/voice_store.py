@@ -0,0 +1,192 @@
+# ================================
+# GODOFREDA VOICE STORE
+# ================================
+# Armazena latentes de condicionamento do XTTS por voz para que
+# a síntese não recalcule o speaker a cada requisição
+# ================================
+
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from audio_utils import concat_audio, to_float32
+from config import config
+from tts_parallel import CHUNK_GAP_SECONDS, split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Limite de caracteres por chamada de inferência do XTTS
+XTTS_CHUNK_CHARS = 200
+
+_VOICE_NAME = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+
+
+def xtts_model(tts: Any) -> Optional[Any]:
+    """Retorna o modelo XTTS interno do TTS.api.TTS, se houver"""
+    model = getattr(getattr(tts, "synthesizer", None), "tts_model", None)
+    if model is not None and hasattr(model, "get_conditioning_latents"):
+        return model
+    return None
+
+
+class VoiceStore:
+    """Cache persistente de latentes GPT e embeddings de speaker"""
+
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = store_dir or config.tts.voice_store_dir
+        # nome -> (gpt_cond_latent, speaker_embedding) como tensores torch
+        self._voices: Dict[str, Tuple[Any, Any]] = {}
+
+    def _path(self, name: str) -> str:
+        """Caminho do arquivo .npz da voz"""
+        return os.path.join(self.store_dir, f"{name}.npz")
+
+    def has(self, name: Optional[str]) -> bool:
+        """Verifica se a voz está carregada"""
+        return name is not None and name in self._voices
+
+    def names(self) -> List[str]:
+        """Lista vozes carregadas"""
+        return sorted(self._voices)
+
+    def _remember(self, name: str, gpt_cond_latent: np.ndarray, speaker_embedding: np.ndarray) -> None:
+        """Mantém a voz em memória como tensores torch"""
+        import torch
+        self._voices[name] = (
+            torch.from_numpy(np.ascontiguousarray(gpt_cond_latent, dtype=np.float32)),
+            torch.from_numpy(np.ascontiguousarray(speaker_embedding, dtype=np.float32))
+        )
+
+    def _save(self, name: str, gpt_cond_latent: Any, speaker_embedding: Any) -> None:
+        """Persiste latentes em .npz e mantém em memória"""
+        latent = gpt_cond_latent.detach().cpu().numpy().astype(np.float32)
+        embedding = speaker_embedding.detach().cpu().numpy().astype(np.float32)
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        np.savez(self._path(name), gpt_cond_latent=latent, speaker_embedding=embedding)
+        self._remember(name, latent, embedding)
+
+    def load_all(self) -> int:
+        """
+        Carrega todas as vozes persistidas no diretório
+
+        Returns:
+            Número de vozes carregadas
+        """
+        if not os.path.isdir(self.store_dir):
+            return 0
+
+        loaded = 0
+        for filename in sorted(os.listdir(self.store_dir)):
+            if not filename.endswith(".npz"):
+                continue
+            name = filename[:-4]
+            try:
+                with np.load(os.path.join(self.store_dir, filename)) as data:
+                    self._remember(name, data["gpt_cond_latent"], data["speaker_embedding"])
+                loaded += 1
+            except Exception as e:
+                logger.warning(f"Failed to load voice {name}: {e}")
+
+        logger.info(f"Voice store loaded {loaded} voices from {self.store_dir}")
+        return loaded
+
+    def register(self, name: str, reference_paths: List[str], tts: Any) -> None:
+        """
+        Calcula e persiste os latentes de uma voz a partir de áudios de referência
+
+        Args:
+            name: Nome da voz
+            reference_paths: Arquivos de áudio de referência
+            tts: Instância TTS.api.TTS com modelo XTTS
+        """
+        if not _VOICE_NAME.match(name):
+            raise ValueError(f"Nome de voz inválido: {name}")
+
+        model = xtts_model(tts)
+        if model is None:
+            raise ValueError("Modelo TTS atual não suporta vozes de referência")
+
+        gpt_cond_latent, speaker_embedding = model.get_conditioning_latents(audio_path=reference_paths)
+        self._save(name, gpt_cond_latent, speaker_embedding)
+        logger.info(f"Voice registered: {name} ({len(reference_paths)} reference files)")
+
+    def ensure_builtin(self, name: str, tts: Any) -> bool:
+        """
+        Garante que um speaker embutido do XTTS esteja no store
+
+        Returns:
+            True se a voz está disponível após a chamada
+        """
+        if self.has(name):
+            return True
+
+        model = xtts_model(tts)
+        speakers = getattr(getattr(model, "speaker_manager", None), "speakers", None) or {}
+        if name not in speakers:
+            return False
+
+        speaker = speakers[name]
+        self._save(name, speaker["gpt_cond_latent"], speaker["speaker_embedding"])
+        logger.info(f"Built-in speaker cached in voice store: {name}")
+        return True
+
+    def synthesize(self, tts: Any, text: str, language: str, name: str) -> Tuple[np.ndarray, int]:
+        """
+        Sintetiza usando os latentes armazenados, sem recondicionar o speaker
+
+        Returns:
+            Tuple[np.ndarray, int]: (amostras float32, sample rate)
+        """
+        import torch
+
+        model = xtts_model(tts)
+        gpt_cond_latent, speaker_embedding = self._voices[name]
+        sample_rate = model.config.audio.output_sample_rate
+
+        parts = []
+        with torch.inference_mode():
+            for chunk in split_sentences(text, XTTS_CHUNK_CHARS):
+                output = model.inference(chunk, language, gpt_cond_latent, speaker_embedding)
+                parts.append(to_float32(output["wav"]))
+        return concat_audio(parts, sample_rate, CHUNK_GAP_SECONDS), sample_rate
+
+    def synthesize_stream(self, tts: Any, text: str, language: str, name: str) -> Iterator[np.ndarray]:
+        """Sintetiza com o streaming nativo do XTTS, entregando trechos de áudio"""
+        import torch
+
+        model = xtts_model(tts)
+        gpt_cond_latent, speaker_embedding = self._voices[name]
+
+        with torch.inference_mode():
+            for chunk in split_sentences(text, XTTS_CHUNK_CHARS):
+                for wav in model.inference_stream(chunk, language, gpt_cond_latent, speaker_embedding):
+                    yield to_float32(wav.cpu())
+
+
+# Instância global do store de vozes (modelo padrão, TTS_MODEL)
+voice_store = VoiceStore()
+
+# Stores dos demais modelos do registro: latentes de um XTTS não servem para outro
+_model_stores: Dict[str, VoiceStore] = {}
+_model_stores_lock = threading.Lock()
+
+
+def store_for(model_name: Optional[str]) -> VoiceStore:
+    """
+    Store de vozes de um modelo
+
+    O modelo padrão usa ``TTS_VOICE_STORE_DIR``; os demais, um subdiretório
+    com o nome do modelo.
+    """
+    if not model_name or model_name == config.tts.model:
+        return voice_store
+    with _model_stores_lock:
+        if model_name not in _model_stores:
+            directory = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+            _model_stores[model_name] = VoiceStore(os.path.join(config.tts.voice_store_dir, directory))
+        return _model_stores[model_name]
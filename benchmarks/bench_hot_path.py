@@ -0,0 +1,249 @@
+"""
+Micro-benchmarks do caminho por requisição com baseline de regressão
+Mede os helpers executados em toda requisição (chave do cache, id do
+cliente, validação de texto, montagem do prompt, decisão do rate limit,
+leitura do cache e o middleware de métricas) contra um Redis em memória,
+compara com a baseline gravada e falha quando algum passa do limite
+
+Uso:
+    python benchmarks/bench_hot_path.py --check
+    python benchmarks/bench_hot_path.py --update
+    python benchmarks/bench_hot_path.py --only rate_limit --repeats 9
+
+Os tempos são normalizados por uma carga de calibração em Python puro
+executada na mesma sessão, para que a baseline seja comparável entre
+máquinas; uma regressão precisa passar do limite relativo e da diferença
+mínima absoluta (ruído em operações de poucas centenas de ns).
+"""
+
+import argparse
+import asyncio
+import gc
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "app"))
+
+from starlette.requests import Request  # noqa: E402
+
+from fakes import FakeRedis  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "hot_path.json")
+
+CHAT_PAYLOAD = {
+    "user_input": "Explique em poucas palavras por que a latência do p99 importa mais que a média em uma live.",
+    "context": "Conversa sobre a live de ontem, com o chat reclamando do atraso da voz.",
+}
+
+# Cada benchmark: nome -> (fábrica que devolve a função medida, é coroutine)
+Factory = Callable[[], Callable[[], Any]]
+
+
+def calibration() -> None:
+    """Carga fixa em Python puro (dicts, strings, hash) usada como unidade de tempo"""
+    data = {"a": list(range(16)), "b": "godofreda" * 4}
+    hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def build_request(forwarded_for: Optional[str]) -> Request:
+    headers = [(b"host", b"bench"), (b"user-agent", b"bench")]
+    if forwarded_for:
+        headers.append((b"x-forwarded-for", forwarded_for.encode()))
+    return Request({
+        "type": "http", "method": "POST", "path": "/chat", "headers": headers,
+        "client": ("127.0.0.1", 50000), "query_string": b"",
+    })
+
+
+def build_benchmarks() -> Dict[str, Tuple[Factory, bool]]:
+    """Importa os módulos da API uma vez e monta os casos com o Redis falso"""
+    import main
+    from asgi_middleware import MetricsMiddleware
+    from bench_middleware import build_metrics, call
+    from cache_service import CacheService
+    from llm_service import GodofredaLLM
+    from rate_limiter import RateLimiter, get_client_id
+
+    cache = CacheService()
+    cache.redis_client = FakeRedis()
+    hit_key = cache._generate_key("chat", CHAT_PAYLOAD)
+    asyncio.run(cache.set(hit_key, {"response": "Claro, mais uma pergunta brilhante."}))
+
+    limiter = RateLimiter()
+    limiter.redis_client = FakeRedis()
+    # Caso aceito: limite inalcançável e janela curta, para o sorted set ficar
+    # com poucas centenas de entradas como em produção. No recusado o cliente
+    # já passou do limite de "tts"
+    limiter.limits["bench"] = {"requests": 10 ** 9, "window": 0.002}
+    for _ in range(limiter.limits["tts"]["requests"]):
+        asyncio.run(limiter.is_allowed("10.0.0.2", "tts"))
+
+    llm = GodofredaLLM.__new__(GodofredaLLM)
+    proxied = build_request("203.0.113.7, 10.0.0.1")
+    direct = build_request(None)
+    text = CHAT_PAYLOAD["user_input"]
+
+    async def admission(request: Request, kind: str) -> None:
+        await limiter.is_allowed(get_client_id(request), kind)
+
+    async def health(scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"status":"healthy"}'})
+
+    middleware = MetricsMiddleware(health, admission=admission, rate_limits=(("/falar", None, "bench"),),
+                                   **build_metrics())
+
+    return {
+        "cache_key_dict": (lambda: lambda: cache._generate_key("chat", CHAT_PAYLOAD), False),
+        "cache_key_str": (lambda: lambda: cache._generate_key("tts", text), False),
+        "client_id_forwarded": (lambda: lambda: get_client_id(proxied), False),
+        "client_id_direct": (lambda: lambda: get_client_id(direct), False),
+        "validate_text_input": (lambda: lambda: main.validate_text_input(text), False),
+        "build_prompt": (lambda: lambda: llm._build_prompt(text, CHAT_PAYLOAD["context"]), False),
+        "cache_get_hit": (lambda: lambda: cache.get(hit_key), True),
+        "cache_get_miss": (lambda: lambda: cache.get("godofreda:chat:missing"), True),
+        "rate_limit_allowed": (lambda: lambda: limiter.is_allowed("10.0.0.1", "bench"), True),
+        "rate_limit_denied": (lambda: lambda: limiter.is_allowed("10.0.0.2", "tts"), True),
+        "middleware_plain": (lambda: lambda: call(middleware, "/health"), True),
+        "middleware_rate_limited": (lambda: lambda: call(middleware, "/falar/stream"), True),
+    }
+
+
+def time_sync(func: Callable[[], Any], number: int, repeats: int) -> float:
+    """Melhor média (ns por chamada) entre as repetições"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter_ns() - start) / number)
+    return best
+
+
+def time_async(func: Callable[[], Awaitable[Any]], number: int, repeats: int) -> float:
+    """Igual a time_sync, com todas as chamadas no mesmo event loop"""
+    async def run() -> float:
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                await func()
+            best = min(best, (time.perf_counter_ns() - start) / number)
+        return best
+
+    return asyncio.run(run())
+
+
+def autorange(func: Callable[[], Any], is_async: bool, target_ms: float) -> int:
+    """Número de chamadas por repetição para cada uma durar ~target_ms"""
+    number = 1
+    while True:
+        elapsed_ns = (time_async if is_async else time_sync)(func, number, 1) * number
+        if elapsed_ns >= target_ms * 1e6 or number >= 10 ** 7:
+            return number
+        number *= 2 if elapsed_ns > target_ms * 1e5 else 10
+
+
+def measure(selected: Callable[[str], bool], repeats: int, target_ms: float) -> Dict[str, Any]:
+    """
+    Alterna calibração e benchmark em cada repetição e usa o melhor de cada
+
+    Medir os dois lado a lado evita que variações de frequência da CPU ou
+    vizinhos barulhentos entre um benchmark e outro apareçam como regressão.
+    """
+    calibration_number = autorange(calibration, False, target_ms)
+    best_calibration = float("inf")
+    results = {}
+    for name, (factory, is_async) in build_benchmarks().items():
+        if not selected(name):
+            continue
+        func = factory()
+        timer = time_async if is_async else time_sync
+        number = autorange(func, is_async, target_ms)
+        calibration_ns = ns = float("inf")
+        # Como o timeit: coletas do GC disparadas por lixo de outros casos
+        # cairiam em momentos aleatórios das medições
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeats):
+                calibration_ns = min(calibration_ns, time_sync(calibration, calibration_number, 1))
+                ns = min(ns, timer(func, number, 1))
+        finally:
+            gc.enable()
+        best_calibration = min(best_calibration, calibration_ns)
+        results[name] = {"ns": round(ns, 1), "relative": round(ns / calibration_ns, 4)}
+    return {"calibration_ns": round(best_calibration, 1), "benchmarks": results}
+
+
+def check(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+          min_delta_ns: float) -> List[Dict[str, Any]]:
+    """Compara os tempos normalizados e devolve a lista de regressões"""
+    regressions = []
+    for name, stats in current["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before:
+            continue
+        expected_ns = before["relative"] * stats["ns"] / stats["relative"]
+        change = stats["relative"] / before["relative"] - 1
+        stats["change_pct"] = round(change * 100, 1)
+        if change > threshold and stats["ns"] - expected_ns > min_delta_ns:
+            regressions.append({"benchmark": name, "change_pct": stats["change_pct"],
+                                "ns": stats["ns"], "expected_ns": round(expected_ns, 1)})
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks do caminho por requisição")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update", action="store_true", help="grava o resultado como nova baseline")
+    parser.add_argument("--check", action="store_true", help="sai com código 1 se houver regressão")
+    parser.add_argument("--threshold", type=float, default=0.25, help="regressão relativa tolerada (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ns", type=float, default=150.0, help="diferença absoluta mínima para acusar")
+    parser.add_argument("--repeats", type=int, default=9)
+    parser.add_argument("--target-ms", type=float, default=20.0, help="duração de cada repetição")
+    parser.add_argument("--only", action="append", help="roda só os benchmarks que contêm o trecho")
+    args = parser.parse_args()
+    # Logs de inicialização dos serviços poluiriam a saída JSON
+    logging.disable(logging.CRITICAL)
+
+    if args.check and not os.path.exists(args.baseline):
+        parser.error(f"baseline inexistente: {args.baseline} (gere com --update)")
+
+    report = measure(lambda name: not args.only or any(part in name for part in args.only),
+                     args.repeats, args.target_ms)
+    regressions: List[Dict[str, Any]] = []
+    if os.path.exists(args.baseline) and not args.update:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check(report, baseline, args.threshold, args.min_delta_ns)
+        if regressions:
+            # Confirma medindo de novo só os suspeitos: um pico isolado de ruído
+            # não derruba a verificação, uma regressão real aparece nas duas
+            suspects = {item["benchmark"] for item in regressions}
+            retry = measure(suspects.__contains__, args.repeats, args.target_ms)
+            confirmed = {item["benchmark"] for item in check(retry, baseline, args.threshold, args.min_delta_ns)}
+            regressions = [item for item in regressions if item["benchmark"] in confirmed]
+        report["regressions"] = regressions
+
+    print(json.dumps(report, indent=2))
+    if args.update:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            f.write(json.dumps({key: report[key] for key in ("calibration_ns", "benchmarks")}, indent=2) + "\n")
+    if args.check and regressions:
+        names = ", ".join(item["benchmark"] for item in regressions)
+        print(f"Regressão acima de {args.threshold:.0%}: {names}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
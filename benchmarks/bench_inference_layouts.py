@@ -0,0 +1,127 @@
+"""
+Benchmark de layouts do pool de inferência
+Varre combinações de workers x threads torch e recomenda a de maior vazão
+
+Uso:
+    python benchmarks/bench_inference_layouts.py --workload tts --requests 24
+    python benchmarks/bench_inference_layouts.py --workload matmul --pin
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from cpu_topology import PoolLayout, apply_worker_layout, available_cpus, cgroup_cpu_quota, effective_cpu_count, plan_layout  # noqa: E402
+
+BENCH_PHRASE = "Olá, eu sou a Godofreda e este é um teste de vazão do pool de inferência."
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(layout: PoolLayout, slots, workload: str, model_name: str) -> None:
+    """Aplica o layout no worker e prepara a carga de trabalho"""
+    try:
+        slot = slots.get_nowait()
+    except Exception:
+        slot = -1
+    apply_worker_layout(layout.intra_op_threads, layout.interop_threads, layout.core_set(slot))
+
+    if workload == "tts":
+        from TTS.api import TTS
+        _worker_state["tts"] = TTS(model_name=model_name)
+
+
+def _run_job(workload: str, speaker: str) -> float:
+    """Executa uma unidade de trabalho e retorna sua duração"""
+    start = time.perf_counter()
+    if workload == "tts":
+        _worker_state["tts"].tts(text=BENCH_PHRASE, language="pt", speaker=speaker)
+    else:
+        import torch
+        a = torch.randn(1024, 1024)
+        for _ in range(20):
+            a = torch.tanh(a @ a / 1024)
+    return time.perf_counter() - start
+
+
+def candidate_layouts(effective: int, pin: bool) -> List[PoolLayout]:
+    """Gera layouts com workers x threads cobrindo as CPUs efetivas"""
+    layouts = []
+    threads = 1
+    while threads <= effective:
+        layouts.append(plan_layout(workers=effective // threads, threads_per_worker=threads, pin_cores=pin))
+        threads *= 2
+    return layouts
+
+
+def bench_layout(layout: PoolLayout, workload: str, requests: int, model_name: str, speaker: str) -> Dict[str, Any]:
+    """Mede a vazão de um layout"""
+    context = multiprocessing.get_context("spawn")
+    slots = context.Queue()
+    for slot in range(layout.workers):
+        slots.put(slot)
+
+    with ProcessPoolExecutor(max_workers=layout.workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(layout, slots, workload, model_name)) as executor:
+        # Aquecimento: garante que todos os workers carregaram antes de medir
+        list(executor.map(_run_job, [workload] * layout.workers, [speaker] * layout.workers))
+
+        start = time.perf_counter()
+        latencies = list(executor.map(_run_job, [workload] * requests, [speaker] * requests))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "workers": layout.workers,
+        "intra_op_threads": layout.intra_op_threads,
+        "pinned": layout.pinned,
+        "throughput_rps": round(requests / elapsed, 3),
+        "latency_p50_s": round(latencies[len(latencies) // 2], 3),
+        "latency_max_s": round(latencies[-1], 3)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de layouts do pool de inferência")
+    parser.add_argument("--workload", choices=["tts", "matmul"], default="tts")
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--pin", action="store_true", help="Fixar workers em cores disjuntos")
+    parser.add_argument("--model", default=os.getenv("TTS_MODEL", "tts_models/multilingual/multi-dataset/xtts_v2"))
+    parser.add_argument("--speaker", default=os.getenv("TTS_SPEAKER", "p230"))
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    quota = cgroup_cpu_quota()
+    effective = effective_cpu_count(cpus, quota)
+
+    results = []
+    for layout in candidate_layouts(effective, args.pin):
+        result = bench_layout(layout, args.workload, args.requests, args.model, args.speaker)
+        print(json.dumps(result), file=sys.stderr)
+        results.append(result)
+
+    best = max(results, key=lambda r: r["throughput_rps"])
+    print(json.dumps({
+        "available_cpus": len(cpus),
+        "cgroup_quota": quota,
+        "effective_cpus": effective,
+        "workload": args.workload,
+        "results": results,
+        "recommended": {
+            "INFERENCE_WORKERS": best["workers"],
+            "INFERENCE_THREADS_PER_WORKER": best["intra_op_threads"],
+            "INFERENCE_PIN_CORES": int(best["pinned"])
+        }
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Teste de carga ponta a ponta da API
+Sobe a API real com um Ollama falso (HTTP, streaming) e uma engine TTS falsa
+com fator de tempo real configurável, dispara /chat, /falar e
+/api/godofreda/chat com a concorrência e a mistura pedidas e reporta vazão,
+p50/p95/p99 e taxa de erros em JSON
+
+Uso:
+    python benchmarks/bench_load.py --concurrency 16 --duration 30 --mix chat=5,falar=3,multimodal=2
+    python benchmarks/bench_load.py --output atual.json --compare base.json
+
+Sem Redis local, o rate limit e o cache ficam desativados (falham abertos);
+com Redis, cada requisição usa um X-Forwarded-For próprio para não esbarrar
+no rate limit por cliente.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_SENTENCES = [
+    "Olá, Godofreda!",
+    "O que você acha do jogo de hoje?",
+    "Conta uma piada sobre programadores que esquecem de escrever testes.",
+    "Explique em poucas palavras por que a latência do p99 importa mais que a média em uma live.",
+]
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """``chat=5,falar=3`` -> pesos por cenário"""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def build_scenarios(args: argparse.Namespace) -> Dict[str, Scenario]:
+    voice = None
+    if args.multimodal_voice:
+        from audio_utils import wav_bytes
+        t = np.arange(16000, dtype=np.float32) / 16000
+        voice = wav_bytes(0.3 * np.sin(2 * np.pi * 180 * t), 16000)
+
+    def sentence(i: int) -> str:
+        text = BENCH_SENTENCES[i % len(BENCH_SENTENCES)]
+        # Fração repetida acerta o cache de /chat; o resto é único
+        return text if random.random() < args.repeat_ratio else f"{text} (#{i})"
+
+    async def chat(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/chat", data={"user_input": sentence(i), "context": ""})
+
+    async def falar(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post("/falar", data={"texto": sentence(i)})
+
+    async def multimodal(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        files = {"text": (None, sentence(i))}
+        if voice is not None:
+            files["voice"] = ("voz.wav", voice, "audio/wav")
+        return await client.post("/api/godofreda/chat", files=files)
+
+    return {"chat": chat, "falar": falar, "multimodal": multimodal}
+
+
+def summarize(latencies: List[float], statuses: Counter, elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    total = sum(statuses.values())
+    errors = sum(count for status, count in statuses.items() if status == "exception" or int(status) >= 400)
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "mean": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+            "max": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        },
+        "status_codes": dict(sorted(statuses.items())),
+    }
+
+
+async def run_load(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    scenarios = build_scenarios(args)
+    mix = parse_mix(args.mix)
+    unknown = set(mix) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Cenários desconhecidos: {', '.join(sorted(unknown))} (use {', '.join(scenarios)})")
+    names, weights = list(mix), list(mix.values())
+
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, Counter] = {name: Counter() for name in names}
+    counter = iter(range(10 ** 9))
+    deadline = time.perf_counter() + args.duration
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                i = next(counter)
+                if args.requests and i >= args.requests:
+                    return
+                name = random.choices(names, weights)[0]
+                # Cliente diferente por requisição: o rate limit é por X-Forwarded-For
+                client.headers["X-Forwarded-For"] = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+                start = time.perf_counter()
+                try:
+                    response = await scenarios[name](client, i)
+                    await response.aread()
+                    statuses[name][str(response.status_code)] += 1
+                except httpx.HTTPError:
+                    statuses[name]["exception"] += 1
+                latencies[name].append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    all_statuses = sum(statuses.values(), Counter())
+    return {
+        "elapsed_seconds": round(elapsed, 2),
+        "scenarios": {name: summarize(latencies[name], statuses[name], elapsed) for name in names},
+        "total": summarize(all_latencies, all_statuses, elapsed),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Variação relativa (%) de vazão e latências em relação a uma execução anterior"""
+    def delta(now: float, before: float) -> Optional[float]:
+        return round((now - before) / before * 100, 1) if before else None
+
+    result = {}
+    for name, stats in dict(current["scenarios"], total=current["total"]).items():
+        before = baseline["total"] if name == "total" else baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        result[name] = {
+            "throughput_rps_pct": delta(stats["throughput_rps"], before["throughput_rps"]),
+            "error_rate_diff": round(stats["error_rate"] - before["error_rate"], 4),
+            **{f"{q}_pct": delta(stats["latency_ms"][q], before["latency_ms"][q]) for q in ("p50", "p95", "p99")},
+        }
+    return result
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Variáveis lidas pelo config.py; precisam existir antes do primeiro import da app"""
+    os.environ.update({
+        "OLLAMA_HOST": f"http://127.0.0.1:{args.ollama_port}",
+        "OLLAMA_MAX_RETRIES": "1",
+        "TTS_BACKEND": "fake",
+        "TTS_WARMUP": "0",
+        "TTS_LOAD_MODE": "blocking",
+        "TTS_SCHEDULER_CONCURRENCY": str(args.tts_concurrency),
+        "JOBS_BACKEND": "memory",
+        "REDIS_URL": args.redis_url,
+    })
+
+
+def start_api(args: argparse.Namespace):
+    """Importa a API com a engine TTS falsa registrada"""
+    from fakes import FakeTTSBackend
+
+    import tts_backends
+    tts_backends.BACKENDS["fake"] = functools.partial(FakeTTSBackend, rtf=args.tts_rtf)
+
+    import main
+    logging.getLogger().setLevel(args.log_level.upper())
+    return main.app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga da API com Ollama e TTS falsos")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos de carga")
+    parser.add_argument("--requests", type=int, default=0, help="limite de requisições (0 = só duração)")
+    parser.add_argument("--mix", default="chat=5,falar=3,multimodal=2")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="fração de textos repetidos (cache)")
+    parser.add_argument("--multimodal-voice", action="store_true", help="anexa um WAV de 1s no chat multimodal")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=30.0)
+    parser.add_argument("--llm-first-token-ms", type=float, default=200.0)
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--tts-rtf", type=float, default=0.3, help="fator de tempo real da engine falsa")
+    parser.add_argument("--tts-concurrency", type=int, default=1)
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:6379")
+    parser.add_argument("--api-port", type=int, default=18000)
+    parser.add_argument("--ollama-port", type=int, default=18434)
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="grava o resultado JSON neste arquivo")
+    parser.add_argument("--compare", help="resultado JSON anterior para comparação")
+    args = parser.parse_args()
+    random.seed(args.seed)
+    configure_environment(args)
+    from fakes import ThreadedServer, build_fake_ollama
+
+    fake_ollama = build_fake_ollama(
+        tokens_per_second=args.llm_tokens_per_second,
+        first_token_ms=args.llm_first_token_ms,
+        tokens=args.llm_tokens
+    )
+    with ThreadedServer(fake_ollama, args.ollama_port):
+        app = start_api(args)
+        with ThreadedServer(app, args.api_port) as api:
+            report = asyncio.run(run_load(api.url, args))
+
+    report["config"] = {key: value for key, value in vars(args).items() if key not in ("output", "compare")}
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark do custo por requisição do middleware de métricas
+Compara a aplicação sem middleware, o middleware antigo baseado em
+BaseHTTPMiddleware (@app.middleware("http")) e o MetricsMiddleware ASGI puro,
+chamando a aplicação diretamente (sem rede) em um endpoint leve e em um stream
+
+Uso:
+    python benchmarks/bench_middleware.py --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram  # noqa: E402
+
+from asgi_middleware import MetricsMiddleware  # noqa: E402
+from instrumentation import INFERENCE_BUCKETS, route_template  # noqa: E402
+
+STREAM_CHUNKS = 32
+STREAM_CHUNK_BYTES = 4096
+
+
+def build_metrics() -> Dict[str, Any]:
+    """Métricas equivalentes às de main.py em um registro isolado"""
+    registry = CollectorRegistry()
+    return {
+        "request_count": Counter('bench_requests_total', '', ['method', 'endpoint', 'status'], registry=registry),
+        "request_duration": Histogram('bench_request_duration_seconds', '', ['method', 'endpoint'],
+                                      buckets=INFERENCE_BUCKETS, registry=registry),
+        "active_connections": Gauge('bench_active_connections', '', registry=registry),
+        "error_count": Counter('bench_errors_total', '', ['type'], registry=registry),
+    }
+
+
+async def allow(request: Request, kind: str) -> None:
+    """Admissão que sempre aceita (isola o custo do middleware do Redis)"""
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health() -> Dict[str, str]:
+        return {"status": "healthy"}
+
+    @app.get("/falar/stream")
+    async def stream() -> StreamingResponse:
+        async def chunks():
+            for _ in range(STREAM_CHUNKS):
+                yield b"\x00" * STREAM_CHUNK_BYTES
+        return StreamingResponse(chunks(), media_type="audio/wav")
+
+    metrics = build_metrics()
+    if variant == "base_http":
+        # Réplica do middleware anterior
+        @app.middleware("http")
+        async def metrics_middleware(request: Request, call_next):
+            start_time = time.time()
+            status_code = 500
+            metrics["active_connections"].inc()
+            try:
+                if request.url.path.startswith("/falar"):
+                    await allow(request, "tts")
+                response = await call_next(request)
+                status_code = response.status_code
+                return response
+            finally:
+                endpoint = route_template(request.scope)
+                metrics["request_count"].labels(method=request.method, endpoint=endpoint,
+                                                status=str(status_code)).inc()
+                metrics["request_duration"].labels(method=request.method, endpoint=endpoint).observe(
+                    time.time() - start_time)
+                metrics["active_connections"].dec()
+    elif variant == "asgi":
+        app.add_middleware(MetricsMiddleware, admission=allow, rate_limits=(("/falar", None, "tts"),), **metrics)
+    return app
+
+
+async def call(app: FastAPI, path: str) -> float:
+    """Executa uma requisição ASGI em memória e retorna o tempo até o último byte"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    body_sent = False
+    finished = asyncio.Event()
+
+    async def receive():
+        # Corpo vazio uma vez; depois, desconexão só quando a resposta terminar
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            finished.set()
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return time.perf_counter() - start
+
+
+async def bench_variant(variant: str, path: str, requests: int) -> List[float]:
+    app = build_app(variant)
+    for _ in range(min(200, requests)):
+        await call(app, path)  # aquecimento
+    return [await call(app, path) for _ in range(requests)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Custo por requisição do middleware de métricas")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for path in ("/health", "/falar/stream"):
+        baseline = None
+        for variant in ("none", "base_http", "asgi"):
+            samples = asyncio.run(bench_variant(variant, path, args.requests))
+            p50 = statistics.median(samples) * 1e6
+            p99 = sorted(samples)[int(len(samples) * 0.99)] * 1e6
+            baseline = p50 if baseline is None else baseline
+            results.setdefault(path, {})[variant] = {
+                "p50_us": round(p50, 1),
+                "p99_us": round(p99, 1),
+                "overhead_p50_us": round(p50 - baseline, 1),
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Custo por etapa do pós-processamento da saída do TTS
+Mede corte de silêncio, loudness (filtro K + blocos), aplicação do ganho,
+reamostragem e conversão para WAV 16 bits em sinais sintéticos de
+várias durações, em ns por chamada e por segundo de áudio; a conversão
+antiga (clip + astype + módulo wave) entra como referência
+
+Uso:
+    python benchmarks/bench_postprocess.py
+    python benchmarks/bench_postprocess.py --durations 1 10 60 --rate 22050 --target-rate 16000
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import time
+import wave
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "app"))
+
+from audio_postprocess import integrated_loudness, normalization_gain, postprocess, trim_edges  # noqa: E402
+from audio_preprocess import resample  # noqa: E402
+from audio_utils import float_to_pcm16, wav_bytes  # noqa: E402
+from config import config  # noqa: E402
+
+
+def synthetic_speech(seconds: float, sample_rate: int, seed: int = 0) -> np.ndarray:
+    """Sílabas (tom com envelope e ruído) separadas por pausas, com silêncio nas bordas"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    carrier = 0.2 * np.sin(2 * np.pi * 180 * t) + 0.02 * rng.standard_normal(t.size)
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None)
+    edge = int(0.3 * sample_rate)
+    envelope[:edge] = envelope[-edge:] = 0
+    return (carrier * envelope).astype(np.float32)
+
+
+def legacy_wav_bytes(audio: np.ndarray, sample_rate: int) -> bytes:
+    """Conversão anterior: cópia do clip, cópia do astype e o módulo wave"""
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def best_ns(func: Callable[[], Any], repeats: int) -> float:
+    """Menor tempo entre as repetições (ns)"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter_ns()
+        func()
+        best = min(best, time.perf_counter_ns() - start)
+    return best
+
+
+def measure(seconds: float, sample_rate: int, target_rate: int, repeats: int) -> Dict[str, Any]:
+    settings = config.tts
+    audio = synthetic_speech(seconds, sample_rate)
+    trim_args = (settings.trim_threshold_db, settings.trim_floor_db, settings.trim_padding_seconds)
+    trimmed = trim_edges(audio, sample_rate, *trim_args)
+    gain = normalization_gain(trimmed, sample_rate, "lufs", settings.loudness_target_lufs, settings.peak_dbfs)
+    scratch = trimmed.copy()
+
+    steps: Dict[str, Callable[[], Any]] = {
+        "trim": lambda: trim_edges(audio, sample_rate, *trim_args),
+        "loudness": lambda: integrated_loudness(trimmed, sample_rate),
+        "apply_gain": lambda: np.multiply(scratch, np.float32(gain), out=scratch),
+        "resample": lambda: resample(trimmed, sample_rate, target_rate),
+        "pcm16": lambda: float_to_pcm16(trimmed),
+        "wav_bytes": lambda: wav_bytes(trimmed, sample_rate),
+        "wav_bytes_legacy": lambda: legacy_wav_bytes(trimmed, sample_rate),
+        # O pipeline modifica o array recebido: cada chamada trabalha numa cópia
+        "postprocess_total": lambda: postprocess(audio.copy(), sample_rate, target_rate),
+    }
+    results = {}
+    for name, func in steps.items():
+        ns = best_ns(func, repeats)
+        results[name] = {"ns": round(ns), "ns_per_audio_second": round(ns / seconds)}
+    return {
+        "seconds": seconds,
+        "samples": int(audio.size),
+        "trimmed_seconds": round(trimmed.size / sample_rate, 3),
+        "steps": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Custo por etapa do pós-processamento de áudio")
+    parser.add_argument("--durations", type=float, nargs="+", default=[1.0, 5.0, 30.0])
+    parser.add_argument("--rate", type=int, default=24000, help="taxa nativa simulada")
+    parser.add_argument("--target-rate", type=int, default=16000, help="taxa da reamostragem")
+    parser.add_argument("--repeats", type=int, default=15)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    report = {
+        "sample_rate": args.rate,
+        "target_rate": args.target_rate,
+        "loudness_mode": config.tts.loudness,
+        "runs": [measure(seconds, args.rate, args.target_rate, args.repeats) for seconds in args.durations],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark comum dos backends TTS
+Mede carga, aquecimento, fator de tempo real (RTF) e latência do primeiro
+trecho em streaming para escolher a engine mais rápida por implantação
+
+Uso:
+    python benchmarks/bench_tts_backends.py --backends coqui onnx --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from tts_backends import BACKENDS, create_backend  # noqa: E402
+
+BENCH_PHRASES = [
+    "Olá, eu sou a Godofreda.",
+    "Você realmente acha que isso é uma pergunta inteligente? Pense mais um pouco.",
+    "Analisando os dados com minha inteligência superior, concluí que a resposta é óbvia, "
+    "mas vou explicar devagar para que todos consigam acompanhar o raciocínio.",
+]
+
+
+def bench_backend(name: str, runs: int) -> Dict[str, Any]:
+    """Executa o benchmark de um backend"""
+    backend = create_backend(name)
+
+    start = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - start
+    warmup_seconds = backend.warmup()
+
+    rtfs: List[float] = []
+    first_chunk: List[float] = []
+    for _ in range(runs):
+        for phrase in BENCH_PHRASES:
+            start = time.perf_counter()
+            audio = backend.synthesize(phrase)
+            elapsed = time.perf_counter() - start
+            rtfs.append(elapsed / (audio.size / backend.sample_rate))
+
+            start = time.perf_counter()
+            next(iter(backend.synthesize_stream(phrase)))
+            first_chunk.append(time.perf_counter() - start)
+
+    return {
+        "backend": name,
+        "load_seconds": round(load_seconds, 2),
+        "warmup_seconds": round(warmup_seconds, 2),
+        "rtf_mean": round(statistics.mean(rtfs), 3),
+        "rtf_p50": round(statistics.median(rtfs), 3),
+        "first_chunk_p50_seconds": round(statistics.median(first_chunk), 3),
+        "sample_rate": backend.sample_rate
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dos backends TTS")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    for name in args.backends:
+        try:
+            results.append(bench_backend(name, args.runs))
+        except Exception as e:
+            results.append({"backend": name, "error": str(e)})
+        print(json.dumps(results[-1]), file=sys.stderr)
+
+    ok = [r for r in results if "error" not in r]
+    print(json.dumps({
+        "results": results,
+        "fastest": min(ok, key=lambda r: r["rtf_mean"])["backend"] if ok else None
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
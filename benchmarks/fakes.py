@@ -0,0 +1,182 @@
+"""
+Substitutos locais das dependências pesadas para benchmarks
+Servidor Ollama falso (HTTP, com streaming e taxa de tokens configurável),
+engine TTS falsa com fator de tempo real configurável, Redis em memória e
+servidores uvicorn em thread para rodar tudo em um único processo
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from tts_backends import TTSBackend  # noqa: E402
+
+FAKE_WORDS = ("Ah", "claro,", "mais", "uma", "pergunta", "brilhante.", "Vou", "explicar", "devagar", "para", "você.")
+
+
+def build_fake_ollama(model: str = "llama2:7b", tokens_per_second: float = 30.0,
+                      first_token_ms: float = 200.0, tokens: int = 40) -> Starlette:
+    """
+    Aplicação ASGI que imita /api/tags e /api/generate do Ollama
+
+    ``first_token_ms`` simula a avaliação do prompt e ``tokens_per_second``
+    a geração; as respostas trazem os mesmos campos de tempo do Ollama.
+    """
+    interval = 1.0 / tokens_per_second
+
+    async def tags(request: Request) -> JSONResponse:
+        return JSONResponse({"models": [{"name": model}]})
+
+    def timings() -> Dict[str, Any]:
+        return {
+            "done": True,
+            "prompt_eval_duration": int(first_token_ms * 1e6),
+            "eval_duration": int(tokens * interval * 1e9),
+            "eval_count": tokens,
+        }
+
+    async def generate(request: Request):
+        payload = await request.json()
+        words = [FAKE_WORDS[i % len(FAKE_WORDS)] for i in range(tokens)]
+
+        if not payload.get("stream", True):
+            await asyncio.sleep(first_token_ms / 1000 + tokens * interval)
+            return JSONResponse(dict(timings(), model=model, response=" ".join(words)))
+
+        async def stream():
+            await asyncio.sleep(first_token_ms / 1000)
+            for index, word in enumerate(words):
+                yield json.dumps({"model": model, "response": (" " if index else "") + word, "done": False}) + "\n"
+                await asyncio.sleep(interval)
+            yield json.dumps(dict(timings(), model=model, response="")) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    return Starlette(routes=[
+        Route("/api/tags", tags, methods=["GET"]),
+        Route("/api/generate", generate, methods=["POST"]),
+    ])
+
+
+class FakeTTSBackend(TTSBackend):
+    """
+    Engine TTS sem modelo: dorme ``rtf`` x duração do áudio e devolve um tom
+
+    O sleep libera o GIL, como a inferência do torch; a duração do áudio é
+    estimada pelo número de caracteres.
+    """
+
+    name = "fake"
+
+    def __init__(self, rtf: float = 0.3, sample_rate: int = 24000, seconds_per_char: float = 0.065):
+        super().__init__()
+        self.rtf = rtf
+        self.seconds_per_char = seconds_per_char
+        self._rate = sample_rate
+
+    def load(self) -> None:
+        self.sample_rate = self._rate
+        self.loaded = True
+
+    def synthesize(self, text: str, language: str = "pt", speaker: Optional[str] = None) -> np.ndarray:
+        audio_seconds = max(0.2, len(text) * self.seconds_per_char)
+        time.sleep(audio_seconds * self.rtf)
+        t = np.arange(int(audio_seconds * self.sample_rate), dtype=np.float32) / self.sample_rate
+        return (0.1 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+
+
+class FakeRedis:
+    """
+    Redis assíncrono em memória com os comandos usados pelo cache e pelo
+    rate limiter (decode_responses=True)
+
+    Sorted sets ficam em listas ordenadas por score (bisect), então a
+    remoção da janela e a contagem não crescem com o histórico. TTLs são
+    aceitos e ignorados: os benchmarks não dependem de expiração.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, str] = {}
+        self.zsets: Dict[str, List[Tuple[float, str]]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.values.get(key)
+
+    async def setex(self, key: str, ttl: int, value: Any) -> bool:
+        self.values[key] = str(value)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            removed += (self.values.pop(key, None) is not None) + (self.zsets.pop(key, None) is not None)
+        return removed
+
+    async def exists(self, *keys: str) -> int:
+        return sum(key in self.values or key in self.zsets for key in keys)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        return key in self.values or key in self.zsets
+
+    async def zadd(self, key: str, mapping: Dict[str, float]) -> int:
+        entries = self.zsets.setdefault(key, [])
+        for member, score in mapping.items():
+            bisect.insort(entries, (float(score), member))
+        return len(mapping)
+
+    async def zremrangebyscore(self, key: str, minimum: float, maximum: float) -> int:
+        entries = self.zsets.get(key)
+        if not entries:
+            return 0
+        lo = bisect.bisect_left(entries, (float(minimum), ""))
+        hi = bisect.bisect_right(entries, (float(maximum), "\uffff"))
+        del entries[lo:hi]
+        return hi - lo
+
+    async def zcard(self, key: str) -> int:
+        return len(self.zsets.get(key, ()))
+
+    async def zrange(self, key: str, start: int, end: int, withscores: bool = False) -> List[Any]:
+        entries = self.zsets.get(key, [])
+        selected = entries[start:None if end == -1 else end + 1]
+        return [(member, score) for score, member in selected] if withscores else [m for _, m in selected]
+
+
+class ThreadedServer:
+    """Servidor uvicorn em uma thread própria (event loop separado)"""
+
+    def __init__(self, app: Any, port: int, host: str = "127.0.0.1"):
+        import uvicorn
+
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host=host, port=port, log_level="warning", access_log=False, lifespan="on"
+        ))
+        self.url = f"http://{host}:{port}"
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "ThreadedServer":
+        self.thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Server at {self.url} failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
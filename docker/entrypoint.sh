@@ -160,14 +160,20 @@ main() {
     # Iniciar servidor
     log_info "Iniciando servidor FastAPI..."
     
-    # Executar uvicorn em background e capturar PID
-    uvicorn main:app \
-        --host "$HOST" \
-        --port "$PORT" \
-        --workers "$WORKERS" \
-        --log-level "$LOG_LEVEL" \
-        --access-log \
-        --use-colors &
+    # Executar servidor em background e capturar PID
+    if [[ "${SERVE_PRELOAD:-0}" == "1" ]]; then
+        # Modelo carregado uma vez no mestre; workers compartilham pesos via fork
+        log_info "Modo preload: ${WORKERS} workers compartilhando o modelo"
+        python3 serve.py &
+    else
+        uvicorn main:app \
+            --host "$HOST" \
+            --port "$PORT" \
+            --workers "$WORKERS" \
+            --log-level "$LOG_LEVEL" \
+            --access-log \
+            --use-colors &
+    fi
     
     local server_pid=$!
     echo "$server_pid" > "$PID_FILE"
@@ -34,6 +34,7 @@ export const API_CONFIG = {
     CHAT: '/chat',
     TTS: '/falar',
     MULTIMODAL_CHAT: '/api/godofreda/chat',
+    REALTIME_SESSION: '/ws/session',
     
     // Webhooks
     ALERTS: '/webhook/alerts',
@@ -0,0 +1,158 @@
+// ================================
+// GODOFREDA REALTIME SESSION
+// ================================
+// Cliente da sessão WebSocket: envia texto/áudio, recebe tokens do
+// LLM e trechos de áudio PCM intercalados e permite barge-in
+// ================================
+
+import { API_CONFIG, buildApiUrl } from '../config/api';
+
+/**
+ * Converte a URL HTTP da API para WebSocket
+ * @param {string} endpoint - Caminho do endpoint
+ */
+const buildWebSocketUrl = (endpoint) => buildApiUrl(endpoint).replace(/^http/, 'ws');
+
+export class RealtimeSession {
+  /**
+   * @param {Object} handlers - Callbacks: onToken, onAudio, onTurnStart, onTurnEnd, onTranscript, onError, onClose
+   */
+  constructor(handlers = {}) {
+    this.handlers = handlers;
+    this.socket = null;
+    this.sessionId = null;
+    this.pendingAudio = null;
+    this.audioContext = null;
+    this.playbackTime = 0;
+    this.activeSources = [];
+  }
+
+  /**
+   * Abre a sessão (uma conexão por espectador)
+   */
+  connect() {
+    return new Promise((resolve, reject) => {
+      this.socket = new WebSocket(buildWebSocketUrl(API_CONFIG.ENDPOINTS.REALTIME_SESSION));
+      this.socket.binaryType = 'arraybuffer';
+
+      this.socket.onmessage = (event) => {
+        if (typeof event.data !== 'string') {
+          this.handleAudio(event.data);
+          return;
+        }
+        const message = JSON.parse(event.data);
+        if (message.type === 'session') {
+          this.sessionId = message.session_id;
+          resolve(this);
+        }
+        this.handleMessage(message);
+      };
+      this.socket.onerror = (error) => reject(error);
+      this.socket.onclose = () => this.handlers.onClose?.();
+    });
+  }
+
+  handleMessage(message) {
+    switch (message.type) {
+      case 'token':
+        this.handlers.onToken?.(message.text, message.turn_id);
+        break;
+      case 'audio':
+        // O próximo frame binário contém o PCM deste cabeçalho
+        this.pendingAudio = message;
+        break;
+      case 'transcript':
+        this.handlers.onTranscript?.(message.text, message.turn_id);
+        break;
+      case 'turn_start':
+        this.handlers.onTurnStart?.(message.turn_id);
+        break;
+      case 'turn_end':
+        this.handlers.onTurnEnd?.(message);
+        break;
+      case 'error':
+        this.handlers.onError?.(message.message);
+        break;
+      default:
+        break;
+    }
+  }
+
+  handleAudio(buffer) {
+    const header = this.pendingAudio;
+    this.pendingAudio = null;
+    if (!header) {
+      return;
+    }
+    this.handlers.onAudio?.(header, buffer);
+    this.play(buffer, header.sample_rate);
+  }
+
+  /**
+   * Enfileira o PCM 16 bits para tocar logo após o trecho anterior
+   */
+  play(buffer, sampleRate) {
+    if (!this.audioContext) {
+      this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
+    }
+    const pcm = new Int16Array(buffer);
+    const audioBuffer = this.audioContext.createBuffer(1, pcm.length, sampleRate);
+    const channel = audioBuffer.getChannelData(0);
+    for (let i = 0; i < pcm.length; i += 1) {
+      channel[i] = pcm[i] / 32768;
+    }
+
+    const source = this.audioContext.createBufferSource();
+    source.buffer = audioBuffer;
+    source.connect(this.audioContext.destination);
+    this.playbackTime = Math.max(this.playbackTime, this.audioContext.currentTime);
+    source.start(this.playbackTime);
+    this.playbackTime += audioBuffer.duration;
+
+    this.activeSources.push(source);
+    source.onended = () => {
+      this.activeSources = this.activeSources.filter((s) => s !== source);
+    };
+  }
+
+  stopPlayback() {
+    this.activeSources.forEach((source) => source.stop());
+    this.activeSources = [];
+    this.playbackTime = 0;
+  }
+
+  /**
+   * Envia uma mensagem de texto (interrompe a resposta em andamento)
+   * @param {string} text - Mensagem do usuário
+   * @param {string} context - Contexto adicional
+   */
+  sendText(text, context = '') {
+    this.stopPlayback();
+    this.socket.send(JSON.stringify({ type: 'text', text, context }));
+  }
+
+  /**
+   * Envia um áudio gravado como turno de voz
+   * @param {Blob} blob - Áudio gravado
+   */
+  async sendAudio(blob) {
+    this.stopPlayback();
+    this.socket.send(await blob.arrayBuffer());
+    this.socket.send(JSON.stringify({ type: 'audio_end', content_type: blob.type }));
+  }
+
+  /**
+   * Barge-in: interrompe a fala da Godofreda
+   */
+  cancel() {
+    this.stopPlayback();
+    this.socket.send(JSON.stringify({ type: 'cancel' }));
+  }
+
+  close() {
+    this.stopPlayback();
+    this.socket?.close();
+  }
+}
+
+export default RealtimeSession;
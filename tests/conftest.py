@@ -0,0 +1,14 @@
+# ================================
+# CONFIGURAÇÃO DOS TESTES
+# ================================
+
+import os
+import sys
+
+# Os módulos da API usam imports absolutos a partir de app/ (PYTHONPATH=/app no container)
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+# Testes sobem a API sem modelo TTS (modo leve, importação em menos de 1s)
+os.environ.setdefault("TTS_LOAD_MODE", "none")
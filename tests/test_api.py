@@ -44,4 +44,49 @@ def test_chat_endpoint_invalid_input():
 def test_falar_endpoint_invalid_input():
     """Testa o endpoint de TTS com entrada inválida"""
     response = client.post("/falar", data={"texto": ""})
-    assert response.status_code == 400 
\ No newline at end of file
+    assert response.status_code == 400 
+def test_falar_batch_rejects_empty_batch():
+    """Testa o lote de TTS sem itens"""
+    response = client.post("/falar/batch", json={"items": []})
+    assert response.status_code == 400
+
+def test_chat_batch_rejects_oversized_batch():
+    """Testa o limite de itens do lote de chat"""
+    items = [{"user_input": "oi"}] * 1000
+    response = client.post("/chat/batch", json={"items": items})
+    assert response.status_code == 400
+
+def test_metrics_use_route_templates():
+    """Métricas rotuladas pelo template da rota; caminhos sem rota viram um único rótulo"""
+    client.get("/health")
+    client.get("/wp-admin/scan-1")
+    client.get("/wp-admin/scan-2")
+    body = client.get("/metrics").text
+    assert 'endpoint="/health",method="GET",status="200"' in body
+    assert 'endpoint="<unmatched>"' in body
+    assert "scan-1" not in body
+
+def test_admin_endpoints_require_token(monkeypatch):
+    """Sem ADMIN_TOKEN as rotas de diagnóstico não existem; com ele exigem o header"""
+    from config import config
+    assert client.get("/admin/loop").status_code == 404
+
+    monkeypatch.setattr(config.admin, "token", "segredo")
+    assert client.get("/admin/loop").status_code == 401
+    assert client.get("/admin/loop", headers={"X-Admin-Token": "errado"}).status_code == 401
+    response = client.get("/admin/loop", headers={"X-Admin-Token": "segredo"})
+    assert response.status_code == 200
+    assert "blocking_events" in response.json()
+    response = client.post("/admin/profile?seconds=0.1&formato=json", headers={"X-Admin-Token": "segredo"})
+    assert response.status_code == 200
+    assert response.json()["samples"] > 0
+    for hz in ("0", "-5"):
+        response = client.post(f"/admin/profile?seconds=0.1&hz={hz}", headers={"X-Admin-Token": "segredo"})
+        assert response.status_code == 400
+
+def test_readiness_in_no_model_mode():
+    """Sem modelo (TTS_LOAD_MODE=none, ver conftest) a API fica pronta só com os serviços leves"""
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["tts"] == "disabled"
+    assert "startup" in client.get("/status").json()
@@ -0,0 +1,59 @@
+# ================================
+# TESTES DO MIDDLEWARE ASGI
+# ================================
+
+import asyncio
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+from asgi_middleware import MetricsMiddleware
+
+def build(admission=None):
+    registry = CollectorRegistry()
+    metrics = {
+        "request_count": Counter('t_requests_total', '', ['method', 'endpoint', 'status'], registry=registry),
+        "request_duration": Histogram('t_request_duration_seconds', '', ['method', 'endpoint'], registry=registry),
+        "active_connections": Gauge('t_active_connections', '', registry=registry),
+        "error_count": Counter('t_errors_total', '', ['type'], registry=registry),
+    }
+    app = FastAPI()
+    seen_active = []
+
+    @app.get("/falar/{voz}")
+    async def stream(voz: str) -> StreamingResponse:
+        async def chunks():
+            for _ in range(3):
+                seen_active.append(metrics["active_connections"]._value.get())
+                await asyncio.sleep(0.05)
+                yield b"\x00" * 16
+        return StreamingResponse(chunks(), media_type="audio/wav")
+
+    app.add_middleware(MetricsMiddleware, admission=admission, rate_limits=(("/falar", None, "tts"),), **metrics)
+    return TestClient(app), registry, seen_active
+
+def test_stream_is_timed_to_last_byte():
+    """A duração inclui o stream inteiro e a conexão fica ativa até o fim"""
+    client, registry, seen_active = build()
+    assert len(client.get("/falar/p230").content) == 48
+
+    labels = {"method": "GET", "endpoint": "/falar/{voz}"}
+    assert registry.get_sample_value("t_request_duration_seconds_sum", labels) >= 0.15
+    assert registry.get_sample_value("t_requests_total", dict(labels, status="200")) == 1
+    assert seen_active == [1, 1, 1]
+    assert registry.get_sample_value("t_active_connections") == 0
+
+def test_admission_rejection_returns_status():
+    """Rate limit recusado vira resposta JSON com o status da HTTPException"""
+    async def deny(request, kind):
+        raise HTTPException(status_code=429, detail={"error": "Rate limit exceeded", "kind": kind})
+
+    client, registry, _ = build(admission=deny)
+    response = client.get("/falar/p230")
+    assert response.status_code == 429
+    assert response.json()["detail"]["kind"] == "tts"
+    assert registry.get_sample_value(
+        "t_requests_total", {"method": "GET", "endpoint": "<unmatched>", "status": "429"}
+    ) == 1
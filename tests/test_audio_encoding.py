@@ -0,0 +1,82 @@
+# ================================
+# TESTES DA CODIFICAÇÃO DE ÁUDIO
+# ================================
+
+import asyncio
+import io
+import shutil
+import wave
+
+import numpy as np
+import pytest
+
+from audio_encoding import (
+    AUDIO_FORMATS, FormatNotAcceptable, OutputSpec, build_output_spec,
+    encode_audio, ffmpeg_command, negotiate_format
+)
+
+def test_parameter_overrides_accept():
+    """O parâmetro explícito vence o header Accept"""
+    assert negotiate_format("audio/mpeg", "flac").name == "flac"
+
+def test_accept_respects_quality_order():
+    """O tipo de maior q suportado é escolhido"""
+    accept = "audio/webm;q=1.0, audio/mpeg;q=0.5, audio/ogg;q=0.8"
+    assert negotiate_format(accept).name == "opus"
+
+def test_wildcard_and_missing_accept_use_default():
+    """Sem preferência explícita, vale o formato padrão"""
+    assert negotiate_format(None).name == "wav"
+    assert negotiate_format("*/*").name == "wav"
+
+def test_unsupported_format_is_rejected():
+    """Formatos desconhecidos geram FormatNotAcceptable (406)"""
+    with pytest.raises(FormatNotAcceptable):
+        negotiate_format("audio/webm")
+    with pytest.raises(FormatNotAcceptable):
+        negotiate_format(None, "aac")
+    with pytest.raises(FormatNotAcceptable):
+        build_output_spec(requested="flac", bit_depth=12)
+
+def test_accept_negotiated_responses_vary_on_accept():
+    """Formato vindo do Accept (ou do padrão) gera Vary: Accept; o parâmetro explícito não"""
+    assert build_output_spec("audio/ogg").headers() == {"Vary": "Accept"}
+    assert build_output_spec(None).headers() == {"Vary": "Accept"}
+    assert build_output_spec("audio/ogg", requested="mp3").headers() == {}
+
+def test_lossy_formats_ignore_bit_depth():
+    """Opus e MP3 não têm profundidade fixa"""
+    assert build_output_spec(requested="mp3", bit_depth=24).bit_depth == 16
+    assert build_output_spec(requested="flac", bit_depth=24).bit_depth == 24
+
+def test_native_wav_skips_encoder():
+    """WAV 16 bits é gerado em processo, reamostrado quando a taxa muda"""
+    native = OutputSpec(AUDIO_FORMATS["wav"])
+    resampled = OutputSpec(AUDIO_FORMATS["wav"], sample_rate=16000)
+    assert not native.needs_encoder()
+    assert not resampled.needs_encoder()
+    assert OutputSpec(AUDIO_FORMATS["wav"], bit_depth=24).needs_encoder()
+    assert OutputSpec(AUDIO_FORMATS["opus"]).needs_encoder()
+
+    data = asyncio.run(encode_audio(np.zeros(240, dtype=np.float32), 24000, native))
+    with wave.open(io.BytesIO(data)) as wav_file:
+        assert wav_file.getframerate() == 24000
+        assert wav_file.getnframes() == 240
+
+    data = asyncio.run(encode_audio(np.zeros(240, dtype=np.float32), 24000, resampled))
+    with wave.open(io.BytesIO(data)) as wav_file:
+        assert wav_file.getframerate() == 16000
+        assert wav_file.getnframes() == 160
+
+def test_ffmpeg_command_resamples_and_sets_depth():
+    """A linha de comando reflete taxa e profundidade pedidas"""
+    command = ffmpeg_command(OutputSpec(AUDIO_FORMATS["flac"], sample_rate=16000, bit_depth=24), 24000)
+    assert command[command.index("-i") + 2:command.index("-i") + 4] == ["-ar", "16000"]
+    assert "s32" in command and command[-1] == "pipe:1"
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg não instalado")
+def test_flac_encoding_roundtrip():
+    """FLAC codificado pelo ffmpeg começa com a assinatura fLaC"""
+    audio = np.sin(np.linspace(0, 100, 24000)).astype(np.float32) * 0.5
+    data = asyncio.run(encode_audio(audio, 24000, OutputSpec(AUDIO_FORMATS["flac"])))
+    assert data[:4] == b"fLaC"
@@ -0,0 +1,77 @@
+# ================================
+# TESTES DO PÓS-PROCESSAMENTO DA SAÍDA DO TTS
+# ================================
+
+import io
+import wave
+
+import numpy as np
+
+from audio_postprocess import StreamPostprocessor, integrated_loudness, postprocess, trim_edges
+from audio_utils import float_to_pcm16, wav_bytes
+from config import config
+
+def tone(seconds, sample_rate, frequency=997.0, amplitude=0.3):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+def padded(audio, sample_rate, seconds=0.5):
+    silence = np.zeros(int(seconds * sample_rate), dtype=np.float32)
+    return np.concatenate([silence, audio, silence])
+
+def test_loudness_matches_reference_sine():
+    """Seno de 997 Hz em fundo de escala mede -3,01 LUFS (BS.1770); silêncio é -inf"""
+    assert abs(integrated_loudness(tone(3.0, 48000, amplitude=1.0), 48000) + 3.01) < 0.1
+    assert abs(integrated_loudness(tone(3.0, 24000, amplitude=0.1), 24000) + 23.01) < 0.1
+    assert integrated_loudness(np.zeros(48000, dtype=np.float32), 48000) == float("-inf")
+
+def test_postprocess_trims_and_normalizes(monkeypatch):
+    """Silêncio das bordas sai, a loudness vai ao alvo e o pico respeita o teto"""
+    monkeypatch.setattr(config.tts, "loudness", "lufs")
+    monkeypatch.setattr(config.tts, "loudness_target_lufs", -16.0)
+    timings = {}
+    audio, sample_rate = postprocess(padded(tone(1.0, 24000, amplitude=0.05), 24000), 24000, timings=timings)
+    assert sample_rate == 24000
+    assert audio.size <= int(24000 * (1.0 + 2 * config.tts.trim_padding_seconds)) + 480
+    assert abs(integrated_loudness(audio, 24000) + 16.0) < 0.2
+    assert float(np.max(np.abs(audio))) <= 10 ** (config.tts.peak_dbfs / 20) + 1e-4
+    assert set(timings) == {"trim", "normalize"}
+
+def test_trim_floor_is_independent_of_stt_vad(monkeypatch):
+    """O piso do corte vem de TTS_TRIM_FLOOR_DB: mudar o VAD do STT não afeta a saída do TTS"""
+    audio = padded(tone(1.0, 24000, amplitude=0.01), 24000)  # cerca de -43 dBFS
+    monkeypatch.setattr(config.stt, "vad_floor_db", -20.0)
+    assert trim_edges(audio, 24000, -40.0, -60.0, 0.0).size == 24000
+    assert trim_edges(audio, 24000, -40.0, -30.0, 0.0).size == audio.size
+
+def test_postprocess_peak_mode_and_output_rate(monkeypatch):
+    """Modo peak leva o pico ao teto; a taxa pedida é aplicada"""
+    monkeypatch.setattr(config.tts, "loudness", "peak")
+    audio, sample_rate = postprocess(tone(1.0, 24000, amplitude=0.2), 24000, target_rate=16000)
+    assert sample_rate == 16000 and abs(audio.size - 16000) <= 1
+    assert abs(20 * np.log10(np.max(np.abs(audio))) - config.tts.peak_dbfs) < 0.05
+
+    monkeypatch.setattr(config.tts, "postprocess", False)
+    source = padded(tone(0.5, 24000), 24000)
+    audio, _ = postprocess(source.copy(), 24000)
+    assert np.array_equal(audio, source)
+
+def test_stream_gain_fixed_by_first_chunk(monkeypatch):
+    """Só o primeiro trecho perde o silêncio inicial; todos recebem o mesmo ganho"""
+    monkeypatch.setattr(config.tts, "loudness", "peak")
+    stream = StreamPostprocessor(24000)
+    first = stream.process(padded(tone(0.5, 24000, amplitude=0.1), 24000))
+    second = stream.process(padded(tone(0.5, 24000, amplitude=0.1), 24000))
+    assert first.size < second.size == 36000
+    assert abs(float(np.max(np.abs(first))) - float(np.max(np.abs(second)))) < 1e-3
+
+def test_pcm16_conversion_matches_wave_module():
+    """Conversão em blocos satura em ±1 e gera um WAV legível"""
+    audio = np.linspace(-1.5, 1.5, 200001, dtype=np.float32)
+    pcm = float_to_pcm16(audio)
+    expected = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    assert np.array_equal(pcm, expected)
+
+    with wave.open(io.BytesIO(wav_bytes(audio, 22050))) as wav_file:
+        assert wav_file.getframerate() == 22050 and wav_file.getsampwidth() == 2
+        assert np.array_equal(np.frombuffer(wav_file.readframes(audio.size), "<i2"), expected)
@@ -0,0 +1,86 @@
+# ================================
+# TESTES DO PREPROCESSAMENTO DE VOZ E STT
+# ================================
+
+import asyncio
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from audio_preprocess import (
+    decode_wav, iter_speech_chunks, normalize_loudness, preprocess_voice, resample, trim_silence
+)
+from stt_backends import StubSTTBackend, create_stt_backend
+
+def tone(seconds, sample_rate, frequency=220.0, amplitude=0.3):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+def wav_file(audio, sample_rate, channels=1):
+    """WAV PCM 16 bits com o mesmo sinal em todos os canais"""
+    pcm = (np.repeat(audio[:, None], channels, axis=1) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+def test_decode_stereo_wav_to_mono():
+    """Canais são combinados e a escala volta para [-1, 1]"""
+    audio, sample_rate = decode_wav(memoryview(wav_file(tone(0.1, 8000), 8000, channels=2)))
+    assert sample_rate == 8000 and audio.dtype == np.float32
+    assert audio.size == 800 and abs(float(audio.max()) - 0.3) < 0.01
+
+def test_resample_keeps_duration_and_removes_aliasing():
+    """48 kHz -> 16 kHz mantém a duração e atenua conteúdo acima de 8 kHz"""
+    low = resample(tone(1.0, 48000, 440.0), 48000, 16000)
+    high = resample(tone(1.0, 48000, 12000.0), 48000, 16000)
+    assert low.size == 16000
+    assert np.sqrt(np.mean(high ** 2)) < 0.1 * np.sqrt(np.mean(low ** 2))
+
+def test_trim_silence_and_normalize():
+    """Silêncio nas bordas sai e o RMS final fica no alvo"""
+    silence = np.zeros(16000, dtype=np.float32)
+    speech = tone(0.5, 16000, amplitude=0.05)
+    trimmed = trim_silence(np.concatenate([silence, speech, silence]), 16000, -35.0, padding_seconds=0.0)
+    assert abs(trimmed.size - speech.size) <= 320
+
+    normalized = normalize_loudness(trimmed, -20.0)
+    rms_db = 20 * np.log10(np.sqrt(np.mean(normalized ** 2)))
+    assert abs(rms_db + 20.0) < 0.5 and np.max(np.abs(normalized)) <= 10 ** (-1 / 20) + 1e-6
+
+def test_only_silence_is_trimmed_to_empty():
+    """Áudio sem fala resulta em vetor vazio"""
+    assert trim_silence(np.zeros(16000, dtype=np.float32), 16000, -35.0).size == 0
+
+def test_speech_chunks_split_at_quiet_frames():
+    """Trechos respeitam o máximo e cortam na pausa"""
+    audio = np.concatenate([tone(1.5, 16000), np.zeros(1600, np.float32), tone(1.5, 16000)])
+    chunks = list(iter_speech_chunks(audio, 16000, max_seconds=2.0))
+    assert sum(chunk.size for chunk in chunks) == audio.size
+    assert all(chunk.size <= 32000 for chunk in chunks)
+    assert 24000 <= chunks[0].size <= 25600
+
+def test_pipeline_feeds_stub_backend():
+    """Pipeline completo entrega 16 kHz sem silêncio ao backend em memória"""
+    audio = np.concatenate([np.zeros(22050, np.float32), tone(1.0, 44100), np.zeros(22050, np.float32)])
+    result = asyncio.run(preprocess_voice(wav_file(audio, 44100, channels=2)))
+    assert result.sample_rate == 16000
+    assert result.original_seconds > 1.9 and result.speech_seconds < 1.4
+
+    backend = StubSTTBackend(responses=["olá", "godofreda"])
+    text = backend.transcribe_chunks(iter_speech_chunks(result.audio, 16000, 0.6), 16000)
+    assert text.startswith("olá godofreda") and len(backend.calls) >= 2
+    assert isinstance(create_stt_backend("stub"), StubSTTBackend)
+
+def test_malformed_wav_raises_value_error():
+    """WAV truncado ou sem chunks obrigatórios vira ValueError (422 na API), não wave.Error"""
+    complete = wav_file(tone(0.1, 8000), 8000)
+    header_only = b"RIFF" + (28).to_bytes(4, "little") + b"WAVE" + complete[12:36]
+    for data in (header_only, complete[:20], b"RIFF\x00\x00\x00\x00WAVE"):
+        with pytest.raises(ValueError):
+            decode_wav(data)
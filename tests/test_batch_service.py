@@ -0,0 +1,70 @@
+# ================================
+# TESTES DO SERVIÇO DE LOTES
+# ================================
+
+import asyncio
+import io
+import zipfile
+
+from batch_service import run_bounded, ndjson_line, ZipStream
+
+def test_run_bounded_limits_concurrency_and_isolates_errors():
+    """No máximo N itens rodam juntos e a falha de um não afeta os outros"""
+    active = 0
+    peak = 0
+
+    async def handler(item):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        if item == "erro":
+            raise ValueError("falha simulada")
+        return item.upper()
+
+    async def scenario():
+        return [outcome async for outcome in run_bounded(["a", "erro", "b", "c", "d"], handler, 2)]
+
+    outcomes = asyncio.run(scenario())
+    assert peak == 2
+    results = {index: (result, error) for index, result, error in outcomes}
+    assert results[0] == ("A", None)
+    assert isinstance(results[1][1], ValueError)
+    assert [results[i][0] for i in (2, 3, 4)] == ["B", "C", "D"]
+
+def test_ndjson_line_is_single_utf8_line():
+    """Cada resultado vira exatamente uma linha JSON"""
+    line = ndjson_line({"response": "olá\nmundo"})
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    assert "olá".encode() in line
+
+def test_zip_stream_produces_valid_archive():
+    """Os pedaços transmitidos formam um ZIP válido"""
+    archive = ZipStream()
+    chunks = [archive.add("0000-a.wav", b"RIFF" * 10), archive.add("manifest.json", b"{}"), archive.close()]
+    assert all(chunks[:2])
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as result:
+        assert result.namelist() == ["0000-a.wav", "manifest.json"]
+        assert result.read("0000-a.wav") == b"RIFF" * 10
+
+def test_stop_flag_keeps_queued_items_from_starting():
+    """Consumidor encerrado antes do fechamento do gerador: itens na fila do semáforo não começam"""
+    started = []
+
+    async def handler(item):
+        started.append(item)
+        await asyncio.sleep(0.01)
+        return item
+
+    async def scenario():
+        stop = asyncio.Event()
+        outcomes = run_bounded(list(range(5)), handler, 1, stop)
+        await outcomes.__anext__()
+        stop.set()  # finally do consumidor; o gerador só é fechado depois
+        await asyncio.sleep(0.1)
+        await outcomes.aclose()
+
+    asyncio.run(scenario())
+    assert len(started) <= 2
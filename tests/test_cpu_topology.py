@@ -0,0 +1,41 @@
+# ================================
+# TESTES DA TOPOLOGIA DE CPU
+# ================================
+
+import sys
+
+from cpu_topology import (
+    apply_worker_layout, effective_cpu_count, enter_preload_master, leave_preload_master, plan_layout
+)
+
+def test_effective_cpu_count_respects_quota():
+    """Cota do cgroup limita as CPUs efetivas"""
+    assert effective_cpu_count(list(range(16)), 2.5) == 2
+    assert effective_cpu_count(list(range(4)), None) == 4
+    assert effective_cpu_count([0], 0.5) == 1
+
+def test_plan_layout_auto_does_not_oversubscribe():
+    """Layout automático não ultrapassa as CPUs disponíveis"""
+    layout = plan_layout(cpus=list(range(16)), quota=None)
+    assert layout.workers * layout.intra_op_threads <= 16
+    assert layout.intra_op_threads == 4
+
+def test_plan_layout_fixed_workers_splits_threads():
+    """Com workers fixos, as threads são divididas entre eles"""
+    layout = plan_layout(workers=3, cpus=list(range(8)), quota=6.0)
+    assert layout.effective_cpus == 6
+    assert layout.intra_op_threads == 2
+
+def test_plan_layout_pinning_uses_disjoint_cores():
+    """Workers fixados recebem conjuntos disjuntos de cores"""
+    layout = plan_layout(workers=2, threads_per_worker=2, pin_cores=True, cpus=[0, 1, 2, 3], quota=None)
+    assert layout.core_sets == [[0, 1], [2, 3]]
+    assert layout.core_set(1) == [2, 3]
+    assert plan_layout(workers=2, cpus=[0, 1], quota=None).core_set(0) is None
+
+def test_worker_layout_without_torch(monkeypatch):
+    """Deploys ONNX/remoto sem torch aplicam o layout sem falhar"""
+    monkeypatch.setitem(sys.modules, "torch", None)
+    apply_worker_layout(2, 1)
+    enter_preload_master()
+    leave_preload_master()
@@ -0,0 +1,121 @@
+# ================================
+# TESTES DO MODO DEGRADADO (ÁUDIO PRÉ-RENDERIZADO E DISJUNTOR DO LLM)
+# ================================
+
+import asyncio
+import io
+import wave
+
+import numpy as np
+
+from circuit_breaker import CircuitBreaker
+from degraded_audio import (
+    DegradedAudioBundle, build_bundle, bundle_fingerprint, degraded_catalog, message_key, nearest_slot
+)
+from llm_service import STATIC_FALLBACKS, GodofredaLLM
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def fake_synthesize(text):
+    """Um tom por frase, com duração proporcional ao texto"""
+    t = np.arange(len(text) * 100) / 16000
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), 16000
+
+def test_bundle_roundtrip_and_templates(tmp_path):
+    """Fallbacks fixos e mensagens expandidas voltam do arquivo mapeado como WAV"""
+    path = str(tmp_path / "degraded.bin")
+    catalog = degraded_catalog()
+    assert set(STATIC_FALLBACKS) <= set(catalog.values())
+    assert message_key("tts_busy", seconds="30") in catalog
+    assert nearest_slot("seconds", 12.5) == "30" and nearest_slot("seconds", 999) == "60"
+
+    build_bundle(path, fake_synthesize, catalog)
+    bundle = DegradedAudioBundle()
+    assert bundle.load(path) and bundle.sample_rate == 16000
+
+    key = bundle.find(f"  {STATIC_FALLBACKS[1]} ")
+    assert key is not None and bundle.find("texto qualquer") is None
+    with wave.open(io.BytesIO(bundle.wav(key))) as wav_file:
+        assert wav_file.getframerate() == 16000
+        assert wav_file.getnframes() == len(STATIC_FALLBACKS[1]) * 100
+    assert abs(float(np.max(np.abs(bundle.audio(key)))) - 0.3) < 1e-3
+
+    (tmp_path / "broken.bin").write_bytes(b"nada disso")
+    assert not bundle.load(str(tmp_path / "broken.bin")) and bundle.path == path
+
+def test_fingerprint_follows_default_registry_model(monkeypatch):
+    """Trocar o modelo padrão do registro invalida o pacote, mesmo com TTS_BACKEND igual"""
+    from model_registry import ModelSpec, model_registry
+
+    catalog = degraded_catalog()
+    monkeypatch.setattr(model_registry, "specs", {"padrao": ModelSpec("padrao", "onnx", "/modelos/a")})
+    monkeypatch.setattr(model_registry, "default", "padrao")
+    first = bundle_fingerprint(catalog)
+    monkeypatch.setitem(model_registry.specs, "padrao", ModelSpec("padrao", "onnx", "/modelos/b"))
+    assert bundle_fingerprint(catalog) != first
+
+def test_circuit_breaker_transitions():
+    """Abre após falhas seguidas, libera uma chamada de teste e fecha no sucesso"""
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow() and not breaker.is_open
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.is_open
+
+    clock.now = 11.0
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now = 22.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.stats()["times_opened"] == 2
+
+def test_llm_breaker_skips_requests_and_uses_static_fallbacks(monkeypatch):
+    """Com o disjuntor aberto o Ollama não é chamado e só saem fallbacks pré-renderizáveis"""
+    llm = GodofredaLLM()
+    llm.breaker = CircuitBreaker("llm", failure_threshold=2, reset_timeout=60.0)
+    calls = []
+
+    async def failing_request(endpoint, data):
+        calls.append(endpoint)
+        return None
+
+    monkeypatch.setattr(llm, "_make_request", failing_request)
+
+    async def run():
+        return [await llm.generate_response("oi, tudo bem?") for _ in range(6)]
+
+    responses = asyncio.run(run())
+    assert len(calls) == 2 and llm.breaker.is_open
+    assert all(response in STATIC_FALLBACKS for response in responses[2:])
+
+def test_degraded_chat_response(tmp_path, monkeypatch):
+    """Fallback do LLM sai do pacote; fila cheia troca a voz pelo aviso e mantém o texto"""
+    from app import main
+    from audio_encoding import AUDIO_FORMATS, OutputSpec
+
+    path = str(tmp_path / "degraded.bin")
+    build_bundle(path, fake_synthesize)
+    monkeypatch.setattr(main, "degraded_audio", DegradedAudioBundle())
+    assert main.degraded_audio.load(path)
+    spec = OutputSpec(AUDIO_FORMATS["wav"])
+
+    response = asyncio.run(main.degraded_chat_response(STATIC_FALLBACKS[0], spec))
+    assert response.headers["X-Degraded"] == "llm_fallback"
+    assert asyncio.run(main.degraded_chat_response("Resposta nova do LLM", spec)) is None
+
+    monkeypatch.setattr(main.config.degraded, "tts_queue_threshold", 1)
+    monkeypatch.setattr(main.tts_scheduler, "queued", lambda: 3)
+    monkeypatch.setattr(main.tts_scheduler, "backlog_seconds", lambda: 20.0)
+    response = asyncio.run(main.degraded_chat_response("Resposta nova do LLM", spec))
+    assert response.headers["X-Degraded"] == "tts_saturated"
+    assert response.headers["X-Response-Text"] == "Resposta nova do LLM"
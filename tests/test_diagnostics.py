@@ -0,0 +1,80 @@
+# ================================
+# TESTES DE DIAGNÓSTICO (PERFIL, MEMÓRIA, EVENT LOOP)
+# ================================
+
+import asyncio
+import threading
+import time
+
+from diagnostics import LoopMonitor, MemorySnapshots, StackSampler, profile_process
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampler_collapses_worker_thread_stacks():
+    """O perfil pega threads de trabalho e gera pilhas colapsadas e SVG"""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_worker, args=(stop,), name="tts-worker")
+    worker.start()
+    try:
+        sampler = StackSampler().run(0.2, 200)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert sampler.samples > 10
+    lines = sampler.collapsed().splitlines()
+    assert any(line.startswith("tts-worker;") and "busy_worker" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    svg = sampler.flamegraph_svg()
+    assert svg.startswith("<svg") and "busy_worker" in svg
+
+def test_profile_sees_blocked_event_loop():
+    """Código síncrono rodando no loop aparece na pilha rotulada event-loop"""
+    async def scenario():
+        task = asyncio.create_task(profile_process(0.3, 100))
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # bloqueia o loop, como um tts_to_file síncrono
+        return await task
+
+    sampler = asyncio.run(scenario())
+    assert any(stack.startswith("event-loop;") and "scenario" in stack for stack in sampler.stacks)
+
+def test_loop_monitor_records_blocking_call():
+    """Bloqueio acima do limite vira evento com a pilha do culpado"""
+    def synchronous_synthesis():
+        time.sleep(0.4)
+
+    async def scenario():
+        monitor = LoopMonitor(interval=0.02, threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.1)
+        synchronous_synthesis()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["blocking_total"] == 1
+    event = stats["blocking_events"][0]
+    assert event["blocked_seconds"] >= 0.2
+    assert any("synchronous_synthesis" in frame for frame in event["stack"])
+    assert stats["lag_ms"]["max"] >= 300
+
+def test_memory_snapshot_diff_shows_growth():
+    """A diferença entre snapshots aponta a linha que alocou"""
+    snapshots = MemorySnapshots(max_snapshots=2)
+    snapshots.start(frames=1)
+    try:
+        base = snapshots.take()["id"]
+        leak = [bytearray(1024) for _ in range(2000)]
+        target = snapshots.take()["id"]
+        diff = snapshots.diff(base, target, limit=5)
+    finally:
+        snapshots.stop()
+
+    assert "test_diagnostics.py" in diff["top"][0]["location"]
+    assert diff["top"][0]["size_diff_kb"] >= 2000
+    assert len(leak) == 2000
+    assert not snapshots.tracing
@@ -0,0 +1,107 @@
+# ================================
+# TESTES DO PIPELINE DE IMAGENS
+# ================================
+
+import asyncio
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+from image_pipeline import AnalysisCache, ImageAnalyzer, hamming, prepare_image
+from vision_backends import StubVisionBackend
+
+def encoded(width, height, format="PNG", seed=0, **kwargs):
+    """Imagem com gradiente e ruído fixo, serializada no formato pedido"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width)[None, :, None]
+    y = np.linspace(0, 255, height)[:, None, None]
+    pixels = np.clip(np.concatenate([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+                     + rng.normal(0, 20, (height, width, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format=format, **kwargs)
+    return buffer.getvalue()
+
+def test_downscale_and_reencode():
+    """A imagem é reduzida ao lado máximo, mantendo a proporção, e vira JPEG"""
+    prepared = prepare_image(encoded(1600, 800), max_side=400)
+    assert (prepared.width, prepared.height) == (400, 200)
+    assert (prepared.original_width, prepared.original_height) == (1600, 800)
+    assert prepared.data[:3] == b"\xff\xd8\xff"
+
+def test_transparency_is_flattened():
+    """PNG com alfa é composto sobre fundo branco"""
+    buffer = io.BytesIO()
+    Image.new("RGBA", (32, 32), (255, 0, 0, 0)).save(buffer, format="PNG")
+    prepared = prepare_image(buffer.getvalue())
+    pixel = Image.open(io.BytesIO(prepared.data)).getpixel((16, 16))
+    assert all(channel > 240 for channel in pixel)
+
+def test_recompressed_repost_has_close_hash():
+    """A mesma imagem em outro formato e tamanho tem dHash quase igual"""
+    original = prepare_image(encoded(800, 600, seed=1))
+    repost = prepare_image(encoded(800, 600, format="JPEG", seed=1, quality=40), max_side=300)
+    mirrored = io.BytesIO()
+    Image.open(io.BytesIO(encoded(800, 600, seed=1))).transpose(Image.Transpose.FLIP_LEFT_RIGHT).save(mirrored, "PNG")
+    other = prepare_image(mirrored.getvalue())
+    assert hamming(original.dhash, repost.dhash) <= 4
+    assert hamming(original.dhash, other.dhash) > 4
+
+def test_invalid_image_raises_value_error():
+    """Bytes que não são imagem viram ValueError"""
+    with pytest.raises(ValueError):
+        prepare_image(b"\x89PNG\r\n\x1a\nlixo")
+
+def test_lru_cache_evicts_least_recently_used():
+    """Acima do limite, sai a entrada usada há mais tempo"""
+    cache = AnalysisCache(max_entries=2, max_distance=0)
+    cache.put(1, "p", "a")
+    cache.put(2, "p", "b")
+    assert cache.get(1, "p") == "a"
+    cache.put(3, "p", "c")
+    assert cache.get(2, "p") is None and cache.get(1, "p") == "a" and len(cache) == 2
+
+def test_cache_is_exact_by_default_and_keyed_by_prompt():
+    """Sem tolerância configurada só o mesmo hash casa; outro prompt é outra análise"""
+    cache = AnalysisCache(max_entries=8)
+    assert cache.max_distance == 0
+    cache.put(0b1010, "descreva", "a")
+    assert cache.get(0b1011, "descreva") is None
+    assert cache.get(0b1010, "leia o texto") is None
+    assert cache.get(0b1010, "descreva") == "a"
+
+def test_reposted_image_uses_cache():
+    """Repostagens e pedidos simultâneos não disparam nova inferência"""
+    backend = StubVisionBackend(responses=["um meme"])
+    analyzer = ImageAnalyzer(backend, AnalysisCache(max_entries=8, max_distance=4))
+
+    async def run():
+        first = await asyncio.gather(*(analyzer.analyze(encoded(640, 480, seed=3)) for _ in range(3)))
+        repost = await analyzer.analyze(encoded(640, 480, format="JPEG", seed=3, quality=50))
+        return first, repost
+
+    first, repost = asyncio.run(run())
+    assert len(backend.calls) == 1
+    assert [text for text, _ in first] == ["um meme"] * 3
+    assert repost == ("um meme", True)
+
+def test_vision_backend_failure_is_service_unavailable(monkeypatch):
+    """Timeout ou erro HTTP do modelo de visão vira 503, não erro interno"""
+    import httpx
+    from fastapi import HTTPException
+    from app import main
+
+    class OfflineBackend(StubVisionBackend):
+        async def describe(self, image, prompt):
+            raise httpx.ConnectTimeout("sem resposta")
+
+    data = encoded(64, 64)
+    image = SimpleNamespace(filename="foto.png", content_type="image/png", sha256="0" * 64, size=len(data), data=data)
+    monkeypatch.setattr(main, "image_analyzer", ImageAnalyzer(OfflineBackend()))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.analyze_image_with_llm(image))
+    assert error.value.status_code == 503
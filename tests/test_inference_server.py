@@ -0,0 +1,80 @@
+# ================================
+# TESTES DO SERVIDOR DE INFERÊNCIA
+# ================================
+
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from inference_client import InferenceClient
+from inference_server import InferenceServer
+from tts_backends import TTSBackend
+
+class FakeBackend(TTSBackend):
+    """Backend determinístico: uma amostra por caractere"""
+
+    name = "fake"
+
+    def load(self):
+        self.sample_rate = 16000
+        self.loaded = True
+
+    def synthesize(self, text, language="pt", speaker=None):
+        if text == "erro":
+            raise ValueError("falha simulada")
+        return np.linspace(0, 1, len(text), dtype=np.float32)
+
+@pytest.fixture
+def server_address(tmp_path):
+    """Sobe o servidor em uma thread com event loop próprio"""
+    backend = FakeBackend()
+    backend.load()
+    address = f"unix:{tmp_path}/tts.sock"
+    server = InferenceServer(backend, address=address, buffer_dir=str(tmp_path))
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait(5)
+    yield address, tmp_path
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+def test_synthesize_maps_buffer_and_removes_file(server_address):
+    """Áudio chega via buffer mapeado e o arquivo é removido após o uso"""
+    address, buffer_dir = server_address
+    client = InferenceClient(address, pool_size=2)
+    audio = client.synthesize("olá mundo")
+    assert audio.dtype == np.float32
+    np.testing.assert_allclose(audio, np.linspace(0, 1, 9, dtype=np.float32))
+    assert not [f for f in os.listdir(buffer_dir) if f.endswith(".pcm")]
+    assert client.info()["sample_rate"] == 16000
+    client.close()
+
+def test_stream_and_connection_reuse(server_address):
+    """Streaming entrega trechos em ordem e conexões voltam ao pool"""
+    address, _ = server_address
+    client = InferenceClient(address, pool_size=1)
+    chunks = list(client.synthesize_stream("Primeira frase. Segunda frase maior."))
+    assert [len(c) for c in chunks] == [len("Primeira frase. Segunda frase maior.")]
+    assert client._pool.qsize() == 1
+    client.close()
+
+def test_server_error_is_raised(server_address):
+    """Erros do backend chegam ao cliente como exceção"""
+    address, _ = server_address
+    client = InferenceClient(address)
+    with pytest.raises(RuntimeError, match="falha simulada"):
+        client.synthesize("erro")
+    assert len(client.synthesize("ok")) == 2
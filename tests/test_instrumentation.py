@@ -0,0 +1,43 @@
+# ================================
+# TESTES DA INSTRUMENTAÇÃO
+# ================================
+
+from prometheus_client import REGISTRY
+
+from instrumentation import (
+    LLM_TOKENS_PER_SECOND, TTS_REAL_TIME_FACTOR, UNMATCHED_ROUTE,
+    record_llm_timings, record_tts, route_template, stage
+)
+
+def stage_count(name):
+    return REGISTRY.get_sample_value("godofreda_stage_duration_seconds_count", {"stage": name}) or 0.0
+
+def test_stage_is_recorded_even_on_error():
+    """O bloco medido conta mesmo quando levanta exceção"""
+    before = stage_count("cache_lookup")
+    try:
+        with stage("cache_lookup"):
+            raise RuntimeError("redis fora")
+    except RuntimeError:
+        pass
+    assert stage_count("cache_lookup") == before + 1
+
+def test_llm_timings_from_ollama_response():
+    """Tempos do Ollama (ns) viram estágios e tokens/s"""
+    before = stage_count("llm_prompt_eval")
+    record_llm_timings({"prompt_eval_duration": 200_000_000, "eval_duration": 2_000_000_000, "eval_count": 50})
+    assert stage_count("llm_prompt_eval") == before + 1
+    assert LLM_TOKENS_PER_SECOND._value.get() == 25.0
+
+def test_tts_real_time_factor():
+    """RTF = tempo de síntese / duração do áudio"""
+    record_tts(0.5, samples=48000, sample_rate=24000)
+    assert TTS_REAL_TIME_FACTOR._value.get() == 0.25
+
+def test_route_template_bounds_cardinality():
+    """Sem rota casada, o rótulo é fixo"""
+    class Route:
+        path = "/jobs/{job_id}"
+
+    assert route_template({"route": Route()}) == "/jobs/{job_id}"
+    assert route_template({"path": "/qualquer/coisa"}) == UNMATCHED_ROUTE
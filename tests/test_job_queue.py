@@ -0,0 +1,212 @@
+# ================================
+# TESTES DA FILA DE JOBS
+# ================================
+
+import asyncio
+
+import pytest
+
+from job_queue import MemoryJobQueue, RedisJobQueue, run_worker, JOB_DONE, JOB_FAILED, JOB_QUEUED
+
+def make_queue(visibility_timeout=60, max_retries=2):
+    queue = MemoryJobQueue()
+    queue.visibility_timeout = visibility_timeout
+    queue.max_retries = max_retries
+    queue.poll_interval = 0.01
+    return queue
+
+def test_submit_claim_complete():
+    """Job percorre fila -> processamento -> concluído com resultado"""
+    async def scenario():
+        queue = make_queue()
+        job = await queue.submit("falar", {"text": "oi"})
+        claimed = await queue.claim("w1", block_seconds=0.1)
+        assert claimed.id == job.id and claimed.attempts == 1
+        assert (await queue.stats())["processing"] == 1
+
+        assert await queue.complete(job.id, "w1", b"RIFF", "audio/wav")
+        done = await queue.get(job.id)
+        assert done.status == JOB_DONE
+        assert await queue.get_result(job.id) == b"RIFF"
+        assert (await queue.stats())["processing"] == 0
+
+    asyncio.run(scenario())
+
+def test_fail_retries_then_fails():
+    """Falhas reenfileiram até max_retries e depois marcam o job como falho"""
+    async def scenario():
+        queue = make_queue(max_retries=2)
+        job = await queue.submit("falar", {"text": "oi"})
+
+        await queue.claim("w1", block_seconds=0.1)
+        assert (await queue.fail(job.id, "boom")).status == JOB_QUEUED
+
+        await queue.claim("w1", block_seconds=0.1)
+        failed = await queue.fail(job.id, "boom")
+        assert failed.status == JOB_FAILED and failed.attempts == 2
+        assert (await queue.stats())["retries"] == 1
+        assert await queue.claim("w1", block_seconds=0.05) is None
+
+    asyncio.run(scenario())
+
+def test_expired_lease_is_requeued():
+    """Jobs de workers que morreram voltam à fila após o visibility timeout"""
+    async def scenario():
+        queue = make_queue(visibility_timeout=0)
+        job = await queue.submit("falar", {"text": "oi"})
+        await queue.claim("w1", block_seconds=0.1)
+
+        assert await queue.requeue_expired() == 1
+        reclaimed = await queue.claim("w2", block_seconds=0.1)
+        assert reclaimed.id == job.id and reclaimed.worker == "w2"
+
+        # O worker antigo termina atrasado: resultado e falha dele não valem mais
+        assert not await queue.complete(job.id, "w1", b"velho", "audio/wav")
+        assert (await queue.fail(job.id, "boom", "w1")).status == "processing"
+        assert await queue.complete(job.id, "w2", b"novo", "audio/wav")
+        assert await queue.get_result(job.id) == b"novo"
+
+    asyncio.run(scenario())
+
+def test_finished_jobs_expire_after_result_ttl():
+    """Jobs concluídos ou falhos saem da memória depois de result_ttl"""
+    async def scenario():
+        queue = make_queue(max_retries=1)
+        queue.result_ttl = 0.05
+        done = await queue.submit("falar", {"text": "oi"})
+        await queue.claim("w1", block_seconds=0.1)
+        await queue.complete(done.id, "w1", b"RIFF", "audio/wav")
+        failed = await queue.submit("falar", {"text": "oi"})
+        await queue.claim("w1", block_seconds=0.1)
+        await queue.fail(failed.id, "boom", "w1")
+        assert (await queue.get(done.id)).status == JOB_DONE
+
+        await asyncio.sleep(0.1)
+        assert await queue.get(done.id) is None and await queue.get_result(done.id) is None
+        assert await queue.get(failed.id) is None
+
+    asyncio.run(scenario())
+
+def test_worker_processes_and_wait_returns_final_state():
+    """Long-poll retorna assim que o worker conclui o job"""
+    async def handler(payload):
+        return payload["text"].encode(), "text/plain"
+
+    async def scenario():
+        queue = make_queue()
+        stop = asyncio.Event()
+        worker = asyncio.create_task(run_worker(queue, {"eco": handler}, "w1", stop))
+
+        job = await queue.submit("eco", {"text": "olá"})
+        unknown = await queue.submit("desconhecido", {})
+        done = await queue.wait(job.id, timeout=2)
+        assert done.status == JOB_DONE
+        assert await queue.get_result(job.id) == "olá".encode()
+
+        stop.set()
+        await asyncio.wait_for(worker, timeout=10)
+        assert (await queue.get(unknown.id)).error.startswith("unknown job kind")
+
+    asyncio.run(scenario())
+
+def test_heartbeat_keeps_lease_during_long_handler():
+    """Handler mais longo que o visibility timeout não é recuperado por outro worker"""
+    async def slow(payload):
+        await asyncio.sleep(0.3)
+        return b"RIFF", "audio/wav"
+
+    async def scenario():
+        queue = make_queue(visibility_timeout=0.1)
+        stop = asyncio.Event()
+        worker = asyncio.create_task(run_worker(queue, {"falar": slow}, "w1", stop))
+        job = await queue.submit("falar", {"text": "oi"})
+        await asyncio.sleep(0.05)
+        for _ in range(8):
+            assert await queue.requeue_expired() == 0
+            await asyncio.sleep(0.03)
+
+        done = await queue.wait(job.id, timeout=2)
+        assert done.status == JOB_DONE and done.attempts == 1
+        stop.set()
+        await asyncio.wait_for(worker, timeout=10)
+
+    asyncio.run(scenario())
+
+# ================================
+# FILA REDIS (scripts Lua em fakeredis)
+# ================================
+
+def make_redis_queue(monkeypatch, visibility_timeout=60, max_retries=2):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import job_queue
+
+    monkeypatch.setattr(job_queue.redis, "from_url", lambda url: fakeredis.FakeAsyncRedis())
+    queue = RedisJobQueue()
+    queue.visibility_timeout = visibility_timeout
+    queue.max_retries = max_retries
+    return queue
+
+def test_redis_claim_and_complete_check_lease_owner(monkeypatch):
+    """Claim abre o lease no mesmo script; só o dono do lease conclui"""
+    async def scenario():
+        queue = make_redis_queue(monkeypatch)
+        job = await queue.submit("falar", {"text": "oi"})
+        claimed = await queue.claim("w1", block_seconds=0.1)
+        assert claimed.id == job.id and claimed.worker == "w1" and claimed.attempts == 1
+        assert (await queue.stats())["processing"] == 1
+        assert await queue.claim("w2", block_seconds=0.05) is None
+
+        assert not await queue.complete(job.id, "w2", b"alheio", "audio/wav")
+        assert await queue.complete(job.id, "w1", b"RIFF", "audio/wav")
+        assert (await queue.get(job.id)).status == JOB_DONE
+        assert await queue.get_result(job.id) == b"RIFF"
+        assert (await queue.stats())["processing"] == 0
+
+    asyncio.run(scenario())
+
+def test_redis_fail_retries_and_ignores_other_workers(monkeypatch):
+    """Falha reenfileira até max_retries; falha de quem não tem o lease é ignorada"""
+    async def scenario():
+        queue = make_redis_queue(monkeypatch, max_retries=2)
+        job = await queue.submit("falar", {"text": "oi"})
+        await queue.claim("w1", block_seconds=0.1)
+        assert (await queue.fail(job.id, "boom", "w2")).status == "processing"
+        assert (await queue.fail(job.id, "boom", "w1")).status == JOB_QUEUED
+
+        await queue.claim("w1", block_seconds=0.1)
+        failed = await queue.fail(job.id, "boom", "w1")
+        assert failed.status == JOB_FAILED and failed.attempts == 2 and failed.error == "boom"
+        assert (await queue.stats())["retries"] == 1
+        assert await queue.claim("w1", block_seconds=0.05) is None
+
+    asyncio.run(scenario())
+
+def test_redis_expiry_respects_completion_and_renewal(monkeypatch):
+    """Expiração só reenfileira job em processamento com prazo vencido"""
+    async def scenario():
+        queue = make_redis_queue(monkeypatch, visibility_timeout=0)
+        renewed = await queue.submit("falar", {"text": "renovado"})
+        await queue.claim("w1", block_seconds=0.1)
+        queue.visibility_timeout = 60
+        assert await queue.extend(renewed.id, "w1")
+        assert not await queue.extend(renewed.id, "w2")
+        assert await queue.requeue_expired() == 0
+
+        queue.visibility_timeout = 0
+        done = await queue.submit("falar", {"text": "concluído"})
+        await queue.claim("w2", block_seconds=0.1)
+        assert await queue.complete(done.id, "w2", b"RIFF", "audio/wav")
+        # Expiração que chega depois da conclusão (corrida com o ZRANGEBYSCORE)
+        assert await queue._fail(done.id, "visibility timeout expired", None, expired=True) is None
+        assert (await queue.get(done.id)).status == JOB_DONE
+
+        expired = await queue.submit("falar", {"text": "expirado"})
+        await queue.claim("w3", block_seconds=0.1)
+        assert await queue.requeue_expired() == 1
+        requeued = await queue.get(expired.id)
+        assert requeued.status == JOB_QUEUED and requeued.error == "visibility timeout expired"
+        assert not await queue.complete(expired.id, "w3", b"velho", "audio/wav")
+        assert (await queue.claim("w4", block_seconds=0.1)).id == expired.id
+
+    asyncio.run(scenario())
@@ -0,0 +1,204 @@
+# ================================
+# TESTES DO REGISTRO DE MODELOS TTS
+# ================================
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from model_registry import ModelRegistry, ModelUnavailable, parse_model_specs
+from tts_backends import TTSBackend
+
+SPECS = ("padrao=coqui;tier=quality;mb=400,"
+         "rapido=onnx:app/tts_models/vits;tier=fast;mb=100,"
+         "outro=onnx:/m;tier=fast;mb=100,"
+         "lento=coqui:xtts;tier=quality;mb=100")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeBackend(TTSBackend):
+    """Backend sem modelo; conta as cargas"""
+
+    name = "fake"
+    loads = []
+
+    def __init__(self, spec):
+        super().__init__()
+        self.spec = spec
+
+    def load(self) -> None:
+        FakeBackend.loads.append(self.spec.name)
+        self.sample_rate = 16000 if self.spec.tier == "fast" else 24000
+        self.loaded = True
+
+    def synthesize(self, text, language="pt", speaker=None):
+        return np.zeros(10, dtype=np.float32)
+
+
+def build_registry(**kwargs) -> ModelRegistry:
+    FakeBackend.loads = []
+    registry = ModelRegistry(parse_model_specs(SPECS), factory=FakeBackend, warmup=False,
+                             memory_probe=lambda: 0, **kwargs)
+    default = FakeBackend(registry.specs["padrao"])
+    default.load()
+    registry.adopt("padrao", default, 400 * 1024 * 1024, 5.0)
+    return registry
+
+
+def test_parse_specs_and_resolve_tiers():
+    """Faixa com vários modelos prefere um já residente; faixa desconhecida usa o padrão"""
+    specs = parse_model_specs(SPECS)
+    assert [(s.name, s.backend, s.model, s.tier, s.memory_mb) for s in specs][1] == \
+        ("rapido", "onnx", "app/tts_models/vits", "fast", 100.0)
+    with pytest.raises(ValueError):
+        parse_model_specs("sem-backend")
+
+    registry = build_registry()
+    assert registry.resolve(tier="fast") == "rapido"
+    assert registry.resolve(tier="inexistente") == "padrao"
+    with pytest.raises(ValueError):
+        registry.resolve(model="xtts")
+
+    registry.acquire("outro")
+    registry.release("outro")
+    assert registry.resolve(tier="fast") == "outro"
+    assert registry.sample_rate("outro") == 16000
+
+
+def test_lru_eviction_within_budget_keeps_default_and_in_use():
+    """Para abrir espaço sai o menos usado; o padrão e modelos sintetizando ficam"""
+    clock = FakeClock()
+    registry = build_registry(budget_mb=600, min_residency=0.0, load_timeout=0.0, clock=clock)
+
+    assert registry.switch_cost("rapido") == 30.0
+    for name in ("rapido", "outro", "rapido"):
+        clock.now += 1.0
+        registry.acquire(name)
+        registry.release(name)
+    assert registry.switch_cost("rapido") == 0.0
+
+    registry.acquire("lento")  # sai "outro", o menos usado recentemente
+    stats = registry.stats()
+    assert [name for name, model in stats["models"].items() if model["resident"]] == ["padrao", "rapido", "lento"]
+    assert stats["used_mb"] == 600 and stats["evictions"] == 1
+
+    registry.acquire("rapido")
+    with pytest.raises(ModelUnavailable):
+        registry.acquire("outro")  # "rapido" e "lento" estão sintetizando
+    assert FakeBackend.loads == ["padrao", "rapido", "outro", "lento"]
+
+
+def test_min_residency_makes_competing_tiers_wait():
+    """Um modelo recém-carregado não é despejado: a troca espera e falha no prazo"""
+    clock = FakeClock()
+    registry = build_registry(budget_mb=500, min_residency=60.0, load_timeout=0.0, clock=clock)
+
+    registry.acquire("rapido")
+    registry.release("rapido")
+    with pytest.raises(ModelUnavailable):
+        registry.acquire("outro")
+    assert registry.stats()["budget_waits"] == 1
+
+    clock.now = 61.0
+    registry.acquire("outro")
+    assert registry.stats()["models"]["rapido"]["resident"] is False
+    assert FakeBackend.loads == ["padrao", "rapido", "outro"]
+
+
+def test_concurrent_acquires_load_once():
+    """Pedidos simultâneos do mesmo modelo compartilham uma única carga"""
+    registry = build_registry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.acquire("rapido"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(backend) for backend in results}) == 1
+    assert FakeBackend.loads.count("rapido") == 1
+    assert registry.stats()["models"]["rapido"]["in_use"] == 8
+
+
+def test_cancelled_synthesis_keeps_model_until_thread_ends(monkeypatch):
+    """Requisição cancelada na carga ou na síntese devolve o modelo só quando a thread termina"""
+    from app import main
+
+    gate = threading.Event()
+
+    class BlockingBackend(FakeBackend):
+        def load(self) -> None:
+            super().load()
+            if self.spec.name == "outro":
+                gate.wait(5)
+
+        def synthesize(self, text, language="pt", speaker=None):
+            gate.wait(5)
+            return super().synthesize(text, language, speaker)
+
+    registry = build_registry()
+    registry.factory = BlockingBackend
+    monkeypatch.setattr(main, "model_registry", registry)
+
+    async def scenario():
+        in_use = {}
+        for model in ("rapido", "outro"):
+            gate.clear()
+            task = asyncio.create_task(main.synthesize_audio("olá", model=model))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            held = registry.stats()["models"][model]["in_use"]
+            gate.set()
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                state = registry.stats()["models"][model]
+                if state["resident"] and state["in_use"] == 0:
+                    break
+            in_use[model] = (held, registry.stats()["models"][model]["in_use"])
+        return in_use
+
+    # "rapido": cancelado sintetizando; "outro": cancelado ainda carregando
+    assert asyncio.run(scenario()) == {"rapido": (1, 0), "outro": (0, 0)}
+
+def test_model_load_does_not_hold_scheduler_slot(monkeypatch):
+    """Carga de um modelo fora da memória acontece antes do slot: o modelo padrão segue atendendo"""
+    from app import main
+    from tts_scheduler import TTSScheduler
+
+    gate = threading.Event()
+
+    class SlowLoadBackend(FakeBackend):
+        def load(self) -> None:
+            super().load()
+            if self.spec.name == "outro":
+                gate.wait(5)
+
+    registry = build_registry()
+    registry.factory = SlowLoadBackend
+    monkeypatch.setattr(main, "model_registry", registry)
+    monkeypatch.setattr(main, "tts_scheduler", TTSScheduler(concurrency=1))
+    monkeypatch.setattr(main, "tts_backend", FakeBackend(registry.specs["padrao"]))
+
+    async def scenario():
+        loading = asyncio.create_task(main.synthesize_audio("olá", lane="bulk", model="outro"))
+        await asyncio.sleep(0.05)
+        running = main.tts_scheduler.stats()["running"]
+        await asyncio.wait_for(main.synthesize_audio("oi", lane="interactive"), timeout=1)
+        gate.set()
+        await asyncio.wait_for(loading, timeout=5)
+        return running
+
+    try:
+        assert asyncio.run(scenario()) == 0
+    finally:
+        gate.set()
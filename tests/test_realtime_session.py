@@ -0,0 +1,129 @@
+# ================================
+# TESTES DA SESSÃO EM TEMPO REAL
+# ================================
+
+import asyncio
+
+import numpy as np
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from realtime_session import RealtimeSession, pop_sentences
+
+async def fake_stream(user_input, context):
+    """LLM falso: responde em tokens; 'devagar' nunca termina"""
+    if user_input == "devagar":
+        while True:
+            yield "bla "
+            await asyncio.sleep(0.01)
+    for token in ["Claro, ", "humano. ", "Essa foi fácil demais, ", "até para você. ", "Fim"]:
+        yield token
+
+async def fake_synthesize(text):
+    return np.zeros(len(text), dtype=np.float32), 16000
+
+async def fake_transcribe(audio, content_type):
+    return f"{len(audio)} bytes"
+
+def make_client():
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def endpoint(websocket: WebSocket):
+        await RealtimeSession(websocket, fake_stream, fake_synthesize, fake_transcribe).run()
+
+    return TestClient(app)
+
+def receive_until_turn_end(ws):
+    """Coleta mensagens JSON (e PCM após cada cabeçalho de áudio) até o fim do turno"""
+    messages = []
+    while True:
+        message = ws.receive_json()
+        if message["type"] == "audio":
+            message["pcm"] = ws.receive_bytes()
+        messages.append(message)
+        if message["type"] == "turn_end":
+            return messages
+
+def test_pop_sentences_waits_for_minimum_length():
+    """Sentenças curtas se juntam às seguintes antes de irem para a síntese"""
+    ready, rest = pop_sentences("Oi. Tudo bem com você hoje? Eu estou", min_chars=20)
+    assert ready == ["Oi. Tudo bem com você hoje?"]
+    assert rest == "Eu estou"
+
+def test_text_turn_streams_tokens_and_audio():
+    """Um turno de texto devolve tokens e áudio PCM intercalados"""
+    with make_client().websocket_connect("/ws") as ws:
+        assert ws.receive_json()["type"] == "session"
+        ws.send_json({"type": "text", "text": "Oi"})
+        messages = receive_until_turn_end(ws)
+
+    kinds = [m["type"] for m in messages]
+    assert kinds[0] == "turn_start"
+    tokens = [m["text"] for m in messages if m["type"] == "token"]
+    assert "".join(tokens).startswith("Claro, humano.")
+
+    audio = [m for m in messages if m["type"] == "audio"]
+    assert [m["seq"] for m in audio] == list(range(len(audio)))
+    assert audio[0]["text"] == "Claro, humano. Essa foi fácil demais, até para você."
+    assert len(audio[0]["pcm"]) == 2 * len(audio[0]["text"])
+    assert messages[-1]["cancelled"] is False
+
+def test_barge_in_cancels_reply():
+    """Cancelar (ou nova fala) interrompe a resposta em andamento"""
+    with make_client().websocket_connect("/ws") as ws:
+        ws.receive_json()
+        ws.send_json({"type": "text", "text": "devagar"})
+        assert ws.receive_json()["type"] == "turn_start"
+        ws.receive_json()  # primeiro token
+
+        ws.send_json({"type": "cancel"})
+        messages = []
+        while not messages or messages[-1]["type"] != "cancelled":
+            messages.append(ws.receive_json())
+
+    turn_end = [m for m in messages if m["type"] == "turn_end"][0]
+    assert turn_end["cancelled"] is True
+    assert messages[-1]["active"] is True
+
+def test_audio_turn_is_transcribed():
+    """Frames binários seguidos de audio_end viram um turno transcrito"""
+    with make_client().websocket_connect("/ws") as ws:
+        ws.receive_json()
+        ws.send_bytes(b"\x00" * 100)
+        ws.send_json({"type": "audio_end", "content_type": "audio/wav"})
+        messages = receive_until_turn_end(ws)
+
+    transcript = [m for m in messages if m["type"] == "transcript"][0]
+    assert transcript["text"] == "100 bytes"
+
+def test_history_keeps_only_context_turns():
+    """O histórico da sessão não cresce além das trocas usadas como contexto"""
+    session = RealtimeSession(None, fake_stream, None, history_turns=2)
+    for turn in range(5):
+        session.history.append((f"pergunta {turn}", f"resposta {turn}"))
+    assert len(session.history) == 2
+    assert session._context("extra") == ("Usuário: pergunta 3\nGodofreda: resposta 3\n"
+                                          "Usuário: pergunta 4\nGodofreda: resposta 4\nextra")
+
+def test_turns_respect_client_rate_limit():
+    """Turno além do limite de chat do cliente é recusado sem chegar ao LLM"""
+    admitted = iter([(True, 0), (False, 42)])
+
+    async def admit():
+        return next(admitted)
+
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def endpoint(websocket: WebSocket):
+        await RealtimeSession(websocket, fake_stream, None, admit_fn=admit).run()
+
+    with TestClient(app).websocket_connect("/ws") as ws:
+        ws.receive_json()
+        ws.send_json({"type": "text", "text": "Oi"})
+        assert receive_until_turn_end(ws)[0]["type"] == "turn_start"
+        ws.send_json({"type": "text", "text": "De novo"})
+        refused = ws.receive_json()
+
+    assert refused["type"] == "error" and refused["retry_after"] == 42
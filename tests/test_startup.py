@@ -0,0 +1,54 @@
+# ================================
+# TESTES DO RELATÓRIO DE INICIALIZAÇÃO
+# ================================
+
+import pytest
+
+from startup import StartupReport
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_phases_and_readiness():
+    """Cada fase é medida; o estado só vira ready depois do aquecimento"""
+    clock = FakeClock()
+    observed = []
+    report = StartupReport(clock=clock)
+    report.observer = lambda name, seconds: observed.append((name, seconds))
+
+    with report.phase("tts_load", "loading"):
+        clock.now += 4.0
+        assert report.to_dict()["current_phase_seconds"] == 4.0
+        assert report.reason() == "TTS model loading (tts_load, 4.0s)"
+    with report.phase("tts_warmup", "warming"):
+        clock.now += 1.5
+    assert not report.ready
+    report.mark_ready()
+
+    data = report.to_dict()
+    assert report.ready
+    assert data["phases"] == {"tts_load": 4.0, "tts_warmup": 1.5}
+    assert data["ready_after_seconds"] == 5.5
+    assert observed == [("tts_load", 4.0), ("tts_warmup", 1.5)]
+    assert report.summary() == "tts_load=4.00s tts_warmup=1.50s total=5.50s"
+
+
+def test_failed_phase_keeps_partial_duration():
+    """Erro na carga registra a duração parcial e o motivo para o /health/ready"""
+    clock = FakeClock()
+    report = StartupReport(clock=clock)
+    with pytest.raises(RuntimeError):
+        with report.phase("tts_import", "importing"):
+            clock.now += 0.25
+            raise RuntimeError("No module named 'TTS'")
+    report.mark_failed("No module named 'TTS'")
+
+    assert report.phases == {"tts_import": 0.25}
+    assert report.state == "failed" and report.ready_after is None
+    assert report.reason() == "TTS model failed to load: No module named 'TTS'"
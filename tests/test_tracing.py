@@ -0,0 +1,112 @@
+# ================================
+# TESTES DO TRACING POR REQUISIÇÃO
+# ================================
+
+import asyncio
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+import instrumentation
+from asgi_middleware import MetricsMiddleware
+from instrumentation import observe_stage, stage
+from tracing import JSONLExporter, RingBufferExporter, Tracer, to_otlp
+
+def test_spans_nest_across_threads_and_stages(monkeypatch):
+    """Spans filhos atravessam to_thread; estágios e tempos medidos por fora viram spans"""
+    ring = RingBufferExporter(10)
+    tracer = Tracer(sample_rate=1.0, exporters=[ring])
+    monkeypatch.setattr(instrumentation, "tracer", tracer)
+
+    def blocking_work():
+        with tracer.span("inference", model="fake"):
+            pass
+
+    async def request():
+        root = tracer.start_trace("POST /chat")
+        with stage("cache_lookup") as span:
+            span.set_attribute("hit", False)
+        with tracer.span("tts.synthesize", chars=12):
+            await asyncio.to_thread(blocking_work)
+            observe_stage("queue_wait", 0.05)
+        tracer.finish_trace(root)
+        return root.trace_id
+
+    trace_id = asyncio.run(request())
+    trace = ring.get(trace_id)
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert set(spans) == {"POST /chat", "cache_lookup", "tts.synthesize", "inference", "queue_wait"}
+    root_id = spans["POST /chat"]["span_id"]
+    assert spans["cache_lookup"]["parent_id"] == root_id
+    assert spans["cache_lookup"]["attributes"] == {"hit": False}
+    assert spans["inference"]["parent_id"] == spans["tts.synthesize"]["span_id"]
+    assert spans["queue_wait"]["parent_id"] == spans["tts.synthesize"]["span_id"]
+    assert 49 <= spans["queue_wait"]["duration_ms"] <= 51
+    assert ring.recent()[0]["trace_id"] == trace_id
+
+def test_unsampled_requests_record_nothing():
+    """Sem amostragem, start_trace devolve None e os spans são vazios"""
+    ring = RingBufferExporter(10)
+    tracer = Tracer(sample_rate=0.0, exporters=[ring])
+    assert tracer.start_trace("GET /health") is None
+    with tracer.span("cache_lookup") as span:
+        assert span is None
+    tracer.add_span("queue_wait", 0.1)
+    assert len(ring.traces) == 0
+    assert tracer.start_trace("GET /health", force=True) is not None
+
+def test_jsonl_exporter_and_otlp_payload(tmp_path):
+    """JSONL com um trace por linha e conversão para OTLP/HTTP JSON"""
+    path = tmp_path / "traces.jsonl"
+    exporter = JSONLExporter(str(path), flush_interval=0.05)
+    tracer = Tracer(sample_rate=1.0, exporters=[exporter])
+    root = tracer.start_trace("GET /voices")
+    try:
+        with tracer.span("llm.generate", model="llama2:7b"):
+            raise TimeoutError("ollama lento")
+    except TimeoutError:
+        pass
+    tracer.finish_trace(root)
+    exporter.close()
+
+    trace = json.loads(path.read_text().strip())
+    assert trace["trace_id"] == root.trace_id
+    assert trace["spans"][1]["error"] == "TimeoutError: ollama lento"
+
+    otlp = to_otlp([trace], "godofreda-api")
+    spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[0]["kind"] == 2 and "parentSpanId" not in spans[0]
+    assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+    assert spans[1]["status"]["code"] == 2
+    assert {"key": "model", "value": {"stringValue": "llama2:7b"}} in spans[1]["attributes"]
+    assert int(spans[1]["endTimeUnixNano"]) >= int(spans[1]["startTimeUnixNano"])
+
+def test_middleware_opens_root_span_when_forced():
+    """X-Trace: 1 força o rastreamento; a resposta traz o X-Trace-Id"""
+    registry = CollectorRegistry()
+    ring = RingBufferExporter(10)
+    tracer = Tracer(sample_rate=0.0, exporters=[ring])
+    app = FastAPI()
+
+    @app.get("/voices/{name}")
+    async def voice(name: str):
+        with tracer.span("voice_store.load", name=name):
+            return {"name": name}
+
+    app.add_middleware(
+        MetricsMiddleware, tracer=tracer,
+        request_count=Counter('tr_requests_total', '', ['method', 'endpoint', 'status'], registry=registry),
+        request_duration=Histogram('tr_request_duration_seconds', '', ['method', 'endpoint'], registry=registry),
+        active_connections=Gauge('tr_active_connections', '', registry=registry),
+        error_count=Counter('tr_errors_total', '', ['type'], registry=registry),
+    )
+    client = TestClient(app)
+    assert "x-trace-id" not in client.get("/voices/p230").headers
+
+    response = client.get("/voices/p230", headers={"X-Trace": "1"})
+    trace = ring.get(response.headers["x-trace-id"])
+    assert trace["name"] == "GET /voices/{name}"
+    assert trace["spans"][0]["attributes"]["status"] == 200
+    assert trace["spans"][1]["name"] == "voice_store.load"
@@ -0,0 +1,197 @@
+# ================================
+# TESTES DOS BACKENDS TTS
+# ================================
+
+import json
+import sys
+from contextlib import nullcontext
+from types import ModuleType, SimpleNamespace
+
+import numpy as np
+import pytest
+
+import inference_client
+from config import config
+from cpu_topology import inference_layout
+from tts_backends import BACKENDS, CoquiBackend, OnnxBackend, RemoteBackend, create_backend
+
+class FakeSession:
+    """Sessão ONNX Runtime: devolve os ids de entrada como áudio e registra as chamadas"""
+
+    def __init__(self, path, sess_options=None, providers=None):
+        self.path = path
+        self.options = sess_options
+        self.providers = providers
+        self.calls = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in ("input", "input_lengths", "scales", "sid")]
+
+    def run(self, outputs, inputs):
+        self.calls.append(inputs)
+        return [inputs["input"].astype(np.float32)[None, :]]
+
+class FakeTokenizer:
+    def text_to_ids(self, text, language=None):
+        return [ord(char) % 100 for char in text]
+
+def fake_module(name, **attributes):
+    module = ModuleType(name)
+    module.__dict__.update(attributes)
+    return module
+
+@pytest.fixture
+def onnx_modules(monkeypatch):
+    """onnxruntime e o tokenizador do Coqui em memória, sem as bibliotecas instaladas"""
+    onnxruntime = fake_module(
+        "onnxruntime",
+        SessionOptions=lambda: SimpleNamespace(),
+        GraphOptimizationLevel=SimpleNamespace(ORT_ENABLE_ALL="all"),
+        InferenceSession=FakeSession
+    )
+    model_config = SimpleNamespace(audio=SimpleNamespace(sample_rate=22050))
+    tokenizer = fake_module(
+        "TTS.tts.utils.text.tokenizer",
+        TTSTokenizer=SimpleNamespace(init_from_config=lambda cfg: (FakeTokenizer(), cfg))
+    )
+    modules = {
+        "onnxruntime": onnxruntime,
+        "TTS": fake_module("TTS"),
+        "TTS.config": fake_module("TTS.config", load_config=lambda path: model_config),
+        "TTS.tts": fake_module("TTS.tts"),
+        "TTS.tts.utils": fake_module("TTS.tts.utils"),
+        "TTS.tts.utils.text": fake_module("TTS.tts.utils.text"),
+        "TTS.tts.utils.text.tokenizer": tokenizer,
+    }
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+class FakeInferenceClient:
+    """Cliente do servidor de inferência: áudio de uma amostra por caractere"""
+
+    def __init__(self, address):
+        self.address = address
+        self.info_calls = 0
+        self.synthesized = []
+
+    def info(self):
+        self.info_calls += 1
+        return {"sample_rate": 24000, "backend": "onnx"}
+
+    def synthesize(self, text, language, speaker):
+        self.synthesized.append(text)
+        return np.ones(len(text), dtype=np.float32)
+
+    def synthesize_stream(self, text, language, speaker):
+        for word in text.split():
+            yield np.ones(len(word), dtype=np.float32)
+
+def test_create_backend_registry(monkeypatch):
+    """Backends criados pelo nome, com o padrão de TTS_BACKEND; nomes desconhecidos são recusados"""
+    assert set(BACKENDS) == {"coqui", "onnx", "remote"}
+    assert isinstance(create_backend("coqui", model_name="tts_models/pt/x"), CoquiBackend)
+    assert create_backend("onnx", model_dir="/modelos/vits").model_dir == "/modelos/vits"
+    assert create_backend("remote", address="unix:/tmp/tts.sock").address == "unix:/tmp/tts.sock"
+
+    monkeypatch.setattr(config.tts, "backend", "onnx")
+    backend = create_backend()
+    assert isinstance(backend, OnnxBackend) and backend.model_dir == config.tts.onnx_model_dir
+    assert not backend.loaded
+    with pytest.raises(ValueError):
+        create_backend("piper")
+
+def test_onnx_backend_requires_onnxruntime(monkeypatch):
+    """Sem onnxruntime a carga falha com uma mensagem clara"""
+    monkeypatch.setitem(sys.modules, "onnxruntime", None)
+    with pytest.raises(RuntimeError, match="onnxruntime"):
+        OnnxBackend("/modelos/vits").load()
+
+def test_onnx_load_and_synthesize(onnx_modules, tmp_path):
+    """Carga usa o layout de inferência e speakers.json; a síntese monta as entradas do grafo"""
+    (tmp_path / "speakers.json").write_text(json.dumps({"godofreda": 3}))
+    backend = OnnxBackend(str(tmp_path))
+    backend.load()
+    session = backend.session
+    assert backend.loaded and backend.sample_rate == 22050
+    assert session.path == str(tmp_path / "model.onnx") and session.providers == ["CPUExecutionProvider"]
+    assert session.options.intra_op_num_threads == inference_layout.intra_op_threads
+
+    audio = backend.synthesize("olá", speaker="godofreda")
+    inputs = session.calls[-1]
+    assert audio.dtype == np.float32 and audio.size == 3
+    assert inputs["input_lengths"].tolist() == [3] and inputs["sid"].tolist() == [3]
+    backend.synthesize("olá", speaker="desconhecida")
+    assert session.calls[-1]["sid"].tolist() == [0]
+
+def test_remote_backend_delegates_to_server(monkeypatch):
+    """Carga lê a taxa do servidor; síntese, streaming e aquecimento passam pelo cliente"""
+    monkeypatch.setattr(inference_client, "InferenceClient", FakeInferenceClient)
+    backend = RemoteBackend("unix:/tmp/tts.sock")
+    backend.load()
+    client = backend.client
+    assert backend.loaded and backend.sample_rate == 24000 and client.address == "unix:/tmp/tts.sock"
+
+    assert backend.synthesize("olá").size == 3
+    assert [chunk.size for chunk in backend.synthesize_stream("olá mundo")] == [3, 5]
+    assert backend.warmup() >= 0.0
+    assert client.info_calls == 2 and client.synthesized == ["olá"]
+    assert backend.info()["remote"]["backend"] == "onnx"
+
+class FakeCoquiTTS:
+    """TTS.api.TTS de um modelo sem latentes (VITS): síntese direta pelo speaker"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.synthesizer = SimpleNamespace(output_sample_rate=22050, tts_model=object())
+        self.spoken = []
+
+    def tts(self, text, language=None, speaker=None):
+        self.spoken.append(speaker)
+        return [0.0] * len(text)
+
+def test_non_xtts_coqui_model_skips_voice_store(monkeypatch):
+    """Modelo Coqui sem XTTS sintetiza direto mesmo com a voz no store do modelo padrão"""
+    import tts_runtime
+    import voice_store
+
+    monkeypatch.setitem(sys.modules, "TTS", fake_module("TTS"))
+    monkeypatch.setitem(sys.modules, "TTS.api", fake_module("TTS.api", TTS=FakeCoquiTTS))
+    monkeypatch.setattr(tts_runtime, "apply_runtime", lambda tts, **kwargs: {"mode": "fp32", "self_check": None})
+    monkeypatch.setattr(tts_runtime, "inference_context", nullcontext)
+    monkeypatch.setitem(voice_store.voice_store._voices, config.tts.default_speaker, (None, None))
+
+    backend = CoquiBackend("tts_models/pt/cv/vits")
+    backend.load()
+    assert backend.voices is None and backend.sample_rate == 22050
+    assert backend.synthesize("olá").size == 3
+    assert [chunk.size for chunk in backend.synthesize_stream("olá")] == [3]
+    assert backend.tts.spoken == [config.tts.default_speaker] * 2
+    with pytest.raises(ValueError):
+        backend.register_voice("godofreda", ["ref.wav"])
+
+def test_voice_stores_are_keyed_per_model(tmp_path, monkeypatch):
+    """O modelo padrão usa o diretório do store; os demais, um subdiretório próprio"""
+    import voice_store as voice_store_module
+    from voice_store import store_for, voice_store
+
+    monkeypatch.setattr(config.tts, "voice_store_dir", str(tmp_path))
+    monkeypatch.setattr(voice_store_module, "_model_stores", {})
+    assert store_for(config.tts.model) is voice_store and store_for(None) is voice_store
+    other = store_for("tts_models/multilingual/multi-dataset/xtts_v1.1")
+    assert other is store_for("tts_models/multilingual/multi-dataset/xtts_v1.1") and other is not voice_store
+    assert other.store_dir == str(tmp_path / "tts_models_multilingual_multi-dataset_xtts_v1.1")
+
+def test_runtime_report_is_kept_per_backend(monkeypatch):
+    """Cada modelo Coqui carregado expõe o próprio modo de runtime em info()"""
+    import tts_runtime
+
+    monkeypatch.setitem(sys.modules, "TTS", fake_module("TTS"))
+    monkeypatch.setitem(sys.modules, "TTS.api", fake_module("TTS.api", TTS=FakeCoquiTTS))
+    monkeypatch.setattr(tts_runtime, "apply_runtime", lambda tts, mode=None, **kwargs: {"mode": mode, "self_check": None})
+
+    quality = CoquiBackend("tts_models/pt/cv/vits", runtime="fp32")
+    fast = CoquiBackend("tts_models/pt/cv/vits-int8", runtime="int8")
+    assert quality.info()["runtime"] is None
+    quality.load()
+    fast.load()
+    assert quality.info()["runtime"]["mode"] == "fp32" and fast.info()["runtime"]["mode"] == "int8"
@@ -0,0 +1,57 @@
+# ================================
+# TESTES DA SÍNTESE PARALELA
+# ================================
+
+import numpy as np
+
+import tts_parallel
+from tts_parallel import ParallelSynthesizer, split_sentences
+from audio_utils import concat_audio, float_to_pcm16
+
+def test_split_sentences_groups_short_sentences():
+    """Sentenças curtas são agrupadas até o limite"""
+    chunks = split_sentences("Oi. Tudo bem? Sim!", max_chars=50)
+    assert chunks == ["Oi. Tudo bem? Sim!"]
+
+def test_split_sentences_respects_limit_and_order():
+    """Trechos respeitam o limite e mantêm a ordem do texto"""
+    text = "Primeira frase longa aqui. Segunda frase também longa. Terceira frase final."
+    chunks = split_sentences(text, max_chars=30)
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+def test_split_sentences_breaks_oversized_sentence():
+    """Sentenças sem pontuação maiores que o limite são quebradas por palavras"""
+    text = " ".join(["palavra"] * 20)
+    chunks = split_sentences(text, max_chars=40)
+    assert len(chunks) > 1
+    assert " ".join(chunks) == text
+
+def test_concat_audio_inserts_gap():
+    """Trechos são concatenados em ordem com silêncio entre eles"""
+    parts = [np.ones(10, dtype=np.float32), np.full(10, 0.5, dtype=np.float32)]
+    audio = concat_audio(parts, sample_rate=100, gap_seconds=0.05)
+    assert audio.shape == (25,)
+    assert audio[0] == 1.0 and audio[-1] == 0.5
+    assert not audio[10:15].any()
+
+def test_float_to_pcm16_clips():
+    """Conversão para PCM 16 bits satura valores fora de [-1, 1]"""
+    pcm = float_to_pcm16([2.0, -2.0, 0.0])
+    assert pcm.tolist() == [32767, -32767, 0]
+
+def test_pool_workers_receive_effective_runtime_mode(monkeypatch):
+    """Workers carregam o modelo no modo efetivo do processo principal, não no configurado"""
+    created = {}
+
+    class FakeExecutor:
+        def __init__(self, **kwargs):
+            created.update(kwargs)
+
+    monkeypatch.setattr(tts_parallel, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(tts_parallel.config.tts, "long_text_enabled", True)
+    monkeypatch.setattr(tts_parallel.config.tts, "runtime", "int8")
+    synthesizer = ParallelSynthesizer()
+    synthesizer.start("fp32")
+    assert created["initializer"] is tts_parallel._init_worker
+    assert created["initargs"][:2] == (synthesizer.backend_name, "fp32")
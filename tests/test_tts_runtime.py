@@ -0,0 +1,20 @@
+# ================================
+# TESTES DO RUNTIME TTS
+# ================================
+
+import numpy as np
+
+from tts_runtime import long_term_spectral_distance
+
+def test_spectral_distance_identical_audio_is_zero():
+    """Áudios idênticos têm distância espectral zero"""
+    t = np.arange(24000) / 24000
+    audio = np.sin(2 * np.pi * 220 * t).astype(np.float32)
+    assert long_term_spectral_distance(audio, audio) == 0.0
+
+def test_spectral_distance_detects_timbre_change():
+    """Mudança de timbre aumenta a distância, ganho pequeno quase não altera"""
+    t = np.arange(24000) / 24000
+    low = np.sin(2 * np.pi * 220 * t).astype(np.float32)
+    high = np.sin(2 * np.pi * 3000 * t).astype(np.float32)
+    assert long_term_spectral_distance(low, high) > long_term_spectral_distance(low, low * 0.9)
@@ -0,0 +1,129 @@
+# ================================
+# TESTES DO ESCALONADOR TTS
+# ================================
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tts_scheduler import TTSScheduler
+
+class FakeClock:
+    """Relógio controlado pelo teste"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+async def run_saturated(scheduler, jobs, clock=None):
+    """Ocupa o único slot, enfileira ``jobs`` e retorna a ordem de atendimento"""
+    order = []
+    await scheduler.acquire("standard", 1)
+
+    async def job(name, lane, chars, arrival, switch_cost=0.0):
+        if clock is not None:
+            clock.now = arrival
+        async with scheduler.slot(lane, chars, switch_cost):
+            order.append(name)
+
+    tasks = []
+    for spec in jobs:
+        tasks.append(asyncio.create_task(job(*spec)))
+        await asyncio.sleep(0)  # enfileirar na ordem declarada
+
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+def test_interactive_lane_goes_first():
+    """Com o modelo ocupado, respostas interativas furam a fila de bulk"""
+    scheduler = TTSScheduler(concurrency=1, aging_rate=0.0, seconds_per_char=0.01)
+    jobs = [("bulk", "bulk", 10, 0), ("standard", "standard", 10, 0), ("interactive", "interactive", 10, 0)]
+    order = asyncio.run(run_saturated(scheduler, jobs))
+    assert order == ["interactive", "standard", "bulk"]
+
+def test_shortest_job_first_within_lane():
+    """Na mesma faixa, textos curtos são atendidos antes dos longos"""
+    scheduler = TTSScheduler(concurrency=1, aging_rate=0.0, seconds_per_char=0.01)
+    jobs = [("longo", "bulk", 900, 0), ("curto", "bulk", 20, 0), ("medio", "bulk", 300, 0)]
+    order = asyncio.run(run_saturated(scheduler, jobs))
+    assert order == ["curto", "medio", "longo"]
+
+def test_aging_prevents_starvation():
+    """Um job bulk que espera tempo suficiente passa à frente de novos interativos"""
+    clock = FakeClock()
+    scheduler = TTSScheduler(concurrency=1, aging_rate=1.0, seconds_per_char=0.0, clock=clock)
+    jobs = [("bulk-antigo", "bulk", 10, 0.0), ("interactive-novo", "interactive", 10, 120.0)]
+    order = asyncio.run(run_saturated(scheduler, jobs, clock))
+    assert order == ["bulk-antigo", "interactive-novo"]
+
+def test_model_switch_waits_behind_resident_model_jobs():
+    """Jobs de um modelo fora da memória esperam os do residente, mesmo chegando antes"""
+    scheduler = TTSScheduler(concurrency=1, aging_rate=0.0, seconds_per_char=0.01)
+    jobs = [("troca", "interactive", 10, 0, 30.0), ("residente-1", "standard", 10, 0),
+            ("residente-2", "interactive", 10, 0)]
+    order = asyncio.run(run_saturated(scheduler, jobs))
+    assert order == ["residente-2", "residente-1", "troca"]
+
+def test_cancelled_waiter_does_not_leak_slot():
+    """Cancelar um job na fila não consome o slot"""
+    async def scenario():
+        scheduler = TTSScheduler(concurrency=1)
+        await scheduler.acquire("standard", 1)
+        waiting = asyncio.create_task(scheduler.acquire("bulk", 1))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        scheduler.release()
+        await asyncio.wait_for(scheduler.acquire("interactive", 1), timeout=1)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 1
+    assert sum(stats["queued"].values()) == 0
+
+def test_cancelled_synthesis_holds_slot_until_thread_ends():
+    """Requisição cancelada durante a síntese só devolve o slot quando a thread termina"""
+    async def scenario():
+        scheduler = TTSScheduler(concurrency=1)
+        release_thread = threading.Event()
+
+        async def synthesize():
+            async with scheduler.slot("interactive", 10) as lease:
+                await lease.run(release_thread.wait)
+
+        task = asyncio.create_task(synthesize())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        held = scheduler.stats()["running"]
+        release_thread.set()
+        await asyncio.wait_for(scheduler.acquire("interactive", 1), timeout=1)
+        return held
+
+    assert asyncio.run(scenario()) == 1
+
+def test_invalid_lane_is_rejected():
+    """Faixas desconhecidas são recusadas"""
+    with pytest.raises(ValueError):
+        asyncio.run(TTSScheduler(concurrency=1).acquire("vip", 1))
+
+def test_cost_estimate_uses_model_time_only():
+    """A espera do consumidor com o slot ocupado não entra em seconds_per_char"""
+    async def scenario():
+        scheduler = TTSScheduler(concurrency=1, seconds_per_char=0.001)
+        async with scheduler.slot("interactive", 10) as lease:
+            await lease.run(time.sleep, 0.02)
+            await asyncio.sleep(0.3)  # cliente lento consumindo os trechos
+            await lease.run(time.sleep, 0.02)
+        return lease.elapsed, scheduler.seconds_per_char
+
+    elapsed, seconds_per_char = asyncio.run(scenario())
+    assert 0.04 <= elapsed < 0.2
+    assert seconds_per_char == pytest.approx(0.001 + 0.2 * (elapsed / 10 - 0.001))
@@ -0,0 +1,121 @@
+# ================================
+# TESTES DO UPLOAD EM STREAMING
+# ================================
+
+import asyncio
+import hashlib
+
+import pytest
+
+from upload_service import StreamingFormParser, UploadedPart, UploadRejected, UploadTooLarge, sniff_content_type
+
+BOUNDARY = "godofredaboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+WEBM = b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01" + b"\x00" * 100
+FILE_TYPES = {"image": ["image/png", "image/jpeg"], "voice": ["audio/wav", "audio/webm"]}
+
+def multipart_body(fields, files):
+    """Monta um corpo multipart: fields = {nome: valor}, files = {nome: (arquivo, tipo, bytes)}"""
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode() + value.encode())
+    for name, (filename, content_type, data) in files.items():
+        header = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                  f'Content-Type: {content_type}\r\n\r\n')
+        parts.append(header.encode() + data)
+    return b"\r\n".join(parts) + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+def parse(body, chunk_size=64, consumed=None, **kwargs):
+    """Alimenta o parser em pedaços, como request.stream()"""
+    async def stream():
+        for start in range(0, len(body), chunk_size):
+            if consumed is not None:
+                consumed.append(chunk_size)
+            yield body[start:start + chunk_size]
+
+    form = StreamingFormParser(FILE_TYPES, **kwargs)
+    asyncio.run(form.parse(CONTENT_TYPE, None, stream()))
+    return form
+
+def test_sniff_content_type():
+    """Tipos reconhecidos pelos magic bytes"""
+    assert sniff_content_type(PNG[:16]) == "image/png"
+    assert sniff_content_type(b"RIFF\x00\x00\x00\x00WAVEfmt ") == "audio/wav"
+    assert sniff_content_type(b"ID3\x04") == "audio/mpeg"
+    assert sniff_content_type(WEBM[:16]) == "audio/webm"
+    assert sniff_content_type(b"<html>") is None
+
+def test_fields_and_file_with_hash():
+    """Campos de texto e arquivo chegam com tipo detectado e hash do conteúdo"""
+    body = multipart_body({"text": "olá"}, {"image": ("foto.png", "application/octet-stream", PNG)})
+    form = parse(body)
+    image = form.files["image"]
+    assert form.fields["text"] == "olá"
+    assert image.content_type == "image/png"
+    assert image.declared_type == "application/octet-stream"
+    assert image.sha256 == hashlib.sha256(PNG).hexdigest()
+    assert bytes(image.data) == PNG
+    form.close()
+
+def test_webm_voice_recording_is_accepted():
+    """Gravações WebM do navegador valem pelo conteúdo, mesmo declaradas como outro tipo"""
+    form = parse(multipart_body({}, {"voice": ("gravacao.wav", "audio/wav", WEBM)}))
+    assert form.files["voice"].content_type == "audio/webm"
+    form.close()
+
+def test_repeated_file_field_closes_previous_part(monkeypatch):
+    """Com o mesmo campo de arquivo repetido vale o último, e o anterior é liberado"""
+    first = multipart_body({}, {"image": ("a.png", "image/png", PNG)})
+    second = multipart_body({}, {"image": ("b.png", "image/png", PNG + b"\x02")})
+    body = first[:-len(f"--{BOUNDARY}--\r\n")] + second
+    closed = []
+    original_close = UploadedPart.close
+
+    def tracking_close(part):
+        closed.append(part.filename)
+        original_close(part)
+
+    monkeypatch.setattr(UploadedPart, "close", tracking_close)
+    form = parse(body)
+    assert form.files["image"].filename == "b.png" and closed == ["a.png"]
+    form.close()
+
+def test_large_upload_is_spooled_to_mmap():
+    """Acima do limite de spool o arquivo vai para disco e é entregue via mmap"""
+    data = PNG + b"\x01" * 5000
+    form = parse(multipart_body({}, {"image": ("grande.png", "image/png", data)}), spool_bytes=1024)
+    image = form.files["image"]
+    assert image._mapped is not None
+    assert image.size == len(data) and bytes(image.data[-4:]) == b"\x01" * 4
+    form.close()
+
+def test_oversized_upload_aborts_early():
+    """A leitura é interrompida assim que o limite é ultrapassado"""
+    data = PNG + b"\x00" * 100_000
+    body = multipart_body({}, {"image": ("enorme.png", "image/png", data)})
+    consumed = []
+    with pytest.raises(UploadTooLarge):
+        parse(body, chunk_size=1024, consumed=consumed, max_file_size=4096)
+    assert sum(consumed) < 8 * 1024
+
+def test_spoofed_content_type_is_rejected():
+    """O tipo declarado não basta: o conteúdo precisa bater com os tipos permitidos"""
+    body = multipart_body({}, {"image": ("falso.png", "image/png", b"<script>alert(1)</script>")})
+    with pytest.raises(UploadRejected) as error:
+        parse(body)
+    assert error.value.status_code == 415
+
+def test_unexpected_file_field_is_rejected():
+    """Arquivos em campos não previstos são recusados"""
+    with pytest.raises(UploadRejected):
+        parse(multipart_body({}, {"extra": ("x.png", "image/png", PNG)}))
+
+def test_urlencoded_form_without_files():
+    """Formulários urlencoded (só texto) continuam aceitos"""
+    async def stream():
+        yield "text=ol%C3%A1&formato=mp3".encode()
+
+    form = StreamingFormParser(FILE_TYPES)
+    fields, files = asyncio.run(form.parse("application/x-www-form-urlencoded", None, stream()))
+    assert fields == {"text": "olá", "formato": "mp3"} and files == {}
@@ -0,0 +1,62 @@
+# ================================
+# TESTES DO STORE DE VOZES
+# ================================
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from voice_store import VoiceStore
+
+class FakeXTTS:
+    """Modelo XTTS mínimo: latentes preenchidos com o número da chamada"""
+
+    def __init__(self, speakers=None):
+        self.calls = 0
+        self.speaker_manager = SimpleNamespace(speakers=speakers or {})
+
+    def get_conditioning_latents(self, audio_path):
+        self.calls += 1
+        return torch.full((1, 4, 8), float(self.calls)), torch.full((1, 8, 1), float(self.calls))
+
+def fake_tts(model):
+    return SimpleNamespace(synthesizer=SimpleNamespace(tts_model=model))
+
+def test_registered_voice_persists_and_reloads(tmp_path):
+    """Latentes vão para .npz e outro processo os encontra sem recondicionar"""
+    store = VoiceStore(str(tmp_path))
+    store.register("godofreda", ["ref.wav"], fake_tts(FakeXTTS()))
+    assert store.has("godofreda") and not store.has("outra") and not store.has(None)
+    assert (tmp_path / "godofreda.npz").exists()
+
+    (tmp_path / "quebrada.npz").write_bytes(b"nada")
+    reloaded = VoiceStore(str(tmp_path))
+    assert reloaded.load_all() == 1 and reloaded.names() == ["godofreda"]
+    latent, embedding = reloaded._voices["godofreda"]
+    assert latent.shape == (1, 4, 8) and float(embedding.sum()) == 8.0
+
+def test_reregistering_replaces_cached_latents(tmp_path):
+    """Registrar de novo invalida os latentes antigos, em memória e em disco"""
+    model = FakeXTTS()
+    store = VoiceStore(str(tmp_path))
+    store.register("godofreda", ["a.wav"], fake_tts(model))
+    store.register("godofreda", ["b.wav"], fake_tts(model))
+    assert float(store._voices["godofreda"][0].max()) == 2.0
+    with np.load(tmp_path / "godofreda.npz") as data:
+        assert float(data["gpt_cond_latent"].max()) == 2.0
+
+def test_invalid_registrations_and_builtin_speakers(tmp_path):
+    """Nomes inválidos e modelos sem XTTS são recusados; speakers embutidos entram no store"""
+    model = FakeXTTS({"Ana": {"gpt_cond_latent": torch.ones((1, 4, 8)), "speaker_embedding": torch.ones((1, 8, 1))}})
+    store = VoiceStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.register("../fora", ["a.wav"], fake_tts(model))
+    with pytest.raises(ValueError):
+        store.register("vits", ["a.wav"], fake_tts(object()))
+
+    assert store.ensure_builtin("Ana", fake_tts(model)) and (tmp_path / "Ana.npz").exists()
+    assert not store.ensure_builtin("Desconhecida", fake_tts(model))
+    assert model.calls == 0